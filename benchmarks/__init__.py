@@ -0,0 +1,4 @@
+"""Benchmark suites for the torrent downloader.
+
+Run the microbenchmarks with ``python -m benchmarks.micro --help``.
+"""
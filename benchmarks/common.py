@@ -0,0 +1,108 @@
+"""Shared helpers for the benchmark suites: timing, JSON results, comparison."""
+
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional
+import json
+import platform
+import statistics
+import sys
+import time
+
+
+@dataclass
+class BenchResult:
+    name: str
+    size: int  # number of synthetic torrents / items per call
+    repeat: int
+    min_s: float
+    median_s: float
+    per_item_ns: float  # median time divided by size
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}[{self.size}]"
+
+
+@dataclass
+class Regression:
+    key: str
+    baseline_ns: float
+    current_ns: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current_ns / self.baseline_ns if self.baseline_ns else float("inf")
+
+
+def measure(name: str, size: int, fn: Callable[[], object], repeat: int,
+            setup: Optional[Callable[[], None]] = None) -> BenchResult:
+    """Time ``fn`` ``repeat`` times (after one warm-up call) and summarise.
+
+    ``setup`` runs before every timed call and is not included in the timing.
+    """
+    assert isinstance(size, int) and size > 0, "size must be a positive integer"
+    assert isinstance(repeat, int) and repeat > 0, "repeat must be a positive integer"
+    if setup:
+        setup()
+    fn()  # warm-up
+    timings: List[float] = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    median = statistics.median(timings)
+    return BenchResult(name=name, size=size, repeat=repeat, min_s=min(timings),
+                       median_s=median, per_item_ns=median / size * 1e9)
+
+
+def repeat_for(size: int, budget_items: int = 200_000) -> int:
+    """Pick a repeat count so each benchmark processes roughly ``budget_items``."""
+    return max(3, min(50, budget_items // max(1, size)))
+
+
+def save_results(path: str, results: List[BenchResult]) -> None:
+    payload = {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": [asdict(r) for r in results],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+
+
+def load_results(path: str) -> List[BenchResult]:
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    assert isinstance(payload, dict) and "results" in payload, "not a benchmark results file"
+    return [BenchResult(**r) for r in payload["results"]]
+
+
+def compare(current: List[BenchResult], baseline: List[BenchResult],
+            threshold: float = 0.15) -> List[Regression]:
+    """Return entries whose per-item time grew by more than ``threshold``.
+
+    Only benchmarks present in both runs are compared (matched by name and
+    size), so adding new benchmarks never produces a false regression.
+    """
+    assert threshold >= 0, "threshold must not be negative"
+    base: Dict[str, BenchResult] = {r.key: r for r in baseline}
+    regressions: List[Regression] = []
+    for r in current:
+        b = base.get(r.key)
+        if b is None:
+            continue
+        if r.per_item_ns > b.per_item_ns * (1.0 + threshold):
+            regressions.append(Regression(key=r.key, baseline_ns=b.per_item_ns, current_ns=r.per_item_ns))
+    return regressions
+
+
+def format_table(results: List[BenchResult]) -> str:
+    lines = [f"{'benchmark':<34}{'size':>8}{'median ms':>12}{'ns/item':>12}"]
+    for r in results:
+        lines.append(f"{r.name:<34}{r.size:>8}{r.median_s * 1e3:>12.3f}{r.per_item_ns:>12.1f}")
+    return "\n".join(lines)
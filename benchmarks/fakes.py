@@ -0,0 +1,96 @@
+"""Synthetic torrent handles for benchmarks.
+
+Mirrors the fakes used by ``tests/test_progress_eta.py``: the objects satisfy
+the ``_HandleLike`` protocol so ``_status_from_handle`` and the GUI row
+building can be exercised at scale without a libtorrent session.
+"""
+
+from contextlib import contextmanager
+from typing import Iterator, List
+import os
+import random
+import tempfile
+
+from torrent_downloader.torrent import TorrentManager, TorrentStatus, lt
+
+_STATE_NAMES = ("downloading", "seeding", "finished", "checking_files", "downloading_metadata")
+
+
+def _state(name: str):
+    """Return the real libtorrent state enum value when available."""
+    try:
+        return getattr(lt.torrent_status.states, name)
+    except Exception:  # pragma: no cover - libtorrent missing
+        return name
+
+
+class FakeStatus:
+    __slots__ = ("progress", "total_done", "total_wanted", "download_rate", "upload_rate",
+                 "num_peers", "state", "paused", "pausable")
+
+    def __init__(self, rng: random.Random):
+        self.total_wanted = rng.randint(1 << 20, 1 << 34)
+        self.total_done = rng.randint(0, self.total_wanted)
+        self.progress = self.total_done / self.total_wanted
+        self.download_rate = rng.choice((0, rng.randint(1, 10 << 20)))
+        self.upload_rate = rng.choice((0, rng.randint(1, 2 << 20)))
+        self.num_peers = rng.randint(0, 200)
+        self.state = _state(rng.choice(_STATE_NAMES))
+        self.paused = rng.random() < 0.1
+        self.pausable = not self.paused
+
+
+class FakeHandle:
+    __slots__ = ("_name", "_has_meta", "_status")
+
+    def __init__(self, index: int, rng: random.Random):
+        self._name = f"synthetic-torrent-{index:06d}-" + "x" * rng.randint(0, 60) + ".iso"
+        self._has_meta = rng.random() > 0.05
+        self._status = FakeStatus(rng)
+
+    def status(self):
+        return self._status
+
+    def has_metadata(self) -> bool:
+        return self._has_meta
+
+    def name(self) -> str:
+        return self._name
+
+    def is_valid(self) -> bool:
+        return True
+
+
+def make_handles(count: int, seed: int = 1234) -> List[FakeHandle]:
+    """Return ``count`` deterministic synthetic handles."""
+    assert isinstance(count, int) and count >= 0, "count must be a non-negative integer"
+    rng = random.Random(seed)
+    return [FakeHandle(i, rng) for i in range(count)]
+
+
+# Offline session: loopback only on an ephemeral port, no peer discovery.
+OFFLINE_SETTINGS = {
+    'listen_interfaces': '127.0.0.1:0',
+    'enable_dht': False,
+    'enable_lsd': False,
+    'enable_upnp': False,
+    'enable_natpmp': False,
+}
+
+
+@contextmanager
+def make_manager(handles: List[FakeHandle]) -> Iterator[TorrentManager]:
+    """An offline ``TorrentManager`` whose torrents are ``handles``, closed on exit."""
+    with tempfile.TemporaryDirectory() as tmp:  # holds an empty catalog only
+        manager = TorrentManager(os.path.join(tmp, "downloads"), os.path.join(tmp, "session.dat"),
+                                 settings=dict(OFFLINE_SETTINGS))
+        try:
+            manager._handles = list(handles)
+            yield manager
+        finally:
+            manager.close()
+
+
+def make_statuses(count: int, seed: int = 1234) -> List[TorrentStatus]:
+    with make_manager(make_handles(count, seed)) as manager:
+        return manager.get_status_list()
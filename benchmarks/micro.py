@@ -0,0 +1,121 @@
+"""Microbenchmarks for status translation and GUI row building.
+
+Usage::
+
+    python -m benchmarks.micro --output bench.json
+    python -m benchmarks.micro --compare bench.json --threshold 0.2
+
+With ``--compare`` the process exits with status 1 if any benchmark's
+per-item time regressed by more than the threshold against the baseline.
+"""
+
+from typing import Callable, List, Optional, Sequence
+import argparse
+import sys
+
+from torrent_downloader import util
+from torrent_downloader.gui import TorrentDownloaderApp
+from torrent_downloader.torrent import _status_from_handle
+
+from .common import BenchResult, compare, format_table, load_results, measure, repeat_for, save_results
+from .fakes import make_handles, make_manager, make_statuses
+
+DEFAULT_SIZES = (10, 100, 1_000, 10_000, 50_000)
+
+
+def _bare_app() -> TorrentDownloaderApp:
+    """An app instance without widgets or session (enough for _build_rows)."""
+    app = TorrentDownloaderApp.__new__(TorrentDownloaderApp)
+    app._last_rows = []
+    return app
+
+
+def _make_tk_tree():
+    """Return (root, treeview) or None when no display is available."""
+    try:
+        import tkinter as tk
+        from tkinter import ttk
+        root = tk.Tk()
+    except Exception:
+        return None
+    root.withdraw()
+    tree = ttk.Treeview(root, columns=("name", "progress", "speed", "eta", "peers", "state"), show="headings")
+    return root, tree
+
+
+def run_suite(sizes: Sequence[int], include_tk: bool = True,
+              log: Optional[Callable[[str], None]] = None) -> List[BenchResult]:
+    """Run all microbenchmarks for each size and return the results."""
+    results: List[BenchResult] = []
+
+    def add(result: BenchResult) -> None:
+        results.append(result)
+        if log:
+            log(f"{result.key}: {result.per_item_ns:.1f} ns/item")
+
+    tk_tree = _make_tk_tree() if include_tk else None
+    try:
+        for size in sizes:
+            repeat = repeat_for(size)
+            handles = make_handles(size)
+            statuses = make_statuses(size)
+            app = _bare_app()
+            rates = [st.download_rate for st in statuses]
+            etas = [st.eta_seconds for st in statuses]
+
+            add(measure("_status_from_handle", size, lambda: [_status_from_handle(h) for h in handles], repeat))
+            with make_manager(handles) as manager:
+                add(measure("get_status_list", size, manager.get_status_list, repeat))
+            add(measure("_build_rows", size, lambda: app._build_rows(statuses), repeat))
+            add(measure("util.format_size", size, lambda: [util.format_size(r) for r in rates], repeat))
+            add(measure("_format_eta", size, lambda: [TorrentDownloaderApp._format_eta(e) for e in etas], repeat))
+
+            if tk_tree is not None:
+                root, tree = tk_tree
+                rows = app._build_rows(statuses)
+                app.tree = tree
+
+                def reset_rows() -> None:
+                    app._last_rows = []  # force a full rebuild on every call
+
+                def refresh() -> None:
+                    app._refresh_tree(rows)
+                    root.update_idletasks()
+
+                add(measure("_refresh_tree", size, refresh, max(3, repeat // 10), setup=reset_rows))
+    finally:
+        if tk_tree is not None:
+            tk_tree[0].destroy()
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="comma separated torrent counts (default: %(default)s)")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare against a stored JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="allowed per-item slowdown before flagging a regression (default: %(default)s)")
+    parser.add_argument("--no-tk", action="store_true", help="skip the Tk Treeview benchmark")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results = run_suite(sizes, include_tk=not args.no_tk, log=lambda msg: print(msg, file=sys.stderr))
+    print(format_table(results))
+    if args.output:
+        save_results(args.output, results)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        regressions = compare(results, load_results(args.compare), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}:")
+            for reg in regressions:
+                print(f"  {reg.key}: {reg.baseline_ns:.1f} -> {reg.current_ns:.1f} ns/item (x{reg.ratio:.2f})")
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Replay a recorded session through the GUI or the status pipeline.
+
+Record a live session with the app (every status refresh and alert)::
+
+    TORRENT_DOWNLOADER_RECORD=session.td.gz python -m torrent_downloader.torrent_downloader
+
+then replay it offline, without a libtorrent session::
+
+    python -m benchmarks.replay session.td.gz --speed 10
+    python -m benchmarks.replay session.td.gz --no-gui
+
+The GUI replay (needs a display) runs the real app against the recording,
+at ``--speed`` times real time, with a temporary config and download
+directory, and prints the ``PERF`` stage timings when the recording ends.
+``--no-gui`` feeds every recorded refresh, as fast as possible, through
+status building, ``_build_rows`` and the HTTP API's ``StatusFeed`` and
+prints their timings.
+"""
+
+from typing import Dict, List, Optional, Sequence
+import argparse
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+from torrent_downloader import config
+from torrent_downloader.api import StatusFeed
+from torrent_downloader.perf import PERF, StageStats
+from torrent_downloader.replay import ReplayManager
+
+from .micro import _bare_app
+
+POLL_MS = 100
+
+
+def replay_headless(path: str) -> List[StageStats]:
+    """Run every refresh of the recording through the status pipeline; per-stage timings."""
+    manager = ReplayManager(path, speed=None)
+    app = _bare_app()
+    feed = StatusFeed()
+    timings: Dict[str, List[int]] = {"process_alerts": [], "get_status_list": [], "_build_rows": [],
+                                     "StatusFeed.publish": []}
+
+    def timed(stage: str, fn):
+        start = time.perf_counter_ns()
+        result = fn()
+        timings[stage].append(time.perf_counter_ns() - start)
+        return result
+
+    while not manager.finished:
+        statuses = timed("get_status_list", manager.get_status_list)  # steps to the next refresh
+        timed("process_alerts", manager.process_alerts)
+        timed("_build_rows", lambda: app._build_rows(statuses))
+        timed("StatusFeed.publish", lambda: feed.publish(statuses, manager.torrent_keys()))
+    manager.close()
+    return [_stage_stats(stage, samples) for stage, samples in sorted(timings.items())]
+
+
+def _stage_stats(stage: str, samples: List[int]) -> StageStats:
+    ordered = sorted(samples) or [0]
+
+    def pct(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] / 1e6
+
+    return StageStats(stage=stage, count=len(samples), p50_ms=pct(0.50), p95_ms=pct(0.95), p99_ms=pct(0.99),
+                      max_ms=ordered[-1] / 1e6, overruns=0)
+
+
+def replay_gui(path: str, speed: float) -> List[StageStats]:
+    """Run the app against the recording until it ends; the ``PERF`` stage timings."""
+    import tkinter as tk
+    from torrent_downloader.gui import TorrentDownloaderApp
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = config.ConfigStore(os.path.join(tmp, "config.json"))  # defaults: one session, no API
+        with patch.object(config, 'STORE', store), \
+                patch('torrent_downloader.gui.TorrentManager', lambda *_a, **_kw: ReplayManager(path, speed)), \
+                patch.object(TorrentDownloaderApp, '_resolve_download_dir', lambda _self: tmp):
+            PERF.reset()
+            PERF.enable()
+            root = tk.Tk()
+            app = TorrentDownloaderApp(root)
+
+            def wait():
+                if app.manager is not None and app.manager.finished:
+                    app.quit_app()
+                else:
+                    root.after(POLL_MS, wait)
+
+            root.after(POLL_MS, wait)
+            root.mainloop()
+            PERF.disable()
+    return PERF.snapshot()
+
+
+def format_stages(stages: Sequence[StageStats]) -> str:
+    lines = [f"{'stage':<22} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'over':>5}"]
+    for s in stages:
+        lines.append(f"{s.stage:<22} {s.count:>7} {s.p50_ms:9.2f} {s.p95_ms:9.2f} {s.p99_ms:9.2f} "
+                     f"{s.max_ms:9.2f} {s.overruns:>5}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="file written with TORRENT_DOWNLOADER_RECORD")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed, 1 = real time (default: %(default)s)")
+    parser.add_argument("--no-gui", action="store_true", help="replay through the status pipeline only")
+    args = parser.parse_args(argv)
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+
+    stages = replay_headless(args.recording) if args.no_gui else replay_gui(args.recording, args.speed)
+    print(format_stages(stages))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""Load test of the manager and GUI row building on the simulated backend.
+
+A ``TorrentManager`` runs on ``simlt.SimBackend`` (no libtorrent needed)
+with N magnet links. After a warm-up in which most of them get their
+metadata, every simulated second runs what one GUI poll does, and each
+stage is timed:
+
+* ``process_alerts`` – the alerts of one second of swarm activity
+* ``tick``           – recheck / relocation / seeding / traffic housekeeping
+* ``get_status_list`` and ``_build_rows`` – one status refresh
+
+``add_magnet``, ``save_state`` (resume data of every torrent) and
+``load`` (a manager starting from the saved catalog) are timed once.
+Results are deterministic for a given ``--seed`` apart from the timings.
+
+Usage::
+
+    python -m benchmarks.scale --sizes 1000,10000,50000 --output scale.json
+    python -m benchmarks.scale --compare scale.json --threshold 0.2
+"""
+
+from typing import Callable, List, Optional, Sequence
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from torrent_downloader.torrent import TorrentManager
+
+from .common import BenchResult, compare, format_table, load_results, save_results
+from .micro import _bare_app
+from .shards import _timed, make_magnets
+from .simlt import SimBackend, SwarmModel
+
+DEFAULT_SIZES = (1_000, 10_000)
+DEFAULT_SECONDS = 20
+WARM_UP_S = 30
+# Everything runs at once, as with the queue limits most users end up setting.
+UNLIMITED_QUEUE = {'active_downloads': -1, 'active_seeds': -1, 'alert_queue_size': 100_000}
+
+
+def _summary(name: str, size: int, timings: Sequence[float]) -> BenchResult:
+    median = statistics.median(timings)
+    return BenchResult(name=name, size=size, repeat=len(timings), min_s=min(timings), median_s=median,
+                       per_item_ns=median / size * 1e9)
+
+
+def run_size(size: int, seconds: int = DEFAULT_SECONDS, seed: int = 0,
+             log: Optional[Callable[[str], None]] = None) -> List[BenchResult]:
+    """Load-test one library size; returns one result per stage."""
+    assert isinstance(size, int) and size > 0, "size must be a positive integer"
+    assert isinstance(seconds, int) and seconds > 0, "seconds must be a positive integer"
+    backend = SimBackend(SwarmModel(seed=seed))
+    magnets = make_magnets(size, seed)
+    app = _bare_app()
+    with tempfile.TemporaryDirectory() as tmp, backend.install():
+        args = (os.path.join(tmp, "downloads"), os.path.join(tmp, "session.dat"))
+        manager = TorrentManager(*args, settings=dict(UNLIMITED_QUEUE))
+        results = [_timed("add_magnet", size, lambda: [manager.add_magnet(m) for m in magnets])]
+        backend.advance(WARM_UP_S)
+        manager.process_alerts()
+        if log:
+            log(f"{size}: {sum(1 for h in manager.get_torrents() if h.has_metadata())} torrents with metadata")
+
+        stages = ("process_alerts", "tick", "get_status_list", "_build_rows")
+        timings: dict = {stage: [] for stage in stages}
+        for _ in range(seconds):
+            backend.advance(1)
+            for stage, fn in (("process_alerts", manager.process_alerts), ("tick", manager.tick),
+                              ("get_status_list", manager.get_status_list)):
+                t0 = time.perf_counter()
+                statuses = fn()
+                timings[stage].append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            app._build_rows(statuses)
+            timings["_build_rows"].append(time.perf_counter() - t0)
+            manager.request_session_stats()
+        results.extend(_summary(stage, size, timings[stage]) for stage in stages)
+
+        results.append(_timed("save_state", size, manager.save_state))
+        manager.close()
+        results.append(_timed("load", size, lambda: TorrentManager(*args, settings=dict(UNLIMITED_QUEUE)).close()))
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="comma separated torrent counts (default: %(default)s)")
+    parser.add_argument("--seconds", type=int, default=DEFAULT_SECONDS,
+                        help="simulated seconds to time (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="swarm model seed (default: %(default)s)")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare against a stored JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed per-item slowdown before flagging a regression (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    results: List[BenchResult] = []
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        results.extend(run_size(size, args.seconds, args.seed, log=lambda msg: print(msg, file=sys.stderr)))
+    print(format_table(results))
+    if args.output:
+        save_results(args.output, results)
+    if args.compare:
+        regressions = compare(results, load_results(args.compare), args.threshold)
+        for reg in regressions:
+            print(f"  {reg.key}: {reg.baseline_ns:.1f} -> {reg.current_ns:.1f} ns/item (x{reg.ratio:.2f})")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
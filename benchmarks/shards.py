@@ -0,0 +1,109 @@
+"""Sharded session benchmark: status aggregation and command throughput.
+
+For every shard count a ``ShardedTorrentManager`` is started on an offline
+loopback configuration and filled with synthetic magnet links (they never
+resolve, which is fine: status translation cost does not depend on it).
+Measured per shard count:
+
+* ``add_magnet`` – adding the torrents one command at a time
+* ``status``     – one merged ``get_status_list`` over all shards
+* ``batch_pause`` / ``batch_resume`` – one batched command per shard
+
+``direct.status`` is the same status refresh on a single in-process
+``TorrentManager`` for reference.
+
+Usage::
+
+    python -m benchmarks.shards --torrents 5000 --shards 1,2,4
+    python -m benchmarks.shards --output shards.json
+"""
+
+from typing import Callable, List, Optional, Sequence
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from torrent_downloader.sharding import ShardedTorrentManager
+from torrent_downloader.torrent import TorrentManager
+
+from .common import BenchResult, format_table, measure, save_results
+from .fakes import OFFLINE_SETTINGS
+
+DEFAULT_SHARDS = (1, 2, 4)
+DEFAULT_TORRENTS = 2_000
+
+
+def make_magnets(count: int, seed: int = 1234) -> List[str]:
+    """``count`` distinct magnet links with random v1 info-hashes."""
+    rng = random.Random(seed)
+    return [f"magnet:?xt=urn:btih:{rng.getrandbits(160):040x}&dn=synthetic-{i}" for i in range(count)]
+
+
+def _timed(name: str, size: int, fn: Callable[[], object]) -> BenchResult:
+    """Single timed run (for commands that change state and cannot be repeated)."""
+    t0 = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t0
+    return BenchResult(name=name, size=size, repeat=1, min_s=elapsed, median_s=elapsed,
+                       per_item_ns=elapsed / size * 1e9)
+
+
+def bench_sharded(shards: int, magnets: Sequence[str], repeat: int, log: Callable[[str], None]) -> List[BenchResult]:
+    count = len(magnets)
+    with tempfile.TemporaryDirectory() as tmp:
+        with ShardedTorrentManager(os.path.join(tmp, "downloads"), os.path.join(tmp, "session.dat"),
+                                   settings=dict(OFFLINE_SETTINGS), shards=shards) as manager:
+            prefix = f"shards{shards}"
+            results = [_timed(f"{prefix}.add_magnet", count, lambda: [manager.add_magnet(m) for m in magnets])]
+            log(f"{prefix}: added {count} torrents")
+            results.append(measure(f"{prefix}.status", count, manager.get_status_list, repeat))
+            indices = list(range(count))
+            results.append(measure(f"{prefix}.batch_pause", count,
+                                   lambda: manager.run_batch('pause_at', indices), repeat))
+            results.append(measure(f"{prefix}.batch_resume", count,
+                                   lambda: manager.run_batch('resume_at', indices), repeat))
+    return results
+
+
+def bench_direct(magnets: Sequence[str], repeat: int) -> BenchResult:
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = TorrentManager(os.path.join(tmp, "downloads"), os.path.join(tmp, "session.dat"),
+                                 settings=dict(OFFLINE_SETTINGS))
+        for magnet in magnets:
+            manager.add_magnet(magnet)
+        return measure("direct.status", len(magnets), manager.get_status_list, repeat)
+
+
+def run_suite(shard_counts: Sequence[int], torrents: int, repeat: int = 5,
+              log: Callable[[str], None] = print) -> List[BenchResult]:
+    assert torrents > 0, "torrents must be positive"
+    magnets = make_magnets(torrents)
+    results = [bench_direct(magnets, repeat)]
+    for shards in shard_counts:
+        results.extend(bench_sharded(shards, magnets, repeat, log))
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", default=",".join(str(s) for s in DEFAULT_SHARDS),
+                        help="comma separated shard counts (default: %(default)s)")
+    parser.add_argument("--torrents", type=int, default=DEFAULT_TORRENTS,
+                        help="synthetic torrents per run (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed repetitions (default: %(default)s)")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    shard_counts = [int(s) for s in args.shards.split(",") if s.strip()]
+    results = run_suite(shard_counts, args.torrents, args.repeat, log=lambda msg: print(msg, file=sys.stderr))
+    print(format_table(results))
+    if args.output:
+        save_results(args.output, results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1005 @@
+"""Simulated libtorrent backend for load tests and benchmarks.
+
+``SimBackend`` stands in for the ``libtorrent`` module: it implements the
+part of the session, handle, status, alert and resume-data API that
+``TorrentManager`` uses, without sockets or disk I/O. Swarms are driven by a
+deterministic model (``SwarmModel``) on a virtual clock: each torrent gets
+its size, peers and speed from a random generator seeded with the model
+seed and its info-hash, so the same adds and clock steps always produce the
+same statuses and alerts, whatever the order the torrents were added in.
+
+Usage::
+
+    backend = SimBackend(SwarmModel(seed=1))
+    with backend.install():  # patches the ``lt`` of the app modules
+        manager = TorrentManager(download_dir, session_file, settings={'active_downloads': -1})
+        manager.add_magnet(magnet)
+        backend.advance(60)  # one minute of swarm time in 1 s steps
+        manager.process_alerts()
+
+What is modelled: magnets resolving their metadata after a delay (never,
+for dead swarms), download and upload rates bounded by the swarm and the
+session rate limits, completion and seeding, pausing, the auto-managed
+queue (``active_downloads`` / ``active_seeds``), hash checks, storage moves,
+resume data (progress survives a save and reload), ``post_torrent_updates``
+with only the torrents that changed, session stats counters, and the alert
+queue limit (``alert_queue_size``; alerts beyond it are dropped). Pieces
+complete in order and one ``piece_finished_alert`` per torrent and step
+stands for all pieces finished in that step. Worker processes of the sharded
+manager import the real libtorrent.
+"""
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from unittest.mock import patch
+import collections
+import hashlib
+import os
+import random
+import sys
+from urllib.parse import parse_qs, unquote
+
+KIB = 1024
+MIB = 1024 * KIB
+BLOCK_SIZE = 16 * KIB
+EPOCH = 1_700_000_000  # wall clock time at virtual time 0
+
+# Modules binding ``lt`` at import time (``from .torrent import lt``).
+LT_MODULES = ("torrent_downloader.torrent", "torrent_downloader.gui", "torrent_downloader.sharding",
+              "torrent_downloader.create")
+
+
+# --- bencoding --------------------------------------------------------------
+def bencode(value: Any) -> bytes:
+    out: List[bytes] = []
+    _bencode(value, out)
+    return b"".join(out)
+
+
+def _bencode(value: Any, out: List[bytes]) -> None:
+    if isinstance(value, bool) or isinstance(value, int):
+        out.append(b"i%de" % int(value))
+    elif isinstance(value, (bytes, str)):
+        data = value.encode("utf-8") if isinstance(value, str) else value
+        out.append(b"%d:" % len(data))
+        out.append(data)
+    elif isinstance(value, (list, tuple)):
+        out.append(b"l")
+        for item in value:
+            _bencode(item, out)
+        out.append(b"e")
+    elif isinstance(value, dict):
+        out.append(b"d")
+        items = [(k.encode("utf-8") if isinstance(k, str) else k, v) for k, v in value.items()]
+        for key, item in sorted(items):
+            _bencode(key, out)
+            _bencode(item, out)
+        out.append(b"e")
+    else:
+        raise TypeError(f"cannot bencode {type(value).__name__}")
+
+
+def bdecode(data: bytes) -> Any:
+    """Decode bencoded ``data``; strings stay bytes, like the bindings return them."""
+    value, end = _bdecode(data, 0)
+    if end != len(data):
+        raise ValueError("trailing data after bencoded value")
+    return value
+
+
+def _bdecode(data: bytes, i: int) -> Tuple[Any, int]:
+    kind = data[i:i + 1]
+    if kind == b"i":
+        end = data.index(b"e", i)
+        return int(data[i + 1:end]), end + 1
+    if kind in (b"l", b"d"):
+        items = []
+        i += 1
+        while data[i:i + 1] != b"e":
+            item, i = _bdecode(data, i)
+            items.append(item)
+        if kind == b"l":
+            return items, i + 1
+        return dict(zip(items[::2], items[1::2])), i + 1
+    if kind.isdigit():
+        colon = data.index(b":", i)
+        start = colon + 1
+        end = start + int(data[i:colon])
+        if end > len(data):
+            raise ValueError("truncated bencoded string")
+        return data[start:end], end
+    raise ValueError(f"invalid bencoding at offset {i}")
+
+
+def _text(value: Any) -> str:
+    return value.decode("utf-8", errors="replace") if isinstance(value, bytes) else str(value)
+
+
+def _get(d: Dict[Any, Any], key: str, default: Any = None) -> Any:
+    """Look up ``key`` in a dict from ``bdecode`` (bytes keys) or built in Python (str keys)."""
+    if key in d:
+        return d[key]
+    return d.get(key.encode("utf-8"), default)
+
+
+# --- constants (values of libtorrent 2.0) -----------------------------------
+class _Namespace:
+    def __init__(self, **values: Any):
+        self.__dict__.update(values)
+
+
+STATES = _Namespace(checking_files=1, downloading_metadata=2, downloading=3, finished=4, seeding=5, allocating=6,
+                    checking_resume_data=7)
+TORRENT_FLAGS = _Namespace(seed_mode=1, upload_mode=2, share_mode=4, apply_ip_filter=8, paused=16,
+                           auto_managed=32, duplicate_is_error=64, update_subscribe=128)
+TORRENT_FLAGS.default_flags = (TORRENT_FLAGS.update_subscribe | TORRENT_FLAGS.auto_managed | TORRENT_FLAGS.paused
+                               | TORRENT_FLAGS.apply_ip_filter)
+PEER_INFO = _Namespace(interesting=0x1, choked=0x2, remote_interested=0x4, remote_choked=0x8,
+                       outgoing_connection=0x20, seed=0x400, optimistic_unchoke=0x800, snubbed=0x1000,
+                       utp_socket=0x20000, rc4_encrypted=0x100000, plaintext_encrypted=0x200000,
+                       tracker=0x1, dht=0x2, pex=0x4, lsd=0x8, standard_bittorrent=0, web_seed=1, http_seed=2)
+
+# libtorrent's defaults for the settings the simulation reads
+DEFAULT_SETTINGS: Dict[str, Any] = {
+    'active_downloads': 3, 'active_seeds': 5, 'active_checking': 1, 'alert_queue_size': 2000,
+    'download_rate_limit': 0, 'upload_rate_limit': 0,
+}
+
+
+# --- model ------------------------------------------------------------------
+class SimClock:
+    """Virtual monotonic clock in seconds, moved by ``SimBackend.advance``."""
+
+    def __init__(self, start: float = 0.0):
+        self.now = float(start)
+
+    def __call__(self) -> float:
+        return self.now
+
+    def wall(self) -> int:
+        return EPOCH + int(self.now)
+
+
+@dataclass(frozen=True)
+class SwarmModel:
+    """Parameters of the deterministic swarm model."""
+
+    seed: int = 0
+    min_size: int = 16 * MIB  # sizes of magnets are log-uniform in [min_size, max_size]
+    max_size: int = 8 * 1024 * MIB
+    piece_length: int = 4 * MIB
+    max_peers: int = 60  # swarm sizes are uniform in [0, max_peers]
+    max_connections: int = 50  # per torrent
+    peer_rate: int = 64 * KIB  # mean download rate per connected seed (bytes/s)
+    dead_fraction: float = 0.05  # swarms without seeds: no metadata, no progress
+    metadata_delay_s: float = 5.0  # mean time for a magnet to get its metadata
+    check_rate: int = 400 * MIB  # hash check speed (bytes/s)
+    move_rate: int = 200 * MIB  # storage move speed (bytes/s)
+    jitter: float = 0.3  # +- fraction of random rate variation per step
+
+    def __post_init__(self) -> None:
+        if not 0 < self.min_size <= self.max_size:
+            raise ValueError("min_size must be positive and at most max_size")
+        if self.piece_length <= 0 or self.piece_length % BLOCK_SIZE:
+            raise ValueError("piece_length must be a positive multiple of 16 KiB")
+        if not 0 <= self.dead_fraction <= 1 or not 0 <= self.jitter < 1:
+            raise ValueError("dead_fraction must be in [0, 1] and jitter in [0, 1)")
+
+
+class _Swarm:
+    """The swarm of one torrent, drawn from the model."""
+
+    __slots__ = ("rng", "seeds", "leechers", "dead", "metadata_at", "size", "num_files")
+
+    def __init__(self, model: SwarmModel, key: str):
+        self.rng = random.Random(f"{model.seed}:{key}")
+        rng = self.rng
+        self.dead = rng.random() < model.dead_fraction
+        self.seeds = 0 if self.dead else rng.randint(1, max(1, model.max_peers))
+        self.leechers = rng.randint(0, model.max_peers)
+        self.metadata_at = rng.expovariate(1 / model.metadata_delay_s) if model.metadata_delay_s > 0 else 0.0
+        self.size = int(model.min_size * (model.max_size / model.min_size) ** rng.random())
+        self.num_files = rng.choice((1, 1, 1, 2, 3, 5, 12))
+
+
+# --- metadata ---------------------------------------------------------------
+class _InfoHashes:
+    __slots__ = ("_key",)
+
+    def __init__(self, key: str):
+        self._key = key
+
+    def get_best(self) -> str:
+        return self._key
+
+    @property
+    def v1(self) -> str:
+        return self._key
+
+    def __str__(self) -> str:
+        return self._key
+
+
+class file_storage:
+    flag_pad_file = 1
+
+    def __init__(self, files: Sequence[Tuple[str, int]]):
+        self._files = list(files)
+        self._total = sum(size for _path, size in self._files)
+
+    def num_files(self) -> int:
+        return len(self._files)
+
+    def file_path(self, index: int) -> str:
+        return self._files[index][0]
+
+    def file_size(self, index: int) -> int:
+        return self._files[index][1]
+
+    def file_flags(self, index: int) -> int:
+        return 0
+
+    def total_size(self) -> int:
+        return self._total
+
+
+class torrent_info:
+    """Metadata from a .torrent file, or made up by the swarm model for magnets."""
+
+    def __init__(self, source: Union[str, Dict[Any, Any]], *, key: Optional[str] = None):
+        if isinstance(source, str):
+            with open(source, "rb") as f:
+                meta = bdecode(f.read())
+            info = _get(meta, "info")
+            if not isinstance(info, dict):
+                raise RuntimeError(f"{source}: not a torrent file")
+        else:
+            info = source
+        self.info = {k: v for k, v in info.items() if k not in ("pieces", b"pieces")}  # kept in resume data
+        self._key = key or hashlib.sha1(bencode(info)).hexdigest()
+        self._name = _text(_get(info, "name", b""))
+        self._piece_length = int(_get(info, "piece length", 16 * KIB))
+        if _get(info, "files") is not None:
+            files = [(os.path.join(self._name, *(_text(p) for p in _get(f, "path"))), int(_get(f, "length")))
+                     for f in _get(info, "files")]
+        else:
+            files = [(self._name, int(_get(info, "length", 0)))]
+        self._files = file_storage(files)
+
+    def info_hashes(self) -> _InfoHashes:
+        return _InfoHashes(self._key)
+
+    def name(self) -> str:
+        return self._name
+
+    def total_size(self) -> int:
+        return self._files.total_size()
+
+    def piece_length(self) -> int:
+        return self._piece_length
+
+    def num_pieces(self) -> int:
+        return max(1, -(-self.total_size() // self._piece_length))
+
+    def files(self) -> file_storage:
+        return self._files
+
+    def layout(self) -> file_storage:
+        return self._files
+
+
+def write_torrent(path: str, name: str, file_sizes: Sequence[int], piece_length: int = 4 * MIB) -> str:
+    """Write a .torrent file (with dummy piece hashes) for the simulation; returns its info-hash."""
+    assert file_sizes and all(size >= 0 for size in file_sizes), "file_sizes must be non-negative sizes"
+    total = sum(file_sizes)
+    info: Dict[str, Any] = {"name": name, "piece length": piece_length,
+                            "pieces": b"\0" * 20 * max(1, -(-total // piece_length))}
+    if len(file_sizes) == 1:
+        info["length"] = file_sizes[0]
+    else:
+        info["files"] = [{"length": size, "path": [f"file{i:03d}.bin"]} for i, size in enumerate(file_sizes)]
+    with open(path, "wb") as f:
+        f.write(bencode({"info": info}))
+    return hashlib.sha1(bencode(info)).hexdigest()
+
+
+class add_torrent_params:
+    def __init__(self) -> None:
+        self.ti: Optional[torrent_info] = None
+        self.info_hashes = _InfoHashes("")
+        self.name = ""
+        self.save_path = ""
+        self.storage_mode = 0
+        self.flags = TORRENT_FLAGS.default_flags
+        self.total_done = 0
+        self.uploaded = 0
+        self.added_time = 0
+        self.completed_time = 0
+        self.seeding_time = 0
+        self.download_limit = -1
+        self.upload_limit = -1
+        self.file_priorities: List[int] = []
+
+
+def parse_magnet_uri(uri: str) -> add_torrent_params:
+    query = parse_qs(uri[len("magnet:?"):])
+    atp = add_torrent_params()
+    for xt in query.get("xt", ()):
+        if xt.startswith("urn:btih:"):
+            atp.info_hashes = _InfoHashes(xt[len("urn:btih:"):].lower())
+    if not atp.info_hashes.get_best():
+        raise RuntimeError(f"invalid magnet link: {uri[:60]}")
+    atp.name = unquote(query.get("dn", [""])[0])
+    return atp
+
+
+def read_resume_data(data: bytes) -> add_torrent_params:
+    """Parameters from resume data written by the simulation (``save_resume_data_alert.resume_data``)."""
+    resume = bdecode(data)
+    atp = add_torrent_params()
+    atp.info_hashes = _InfoHashes(_text(_get(resume, "info-hash")))
+    atp.name = _text(_get(resume, "name", b""))
+    atp.save_path = _text(_get(resume, "save_path", b""))
+    info = _get(resume, "info")
+    if info is not None:
+        atp.ti = torrent_info(info, key=atp.info_hashes.get_best())
+    for field in ("flags", "total_done", "uploaded", "added_time", "completed_time", "seeding_time",
+                  "download_limit", "upload_limit"):
+        setattr(atp, field, int(_get(resume, field, getattr(atp, field))))
+    return atp
+
+
+def make_magnet_uri(handle: "torrent_handle") -> str:
+    return f"magnet:?xt=urn:btih:{handle.info_hash()}&dn={handle.name()}"
+
+
+# --- alerts -----------------------------------------------------------------
+class alert:
+    """Base of the simulated alerts; dispatch uses the class name, as with the bindings."""
+
+    category_t = _Namespace(all_categories=0x7FFFFFFF)
+
+    def __init__(self, handle: Optional["torrent_handle"] = None, msg: str = "", **fields: Any):
+        if handle is not None:
+            self.handle = handle
+        self._message = msg
+        self.__dict__.update(fields)
+
+    def message(self) -> str:
+        return self._message
+
+    def what(self) -> str:
+        return type(self).__name__[:-len("_alert")]
+
+
+ALERT_NAMES = (
+    "add_torrent_alert", "torrent_removed_alert", "torrent_deleted_alert", "metadata_received_alert",
+    "state_changed_alert", "torrent_finished_alert", "torrent_paused_alert", "torrent_resumed_alert",
+    "torrent_checked_alert", "piece_finished_alert", "storage_moved_alert", "storage_moved_failed_alert",
+    "save_resume_data_alert", "save_resume_data_failed_alert", "state_update_alert", "session_stats_alert",
+    "alerts_dropped_alert",
+)
+ALERT_TYPES: Dict[str, type] = {name: type(name, (alert,), {}) for name in ALERT_NAMES}
+
+
+# --- torrents ---------------------------------------------------------------
+class torrent_status:
+    """Snapshot of a simulated torrent, with the fields the app reads."""
+
+    states = STATES
+    __slots__ = ("handle", "info_hashes", "name", "state", "paused", "auto_managed", "has_metadata",
+                 "progress", "total_done", "total_wanted", "total_wanted_done", "download_rate", "upload_rate",
+                 "num_peers", "num_seeds", "num_complete", "num_incomplete", "save_path", "is_finished",
+                 "is_seeding", "total_payload_download", "total_payload_upload", "all_time_download",
+                 "all_time_upload", "seeding_duration", "num_pieces", "pieces", "need_save_resume")
+
+
+class peer_info:
+    """A connected peer, as returned by ``get_peer_info``."""
+
+    __slots__ = ("ip", "client", "flags", "source", "connection_type", "down_speed", "up_speed", "progress")
+
+
+for _name, _value in vars(PEER_INFO).items():  # lt.peer_info.interesting etc.
+    setattr(peer_info, _name, _value)
+
+
+class _Torrent:
+    """Simulation state of one torrent; ``torrent_handle`` is its public face."""
+
+    __slots__ = ("key", "name", "swarm", "ti", "save_path", "flags", "paused", "state", "total_done", "uploaded",
+                 "session_download", "session_upload", "download_rate", "upload_rate", "added_time",
+                 "completed_time", "seeding_time", "added_at", "check_left", "moving_to", "move_left",
+                 "need_save", "valid")
+
+    def __init__(self, atp: add_torrent_params, swarm: _Swarm, now: float, wall: int):
+        self.key = atp.info_hashes.get_best()
+        self.ti = atp.ti
+        self.name = atp.ti.name() if atp.ti is not None else atp.name
+        self.swarm = swarm
+        self.save_path = atp.save_path
+        self.flags = int(atp.flags)
+        self.paused = bool(self.flags & TORRENT_FLAGS.paused)
+        self.total_done = atp.total_done
+        self.uploaded = atp.uploaded
+        self.session_download = self.session_upload = 0
+        self.download_rate = self.upload_rate = 0
+        self.added_time = atp.added_time or wall
+        self.completed_time = atp.completed_time
+        self.seeding_time = float(atp.seeding_time)
+        self.added_at = now
+        self.check_left = 0.0  # seconds of hashing left
+        self.moving_to: Optional[str] = None
+        self.move_left = 0.0
+        self.need_save = False
+        self.valid = True
+        if self.ti is None:
+            self.state = STATES.downloading_metadata
+        elif self.flags & TORRENT_FLAGS.seed_mode:
+            self.total_done = self.size
+            self.state = STATES.seeding
+        elif self.total_done >= self.size:
+            self.state = STATES.seeding
+        else:
+            self.state = STATES.downloading
+
+    @property
+    def size(self) -> int:
+        return self.ti._files._total if self.ti is not None else 0
+
+    @property
+    def auto_managed(self) -> bool:
+        return bool(self.flags & TORRENT_FLAGS.auto_managed)
+
+    @property
+    def finished(self) -> bool:
+        return self.ti is not None and self.total_done >= self.size
+
+    @property
+    def active(self) -> bool:
+        """Not paused and not hashing: exchanging data."""
+        return not self.paused and self.state not in (STATES.checking_files, STATES.checking_resume_data)
+
+    def peers(self, model: SwarmModel) -> int:
+        if not self.active:
+            return 0
+        swarm = self.swarm
+        return min(model.max_connections, (0 if self.finished else swarm.seeds) + swarm.leechers)
+
+    def pieces_done(self) -> int:
+        if self.ti is None:
+            return 0
+        return self.ti.num_pieces() if self.finished else self.total_done // self.ti.piece_length()
+
+
+class torrent_handle:
+    """Handle of a simulated torrent; becomes invalid when it is removed."""
+
+    __slots__ = ("_t", "_session")
+
+    def __init__(self, torrent: _Torrent, session: "session"):
+        self._t = torrent
+        self._session = session
+
+    def is_valid(self) -> bool:
+        return self._t.valid
+
+    def _check(self) -> _Torrent:
+        if not self._t.valid:
+            raise RuntimeError("invalid torrent handle used")
+        return self._t
+
+    def info_hashes(self) -> _InfoHashes:
+        return _InfoHashes(self._t.key)
+
+    def info_hash(self) -> str:
+        return self._t.key
+
+    def name(self) -> str:
+        return self._check().name
+
+    def has_metadata(self) -> bool:
+        return self._check().ti is not None
+
+    def torrent_file(self) -> Optional[torrent_info]:
+        return self._check().ti
+
+    def status(self, flags: int = 0) -> torrent_status:
+        """Pieces only with ``status_flags_t.query_pieces``, so plain refreshes stay cheap."""
+        return self._session._status(self._check(), self, bool(flags & 8))
+
+    def pause(self) -> None:
+        self._session._set_paused(self._check(), True)
+
+    def resume(self) -> None:
+        self._session._set_paused(self._check(), False)
+
+    def set_flags(self, flags: int, mask: Optional[int] = None) -> None:
+        t = self._check()
+        if mask is not None:
+            flags = (t.flags & ~mask) | (flags & mask)
+        else:
+            flags = t.flags | flags
+        self._session._apply_flags(t, flags)
+
+    def unset_flags(self, flags: int) -> None:
+        t = self._check()
+        self._session._apply_flags(t, t.flags & ~flags)
+
+    def flags(self) -> int:
+        return self._check().flags
+
+    def set_max_uploads(self, limit: int) -> None:
+        self._check()
+
+    def force_recheck(self) -> None:
+        t = self._check()
+        if t.ti is not None:
+            t.check_left = max(t.total_done, 1) / self._session._model.check_rate
+            self._session._set_state(t, STATES.checking_files)
+
+    def move_storage(self, path: str, flags: int = 0) -> None:
+        t = self._check()
+        t.moving_to = path
+        t.move_left = t.total_done / self._session._model.move_rate
+
+    def need_save_resume_data(self) -> bool:
+        return self._check().need_save
+
+    def save_resume_data(self, flags: int = 0) -> None:
+        self._session._resume_requests.append(self)
+
+    def get_peer_info(self) -> List[peer_info]:
+        return self._session._peers(self._check())
+
+    def file_progress(self, flags: int = 0) -> List[int]:
+        t = self._check()
+        fs = t.ti.files() if t.ti is not None else file_storage([])
+        done = t.pieces_done() * t.ti.piece_length() if t.ti is not None else 0
+        progress = []
+        for i in range(fs.num_files()):  # pieces complete in order, so files do too
+            size = fs.file_size(i)
+            progress.append(max(0, min(size, done)))
+            done -= size
+        return progress
+
+    def get_file_priorities(self) -> List[int]:
+        t = self._check()
+        return [4] * (t.ti.files().num_files() if t.ti is not None else 0)
+
+    def piece_availability(self) -> List[int]:
+        t = self._check()
+        if t.ti is None:
+            return []
+        return [0 if t.swarm.dead else t.swarm.seeds] * t.ti.num_pieces()
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, torrent_handle) and other._t is self._t
+
+    def __hash__(self) -> int:
+        return id(self._t)
+
+
+# --- session ----------------------------------------------------------------
+class ip_filter:
+    def __init__(self) -> None:
+        self.rules: List[Tuple[str, str, int]] = []
+
+    def add_rule(self, first: str, last: str, flags: int) -> None:
+        self.rules.append((first, last, flags))
+
+
+class session:
+    """A simulated session; torrents move when the backend advances the clock."""
+
+    global_peer_class_id = 0
+    tcp_peer_class_id = 1
+    local_peer_class_id = 2
+
+    def __init__(self, backend: "SimBackend", settings: Optional[Dict[str, Any]] = None):
+        self._backend = backend
+        self._model = backend.model
+        self._clock = backend.clock
+        self.settings: Dict[str, Any] = dict(DEFAULT_SETTINGS)
+        self.settings.update(settings or {})
+        self._torrents: Dict[str, torrent_handle] = {}  # in add order
+        self._alerts: Deque[alert] = collections.deque()
+        self._resume_requests: Deque[torrent_handle] = collections.deque()
+        self._updated: Dict[str, torrent_handle] = {}  # changed since the last post_torrent_updates
+        self._first_update = True
+        self._dropped = 0
+        self._counters: Dict[str, int] = collections.Counter()
+        self.ip_filter = ip_filter()
+        self.peer_class_filter = ip_filter()
+        self.peer_classes: Dict[int, Dict[str, Any]] = {}
+
+    # settings and state
+    def apply_settings(self, settings: Dict[str, Any]) -> None:
+        self.settings.update(settings)
+
+    def get_settings(self) -> Dict[str, Any]:
+        return dict(self.settings)
+
+    def save_state(self, flags: int = 0xFFFFFFFF) -> Dict[str, Any]:
+        return {"settings": {k: v for k, v in self.settings.items() if isinstance(v, (int, str))}}
+
+    def load_state(self, state: Dict[Any, Any], flags: int = 0xFFFFFFFF) -> None:
+        for key, value in (_get(state, "settings") or {}).items():
+            self.settings[_text(key)] = _text(value) if isinstance(value, bytes) else value
+
+    def set_ip_filter(self, f: ip_filter) -> None:
+        self.ip_filter = f
+
+    def set_peer_class_filter(self, f: ip_filter) -> None:
+        self.peer_class_filter = f
+
+    def create_peer_class(self, name: str) -> int:
+        class_id = next(i for i in range(self.local_peer_class_id + 1, 1 << 16) if i not in self.peer_classes)
+        self.peer_classes[class_id] = {'label': name}
+        return class_id
+
+    def delete_peer_class(self, class_id: int) -> None:
+        self.peer_classes.pop(class_id, None)
+
+    def set_peer_class(self, class_id: int, info: Dict[str, Any]) -> None:
+        self.peer_classes[class_id] = dict(info)
+
+    # torrents
+    def add_torrent(self, params: Union[add_torrent_params, Dict[str, Any]]) -> torrent_handle:
+        if isinstance(params, dict):
+            atp = add_torrent_params()
+            atp.ti = params['ti']
+            atp.info_hashes = atp.ti.info_hashes()
+            atp.save_path = params.get('save_path', '')
+            atp.flags = params.get('flags', TORRENT_FLAGS.default_flags)
+            params = atp
+        key = params.info_hashes.get_best()
+        if key in self._torrents:
+            raise RuntimeError(f"torrent {key} already in session")
+        torrent = _Torrent(params, _Swarm(self._model, key), self._clock.now, self._clock.wall())
+        handle = torrent_handle(torrent, self)
+        self._torrents[key] = handle
+        self._changed(handle)
+        self._post("add_torrent_alert", handle, f"{torrent.name or key} added")
+        return handle
+
+    def remove_torrent(self, handle: torrent_handle, option: int = 0) -> None:
+        t = handle._check()
+        t.valid = False
+        del self._torrents[t.key]
+        self._updated.pop(t.key, None)
+        self._post("torrent_removed_alert", handle, f"{t.name or t.key} removed", info_hashes=_InfoHashes(t.key))
+        if option & 1:
+            self._post("torrent_deleted_alert", handle, f"{t.name or t.key} deleted", info_hashes=_InfoHashes(t.key))
+
+    def get_torrents(self) -> List[torrent_handle]:
+        return list(self._torrents.values())
+
+    def find_torrent(self, key: Any) -> torrent_handle:
+        return self._torrents[str(key)]
+
+    # alerts
+    def _post(self, name: str, handle: Optional[torrent_handle], msg: str = "", **fields: Any) -> None:
+        limit = int(self.settings.get('alert_queue_size', 2000))
+        if len(self._alerts) >= limit and name not in ("save_resume_data_alert", "save_resume_data_failed_alert"):
+            self._dropped += 1
+            return
+        self._alerts.append(ALERT_TYPES[name](handle, msg, **fields))
+
+    def _deliver_resume_data(self) -> None:
+        """Resume data is written asynchronously: hand out what fits in the alert queue."""
+        limit = int(self.settings.get('alert_queue_size', 2000))
+        while self._resume_requests and len(self._alerts) < limit:
+            handle = self._resume_requests.popleft()
+            t = handle._t
+            if not t.valid:
+                self._post("save_resume_data_failed_alert", handle, f"{t.key}: invalid handle")
+                continue
+            t.need_save = False
+            self._post("save_resume_data_alert", handle, f"{t.name or t.key} resume data generated",
+                       resume_data=self._resume_data(t), params=self._resume_params(t))
+
+    def _resume_data(self, t: _Torrent) -> Dict[str, Any]:
+        data: Dict[str, Any] = {"info-hash": t.key, "name": t.name, "save_path": t.save_path, "flags": t.flags,
+                                "total_done": t.total_done, "uploaded": t.uploaded, "added_time": t.added_time,
+                                "completed_time": t.completed_time, "seeding_time": int(t.seeding_time),
+                                "download_limit": -1, "upload_limit": -1}
+        if t.paused:
+            data["flags"] |= TORRENT_FLAGS.paused
+        else:
+            data["flags"] &= ~TORRENT_FLAGS.paused
+        if t.ti is not None:
+            data["info"] = t.ti.info
+        return data
+
+    @staticmethod
+    def _resume_params(t: _Torrent) -> add_torrent_params:
+        params = add_torrent_params()
+        params.info_hashes = _InfoHashes(t.key)
+        params.name = t.name
+        params.added_time = t.added_time
+        params.completed_time = t.completed_time
+        params.file_priorities = [4] * (t.ti.files().num_files() if t.ti is not None else 0)
+        return params
+
+    def pop_alerts(self) -> List[alert]:
+        self._deliver_resume_data()
+        alerts = list(self._alerts)
+        self._alerts.clear()
+        if self._dropped:
+            alerts.append(ALERT_TYPES["alerts_dropped_alert"](None, f"{self._dropped} alerts dropped",
+                                                              dropped=self._dropped))
+            self._dropped = 0
+        return alerts
+
+    def wait_for_alert(self, timeout_ms: int) -> Optional[alert]:
+        """Alerts are posted synchronously, so there is nothing to wait for."""
+        self._deliver_resume_data()
+        return self._alerts[0] if self._alerts else None
+
+    def post_torrent_updates(self, flags: int = 0xFFFFFFFF) -> None:
+        handles = list(self._torrents.values() if self._first_update else self._updated.values())
+        self._first_update = False
+        self._updated.clear()
+        self._post("state_update_alert", None, f"{len(handles)} torrents updated",
+                   status=[self._status(h._t, h, False) for h in handles])
+
+    def post_session_stats(self) -> None:
+        values = dict(self._counters)
+        values['disk.queued_disk_jobs'] = sum(1 for h in self._torrents.values() if h._t.check_left > 0)
+        values['peer.num_peers_connected'] = sum(h._t.peers(self._model) for h in self._torrents.values())
+        self._post("session_stats_alert", None, "session stats", values=values)
+
+    # simulation
+    def _changed(self, handle: torrent_handle) -> None:
+        handle._t.need_save = True
+        self._updated[handle._t.key] = handle
+
+    def _set_state(self, t: _Torrent, state: int) -> None:
+        if t.state != state:
+            previous, t.state = t.state, state
+            self._post("state_changed_alert", self._torrents[t.key], f"{t.name}: state changed",
+                       state=state, prev_state=previous)
+
+    def _set_paused(self, t: _Torrent, paused: bool) -> None:
+        if t.paused == paused:
+            return
+        t.paused = paused
+        if paused:
+            t.download_rate = t.upload_rate = 0
+        handle = self._torrents[t.key]
+        self._changed(handle)
+        self._post("torrent_paused_alert" if paused else "torrent_resumed_alert", handle,
+                   f"{t.name or t.key} {'paused' if paused else 'resumed'}")
+
+    def _apply_flags(self, t: _Torrent, flags: int) -> None:
+        t.flags = flags
+        self._changed(self._torrents[t.key])
+
+    def _status(self, t: _Torrent, handle: torrent_handle, with_pieces: bool) -> torrent_status:
+        s = torrent_status()
+        s.handle = handle
+        s.info_hashes = _InfoHashes(t.key)
+        s.name = t.name
+        s.state = t.state
+        s.paused = t.paused
+        s.auto_managed = t.auto_managed
+        s.has_metadata = t.ti is not None
+        s.total_wanted = t.size
+        s.total_done = s.total_wanted_done = t.total_done
+        s.progress = t.total_done / t.size if t.size else 0.0
+        s.download_rate = t.download_rate
+        s.upload_rate = t.upload_rate
+        s.num_peers = t.peers(self._model)
+        s.num_seeds = 0 if t.finished or not t.active else min(s.num_peers, t.swarm.seeds)
+        s.num_complete = t.swarm.seeds + (1 if t.finished else 0)
+        s.num_incomplete = t.swarm.leechers
+        s.save_path = t.save_path
+        s.is_finished = t.finished
+        s.is_seeding = t.finished and not t.paused
+        s.total_payload_download = t.session_download
+        s.total_payload_upload = t.session_upload
+        s.all_time_download = t.total_done
+        s.all_time_upload = t.uploaded
+        s.seeding_duration = timedelta(seconds=int(t.seeding_time))
+        s.num_pieces = t.pieces_done()
+        s.pieces = [i < s.num_pieces for i in range(t.ti.num_pieces())] if with_pieces and t.ti is not None else []
+        s.need_save_resume = t.need_save
+        return s
+
+    def _peers(self, t: _Torrent) -> List[peer_info]:
+        count = t.peers(self._model)
+        rng = random.Random(f"{self._model.seed}:{t.key}:peers")
+        peers = []
+        for i in range(count):
+            p = peer_info()
+            seed = i < count - t.swarm.leechers
+            p.ip = (f"10.{i // 250 % 250}.{i % 250}.{rng.randint(1, 254)}", rng.randint(1024, 65535))
+            p.client = rng.choice(("qBittorrent 4.6.2", "Transmission 4.0.5", "libtorrent/2.0.9", ""))
+            p.flags = (PEER_INFO.interesting if seed else PEER_INFO.remote_interested) | PEER_INFO.outgoing_connection
+            if rng.random() < 0.5:
+                p.flags |= PEER_INFO.utp_socket
+            p.source = rng.choice((PEER_INFO.tracker, PEER_INFO.dht, PEER_INFO.pex))
+            p.connection_type = PEER_INFO.standard_bittorrent
+            p.down_speed = t.download_rate // max(1, count - t.swarm.leechers) if seed else 0
+            p.up_speed = 0 if seed else t.upload_rate // max(1, t.swarm.leechers)
+            p.progress = 1.0 if seed else rng.random()
+            peers.append(p)
+        return peers
+
+    def _auto_manage(self) -> None:
+        """libtorrent's queue: the first ``active_downloads`` / ``active_seeds`` auto-managed torrents run."""
+        slots = {False: int(self.settings.get('active_downloads', 3)), True: int(self.settings.get('active_seeds', 5))}
+        for handle in self._torrents.values():
+            t = handle._t
+            if not t.auto_managed or t.check_left > 0:
+                continue
+            finished = t.finished
+            run = slots[finished] != 0  # -1: unlimited
+            if run and slots[finished] > 0:
+                slots[finished] -= 1
+            self._set_paused(t, not run)
+
+    def _step(self, dt: float) -> None:
+        """Advance every torrent by ``dt`` seconds."""
+        model = self._model
+        self._auto_manage()
+        checking_slots = max(1, int(self.settings.get('active_checking', 1)))
+        download_want: List[Tuple[torrent_handle, int]] = []
+        upload_want: List[Tuple[torrent_handle, int]] = []
+        for handle in self._torrents.values():
+            t = handle._t
+            if t.check_left > 0:
+                if checking_slots > 0:
+                    checking_slots -= 1
+                    t.check_left -= dt
+                    if t.check_left <= 0:
+                        t.check_left = 0
+                        self._set_state(t, STATES.seeding if t.finished else STATES.downloading)
+                        self._post("torrent_checked_alert", handle, f"{t.name} checked")
+                        self._changed(handle)
+                continue
+            if t.moving_to is not None:
+                t.move_left -= dt
+                if t.move_left <= 0:
+                    t.save_path, t.moving_to = t.moving_to, None
+                    self._post("storage_moved_alert", handle, f"{t.name} moved to {t.save_path}",
+                               storage_path=t.save_path)
+                    self._changed(handle)
+            if not t.active or t.swarm.dead:
+                continue
+            if t.ti is None:
+                if self._clock.now - t.added_at >= t.swarm.metadata_at:
+                    self._got_metadata(handle)
+                continue
+            jitter = 1 + model.jitter * (2 * t.swarm.rng.random() - 1)
+            if not t.finished:
+                rate = int(min(t.swarm.seeds, model.max_connections) * model.peer_rate * jitter)
+                download_want.append((handle, min(rate, int((t.size - t.total_done) / dt) + 1)))
+            if t.swarm.leechers:
+                upload_want.append((handle, int(t.swarm.leechers * model.peer_rate / 4 * jitter)))
+            elif t.upload_rate:
+                t.upload_rate = 0
+                self._changed(handle)
+            if t.finished:
+                t.seeding_time += dt
+        self._transfer(download_want, int(self.settings.get('download_rate_limit', 0)), dt, download=True)
+        self._transfer(upload_want, int(self.settings.get('upload_rate_limit', 0)), dt, download=False)
+
+    def _transfer(self, wants: List[Tuple[torrent_handle, int]], limit: int, dt: float, download: bool) -> None:
+        total = sum(rate for _h, rate in wants)
+        scale = limit / total if 0 < limit < total else 1.0
+        counter = 'net.recv_payload_bytes' if download else 'net.sent_payload_bytes'
+        for handle, want in wants:
+            t = handle._t
+            rate = int(want * scale)
+            amount = int(rate * dt)
+            self._counters[counter] += amount
+            if download:
+                pieces_before = t.pieces_done()
+                t.download_rate = rate
+                t.total_done = min(t.size, t.total_done + amount)
+                t.session_download += amount
+                blocks = amount // BLOCK_SIZE
+                self._counters['disk.num_write_ops'] += blocks
+                self._counters['disk.disk_write_time'] += blocks * 800  # microseconds
+                if t.pieces_done() != pieces_before:
+                    self._post("piece_finished_alert", handle, f"{t.name}: piece finished",
+                               piece_index=t.pieces_done() - 1)
+                if t.finished:
+                    t.download_rate = 0
+                    t.completed_time = self._clock.wall()
+                    self._set_state(t, STATES.seeding)
+                    self._post("torrent_finished_alert", handle, f"{t.name} torrent finished downloading")
+            else:
+                t.upload_rate = rate
+                t.uploaded += amount
+                t.session_upload += amount
+                blocks = amount // BLOCK_SIZE
+                self._counters['disk.num_read_ops'] += blocks
+                self._counters['disk.disk_read_time'] += blocks * 300
+            self._changed(handle)
+
+    def _got_metadata(self, handle: torrent_handle) -> None:
+        t = handle._t
+        swarm = t.swarm
+        name = t.name or f"sim-{t.key[:8]}"
+        parts = [swarm.size // swarm.num_files] * swarm.num_files
+        parts[-1] += swarm.size - sum(parts)
+        info: Dict[str, Any] = {"name": name, "piece length": self._model.piece_length}
+        if swarm.num_files == 1:
+            info["length"] = parts[0]
+        else:
+            info["files"] = [{"length": size, "path": [f"part{i:03d}.bin"]} for i, size in enumerate(parts)]
+        t.ti = torrent_info(info, key=t.key)
+        t.name = name
+        self._set_state(t, STATES.downloading)
+        self._changed(handle)
+        self._post("metadata_received_alert", handle, f"{name}: metadata received")
+
+
+# --- the module stand-in ----------------------------------------------------
+class SimBackend:
+    """Replaces the ``libtorrent`` module; every ``session()`` it creates shares the clock and model."""
+
+    torrent_status = torrent_status
+    torrent_flags = TORRENT_FLAGS
+    torrent_handle = torrent_handle
+    torrent_info = torrent_info
+    add_torrent_params = add_torrent_params
+    file_storage = file_storage
+    peer_info = peer_info
+    ip_filter = ip_filter
+    alert = alert
+    storage_mode_t = _Namespace(storage_mode_allocate=0, storage_mode_sparse=1)
+    move_flags_t = _Namespace(always_replace_files=0, fail_if_exist=1, dont_replace=2)
+    options_t = _Namespace(delete_files=1)
+    status_flags_t = _Namespace(query_distributed_copies=1, query_accurate_download_counters=2,
+                                query_last_seen_complete=4, query_pieces=8, query_verified_pieces=16)
+    file_progress_flags_t = _Namespace(piece_granularity=1)
+    bencode = staticmethod(bencode)
+    bdecode = staticmethod(bdecode)
+    parse_magnet_uri = staticmethod(parse_magnet_uri)
+    read_resume_data = staticmethod(read_resume_data)
+    make_magnet_uri = staticmethod(make_magnet_uri)
+    __version__ = "2.0.0-sim"
+
+    def __init__(self, model: Optional[SwarmModel] = None, clock: Optional[SimClock] = None):
+        self.model = model or SwarmModel()
+        self.clock = clock or SimClock()
+        self.sessions: List[session] = []
+
+    def session(self, settings: Optional[Dict[str, Any]] = None) -> session:
+        s = session(self, settings)
+        self.sessions.append(s)
+        return s
+
+    def __getattr__(self, name: str) -> Any:
+        if name in ALERT_TYPES:  # e.g. isinstance(a, lt.save_resume_data_alert)
+            return ALERT_TYPES[name]
+        raise AttributeError(f"the simulated backend has no {name}")
+
+    def advance(self, seconds: float, step: float = 1.0) -> None:
+        """Move the virtual clock forward, simulating every session in steps of ``step`` seconds."""
+        assert seconds >= 0 and step > 0, "seconds must be >= 0 and step positive"
+        left = seconds
+        while left > 1e-9:
+            dt = min(step, left)
+            self.clock.now += dt
+            left -= dt
+            for s in self.sessions:
+                s._step(dt)
+
+    @contextmanager
+    def install(self) -> Iterator["SimBackend"]:
+        """Use this backend as ``lt`` in the app modules (those imported so far)."""
+        patches = [patch(f"{name}.lt", self) for name in LT_MODULES if name in sys.modules]
+        for p in patches:
+            p.start()
+        try:
+            yield self
+        finally:
+            for p in reversed(patches):
+                p.stop()
@@ -0,0 +1,130 @@
+"""Cold start report: import times and time to first frame.
+
+Usage::
+
+    python -m benchmarks.startup --top 15
+    python -m benchmarks.startup --first-frame --budget-ms 500
+
+The import report runs a fresh interpreter with ``-X importtime`` and lists
+the modules with the largest cumulative import time. ``--first-frame``
+launches the real GUI (needs a display) in a fresh interpreter with a
+temporary ``HOME`` and prints the start-up timeline up to the moment the
+session is ready. With ``--budget-ms`` the process exits with status 1 if
+the first frame took longer than the budget.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+DEFAULT_MODULE = "torrent_downloader.torrent_downloader"
+
+# Runs in the child interpreter: build the app like main() does and print the
+# timeline as JSON once the session is ready.
+_FIRST_FRAME_SCRIPT = """
+import json, sys, tkinter as tk
+from torrent_downloader.perf import STARTUP
+STARTUP.start()
+root = tk.Tk()
+STARTUP.mark("tk_ready")
+from torrent_downloader.gui import TorrentDownloaderApp
+app = TorrentDownloaderApp(root)
+STARTUP.mark("window_built")
+
+def wait():
+    if app.manager is None:
+        root.after(10, wait)
+        return
+    print(json.dumps(STARTUP.milestones()))
+    app.quit_app()
+
+root.after(10, wait)
+root.mainloop()
+"""
+
+
+@dataclass
+class ImportTiming:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int  # nesting level in the import tree (0 = imported directly)
+
+
+def parse_importtime(text: str) -> List[ImportTiming]:
+    """Parse ``-X importtime`` stderr output."""
+    assert isinstance(text, str), "text must be a string"
+    timings: List[ImportTiming] = []
+    for line in text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # header line
+        name = parts[2].rstrip()
+        stripped = name.lstrip()
+        timings.append(ImportTiming(module=stripped, self_us=int(parts[0]), cumulative_us=int(parts[1]),
+                                    depth=(len(name) - len(stripped) - 1) // 2))
+    return timings
+
+
+def measure_imports(module: str = DEFAULT_MODULE) -> List[ImportTiming]:
+    """Import ``module`` in a fresh interpreter and return its import timings."""
+    assert isinstance(module, str) and module, "module must be a non-empty string"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, check=True)
+    return parse_importtime(proc.stderr)
+
+
+def measure_first_frame(timeout: float = 60.0) -> Dict[str, float]:
+    """Start the GUI in a fresh interpreter and return its milestones (ms)."""
+    with tempfile.TemporaryDirectory() as home:
+        env = dict(os.environ, HOME=home, XDG_DOWNLOAD_DIR=os.path.join(home, "Downloads"))
+        proc = subprocess.run([sys.executable, "-c", _FIRST_FRAME_SCRIPT], capture_output=True, text=True,
+                              env=env, timeout=timeout, check=True)
+    return {name: offset for name, offset in json.loads(proc.stdout.strip().splitlines()[-1])}
+
+
+def format_report(timings: Sequence[ImportTiming], top: int = 15) -> str:
+    """Top modules by cumulative import time, plus the total."""
+    total = max((t.cumulative_us for t in timings if t.depth == 0), default=0)
+    lines = [f"{'module':<50} {'self ms':>9} {'cum ms':>9}"]
+    for t in sorted(timings, key=lambda t: t.cumulative_us, reverse=True)[:top]:
+        lines.append(f"{'  ' * t.depth + t.module:<50} {t.self_us / 1000:9.1f} {t.cumulative_us / 1000:9.1f}")
+    lines.append(f"total import time: {total / 1000:.1f} ms")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="module to import (default: %(default)s)")
+    parser.add_argument("--top", type=int, default=15, help="number of modules to list (default: %(default)s)")
+    parser.add_argument("--first-frame", action="store_true", help="also measure the GUI start-up timeline")
+    parser.add_argument("--budget-ms", type=float, help="fail if the first frame takes longer than this")
+    args = parser.parse_args(argv)
+
+    timings = measure_imports(args.module)
+    print(format_report(timings, args.top))
+    if "libtorrent" in {t.module for t in timings}:
+        print(f"note: importing {args.module} loads libtorrent")
+
+    if not args.first_frame:
+        return 0
+    milestones = measure_first_frame()
+    print()
+    for name, offset in milestones.items():
+        print(f"{name:<20} {offset:9.1f} ms")
+    first_frame = milestones.get("first_frame")
+    if args.budget_ms is not None and (first_frame is None or first_frame > args.budget_ms):
+        print(f"first frame exceeded budget of {args.budget_ms:.0f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""Loopback swarm end-to-end throughput benchmark.
+
+Generates a random payload, builds a torrent with ``lt.create_torrent`` and
+lets one plain libtorrent seeder session feed one or more ``TorrentManager``
+leechers over 127.0.0.1 (DHT, LSD, UPnP and NAT-PMP disabled, so the run is
+fully offline). Every settings profile runs in a fresh spawned process so
+CPU time and peak RSS are attributable to that profile alone; note that the
+figures cover the seeder and the leechers together.
+
+Usage::
+
+    python -m benchmarks.swarm --size-mb 256 --files 4 --leechers 2
+    python -m benchmarks.swarm --profiles default,high_throughput --output swarm.json
+"""
+
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional, Sequence
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import socket
+import sys
+import tempfile
+import time
+
+# Settings every session in the benchmark uses: loopback only, no discovery.
+LOOPBACK_SETTINGS: Dict[str, Any] = {
+    'enable_dht': False,
+    'enable_lsd': False,
+    'enable_upnp': False,
+    'enable_natpmp': False,
+    'allow_multiple_connections_per_ip': True,
+}
+
+# Profiles are applied to the leechers on top of TorrentManager's defaults.
+PROFILES: Dict[str, Dict[str, Any]] = {
+    'default': {},
+    'high_throughput': {
+        'send_buffer_watermark': 4 * 1024 * 1024,
+        'send_buffer_watermark_factor': 150,
+        'max_queued_disk_bytes': 16 * 1024 * 1024,
+        'aio_threads': 8,
+        'hashing_threads': 4,
+        'request_queue_time': 5,
+        'max_out_request_queue': 1500,
+    },
+    'tcp_only': {
+        'enable_incoming_utp': False,
+        'enable_outgoing_utp': False,
+    },
+}
+
+
+@dataclass
+class SwarmResult:
+    profile: str
+    payload_bytes: int
+    files: int
+    leechers: int
+    completed: bool
+    seconds: float
+    mb_per_s: float  # aggregate payload delivered to all leechers
+    cpu_seconds: float
+    peak_rss_mb: float
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def make_payload(root: str, total_bytes: int, files: int) -> str:
+    """Write ``files`` random files totalling ``total_bytes`` under ``root/payload``."""
+    assert total_bytes > 0 and files > 0, "payload size and file count must be positive"
+    payload_dir = os.path.join(root, "payload")
+    os.makedirs(payload_dir, exist_ok=True)
+    per_file = total_bytes // files
+    chunk = 1 << 20
+    for i in range(files):
+        size = per_file if i < files - 1 else total_bytes - per_file * (files - 1)
+        with open(os.path.join(payload_dir, f"file-{i:03d}.bin"), "wb") as f:
+            while size > 0:
+                n = min(chunk, size)
+                f.write(os.urandom(n))
+                size -= n
+    return payload_dir
+
+
+def make_torrent(payload_dir: str, torrent_path: str) -> None:
+    import libtorrent as lt
+    fs = lt.file_storage()
+    lt.add_files(fs, payload_dir)
+    ct = lt.create_torrent(fs)
+    lt.set_piece_hashes(ct, os.path.dirname(payload_dir))
+    with open(torrent_path, "wb") as f:
+        f.write(lt.bencode(ct.generate()))
+
+
+def run_profile(profile: str, payload_bytes: int, files: int, leechers: int, timeout: float) -> SwarmResult:
+    """Run one seeder plus ``leechers`` TorrentManagers to completion."""
+    import libtorrent as lt
+    from torrent_downloader.torrent import TorrentManager
+
+    overrides = PROFILES[profile]
+    with tempfile.TemporaryDirectory(prefix="swarm-bench-") as tmp:
+        payload_dir = make_payload(tmp, payload_bytes, files)
+        torrent_path = os.path.join(tmp, "payload.torrent")
+        make_torrent(payload_dir, torrent_path)
+
+        seed_port = _free_port()
+        seed_settings = dict(LOOPBACK_SETTINGS)
+        seed_settings['listen_interfaces'] = f"127.0.0.1:{seed_port}"
+        seeder = lt.session(seed_settings)
+        seeder.add_torrent({
+            'ti': lt.torrent_info(torrent_path),
+            'save_path': tmp,
+            'flags': lt.torrent_flags.seed_mode,
+        })
+
+        managers: List[TorrentManager] = []
+        handles = []
+        for i in range(leechers):
+            settings = dict(LOOPBACK_SETTINGS)
+            settings.update(overrides)
+            settings['listen_interfaces'] = f"127.0.0.1:{_free_port()}"
+            download_dir = os.path.join(tmp, f"leecher-{i}")
+            os.makedirs(download_dir)
+            manager = TorrentManager(download_dir, os.path.join(tmp, f"session-{i}.dat"), settings=settings)
+            managers.append(manager)
+
+        usage0 = resource.getrusage(resource.RUSAGE_SELF)
+        t0 = time.perf_counter()
+        for manager in managers:
+            handle = manager.add_torrent_file(torrent_path)
+            handle.connect_peer(("127.0.0.1", seed_port))
+            handles.append(handle)
+
+        completed = False
+        deadline = t0 + timeout
+        while time.perf_counter() < deadline:
+            if all(h.status().is_seeding for h in handles):
+                completed = True
+                break
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - t0
+        usage1 = resource.getrusage(resource.RUSAGE_SELF)
+
+        cpu = (usage1.ru_utime - usage0.ru_utime) + (usage1.ru_stime - usage0.ru_stime)
+        delivered = payload_bytes * leechers if completed else sum(h.status().total_done for h in handles)
+        del handles, managers, seeder
+        return SwarmResult(
+            profile=profile,
+            payload_bytes=payload_bytes,
+            files=files,
+            leechers=leechers,
+            completed=completed,
+            seconds=elapsed,
+            mb_per_s=delivered / (1024 * 1024) / elapsed if elapsed > 0 else 0.0,
+            cpu_seconds=cpu,
+            peak_rss_mb=_peak_rss_mb(),
+        )
+
+
+def _run_in_child(args: tuple) -> Dict[str, Any]:
+    return asdict(run_profile(*args))
+
+
+def run_isolated(profile: str, payload_bytes: int, files: int, leechers: int, timeout: float) -> SwarmResult:
+    """Run a profile in a freshly spawned process (clean RSS high-water mark)."""
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        data = pool.apply(_run_in_child, ((profile, payload_bytes, files, leechers, timeout),))
+    return SwarmResult(**data)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=64, help="total payload size in MiB (default: %(default)s)")
+    parser.add_argument("--files", type=int, default=4, help="number of payload files (default: %(default)s)")
+    parser.add_argument("--leechers", type=int, default=1, help="number of TorrentManager leechers")
+    parser.add_argument("--profiles", default="default", help=f"comma separated, available: {','.join(PROFILES)}")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds before a run is abandoned")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    profiles = [p.strip() for p in args.profiles.split(",") if p.strip()]
+    unknown = [p for p in profiles if p not in PROFILES]
+    if unknown:
+        parser.error(f"unknown profile(s): {', '.join(unknown)}")
+
+    payload_bytes = int(args.size_mb * 1024 * 1024)
+    results: List[SwarmResult] = []
+    print(f"{'profile':<18}{'done':>6}{'seconds':>10}{'MB/s':>10}{'cpu s':>8}{'rss MB':>9}")
+    for profile in profiles:
+        r = run_isolated(profile, payload_bytes, args.files, args.leechers, args.timeout)
+        results.append(r)
+        print(f"{r.profile:<18}{'yes' if r.completed else 'no':>6}{r.seconds:>10.2f}{r.mb_per_s:>10.1f}"
+              f"{r.cpu_seconds:>8.2f}{r.peak_rss_mb:>9.1f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump([asdict(r) for r in results], f, indent=2)
+    return 0 if all(r.completed for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,7 +10,7 @@ setup(
     author='Steven Yan, f321x',
     author_email='f@f321x.com',
     url='https://github.com/f321x/torrent-downloader',
-    packages=find_packages(),
+    packages=find_packages(exclude=["tests", "benchmarks", "benchmarks.*"]),
     py_modules=['torrent_downloader_gui'],
     install_requires=[
         'libtorrent>=2.0.0'
@@ -0,0 +1,179 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from benchmarks.simlt import MIB, SimBackend, SwarmModel, write_torrent
+from torrent_downloader.admission import AdmissionController, volume_of
+from torrent_downloader.torrent import TorrentManager
+
+GB = 1024 ** 3
+
+
+def fake_handle(key="", paused=False, auto_managed=True):
+    handle = MagicMock()
+    handle.status.return_value = SimpleNamespace(paused=paused, auto_managed=auto_managed)
+    handle.info_hashes.return_value.get_best.return_value = key
+    return handle
+
+
+class TestAdmissionController(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.free = [10 * GB]
+        self.queries = []
+        self.now = [0.0]
+
+        def free_space(path):
+            self.queries.append(path)
+            return self.free[0]
+
+        self.controller = AdmissionController(reserve_bytes=GB, refresh_s=30, auto_managed_flag="AM",
+                                              free_space=free_space, clock=lambda: self.now[0])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def refresh(self):
+        self.now[0] += 30
+        self.controller.tick()
+
+    def test_volume_of_missing_directory(self):
+        missing = os.path.join(self.tmp.name, "not", "yet")
+        self.assertEqual(volume_of(missing), (os.stat(self.tmp.name).st_dev, self.tmp.name))
+
+    def test_torrents_are_held_until_space_frees_up(self):
+        a, b, c = fake_handle(), fake_handle(), fake_handle()
+        self.assertTrue(self.controller.admit("a", a, self.tmp.name, 6 * GB))
+        self.assertFalse(self.controller.admit("b", b, self.tmp.name, 4 * GB))  # 9 GiB usable, 6 promised
+        b.unset_flags.assert_called_once_with("AM")
+        b.pause.assert_called_once()
+        self.assertTrue(self.controller.admit("c", c, self.tmp.name, 2 * GB))
+        self.assertTrue(self.controller.admit("seed", fake_handle(), self.tmp.name, 0))
+        self.assertEqual(len(self.queries), 1)  # cached per volume, not queried per add
+        self.assertEqual(self.controller.queue_position("b"), 1)
+
+        self.controller.update([("a", 0), ("unknown", 5)])  # "a" wrote its 6 GiB
+        self.free[0] = 4 * GB
+        self.controller.tick()
+        self.assertEqual(len(self.queries), 1)  # not due yet
+        self.refresh()
+        self.assertEqual(len(self.queries), 2)
+        b.resume.assert_not_called()  # 4 - 1 reserve - 2 for "c" < 4
+
+        self.free[0] = 8 * GB  # the user deleted something
+        self.refresh()
+        b.set_flags.assert_called_once_with("AM")
+        b.resume.assert_called_once()
+        self.assertFalse(self.controller.pending())
+
+    def test_overcommitted_volume_holds_the_newest_download(self):
+        old, magnet = fake_handle(), fake_handle(paused=True, auto_managed=False)
+        self.controller.admit("old", old, self.tmp.name, 5 * GB)
+        self.controller.admit("magnet", magnet, self.tmp.name, 0)  # size not known yet
+        self.controller.update([("magnet", 5 * GB)])
+        self.refresh()
+        magnet.pause.assert_called_once()
+        old.pause.assert_not_called()
+        self.controller.discard("old")
+        self.refresh()
+        magnet.set_flags.assert_not_called()  # restored as it was: paused, not auto-managed
+        magnet.resume.assert_not_called()
+        self.assertIsNone(self.controller.queue_position("magnet"))
+
+    def test_user_can_force_and_release(self):
+        big, other = fake_handle(), fake_handle()
+        self.assertFalse(self.controller.admit("big", big, self.tmp.name, 20 * GB))
+        self.assertTrue(self.controller.force("big"))
+        self.assertFalse(self.controller.force("big"))
+        self.refresh()  # forced torrents are never held again
+        self.assertEqual(big.pause.call_count, 1)
+        self.controller.admit("other", other, self.tmp.name, 20 * GB)
+        self.controller.release_all()
+        other.resume.assert_called_once()
+
+    def test_committed_bytes_and_positions_stay_in_step(self):
+        volume = volume_of(self.tmp.name)[0]
+        for i in range(5):
+            self.controller.admit(f"t{i}", fake_handle(), self.tmp.name, 2 * GB)  # t0..t3 fit into 9 GiB
+        self.assertEqual(self.controller.committed(volume), 8 * GB)
+        self.controller.update([("t0", GB), ("t4", 3 * GB)])  # t4 is held: not committed
+        self.assertEqual(self.controller.committed(volume), 7 * GB)
+        self.controller.admit("t5", fake_handle(), self.tmp.name, 4 * GB)
+        self.assertEqual([self.controller.queue_position(k) for k in ("t4", "t5", "t0")], [1, 2, None])
+        self.controller.discard("t1")
+        self.assertEqual(self.controller.committed(volume), 5 * GB)
+        self.assertTrue(self.controller.force("t4"))
+        self.assertEqual(self.controller.committed(volume), 8 * GB)
+        self.assertEqual(self.controller.queue_position("t5"), 1)
+        self.controller.admit("t0", fake_handle(), self.tmp.name, 0)  # admitted again: replaces the old entry
+        self.assertEqual(self.controller.committed(volume), 7 * GB)
+
+    def test_restored_holds_wait_for_their_size(self):
+        events = []
+        controller = AdmissionController(reserve_bytes=GB, refresh_s=30, auto_managed_flag="AM",
+                                         free_space=lambda _path: self.free[0], clock=lambda: self.now[0],
+                                         on_hold=lambda e: events.append(("hold", e.key)),
+                                         on_release=lambda key: events.append(("release", key)))
+        self.controller = controller
+        big, small = fake_handle(paused=True, auto_managed=False), fake_handle(paused=True, auto_managed=False)
+        controller.restore("big", big, self.tmp.name, was_paused=False, was_auto_managed=True)
+        controller.restore("small", small, self.tmp.name, was_paused=False, was_auto_managed=True)
+        self.refresh()
+        small.resume.assert_not_called()  # size unknown until the first status update
+        controller.update([("big", 20 * GB), ("small", GB)])
+        self.refresh()
+        small.set_flags.assert_called_once_with("AM")
+        small.resume.assert_called_once()
+        self.assertEqual(controller.queue_position("big"), 1)
+        controller.admit("new", fake_handle(), self.tmp.name, 20 * GB)
+        controller.discard("big")
+        self.assertEqual(events, [("release", "small"), ("hold", "new"), ("release", "big")])
+
+
+@patch('torrent_downloader.torrent.lt')
+class TestManagerAdmission(unittest.TestCase):
+    def test_large_torrent_file_is_held_and_shown(self, mock_lt):
+        with tempfile.TemporaryDirectory() as tmp:
+            torrent = os.path.join(tmp, "big.torrent")
+            open(torrent, "wb").close()
+            mock_lt.torrent_info.return_value.total_size.return_value = 1 << 60
+            handle = fake_handle("ab" * 20)
+            mock_lt.session.return_value.add_torrent.return_value = handle
+            manager = TorrentManager(tmp, os.path.join(tmp, "session.dat"), disk_reserve=0)
+            manager._handles = []
+            manager.add_torrent_file(torrent)
+            handle.pause.assert_called_once()
+            with patch('torrent_downloader.torrent._status_from_handle',
+                       side_effect=lambda h: SimpleNamespace(space_position=None, check_position=None,
+                                                             move_position=None)):
+                self.assertEqual(manager.get_status_list()[0].space_position, 1)
+            manager.set_disk_reserve(None)
+            handle.resume.assert_called_once()
+
+
+class TestHoldsAcrossRestarts(unittest.TestCase):
+    def test_held_torrents_are_queued_again_or_released(self):
+        backend = SimBackend(SwarmModel(seed=1))
+        with tempfile.TemporaryDirectory() as tmp, backend.install():
+            args = (os.path.join(tmp, "downloads"), os.path.join(tmp, "session.dat"))
+            torrent = os.path.join(tmp, "big.torrent")
+            write_torrent(torrent, "big", [64 * MIB])
+            manager = TorrentManager(*args, disk_reserve=1 << 60)
+            manager.add_torrent_file(torrent)
+            manager.save_state()
+            manager.close()
+
+            restarted = TorrentManager(*args, disk_reserve=1 << 60)
+            self.assertTrue(restarted._admission.pending())  # not admitted as a 0 byte torrent
+            restarted.close()
+
+            released = TorrentManager(*args)  # admission control switched off meanwhile
+            self.assertTrue(released.get_torrents()[0].status().auto_managed)
+            self.assertEqual(released._catalog.holds("space"), [])
+            released.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import asyncio
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from torrent_downloader.aio import AlertEvent, AsyncTorrentManager, EventOverflow, StatusEvent
+from torrent_downloader.torrent import TorrentStatus
+
+
+def status(name, progress=0.0):
+    return TorrentStatus(name=name, progress=progress, download_rate=0, upload_rate=0, num_peers=0,
+                         eta_seconds=None, has_metadata=True, state="downloading")
+
+
+def fake_handle(key):
+    return SimpleNamespace(info_hashes=lambda: SimpleNamespace(get_best=lambda: key), is_valid=lambda: True)
+
+
+class FakeManager:
+    """The parts of the TorrentManager API the facade uses; records the calling threads."""
+
+    def __init__(self):
+        self.threads = set()
+        self.torrents = {}  # key -> TorrentStatus
+        self.listeners = []
+        self.alerts = []
+        self.saved = self.closed = False
+
+    def _called(self):
+        self.threads.add(threading.current_thread().name)
+
+    def add_alert_listener(self, alert_type, callback):
+        self.listeners.append(callback)
+
+    def process_alerts(self):
+        self._called()
+        alerts, self.alerts = self.alerts, []
+        for alert in alerts:
+            for callback in self.listeners:
+                callback(alert)
+        return len(alerts)
+
+    def tick(self):
+        self._called()
+
+    def add_magnet(self, magnet_uri):
+        self._called()
+        key = "ab" * 20
+        self.torrents[key] = status("new")
+        finished = type("torrent_finished_alert", (), {"message": lambda self: "new finished"})()
+        finished.handle = fake_handle(key)
+        self.alerts += [finished, type("dht_stats_alert", (), {})()]
+        return fake_handle(key)
+
+    def torrent_keys(self):
+        return list(self.torrents)
+
+    def get_status_list(self):
+        self._called()
+        return list(self.torrents.values())
+
+    def pause_at(self, index):
+        self._called()
+        key = list(self.torrents)[index]
+        self.torrents[key] = status(self.torrents[key].name, 0.5)
+        return True
+
+    def remove_at(self, index, *, delete_files=False):
+        del self.torrents[list(self.torrents)[index]]
+        return True
+
+    def save_state(self):
+        self.saved = True
+
+    def close(self):
+        self.closed = True
+
+
+class TestAsyncTorrentManager(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.manager = FakeManager()
+        self.manager.torrents["cd" * 20] = status("old")
+        self.engine = await AsyncTorrentManager(lambda: self.manager, refresh_s=0.01).start()
+
+    async def asyncTearDown(self):
+        await self.engine.close()
+
+    async def next_event(self, events, kind):
+        while True:
+            event = await asyncio.wait_for(events.__anext__(), 5)
+            if isinstance(event, kind):
+                return event
+
+    async def test_commands_and_events_run_on_the_engine_thread(self):
+        events = self.engine.events()
+        first = await self.next_event(events, StatusEvent)
+        self.assertTrue(first.full)
+        self.assertEqual([t['name'] for t in first.torrents], ["old"])
+
+        key = await self.engine.add_magnet("magnet:?xt=urn:btih:" + "ab" * 20)
+        self.assertEqual(key, "ab" * 20)
+        alert = await self.next_event(events, AlertEvent)
+        self.assertEqual(alert, AlertEvent("torrent_finished_alert", key, "new finished"))  # dht_stats filtered
+        delta = await self.next_event(events, StatusEvent)
+        self.assertFalse(delta.full)
+        self.assertEqual([t['info_hash'] for t in delta.torrents], [key])
+
+        self.assertTrue(await self.engine.pause(key))
+        delta = await self.next_event(events, StatusEvent)
+        self.assertEqual([(t['info_hash'], t['progress']) for t in delta.torrents], [(key, 0.5)])
+        self.assertTrue(await self.engine.remove(key))
+        self.assertEqual((await self.next_event(events, StatusEvent)).removed, [key])
+        with self.assertRaises(KeyError):
+            await self.engine.pause(key)
+        self.assertEqual(self.manager.threads, {"torrent-engine"})
+
+        await self.engine.close()
+        self.assertTrue(self.manager.saved and self.manager.closed)
+        with self.assertRaises(StopAsyncIteration):
+            await self.next_event(events, StatusEvent)
+        with self.assertRaises(RuntimeError):
+            await self.engine.save_state()
+
+    async def test_sharded_managers_return_the_key(self):
+        self.manager.add_magnet = lambda magnet_uri: "ef" * 32  # e.g. the v2 hash of a hybrid torrent
+        self.assertEqual(await self.engine.add_magnet("magnet:?xt=urn:btih:" + "ab" * 20), "ef" * 32)
+
+    async def test_commands_racing_close_fail_instead_of_hanging(self):
+        late = []
+        saved = self.manager.save_state
+        self.manager.save_state = lambda: (late.append(self.engine._commands.submit(lambda m: 1)), saved())
+        await self.engine.close()  # the command lands after the engine's last run_pending
+        with self.assertRaisesRegex(RuntimeError, "not running"):
+            await asyncio.wait_for(asyncio.wrap_future(late[0]), 5)
+        with self.assertRaises(RuntimeError):
+            self.engine._commands.submit(lambda m: 1).result(timeout=5)
+
+    async def test_slow_consumer_overflows(self):
+        engine = await AsyncTorrentManager(FakeManager, max_queued=1).start()
+        events = engine.events()
+        await events.__anext__()  # full list
+        for _ in range(3):
+            await engine.add_magnet("magnet:?xt=urn:btih:" + "ab" * 20)  # one alert each
+        await asyncio.sleep(0.2)
+        with self.assertRaises(EventOverflow):
+            while True:
+                await asyncio.wait_for(events.__anext__(), 5)
+        await engine.close()
+
+    async def test_factory_errors_surface_on_start(self):
+        with self.assertRaises(ValueError):
+            await AsyncTorrentManager(MagicMock(side_effect=ValueError("no session"))).start()
+
+
+if __name__ == '__main__':
+    unittest.main()
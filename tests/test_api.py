@@ -0,0 +1,178 @@
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+from unittest.mock import MagicMock
+
+from torrent_downloader.api import ApiServer, CommandQueue, StatusFeed
+from torrent_downloader.torrent import TorrentStatus
+
+
+def status(name, progress=0.0):
+    return TorrentStatus(name=name, progress=progress, download_rate=0, upload_rate=0, num_peers=0,
+                         eta_seconds=None, has_metadata=True, state="downloading")
+
+
+class TestStatusFeed(unittest.TestCase):
+    def test_versions_and_deltas(self):
+        feed = StatusFeed()
+        self.assertTrue(feed.publish([status("a"), status("b")], ["ha", "hb"]))
+        self.assertFalse(feed.publish([status("a"), status("b")], ["ha", "hb"]))  # unchanged: same version
+        self.assertEqual(feed.version, 1)
+        feed.publish([status("a", 0.5), status("b")], ["ha", "hb"])
+        delta = feed.delta(1)
+        self.assertEqual([t['info_hash'] for t in delta['torrents']], ["ha"])
+        self.assertFalse(delta['full'])
+        feed.publish([status("a", 0.5)], ["ha"])
+        self.assertEqual(feed.delta(2)['removed'], ["hb"])
+        self.assertEqual(feed.delta(2)['torrents'], [])
+        self.assertTrue(feed.delta(99)['full'])  # unknown future version
+
+    def test_encoded_bodies_are_shared_until_the_next_version(self):
+        feed = StatusFeed()
+        feed.publish([status("a")], ["ha"])
+        body = feed.encoded(None)
+        self.assertIs(feed.encoded(None), body)
+        self.assertEqual(json.loads(body)['torrents'][0]['name'], "a")
+        feed.publish([status("a", 1.0)], ["ha"])
+        self.assertIsNot(feed.encoded(None), body)
+
+    def test_old_clients_get_a_full_list_once_tombstones_are_dropped(self):
+        feed = StatusFeed(max_tombstones=1)
+        feed.publish([status("a"), status("b"), status("c")], ["ha", "hb", "hc"])
+        feed.publish([status("b"), status("c")], ["hb", "hc"])
+        feed.publish([status("c")], ["hc"])
+        self.assertTrue(feed.delta(1)['full'])
+        self.assertEqual(feed.delta(2)['removed'], ["hb"])
+
+    def test_wait_wakes_up_on_publish(self):
+        feed = StatusFeed()
+        threading.Timer(0.05, lambda: feed.publish([status("a")], ["ha"])).start()
+        self.assertTrue(feed.wait(0, timeout=5))
+        self.assertFalse(feed.wait(1, timeout=0.01))
+
+
+class TestApiServer(unittest.TestCase):
+    def setUp(self):
+        self.manager = MagicMock()
+        self.manager.torrent_keys.return_value = ["ha", "hb"]
+        self.manager.pause_at.return_value = True
+        self.feed, self.commands = StatusFeed(), CommandQueue()
+        self.api = ApiServer(self.feed, self.commands, port=0, token="secret").start()
+        self.addCleanup(self.api.close)
+        # stands in for the GUI poll loop that owns the manager
+        self.stop = threading.Event()
+
+        def pump():
+            while not self.stop.is_set():
+                self.commands.run_pending(self.manager)
+                time.sleep(0.01)
+        threading.Thread(target=pump, daemon=True).start()
+        self.addCleanup(self.stop.set)
+
+    def request(self, method, path, body=None, content_type="application/json", token="secret", headers=()):
+        req = urllib.request.Request(f"http://127.0.0.1:{self.api.port}{path}", data=body, method=method,
+                                     headers=dict(headers))
+        req.add_header("Content-Type", content_type)
+        if token:
+            req.add_header("Authorization", f"Bearer {token}")
+        try:
+            with urllib.request.urlopen(req, timeout=5) as resp:
+                return resp.status, json.loads(resp.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_commands_run_on_the_owner_thread(self):
+        self.assertEqual(self.request("POST", "/torrents", json.dumps({'magnet': "magnet:?xt=urn:btih:aa"}).encode())[0],
+                         201)
+        self.manager.add_magnet.assert_called_once_with("magnet:?xt=urn:btih:aa")
+        self.assertEqual(self.request("POST", "/torrents/HB/pause"), (200, {'ok': True}))
+        self.manager.pause_at.assert_called_once_with(1)
+        self.assertEqual(self.request("DELETE", "/torrents/ha?delete_files=1")[0], 200)
+        self.manager.remove_at.assert_called_once_with(0, delete_files=True)
+        self.assertEqual(self.request("POST", "/torrents/zz/resume")[0], 404)
+        self.assertEqual(self.request("POST", "/torrents", b'{"magnet": "http://x"}')[0], 400)
+        self.assertEqual(self.request("POST", "/torrents", b"d4:infod", "application/x-bittorrent")[0], 201)
+        self.manager.add_torrent_file.assert_called_once()
+
+    def test_auth_listing_and_long_poll(self):
+        self.assertEqual(self.request("GET", "/torrents", token=None)[0], 401)
+        self.assertEqual(self.request("GET", "/torrents", token="wrong")[0], 401)
+        self.feed.publish([status("a"), status("b")], ["ha", "hb"])
+        code, listing = self.request("GET", "/torrents")
+        self.assertEqual((code, listing['version'], len(listing['torrents'])), (200, 1, 2))
+
+        threading.Timer(0.1, lambda: self.feed.publish([status("a", 0.3), status("b")], ["ha", "hb"])).start()
+        start = time.monotonic()
+        code, delta = self.request("GET", "/status?since=1&timeout=5")
+        self.assertLess(time.monotonic() - start, 4)
+        self.assertEqual((delta['version'], [t['info_hash'] for t in delta['torrents']]), (2, ["ha"]))
+        code, delta = self.request("GET", "/status?since=2&timeout=0.05")  # nothing new: empty delta
+        self.assertEqual((code, delta['torrents'], delta['version']), (200, [], 2))
+        self.assertEqual(self.request("GET", "/nope")[0], 404)
+
+    def test_browser_requests_are_refused(self):
+        magnet = json.dumps({'magnet': "magnet:?xt=urn:btih:aa"}).encode()
+        self.assertEqual(self.request("POST", "/torrents", magnet, "text/plain")[0], 415)  # no CORS preflight
+        self.assertEqual(self.request("POST", "/torrents", magnet, headers={"Origin": "https://evil.example"})[0],
+                         403)
+        self.assertEqual(self.request("GET", "/torrents", headers={"Host": "rebound.example:8081"})[0], 403)
+        self.assertEqual(self.request("GET", "/torrents", headers={"Origin": "http://localhost:3000",
+                                                                  "Host": "[::1]:8081"})[0], 200)
+        self.manager.add_magnet.assert_not_called()
+        generated = ApiServer(self.feed, self.commands, port=0)
+        self.addCleanup(generated._server.server_close)
+        self.assertTrue(generated.token)  # never open without a token
+
+    def raw(self, head, body=b""):
+        """Send one raw request; everything the server sends until it closes the connection."""
+        with socket.create_connection(("127.0.0.1", self.api.port), timeout=5) as sock:
+            sock.sendall(head.replace("\n", "\r\n").encode() + b"\r\n" + body)
+            data = b""
+            while chunk := sock.recv(65536):
+                data += chunk
+        return data
+
+    def test_bad_lengths_and_unread_bodies_close_the_connection(self):
+        auth = "Host: 127.0.0.1\nAuthorization: Bearer secret\nContent-Type: application/json\n"
+        for length in ("abc", "-1"):
+            reply = self.raw(f"POST /torrents HTTP/1.1\n{auth}Content-Length: {length}\n")
+            self.assertTrue(reply.startswith(b"HTTP/1.1 400"), reply)
+        smuggled = b"DELETE /torrents/ha HTTP/1.1\r\nHost: 127.0.0.1\r\nAuthorization: Bearer secret\r\n\r\n"
+        reply = self.raw(f"POST /torrents HTTP/1.1\nHost: 127.0.0.1\nContent-Length: {len(smuggled)}\n", smuggled)
+        self.assertTrue(reply.startswith(b"HTTP/1.1 401"), reply)
+        self.assertEqual(reply.count(b"HTTP/1.1 "), 1)  # the body was not run as a second request
+        self.manager.remove_at.assert_not_called()
+
+    def test_create_seeds_the_new_torrent(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "file.bin")
+            with open(source, "wb") as f:
+                f.write(b"x" * 40_000)
+            body = json.dumps({'source': source, 'format': "v1"}).encode()
+            self.assertEqual(self.request("POST", "/create", body)[0], 403)  # no roots: disabled
+            self.api.close()
+            self.api = ApiServer(self.feed, self.commands, port=0, token="secret", create_roots=[tmp]).start()
+            self.addCleanup(self.api.close)
+            self.assertEqual(self.request("POST", "/create", json.dumps({'source': tmp + "/../"}).encode())[0], 403)
+            self.assertEqual(self.request("POST", "/create", json.dumps({
+                'source': source, 'output': os.path.join(os.path.dirname(tmp), "x.torrent")}).encode())[0], 403)
+            generated = ApiServer(self.feed, self.commands, port=0, create_roots=[tmp])
+            self.addCleanup(generated._server.server_close)
+            self.assertEqual(generated.create_roots, [])  # a generated token doesn't enable /create
+            code, result = self.request("POST", "/create", json.dumps({'source': source, 'format': "v1"}).encode())
+            self.assertEqual((code, result['output'], result['num_pieces']), (201, source + ".torrent", 3))
+            self.assertTrue(os.path.isfile(result['output']))
+            self.manager.add_torrent_file.assert_called_once_with(source + ".torrent", save_path=tmp, seed_mode=True)
+            self.assertEqual(self.request("POST", "/create", b'{"source": "relative"}')[0], 400)
+            self.assertEqual(self.request("POST", "/create", json.dumps({'source': source, 'format': "v3"}).encode())[0],
+                             400)
+
+
+if __name__ == '__main__':
+    unittest.main()
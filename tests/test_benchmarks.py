@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+import unittest
+
+from benchmarks.common import BenchResult, compare, load_results, save_results
+from benchmarks.fakes import make_handles, make_statuses
+from benchmarks.micro import run_suite
+from benchmarks.startup import format_report, parse_importtime
+from benchmarks.swarm import LOOPBACK_SETTINGS, PROFILES, make_payload
+
+
+def _result(name: str, per_item_ns: float, size: int = 100) -> BenchResult:
+    return BenchResult(name=name, size=size, repeat=3, min_s=0.0, median_s=per_item_ns * size / 1e9,
+                       per_item_ns=per_item_ns)
+
+
+class TestBenchmarkCompare(unittest.TestCase):
+    def test_compare_flags_only_regressions_above_threshold(self):
+        baseline = [_result("a", 100.0), _result("b", 100.0), _result("c", 100.0)]
+        current = [_result("a", 110.0), _result("b", 130.0), _result("c", 50.0), _result("new", 1e9)]
+        regressions = compare(current, baseline, threshold=0.2)
+        self.assertEqual([r.key for r in regressions], ["b[100]"])
+        self.assertAlmostEqual(regressions[0].ratio, 1.3)
+
+    def test_compare_matches_on_size(self):
+        baseline = [_result("a", 100.0, size=10)]
+        current = [_result("a", 500.0, size=1000)]
+        self.assertEqual(compare(current, baseline), [])
+
+    def test_save_and_load_roundtrip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.json")
+            results = [_result("a", 1.5), _result("b", 2.5)]
+            save_results(path, results)
+            with open(path, encoding="utf-8") as f:
+                self.assertIn("meta", json.load(f))
+            self.assertEqual(load_results(path), results)
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def test_synthetic_handles_are_deterministic(self):
+        a = [h.name() for h in make_handles(20, seed=7)]
+        b = [h.name() for h in make_handles(20, seed=7)]
+        self.assertEqual(a, b)
+        self.assertEqual(len(make_statuses(20)), 20)
+
+    def test_run_suite_small(self):
+        results = run_suite([5], include_tk=False)
+        names = {r.name for r in results}
+        self.assertTrue({"_status_from_handle", "get_status_list", "_build_rows",
+                         "util.format_size", "_format_eta"} <= names)
+        self.assertTrue(all(r.per_item_ns > 0 for r in results))
+
+
+class TestSwarmHelpers(unittest.TestCase):
+    def test_make_payload_sizes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            payload = make_payload(tmp, 10_000, 3)
+            sizes = sorted(os.path.getsize(os.path.join(payload, n)) for n in os.listdir(payload))
+            self.assertEqual(len(sizes), 3)
+            self.assertEqual(sum(sizes), 10_000)
+
+    def test_profiles_never_enable_discovery(self):
+        self.assertIn('default', PROFILES)
+        for key in ('enable_dht', 'enable_lsd', 'enable_upnp', 'enable_natpmp'):
+            self.assertFalse(LOOPBACK_SETTINGS[key])
+            for overrides in PROFILES.values():
+                self.assertNotIn(key, overrides)
+
+
+class TestStartupReport(unittest.TestCase):
+    SAMPLE = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |     _weakrefset\n"
+        "import time:       900 |       1020 |   threading\n"
+        "import time:      2000 |       3020 | torrent_downloader\n"
+        "unrelated line\n"
+    )
+
+    def test_parse_importtime(self):
+        timings = parse_importtime(self.SAMPLE)
+        self.assertEqual([(t.module, t.depth) for t in timings],
+                         [("_weakrefset", 2), ("threading", 1), ("torrent_downloader", 0)])
+        self.assertEqual(timings[2].cumulative_us, 3020)
+
+    def test_format_report_lists_slowest_first(self):
+        report = format_report(parse_importtime(self.SAMPLE), top=2).splitlines()
+        self.assertTrue(report[1].startswith("torrent_downloader"))
+        self.assertEqual(len(report), 4)  # header, two modules, total
+        self.assertIn("3.0 ms", report[-1])
+
+
+if __name__ == '__main__':  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,128 @@
+import glob
+import gzip
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from torrent_downloader.blocklist import (ParseStats, compile_blocklist, load_blocklist, merge_ranges, parse_lines,
+                                          read_cache)
+from torrent_downloader.torrent import TorrentManager
+
+from benchmarks.fakes import OFFLINE_SETTINGS
+
+try:
+    import libtorrent as lt
+    HAVE_LIBTORRENT = True
+except ImportError:  # pragma: no cover - environment specific
+    HAVE_LIBTORRENT = False
+
+MIXED = """# comment
+Bad Corp, Inc:1.2.3.0-1.2.3.255
+001.002.004.000 - 001.002.004.010 , 000 , adjacent to the range above
+010.000.000.000 - 010.255.255.255 , 200 , allowed by level
+192.168.0.0/16
+192.168.10.0/24
+2001:db8::/32
+8.8.8.8
+not an address
+"""
+
+
+class TestParsing(unittest.TestCase):
+    def test_formats_and_merging(self):
+        stats = ParseStats()
+        entries = list(parse_lines(MIXED.splitlines(), stats))
+        self.assertEqual((stats.lines, stats.ranges, stats.malformed), (9, 6, 1))
+        self.assertEqual(entries[0], (4, 0x01020300, 0x010203FF))
+        self.assertEqual(entries[1], (4, 0x01020400, 0x0102040A))
+        self.assertEqual(merge_ranges([(1, 5), (6, 8), (3, 4), (10, 12), (11, 20)]), [(1, 8), (10, 20)])
+
+    def test_compiled_lookup(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "list.p2p.gz")
+            with gzip.open(path, "wt") as f:
+                f.write(MIXED)
+            blocklist = compile_blocklist(path)
+        self.assertEqual(len(blocklist), 4)  # 1.2.3.0-1.2.4.10, 8.8.8.8, 192.168/16, 2001:db8::/32
+        for address, blocked in (("1.2.4.5", True), ("1.2.4.11", False), ("10.1.1.1", False),
+                                 ("192.168.200.1", True), ("8.8.8.8", True), ("2001:db8::1", True), ("::1", False)):
+            self.assertEqual(blocklist.blocked(address), blocked, address)
+        self.assertEqual(list(blocklist.address_ranges())[0], ("1.2.3.0", "1.2.4.10"))
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, "cache")
+        self.source = os.path.join(self.tmp.name, "level1.p2p")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_source(self, count):
+        with open(self.source, "w") as f:
+            for i in range(count):
+                prefix = f"{i >> 16}.{i >> 8 & 255}.{i & 255}"
+                f.write(f"range {i}:{prefix}.0-{prefix}.127\n")
+
+    def test_second_load_comes_from_the_cache(self):
+        self.write_source(100_000)
+        compiled = load_blocklist(self.source, self.cache_dir)
+        self.assertFalse(compiled.from_cache)
+        self.assertEqual(len(compiled), 100_000)
+        start = time.perf_counter()
+        cached = load_blocklist(self.source, self.cache_dir)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertTrue(cached.from_cache)
+        self.assertEqual((cached.starts4, cached.ends4), (compiled.starts4, compiled.ends4))
+
+    def test_changed_source_replaces_the_cache(self):
+        self.write_source(10)
+        load_blocklist(self.source, self.cache_dir)
+        with open(self.source, "a") as f:
+            f.write("2001:db8::/32\n")
+        blocklist = load_blocklist(self.source, self.cache_dir)
+        self.assertFalse(blocklist.from_cache)
+        caches = glob.glob(os.path.join(self.cache_dir, "blocklist-*"))
+        self.assertEqual(len(caches), 1)
+        self.assertEqual(read_cache(caches[0]).starts6, blocklist.starts6)
+        with open(caches[0], "r+b") as f:  # corrupt cache: compiled again
+            f.truncate(10)
+        self.assertFalse(load_blocklist(self.source, self.cache_dir).from_cache)
+
+
+@unittest.skipUnless(HAVE_LIBTORRENT, "libtorrent not installed")
+class TestManagerBlocklist(unittest.TestCase):
+    def test_blocklist_is_applied_at_start_and_cleared_live(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "list.txt")
+            with open(source, "w") as f:
+                f.write(MIXED)
+            manager = TorrentManager(os.path.join(tmp, "downloads"), os.path.join(tmp, "session.dat"),
+                                     settings=dict(OFFLINE_SETTINGS), blocklist_path=source)
+            ip_filter = manager._session.get_ip_filter()
+            self.assertEqual((ip_filter.access("1.2.3.4"), ip_filter.access("9.9.9.9")), (1, 0))
+            self.assertEqual(manager.blocked_ranges, 4)
+            threads = []
+            build = TorrentManager._build_ip_filter
+
+            def record(blocklist):
+                threads.append(threading.current_thread().name)
+                return build(blocklist)
+
+            with patch.object(TorrentManager, '_build_ip_filter', side_effect=record):
+                manager.load_blocklist(None)
+                for _ in range(100):
+                    manager.tick()
+                    if not manager.blocked_ranges:
+                        break
+                    time.sleep(0.01)
+            self.assertEqual(manager._session.get_ip_filter().access("1.2.3.4"), 0)
+            self.assertEqual(threads, ["blocklist-load"])  # not built on the thread calling tick()
+
+
+if __name__ == '__main__':
+    unittest.main()
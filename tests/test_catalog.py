@@ -0,0 +1,125 @@
+import json
+import os
+import tempfile
+import unittest
+
+from torrent_downloader.catalog import Hold, ResumeRow, TorrentCatalog
+from torrent_downloader.create import create_torrent
+from torrent_downloader.seeding import SeedingPolicy
+from torrent_downloader.torrent import TorrentManager
+
+from benchmarks.fakes import OFFLINE_SETTINGS
+
+try:
+    import libtorrent as lt
+    HAVE_LIBTORRENT = True
+except ImportError:  # pragma: no cover - environment specific
+    HAVE_LIBTORRENT = False
+
+
+class TestTorrentCatalog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "state", "session.db")
+        self.catalog = TorrentCatalog(self.path)
+
+    def tearDown(self):
+        self.catalog.close()
+        self.tmp.cleanup()
+
+    def test_rows_keep_list_order_and_only_saved_torrents_resume(self):
+        self.assertTrue(self.catalog.created)
+        self.catalog.set_save_path("c", "/data")  # known before its first save
+        self.catalog.put_resume([ResumeRow("a", b"ra", name="A", completed_at=5.0), ResumeRow("b", b"rb")])
+        self.catalog.put_resume([ResumeRow("a", b"ra2", name="A")])  # update keeps the position
+        self.assertEqual(list(self.catalog.iter_resume(batch_size=1)), [("a", b"ra2"), ("b", b"rb")])
+        self.assertEqual(self.catalog.resume_keys(), {"a", "b"})
+        self.assertEqual([e.info_hash for e in self.catalog.entries()], ["c", "a", "b"])
+        self.assertEqual([e.info_hash for e in self.catalog.entries(limit=1, offset=1)], ["a"])
+        self.assertEqual(self.catalog.save_paths(), {"c": "/data"})
+        self.assertFalse(TorrentCatalog(self.path).created)
+
+    def test_labels_policies_and_delete(self):
+        self.catalog.put_resume([ResumeRow("a", b"ra", completed_at=1.0), ResumeRow("b", b"rb")])
+        self.catalog.set_labels("a", ["linux", "iso"])
+        self.catalog.set_labels("b", ["linux"])
+        self.assertEqual([e.info_hash for e in self.catalog.entries(label="linux")], ["a", "b"])
+        self.assertEqual([e.info_hash for e in self.catalog.entries(label="iso", completed=True)], ["a"])
+        self.assertEqual([e.info_hash for e in self.catalog.entries(completed=False)], ["b"])
+        self.assertEqual(self.catalog.labels_of("a"), ["iso", "linux"])
+        policy = SeedingPolicy(ratio_limit=2.0)
+        self.catalog.set_seeding_policy("a", policy)
+        self.assertEqual(self.catalog.get("a").seeding_policy, policy)
+        self.assertEqual(self.catalog.seeding_policies(), {"a": policy})
+        self.catalog.set_hold("space", Hold("b", was_paused=False, was_auto_managed=True, seq=2))
+        self.catalog.set_hold("space", Hold("a", was_paused=True, was_auto_managed=False, seq=1))
+        self.assertEqual([h.info_hash for h in self.catalog.holds("space")], ["a", "b"])
+        self.assertTrue(self.catalog.delete("a"))
+        self.assertFalse(self.catalog.delete("a"))
+        self.assertEqual(self.catalog.holds("space"), [Hold("b", False, True, 2)])  # gone with the torrent
+        self.assertEqual(self.catalog.entries(label="iso"), [])
+        self.assertEqual((len(self.catalog), "a" in self.catalog, "b" in self.catalog), (1, False, True))
+
+    def test_failed_transaction_rolls_back(self):
+        with self.assertRaises(RuntimeError):
+            with self.catalog.transaction():
+                self.catalog.put_resume([ResumeRow("a", b"ra")])
+                raise RuntimeError("boom")
+        self.assertEqual(len(self.catalog), 0)
+
+
+@unittest.skipUnless(HAVE_LIBTORRENT, "libtorrent not installed")
+class TestManagerCatalog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        source = os.path.join(self.tmp.name, "data.bin")
+        with open(source, "wb") as f:
+            f.write(os.urandom(50_000))
+        self.created = create_torrent(source, os.path.join(self.tmp.name, "data.torrent"))
+        self.downloads = os.path.join(self.tmp.name, "downloads")
+        self.session_file = os.path.join(self.tmp.name, "session.dat")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def manager(self):
+        return TorrentManager(self.downloads, self.session_file, settings=dict(OFFLINE_SETTINGS))
+
+    def test_resume_rows_survive_a_restart(self):
+        manager = self.manager()
+        manager.add_torrent_file(self.created.output, save_path=self.created.save_path, seed_mode=True)
+        self.assertTrue(manager.set_labels_at(0, ["mine"]))
+        manager.save_state()
+        entry = manager._catalog.get(self.created.info_hash)
+        self.assertEqual(entry.name, "data.bin")
+        self.assertIsNotNone(entry.added_at)
+
+        reloaded = self.manager()
+        self.assertEqual(reloaded.torrent_keys(), [self.created.info_hash])
+        self.assertEqual(reloaded.get_labels_at(0), ["mine"])
+        self.assertEqual(reloaded.get_torrents()[0].status().save_path, self.created.save_path)
+
+    def test_old_session_files_are_imported_once(self):
+        atp = lt.add_torrent_params()
+        atp.ti = lt.torrent_info(self.created.output)
+        atp.save_path = self.downloads
+        with open(self.session_file + ".paths", "w") as f:
+            f.write("{not json")  # e.g. cut short by a crash
+        with open(self.session_file + ".resume", "wb") as f:
+            f.write(lt.bencode([5, lt.write_resume_data(atp)]))  # one bad entry
+
+        self.assertEqual(self.manager().torrent_keys(), [])  # failed: nothing imported, tried again
+        self.assertTrue(os.path.exists(self.session_file + ".resume"))
+        with open(self.session_file + ".paths", "w") as f:
+            json.dump({self.created.info_hash: self.created.save_path}, f)
+
+        manager = self.manager()
+        self.assertEqual(manager.torrent_keys(), [self.created.info_hash])  # the bad entry is skipped
+        self.assertEqual(manager._save_paths, {self.created.info_hash: self.created.save_path})
+        self.assertFalse(os.path.exists(self.session_file + ".resume"))  # the catalog is the source of truth
+        self.assertTrue(os.path.exists(self.session_file + ".resume.imported"))
+        self.assertEqual(self.manager().torrent_keys(), [self.created.info_hash])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,12 @@
 import json
+import os
 import tempfile
 import unittest
 from pathlib import Path
 from unittest.mock import patch
 
 from torrent_downloader import config, util
+from torrent_downloader.peerclass import PeerClasses, PeerClassRule
 
 
 class TestConfig(unittest.TestCase):
@@ -43,6 +45,116 @@ class TestConfig(unittest.TestCase):
         with patch('torrent_downloader.config.util.get_app_data_dir', new=lambda: str(app_dir)):
             self.assertIsNone(config.load_download_directory())
 
+    def test_log_level_is_merged_with_other_keys(self):
+        app_dir = self.tmp_path / 'appdata3'
+        app_dir.mkdir()
+        with patch('torrent_downloader.config.util.get_app_data_dir', new=lambda: str(app_dir)):
+            self.assertIsNone(config.load_log_level())
+            config.save_download_directory('/data/downloads')
+            config.save_log_level('debug')
+            self.assertEqual(config.load_log_level(), 'DEBUG')
+            self.assertEqual(config.load_download_directory(), '/data/downloads')
+
+
+class TestConfigStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'config.json')
+        self.store = config.ConfigStore(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write_raw(self, raw):
+        with open(self.path, 'w') as f:
+            json.dump(raw, f)
+
+    def test_defaults_and_typed_set(self):
+        self.assertEqual(self.store.get('poll_interval_ms'), 1000)
+        self.assertIsNone(self.store.get('download_directory'))
+        self.assertEqual(self.store.set(poll_interval_ms=500, full_allocation=False), {'poll_interval_ms': 500})
+        with open(self.path) as f:
+            raw = json.load(f)
+        self.assertEqual(raw['poll_interval_ms'], 500)
+        self.assertEqual(raw['schema_version'], config.SCHEMA_VERSION)
+        self.assertFalse(os.path.exists(self.path + '.tmp'))
+
+    def test_invalid_values_are_rejected_without_writing(self):
+        for bad in ({'poll_interval_ms': 10}, {'max_name_len': True}, {'full_allocation': 1},
+                    {'disk_preset': ''}, {'session': []}):
+            with self.assertRaises(ValueError):
+                self.store.set(upload_rate_limit=1, **bad)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_reads_are_cached(self):
+        self.store.get('log_level')
+        with patch.object(config.ConfigStore, '_read') as read:
+            for _ in range(10):
+                self.store.get('log_level')
+            read.assert_not_called()
+
+    def test_unversioned_file_is_migrated_and_unknown_keys_kept(self):
+        self._write_raw({'download_directory': '/data', 'future_key': 1, 'max_name_len': 'wide'})
+        self.assertEqual(self.store.get('download_directory'), '/data')
+        self.assertEqual(self.store.get('max_name_len'), 50)  # invalid stored value -> default
+        self.store.set(log_level='DEBUG')
+        with open(self.path) as f:
+            raw = json.load(f)
+        self.assertEqual(raw['future_key'], 1)
+        self.assertEqual(raw['schema_version'], config.SCHEMA_VERSION)
+
+    def test_subscribers_get_relevant_changes_only(self):
+        all_changes, limits = [], []
+        self.store.subscribe(all_changes.append)
+        unsubscribe = self.store.subscribe(limits.append, keys=config.SESSION_KEYS)
+        self.store.subscribe(lambda _c: 1 / 0)  # broken subscribers are logged, not raised
+        self.store.set(poll_interval_ms=2000, upload_rate_limit=1024)
+        self.store.set(upload_rate_limit=1024)  # unchanged: no notification
+        unsubscribe()
+        self.store.set(download_rate_limit=10)
+        self.assertEqual(all_changes, [{'poll_interval_ms': 2000, 'upload_rate_limit': 1024},
+                                       {'download_rate_limit': 10}])
+        self.assertEqual(limits, [{'upload_rate_limit': 1024}])
+
+    def test_reload_publishes_external_edits(self):
+        self.store.set(max_name_len=40)
+        changes = []
+        self.store.subscribe(changes.append)
+        self._write_raw({'schema_version': 1, 'max_name_len': 80})
+        self.assertEqual(self.store.reload(), {'max_name_len': 80})
+        self.assertEqual(changes, [{'max_name_len': 80}])
+
+    def test_session_settings_merge_limits_and_overrides(self):
+        self.store.set(download_rate_limit=100, session={'connections_limit': 50, 'upload_rate_limit': 7})
+        self.assertEqual(self.store.session_settings(),
+                         {'download_rate_limit': 100, 'upload_rate_limit': 7, 'connections_limit': 50,
+                          'choking_algorithm': 0, 'seed_choking_algorithm': 0})
+
+    def test_choker_names_map_to_libtorrent_values(self):
+        self.store.set(choking_algorithm='rate_based', seed_choking_algorithm='anti_leech')
+        settings = self.store.session_settings()
+        self.assertEqual((settings['choking_algorithm'], settings['seed_choking_algorithm']), (2, 2))
+        with self.assertRaises(ValueError):
+            self.store.set(choking_algorithm='bittyrant')
+
+    def test_seeding_policy_from_settings(self):
+        self.assertFalse(self.store.seeding_policy().has_limits)
+        self.store.set(seed_ratio_limit_percent=150, seed_idle_limit_min=30, seed_limit_action='remove')
+        policy = self.store.seeding_policy()
+        self.assertEqual((policy.ratio_limit, policy.seed_time_limit_s, policy.idle_time_limit_s),
+                         (1.5, None, 1800))
+        self.assertEqual(policy.action, 'remove')
+
+    def test_peer_classes_from_settings(self):
+        self.assertEqual(self.store.peer_classes(), PeerClasses(local_unthrottled=True))
+        with self.assertLogs(level='ERROR'):
+            self.store.set(lan_unthrottled=False, peer_classes={
+                'office': {'networks': ['203.0.113.0/24'], 'upload_limit': 50000},
+                'broken': {'networks': ['not a network']}})
+            peer_classes = self.store.peer_classes()
+        self.assertFalse(peer_classes.local_unthrottled)
+        self.assertEqual(peer_classes.rules, (PeerClassRule('office', ('203.0.113.0/24',), upload_limit=50000),))
+
 
 if __name__ == '__main__':  # pragma: no cover
     unittest.main()
@@ -0,0 +1,99 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from torrent_downloader.create import (FORMAT_HYBRID, FORMAT_V1, FORMAT_V2, MAX_PIECE_SIZE, MIN_PIECE_SIZE,
+                                       CreateCancelled, CreateProgress, choose_piece_size, create_torrent)
+from torrent_downloader.torrent import TorrentManager
+
+from benchmarks.fakes import OFFLINE_SETTINGS
+
+try:
+    import libtorrent as lt
+    HAVE_LIBTORRENT = True
+except ImportError:  # pragma: no cover - environment specific
+    HAVE_LIBTORRENT = False
+
+
+class TestPieceSize(unittest.TestCase):
+    def test_choose_piece_size(self):
+        self.assertEqual(choose_piece_size(0), MIN_PIECE_SIZE)
+        self.assertEqual(choose_piece_size(10 * 1024 * 1024), MIN_PIECE_SIZE)
+        self.assertEqual(choose_piece_size(700 * 1024 * 1024), 512 * 1024)
+        self.assertEqual(choose_piece_size(1 << 45), MAX_PIECE_SIZE)
+
+    def test_progress(self):
+        progress = CreateProgress(pieces_done=5, num_pieces=10, piece_size=1024, elapsed_s=2.0)
+        self.assertEqual(progress.fraction, 0.5)
+        self.assertEqual(progress.bytes_per_s, 2560)
+
+
+@unittest.skipUnless(HAVE_LIBTORRENT, "libtorrent not installed")
+class TestCreateTorrent(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "data")
+        os.makedirs(os.path.join(self.source, "sub"))
+        with open(os.path.join(self.source, "a.bin"), "wb") as f:
+            f.write(os.urandom(100_000))
+        with open(os.path.join(self.source, "sub", "b.bin"), "wb") as f:
+            f.write(os.urandom(70_000))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def reference(self, flags):
+        creator = lt.create_torrent(lt.list_files(self.source), MIN_PIECE_SIZE, flags)
+        lt.set_piece_hashes(creator, self.tmp.name)
+        return lt.torrent_info(creator.generate())
+
+    def test_threaded_v1_hashes_match_libtorrent(self):
+        output = os.path.join(self.tmp.name, "v1.torrent")
+        seen = []
+        result = create_torrent(self.source, output, fmt=FORMAT_V1, piece_size=MIN_PIECE_SIZE, threads=3,
+                                on_progress=lambda p: seen.append(p.pieces_done))
+        info = lt.torrent_info(output)
+        self.assertEqual(str(info.info_hashes().get_best()), str(self.reference(lt.create_torrent.v1_only)
+                                                                  .info_hashes().get_best()))
+        self.assertEqual(result.num_pieces, 11)
+        self.assertEqual(seen, list(range(1, 12)))
+        self.assertEqual(result.total_size, 170_000)
+
+    def test_hybrid_and_v2(self):
+        hybrid = create_torrent(self.source, os.path.join(self.tmp.name, "h.torrent"), fmt=FORMAT_HYBRID,
+                                piece_size=MIN_PIECE_SIZE, trackers=["http://tracker.invalid/announce"])
+        info = lt.torrent_info(hybrid.output)
+        self.assertTrue(info.info_hashes().has_v1() and info.info_hashes().has_v2())
+        self.assertEqual(info.info_hashes(), self.reference(0).info_hashes())  # trackers are outside the info dict
+        with open(hybrid.output, "rb") as f:
+            self.assertEqual(lt.bdecode(f.read())[b"announce"], b"http://tracker.invalid/announce")
+        v2 = create_torrent(self.source, os.path.join(self.tmp.name, "v2.torrent"), fmt=FORMAT_V2)
+        self.assertFalse(lt.torrent_info(v2.output).info_hashes().has_v1())
+
+    def test_cancel_and_bad_input(self):
+        cancel = threading.Event()
+        cancel.set()
+        output = os.path.join(self.tmp.name, "x.torrent")
+        for fmt in (FORMAT_V1, FORMAT_HYBRID):
+            with self.assertRaises(CreateCancelled):
+                create_torrent(self.source, output, fmt=fmt, cancel=cancel)
+        self.assertFalse(os.path.exists(output))
+        with self.assertRaises(FileNotFoundError):
+            create_torrent(os.path.join(self.tmp.name, "missing"), output)
+        with self.assertRaises(ValueError):
+            create_torrent(self.source, output, piece_size=20_000)
+
+    def test_seed_created_torrent_without_recheck(self):
+        result = create_torrent(self.source, os.path.join(self.tmp.name, "data.torrent"))
+        downloads = os.path.join(self.tmp.name, "downloads")
+        session_file = os.path.join(self.tmp.name, "session.dat")
+        manager = TorrentManager(downloads, session_file, settings=dict(OFFLINE_SETTINGS))
+        handle = manager.add_torrent_file(result.output, save_path=result.save_path, seed_mode=True)
+        self.assertTrue(handle.flags() & lt.torrent_flags.seed_mode)
+        self.assertEqual(handle.status().save_path, self.tmp.name)
+        self.assertEqual(TorrentManager(downloads, session_file)._save_paths, {result.info_hash: self.tmp.name})
+
+
+if __name__ == '__main__':
+    unittest.main()
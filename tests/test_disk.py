@@ -0,0 +1,60 @@
+import unittest
+
+import libtorrent as lt
+
+from torrent_downloader.disk import DISK_DEFAULTS, DISK_PRESETS, DiskStatsTracker, disk_settings, format_disk_stats
+
+
+class TestDiskPresets(unittest.TestCase):
+    def test_presets_use_known_libtorrent_settings(self):
+        known = lt.default_settings()
+        for name, settings in DISK_PRESETS.items():
+            for key in settings:
+                self.assertIn(key, known, f"{name}: unknown libtorrent setting {key}")
+
+    def test_disk_settings_returns_copy(self):
+        settings = disk_settings('hdd')
+        settings['aio_threads'] = 99
+        self.assertNotEqual(DISK_PRESETS['hdd']['aio_threads'], 99)
+        with self.assertRaises(ValueError):
+            disk_settings('floppy')
+
+    def test_defaults_match_libtorrent_and_reset_every_preset_key(self):
+        known = lt.default_settings()
+        self.assertEqual({key: known[key] for key in DISK_DEFAULTS}, DISK_DEFAULTS)
+        self.assertEqual(disk_settings('default'), DISK_DEFAULTS)
+        for name, settings in DISK_PRESETS.items():
+            self.assertLessEqual(set(settings), set(DISK_DEFAULTS), name)
+        for name in ('nvme', 'ssd'):  # deep queues, not shallower than the default
+            self.assertGreater(disk_settings(name)['max_queued_disk_bytes'], DISK_DEFAULTS['max_queued_disk_bytes'])
+
+
+class TestDiskStatsTracker(unittest.TestCase):
+    def test_gauges_and_latencies(self):
+        tracker = DiskStatsTracker()
+        first = tracker.update({
+            'disk.queued_disk_jobs': 4, 'disk.queued_write_bytes': 2 * 1024 * 1024,
+            'peer.num_peers_up_disk': 1, 'peer.num_peers_down_disk': 2, 'disk.request_latency': 1500,
+            'disk.disk_read_time': 1000, 'disk.num_read_ops': 10,
+            'disk.disk_write_time': 5000, 'disk.num_write_ops': 5,
+        })
+        self.assertEqual(first.queued_jobs, 4)
+        self.assertEqual(first.peers_blocked_on_disk, 3)
+        self.assertIsNone(first.read_latency_us)  # needs two samples
+
+        second = tracker.update({
+            'disk.disk_read_time': 3000, 'disk.num_read_ops': 20,
+            'disk.disk_write_time': 5000, 'disk.num_write_ops': 5,
+        })
+        self.assertEqual(second.read_latency_us, 200.0)
+        self.assertIsNone(second.write_latency_us)  # no writes in interval
+        self.assertIs(tracker.latest, second)
+
+    def test_format(self):
+        self.assertEqual(format_disk_stats(None), "Disk: n/a")
+        text = format_disk_stats(DiskStatsTracker().update({'disk.queued_disk_jobs': 7}))
+        self.assertIn("queue 7 jobs", text)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from torrent_downloader.files import FileView, FileViewCache, bin_pieces
+from torrent_downloader.torrent import TorrentManager
+
+from benchmarks.fakes import OFFLINE_SETTINGS
+
+try:
+    import libtorrent as lt
+    HAVE_LIBTORRENT = True
+except ImportError:  # pragma: no cover - environment specific
+    HAVE_LIBTORRENT = False
+
+
+class TestBinPieces(unittest.TestCase):
+    def test_buckets(self):
+        pieces = [True, True, False, False, True, False]
+        self.assertEqual(bin_pieces(pieces, [3, 1, 0, 2, 2, 5], 3), [(1.0, 1), (0.0, 0), (0.5, 2)])
+        self.assertEqual(bin_pieces(pieces, [], 2), [(2 / 3, -1), (1 / 3, -1)])
+        self.assertEqual(len(bin_pieces(pieces, [], 100)), 6)  # never more buckets than pieces
+        self.assertEqual(bin_pieces([], [], 10), [])
+
+
+class TestFileViewCache(unittest.TestCase):
+    def setUp(self):
+        self.now = [0.0]
+        self.cache = FileViewCache(max_age_s=10, clock=lambda: self.now[0])
+        self.compute = MagicMock(side_effect=lambda: FileView(files=[], pieces=[], availability=[]))
+
+    def test_recomputes_only_when_stale(self):
+        first = self.cache.get("k", 5, self.compute)
+        self.assertIs(self.cache.get("k", 5, self.compute), first)
+        self.assertIsNot(self.cache.get("k", 6, self.compute), first)  # piece count changed
+        self.assertEqual(self.compute.call_count, 2)
+        self.cache.invalidate("k")  # piece_finished_alert
+        self.cache.get("k", 6, self.compute)
+        self.now[0] = 11  # availability too old
+        self.cache.get("k", 6, self.compute)
+        self.assertEqual(self.compute.call_count, 4)
+
+    def test_versions_and_discard(self):
+        a = self.cache.get("a", 0, self.compute)
+        b = self.cache.get("b", 0, self.compute)
+        self.assertGreater(b.version, a.version)
+        self.cache.invalidate("unknown")  # ignored
+        self.cache.discard("a")
+        self.assertEqual(len(self.cache), 1)
+
+    def test_max_entries_evicts_least_recently_computed(self):
+        self.cache.max_entries = 2
+        for key in ("a", "b", "c"):
+            self.cache.get(key, 0, self.compute)
+        self.assertEqual(len(self.cache), 2)
+        self.cache.get("c", 0, self.compute)  # still cached
+        self.assertEqual(self.compute.call_count, 3)
+        self.cache.get("a", 0, self.compute)  # evicted: computed again
+        self.assertEqual(self.compute.call_count, 4)
+
+
+@unittest.skipUnless(HAVE_LIBTORRENT, "libtorrent not installed")
+class TestManagerFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = os.path.join(self.tmp.name, "data", "sub")
+        os.makedirs(root)
+        with open(os.path.join(self.tmp.name, "data", "a.bin"), "wb") as f:
+            f.write(b"a" * 100_000)
+        with open(os.path.join(root, "b.bin"), "wb") as f:
+            f.write(b"b" * 50_000)
+        fs = lt.file_storage()
+        lt.add_files(fs, os.path.join(self.tmp.name, "data"))
+        creator = lt.create_torrent(fs, 16384)  # hybrid: pad files between the files
+        lt.set_piece_hashes(creator, self.tmp.name)
+        self.torrent = os.path.join(self.tmp.name, "data.torrent")
+        with open(self.torrent, "wb") as f:
+            f.write(lt.bencode(creator.generate()))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_files_view_is_cached_and_invalidated_by_piece_alerts(self):
+        manager = TorrentManager(self.tmp.name, os.path.join(self.tmp.name, "session.dat"),
+                                 settings=dict(OFFLINE_SETTINGS))
+        handle = manager.add_torrent_file(self.torrent)
+        view = manager.get_files_at(0)
+        self.assertEqual([(f.path, f.size) for f in view.files],
+                         [("data/a.bin", 100_000), (os.path.join("data", "sub", "b.bin"), 50_000)])
+        self.assertEqual(view.num_pieces, handle.torrent_file().num_pieces())
+        self.assertIs(manager.get_files_at(0), view)
+        piece_finished_alert = type("piece_finished_alert", (), {"handle": handle})
+        manager._dispatch_alert(piece_finished_alert())
+        self.assertIsNot(manager.get_files_at(0), view)
+        self.assertIsNone(manager.get_files_at(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
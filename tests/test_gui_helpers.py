@@ -1,5 +1,15 @@
 import unittest
-from torrent_downloader.gui import TorrentDownloaderApp, MAX_NAME_LEN
+from unittest.mock import MagicMock
+
+from torrent_downloader.create import CreateProgress
+from torrent_downloader.files import FileEntry, FileView
+from torrent_downloader.gui import (DetailsPane, FilesPanel, KeyedTable, MAX_NAME_LEN, PeerPanel, PerformancePanel,
+                                    PostProcessWindow, StatisticsWindow, TorrentDownloaderApp)
+from torrent_downloader.memory import Allocation, MemoryReport, is_tracing, start_tracing, stop_tracing
+from torrent_downloader.perf import PERF
+from torrent_downloader.postprocess import FAILED, QUEUED, PostProcessJob, StageResult
+from torrent_downloader.stats import DAY, TorrentTraffic, TrafficBucket, TrafficReport
+from torrent_downloader.torrent import PeerInfo, TorrentStatus
 
 
 class TestGuiHelpers(unittest.TestCase):
@@ -17,6 +27,159 @@ class TestGuiHelpers(unittest.TestCase):
         short = "short name"
         self.assertEqual(TorrentDownloaderApp._shorten(short), short)
 
+    def test_state_label_shows_recheck_queue(self):
+        st = TorrentStatus(name="x", progress=0.0, download_rate=0, upload_rate=0, num_peers=0,
+                           eta_seconds=None, has_metadata=True, state="paused")
+        self.assertEqual(TorrentDownloaderApp._state_label(st), "paused")
+        st.check_position = 0
+        self.assertEqual(TorrentDownloaderApp._state_label(st), "checking")
+        st.check_position = 3
+        self.assertEqual(TorrentDownloaderApp._state_label(st), "queued check #3")
+        st.check_position = None
+        st.space_position = 2
+        self.assertEqual(TorrentDownloaderApp._state_label(st), "waiting for disk space #2")
+
+    def test_policy_from_fields(self):
+        policy = TorrentDownloaderApp._policy_from_fields("1.5", "", " 90 ", "remove")
+        self.assertEqual((policy.ratio_limit, policy.seed_time_limit_s, policy.idle_time_limit_s), (1.5, None, 5400))
+        self.assertEqual(policy.action, "remove")
+        for fields in (("x", "", "", "pause"), ("-1", "", "", "pause"), ("", "", "", "delete")):
+            with self.assertRaises(ValueError):
+                TorrentDownloaderApp._policy_from_fields(*fields)
+
+    def test_format_create_progress(self):
+        progress = CreateProgress(pieces_done=3, num_pieces=10, piece_size=1024 * 1024, elapsed_s=1.5)
+        self.assertEqual(TorrentDownloaderApp._format_create_progress(progress), "3/10 pieces, 2.0 MB/s")
+
+    def test_statistics_report_rows(self):
+        report = TrafficReport(DAY, 0, 3 * DAY, [TrafficBucket(0, 1024, 0), TrafficBucket(DAY, 0, 2048)],
+                               [TorrentTraffic("ab", "", 1024, 2048)])
+        totals, top, buckets = StatisticsWindow.format_report(report)
+        self.assertEqual(totals, "Down: 1.0 KB  Up: 2.0 KB")
+        self.assertEqual(top, [("ab", "1.0 KB", "2.0 KB")])  # no name recorded: info-hash
+        self.assertEqual([row[1:] for row in buckets], [("0.0 B", "2.0 KB"), ("1.0 KB", "0.0 B")])  # newest first
+
+    def test_format_memory(self):
+        self.assertEqual(PerformancePanel.format_memory(MemoryReport(None)), ("RSS: n/a", []))
+        report = MemoryReport(2048, 1024, 4096, [Allocation("gui.py:10", 1024, 3)])
+        summary, rows = PerformancePanel.format_memory(report)
+        self.assertEqual(summary, "RSS: 2.0 KB  Python: 1.0 KB (peak 4.0 KB)")
+        self.assertEqual(rows, [("gui.py:10", "1.0 KB", "3")])
+
+    def test_performance_panel_leaves_perf_on_if_enabled_elsewhere(self):
+        panel = PerformancePanel.__new__(PerformancePanel)  # skip widget construction
+        panel.window, panel._open, panel._started_tracing = MagicMock(), True, False
+        try:
+            PERF.enable()  # e.g. TORRENT_DOWNLOADER_PERF=1
+            panel._owns_perf = False
+            panel.close()
+            self.assertTrue(PERF.enabled)
+            panel._owns_perf = True
+            panel.close()
+            self.assertFalse(PERF.enabled)
+        finally:
+            PERF.disable()
+
+    def test_performance_panel_leaves_outside_tracing_on(self):
+        panel = PerformancePanel.__new__(PerformancePanel)  # skip widget construction
+        panel.trace_var, panel._started_tracing, panel.refresh_memory = MagicMock(), False, MagicMock()
+        start_tracing()  # e.g. PYTHONTRACEMALLOC
+        try:
+            panel.trace_var.get.return_value = True
+            panel.toggle_tracing()
+            self.assertFalse(panel._started_tracing)
+            panel.trace_var.get.return_value = False
+            panel.toggle_tracing()
+            self.assertTrue(is_tracing())
+        finally:
+            stop_tracing()
+        panel.trace_var.get.return_value = True
+        panel.toggle_tracing()
+        self.assertTrue(panel._started_tracing and is_tracing())
+        panel.trace_var.get.return_value = False
+        panel.toggle_tracing()
+        self.assertFalse(is_tracing())
+
+    def test_postprocess_job_rows(self):
+        jobs = [PostProcessJob(2, "bb", "album", QUEUED),
+                PostProcessJob(1, "aa", "iso", FAILED, [StageResult("verify", False, "checksum mismatch: iso")],
+                               finished_at=0.0)]
+        rows = PostProcessWindow.format_jobs(jobs)
+        self.assertEqual(rows[0], ("bb", ("album", "queued", "", "", "")))
+        self.assertEqual(rows[1][1][:4], ("iso", "failed", "verify", "checksum mismatch: iso"))
+
+
+def peer(endpoint, down=0):
+    return PeerInfo(endpoint=endpoint, client="qBittorrent 4.6", flags="D I", download_rate=down,
+                    upload_rate=0, progress=0.5, connection="uTP")
+
+
+class TestDetailsPane(unittest.TestCase):
+    @staticmethod
+    def table():
+        table = KeyedTable.__new__(KeyedTable)  # skip widget construction
+        table.tree, table._owner, table._rows = MagicMock(), None, {}
+        return table
+
+    def test_diff_rows(self):
+        old = {"a": ("1",), "b": ("2",), "c": ("3",)}
+        new = {"b": ("2",), "c": ("x",), "d": ("4",)}
+        self.assertEqual(KeyedTable.diff_rows(old, new), (["d"], ["c"], ["a"]))
+
+    def test_peer_rows_update_in_place(self):
+        fetch = MagicMock(return_value=(0, [peer("1.2.3.4:6881"), peer("[::1]:51413")]))
+        panel = PeerPanel.__new__(PeerPanel)
+        panel._fetch, panel.table = fetch, self.table()
+        tree = panel.table.tree
+
+        panel.refresh()
+        self.assertEqual(tree.insert.call_count, 2)
+        fetch.return_value = (0, [peer("1.2.3.4:6881", down=2048), peer("5.6.7.8:1")])
+        panel.refresh()
+        tree.delete.assert_called_once_with("[::1]:51413")
+        tree.item.assert_called_once()
+        self.assertEqual(tree.insert.call_count, 3)
+
+        fetch.return_value = (1, [])  # another torrent selected
+        panel.refresh()
+        self.assertEqual(panel.table._rows, {})
+        self.assertEqual(PeerPanel.format_row(peer("x:1", down=1024))[3], "1.0 KB/s")
+
+    def test_polls_only_the_visible_tab_while_shown(self):
+        pane = DetailsPane.__new__(DetailsPane)
+        pane.master, pane.notebook, pane.visible, pane._job = MagicMock(), MagicMock(), False, None
+        pane.tabs = [MagicMock(), MagicMock()]
+        pane.notebook.index.return_value = 1
+        pane.refresh()
+        pane.tabs[1].refresh.assert_not_called()
+        pane.visible = True
+        pane.refresh_now()
+        pane.tabs[0].refresh.assert_not_called()
+        pane.tabs[1].refresh.assert_called_once()
+        pane.master.after.assert_called_once()
+
+    def test_files_tab_rebuilds_rows_only_for_new_views(self):
+        view = FileView(files=[FileEntry(0, "t/a.bin", 2048, 0.5, 4), FileEntry(2, "t/b.bin", 10, 1.0, 0)],
+                        pieces=[True, False, True, True], availability=[])
+        panel = FilesPanel.__new__(FilesPanel)
+        panel._fetch, panel.table, panel.canvas = MagicMock(return_value=(3, view)), self.table(), MagicMock()
+        panel._shown = panel._drawn = None
+        panel.canvas.winfo_width.return_value = 4
+        panel.refresh()
+        panel.refresh()
+        self.assertEqual(panel.table.tree.insert.call_count, 2)
+        self.assertEqual(panel.table._rows["2"], ("t/b.bin", "10.0 B", "100.0%", "skip"))
+        self.assertEqual(panel.canvas.delete.call_count, 1)  # drawn once
+        panel._fetch.return_value = (3, None)  # no metadata
+        panel.refresh()
+        self.assertEqual(panel.table._rows, {})
+
+    def test_bar_segments_merge_equal_runs(self):
+        segments = FilesPanel.bar_segments([(1.0, 2), (1.0, 3), (0.0, 0), (0.5, -1)], 8)
+        self.assertEqual([(x0, x1) for x0, x1, _h, _a in segments], [(0, 4), (4, 6), (6, 8)])
+        self.assertEqual(segments[0][2:], (FilesPanel.HAVE_COLORS[-1], FilesPanel.WELL_AVAILABLE_COLOR))
+        self.assertEqual(FilesPanel.bar_segments([], 100), [])
+
 
 if __name__ == '__main__':  # pragma: no cover
     unittest.main()
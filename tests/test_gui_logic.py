@@ -4,15 +4,23 @@ from unittest.mock import MagicMock, patch
 
 # Mock tkinter before it's imported
 with patch.dict('sys.modules', {'tkinter': MagicMock(), 'tkinter.ttk': MagicMock()}):
-    from torrent_downloader.gui import TorrentDownloaderApp
+    from torrent_downloader import gui as gui_module
     from torrent_downloader.torrent import TorrentStatus
+TorrentDownloaderApp = gui_module.TorrentDownloaderApp
 
 class TestGuiLogic(unittest.TestCase):
 
-    @patch('torrent_downloader.gui.TorrentManager')
-    @patch('torrent_downloader.gui.util')
+    @patch.object(gui_module, 'TorrentManager')
+    @patch.object(gui_module, 'util')
     def setUp(self, mock_util, mock_manager):
         """Set up a TorrentDownloaderApp with mocked dependencies."""
+        # Patch the module the app is built from: "torrent_downloader.gui" may
+        # name another copy once the sys.modules patch above is undone, or the
+        # real tkinter one when other tests imported gui first.
+        for name in ('tk', 'ttk'):
+            patcher = patch.object(gui_module, name)
+            patcher.start()
+            self.addCleanup(patcher.stop)
         # Mock the master tkinter window
         self.master = MagicMock()
         
@@ -99,7 +107,7 @@ class TestGuiLogic(unittest.TestCase):
         self.mock_manager.resume_at.assert_any_call(2)
         self.assertEqual(self.mock_manager.resume_at.call_count, 2)
 
-    @patch('torrent_downloader.gui.messagebox')
+    @patch.object(gui_module, 'messagebox')
     def test_remove_selected(self, mock_messagebox):
         """Test the logic for removing a selected torrent."""
         # Mock the tree selection and children order
@@ -116,7 +124,7 @@ class TestGuiLogic(unittest.TestCase):
         # Verify the manager's remove_at was called for the correct index (1)
         self.mock_manager.remove_at.assert_called_once_with(1, delete_files=False)
 
-    @patch('torrent_downloader.gui.messagebox')
+    @patch.object(gui_module, 'messagebox')
     def test_remove_selected_cancelled(self, mock_messagebox):
         """Test that nothing is removed if the user cancels the dialog."""
         self.app.tree.selection.return_value = ('I002',)
@@ -1,3 +1,4 @@
+import gzip
 import os
 import logging
 import tempfile
@@ -7,6 +8,8 @@ from unittest.mock import patch
 
 import torrent_downloader as pkg
 from torrent_downloader import util
+from torrent_downloader.logging import (RateLimitFilter, _gzip_namer, _gzip_rotator, _on_log_level_changed,
+                                        resolve_level)
 
 
 class TestLoggingSetup(unittest.TestCase):
@@ -37,6 +40,7 @@ class TestLoggingSetup(unittest.TestCase):
 
             test_message = 'test logging message'
             logging.info(test_message)
+            pkg.flush_logging()  # records are written asynchronously
             content = Path(log_path).read_text(encoding='utf-8')
             self.assertIn('Logging initialised', content)
             self.assertIn(test_message, content)
@@ -46,9 +50,77 @@ class TestLoggingSetup(unittest.TestCase):
 
             size_before = os.path.getsize(log_path)
             logging.info('second call')
+            pkg.flush_logging()
             size_after = os.path.getsize(log_path)
             self.assertGreater(size_after, size_before)
 
 
+class TestLogLevel(unittest.TestCase):
+    def test_explicit_level_wins(self):
+        with patch.dict(os.environ, {'TORRENT_DOWNLOADER_LOG_LEVEL': 'ERROR'}):
+            self.assertEqual(resolve_level(logging.DEBUG), logging.DEBUG)
+            self.assertEqual(resolve_level('warning'), logging.WARNING)
+
+    def test_env_then_config_then_default(self):
+        with patch('torrent_downloader.config.load_log_level', return_value='DEBUG'):
+            with patch.dict(os.environ, {'TORRENT_DOWNLOADER_LOG_LEVEL': 'error'}):
+                self.assertEqual(resolve_level(), logging.ERROR)
+            with patch.dict(os.environ, {'TORRENT_DOWNLOADER_LOG_LEVEL': 'bogus'}):
+                self.assertEqual(resolve_level(), logging.DEBUG)
+        with patch('torrent_downloader.config.load_log_level', return_value=None), \
+             patch.dict(os.environ, {}, clear=True):
+            self.assertEqual(resolve_level(), logging.INFO)
+
+    def test_config_change_updates_level_live(self):
+        root = logging.getLogger()
+        previous = root.level
+        try:
+            _on_log_level_changed({'log_level': 'ERROR'})
+            self.assertEqual(root.level, logging.ERROR)
+            with patch('torrent_downloader.config.load_log_level', return_value=None), \
+                 patch.dict(os.environ, {}, clear=True):
+                _on_log_level_changed({'log_level': None})
+            self.assertEqual(root.level, logging.INFO)
+        finally:
+            root.setLevel(previous)
+
+
+class TestRateLimitFilter(unittest.TestCase):
+    def _record(self, msg: str, arg: object) -> logging.LogRecord:
+        return logging.LogRecord('root', logging.WARNING, __file__, 1, msg, (arg,), None)
+
+    def test_repeats_suppressed_and_counted(self):
+        now = [0.0]
+        flt = RateLimitFilter(interval=10.0, burst=2, clock=lambda: now[0])
+        template = 'Failed to retrieve status for handle: %s'
+        passed = [flt.filter(self._record(template, i)) for i in range(5)]
+        self.assertEqual(passed, [True, True, False, False, False])
+        # Different template is independent
+        self.assertTrue(flt.filter(self._record('other %s', 1)))
+        # New window: record passes and reports suppressed repeats
+        now[0] = 11.0
+        rec = self._record(template, 99)
+        self.assertTrue(flt.filter(rec))
+        self.assertIn('suppressed 3 similar messages', rec.getMessage())
+
+    def test_errors_are_never_dropped(self):
+        flt = RateLimitFilter(interval=10.0, burst=1, clock=lambda: 0.0)
+        errors = [logging.LogRecord('root', logging.ERROR, __file__, 1, 'Failed to move %s', (i,), None)
+                  for i in range(3)]
+        self.assertEqual([flt.filter(r) for r in errors], [True, True, True])
+
+
+class TestGzipRotation(unittest.TestCase):
+    def test_rotator_compresses_and_removes_source(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, 'app.log.1')
+            Path(src).write_text('line one\n', encoding='utf-8')
+            dest = _gzip_namer(src)
+            _gzip_rotator(src, dest)
+            self.assertFalse(os.path.exists(src))
+            with gzip.open(dest, 'rt', encoding='utf-8') as f:
+                self.assertEqual(f.read(), 'line one\n')
+
+
 if __name__ == '__main__':  # pragma: no cover
     unittest.main()
@@ -0,0 +1,110 @@
+import gc
+import os
+import tempfile
+import tracemalloc
+import unittest
+from unittest.mock import MagicMock, patch
+
+from torrent_downloader.disk import disk_settings
+from torrent_downloader.memory import (LIBTORRENT_DEFAULTS, LOW_MEMORY_SETTINGS, memory_report, memory_settings,
+                                       rss_bytes, start_tracing, stop_tracing)
+from torrent_downloader.torrent import TorrentManager
+
+from benchmarks.fakes import make_handles, make_manager
+from benchmarks.micro import _bare_app
+
+try:
+    import libtorrent as lt
+    HAVE_LIBTORRENT = True
+except ImportError:  # pragma: no cover - environment specific
+    HAVE_LIBTORRENT = False
+
+BUDGET_TORRENTS = 5000
+# Python-side bytes per torrent for a status refresh (statuses, rows, handle list).
+BUDGET_BYTES_PER_TORRENT = 1024
+
+
+class TestMemorySettings(unittest.TestCase):
+    @unittest.skipUnless(HAVE_LIBTORRENT, "libtorrent not installed")
+    def test_keys_and_defaults_match_libtorrent(self):
+        defaults = lt.default_settings()
+        self.assertEqual(set(LOW_MEMORY_SETTINGS), set(LIBTORRENT_DEFAULTS))
+        for key, value in LIBTORRENT_DEFAULTS.items():
+            self.assertEqual(defaults[key], value, key)
+            self.assertLess(LOW_MEMORY_SETTINGS[key], value, key)
+
+    def test_memory_settings_returns_copy(self):
+        settings = memory_settings(True)
+        settings['connections_limit'] = 1
+        self.assertEqual(memory_settings(True), LOW_MEMORY_SETTINGS)
+        self.assertEqual(memory_settings(False), LIBTORRENT_DEFAULTS)
+
+
+class TestMemoryReport(unittest.TestCase):
+    def tearDown(self):
+        stop_tracing()
+
+    @unittest.skipUnless(os.path.exists("/proc/self/statm"), "needs /proc")
+    def test_rss(self):
+        self.assertGreater(rss_bytes(), 1024 * 1024)
+
+    def test_top_allocators_only_while_tracing(self):
+        self.assertIsNone(memory_report().traced_bytes)
+        start_tracing()
+        hog = [bytearray(1000) for _ in range(2000)]
+        report = memory_report(top_n=3)
+        self.assertGreaterEqual(report.traced_bytes, 2_000_000)
+        self.assertIn(f"{__file__}:", report.top[0].location)
+        self.assertGreaterEqual(report.top[0].size_bytes, 2_000_000)
+        self.assertLessEqual(len(report.top), 3)
+        del hog
+
+
+@patch('torrent_downloader.torrent.lt')
+class TestManagerMemoryMode(unittest.TestCase):
+    def manager(self, mock_lt, **kwargs):
+        self.session = MagicMock()
+        mock_lt.session.return_value = self.session
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        return TorrentManager(tmp.name, os.path.join(tmp.name, "session.dat"), **kwargs)
+
+    def test_caps_win_over_preset_but_not_explicit_settings(self, mock_lt):
+        self.manager(mock_lt, disk_preset='nvme', low_memory=True, settings={'connections_limit': 80})
+        applied = mock_lt.session.call_args[0][0]
+        self.assertEqual(applied['aio_threads'], LOW_MEMORY_SETTINGS['aio_threads'])
+        self.assertEqual(applied['connections_limit'], 80)
+
+    def test_switching_off_restores_defaults_and_preset(self, mock_lt):
+        manager = self.manager(mock_lt, disk_preset='hdd', low_memory=True)
+        manager.apply_memory_mode(False)
+        applied = self.session.apply_settings.call_args[0][0]
+        self.assertEqual(applied['max_peerlist_size'], LIBTORRENT_DEFAULTS['max_peerlist_size'])
+        self.assertEqual(applied['aio_threads'], disk_settings('hdd')['aio_threads'])
+        self.assertIsNone(manager._file_views.max_entries)
+        manager.apply_memory_mode(True)
+        self.assertEqual(manager._file_views.max_entries, 1)
+
+
+class TestMemoryBudget(unittest.TestCase):
+    def test_status_refresh_of_5k_torrents_fits_the_budget(self):
+        handles = make_handles(BUDGET_TORRENTS)
+        app = _bare_app()
+        app.low_memory = True
+        with make_manager([]) as manager:
+            gc.collect()
+            tracemalloc.start()
+            try:
+                manager._handles = list(handles)
+                app._sync_state_from_manager()  # no magnet link per torrent in low-memory mode (app has no manager)
+                rows = app._build_rows_impl(manager.get_status_list())
+                _current, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        self.assertEqual(len(rows), BUDGET_TORRENTS)
+        self.assertLess(peak, BUDGET_TORRENTS * BUDGET_BYTES_PER_TORRENT,
+                        f"{peak / BUDGET_TORRENTS:.0f} bytes per torrent")
+
+
+if __name__ == '__main__':
+    unittest.main()
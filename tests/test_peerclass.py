@@ -0,0 +1,88 @@
+import ipaddress
+import os
+import tempfile
+import unittest
+
+from torrent_downloader.peerclass import MAX_RULES, PeerClasses, PeerClassRule, filter_ranges
+from torrent_downloader.torrent import TorrentManager
+
+from benchmarks.fakes import OFFLINE_SETTINGS
+
+try:
+    import libtorrent as lt
+    HAVE_LIBTORRENT = True
+except ImportError:  # pragma: no cover - environment specific
+    HAVE_LIBTORRENT = False
+
+GLOBAL, LOCAL = 0, 2
+
+
+def mask_of(ranges, address):
+    ip = ipaddress.ip_address(address)
+    for first, last, mask in ranges:
+        first, last = ipaddress.ip_address(first), ipaddress.ip_address(last)
+        if first.version == ip.version and first <= ip <= last:
+            return mask
+    raise AssertionError(f"{address} not covered")
+
+
+class TestFilterRanges(unittest.TestCase):
+    def test_local_networks_leave_the_global_class(self):
+        ranges = filter_ranges(PeerClasses(), GLOBAL, LOCAL, {})
+        self.assertEqual(mask_of(ranges, "192.168.1.20"), 1 << LOCAL)
+        self.assertEqual(mask_of(ranges, "fe80::1"), 1 << LOCAL)
+        self.assertEqual(mask_of(ranges, "8.8.8.8"), 1 << GLOBAL)
+        self.assertEqual(ranges[0], ("0.0.0.0", "9.255.255.255", 1 << GLOBAL))
+        self.assertEqual(ranges[-1][1], "ffff:ffff:ffff:ffff:ffff:ffff:ffff:ffff")
+        throttled = filter_ranges(PeerClasses(local_unthrottled=False), GLOBAL, LOCAL, {})
+        self.assertEqual(throttled, [("0.0.0.0", "255.255.255.255", 1),
+                                     ("::", "ffff:ffff:ffff:ffff:ffff:ffff:ffff:ffff", 1)])
+
+    def test_rules_add_their_class(self):
+        config = PeerClasses(rules=(PeerClassRule("office", ("203.0.113.0/24", "192.168.5.0/24")),
+                                    PeerClassRule("wide", ("203.0.0.0/8",))))
+        ranges = filter_ranges(config, GLOBAL, LOCAL, {"office": 3, "wide": 4})
+        self.assertEqual(mask_of(ranges, "203.0.113.9"), (1 << GLOBAL) | (1 << 3) | (1 << 4))
+        self.assertEqual(mask_of(ranges, "203.1.0.1"), (1 << GLOBAL) | (1 << 4))
+        self.assertEqual(mask_of(ranges, "192.168.5.1"), (1 << LOCAL) | (1 << 3))
+        self.assertEqual(mask_of(ranges, "192.168.6.1"), 1 << LOCAL)
+        v4 = [mask for first, _last, mask in ranges if ":" not in first]
+        self.assertTrue(all(a != b for a, b in zip(v4, v4[1:])))  # equal neighbours are joined
+
+    def test_rule_validation(self):
+        self.assertEqual(PeerClassRule.from_dict("a", {"networks": ["10.0.0.0/8"], "download_limit": 5}).to_dict(),
+                         {"networks": ["10.0.0.0/8"], "upload_limit": 0, "download_limit": 5})
+        for data in ({"networks": []}, {"networks": "10.0.0.0/8"}, {"networks": ["10.0.0.0/33"]},
+                     {"networks": ["::/0"], "upload_limit": -1}, "10.0.0.0/8"):
+            with self.assertRaises(ValueError):
+                PeerClassRule.from_dict("a", data)
+        with self.assertRaises(ValueError):
+            PeerClasses(rules=[PeerClassRule(f"c{i}", ("10.0.0.0/8",)) for i in range(MAX_RULES + 1)])
+
+
+@unittest.skipUnless(HAVE_LIBTORRENT, "libtorrent not installed")
+class TestManagerPeerClasses(unittest.TestCase):
+    def test_classes_are_created_updated_and_deleted(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            office = PeerClassRule("office", ("203.0.113.0/24",), upload_limit=50000, download_limit=100000)
+            manager = TorrentManager(os.path.join(tmp, "downloads"), os.path.join(tmp, "session.dat"),
+                                     settings=dict(OFFLINE_SETTINGS), peer_classes=PeerClasses(rules=(office,)))
+            session = manager._session
+            office_id = manager._peer_class_ids["office"]
+            info = session.get_peer_class(office_id)
+            self.assertEqual((info["label"], info["upload_limit"], info["download_limit"]),
+                             ("office", 50000, 100000))
+            local = session.get_peer_class(session.local_peer_class_id)
+            self.assertTrue(local["ignore_unchoke_slots"])
+            self.assertEqual((local["upload_limit"], local["download_limit"]), (0, 0))
+
+            manager.set_peer_classes(PeerClasses(rules=(PeerClassRule("office", ("203.0.113.0/24",),
+                                                                      upload_limit=20000),)))
+            self.assertEqual(manager._peer_class_ids["office"], office_id)
+            self.assertEqual(session.get_peer_class(office_id)["upload_limit"], 20000)
+            manager.set_peer_classes(PeerClasses(local_unthrottled=False))
+            self.assertEqual(manager._peer_class_ids, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
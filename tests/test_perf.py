@@ -0,0 +1,75 @@
+import unittest
+
+from torrent_downloader import perf
+from torrent_downloader.perf import Histogram, PerfRecorder
+
+
+class TestHistogram(unittest.TestCase):
+    def test_empty_histogram(self):
+        h = Histogram()
+        self.assertEqual(h.count, 0)
+        self.assertEqual(h.percentile(0.5), 0)
+
+    def test_percentiles_within_bucket_resolution(self):
+        h = Histogram()
+        for ms in range(1, 101):  # 1..100 ms uniformly
+            h.record(ms * 1_000_000)
+        self.assertEqual(h.count, 100)
+        self.assertEqual(h.max_ns, 100_000_000)
+        # Quarter-octave buckets: upper bound at most ~19% above the true value
+        p50 = h.percentile(0.50) / 1e6
+        p99 = h.percentile(0.99) / 1e6
+        self.assertGreaterEqual(p50, 50)
+        self.assertLessEqual(p50, 50 * 1.2)
+        self.assertGreaterEqual(p99, 99)
+        self.assertLessEqual(p99, 100)  # clamped to the observed maximum
+
+    def test_overflow_and_negative_values(self):
+        h = Histogram()
+        h.record(-5)
+        h.record(10 ** 12)  # far above the last bucket bound
+        self.assertEqual(h.count, 2)
+        self.assertEqual(h.counts[0], 1)
+        self.assertEqual(h.counts[-1], 1)
+        self.assertEqual(h.percentile(1.0), 10 ** 12)
+
+
+class TestPerfRecorder(unittest.TestCase):
+    def test_disabled_recorder_records_nothing(self):
+        rec = PerfRecorder(enabled=False)
+        with rec.timer("stage"):
+            pass
+        rec.record("stage", 1000)
+        rec.count_overrun("stage")
+        self.assertEqual(rec.snapshot(), [])
+        # The shared null timer is handed out (no per-call allocation)
+        self.assertIs(rec.timer("a"), rec.timer("b"))
+
+    def test_enabled_recorder_collects_stats(self):
+        rec = PerfRecorder(enabled=True)
+        with rec.timer("build"):
+            sum(range(1000))
+        rec.record("build", 2_000_000)
+        rec.count_overrun("tick")
+        stats = {s.stage: s for s in rec.snapshot()}
+        self.assertEqual(stats["build"].count, 2)
+        self.assertGreater(stats["build"].max_ms, 0)
+        self.assertEqual(stats["tick"].count, 0)
+        self.assertEqual(stats["tick"].overruns, 1)
+
+    def test_reset_and_toggle(self):
+        rec = PerfRecorder()
+        rec.enable()
+        rec.record("x", 10)
+        rec.reset()
+        self.assertEqual(rec.snapshot(), [])
+        rec.disable()
+        rec.record("x", 10)
+        self.assertIsNone(rec.histogram("x"))
+
+    def test_global_recorder_exists(self):
+        self.assertIsInstance(perf.PERF, PerfRecorder)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,232 @@
+import hashlib
+import io
+import os
+import sys
+import tarfile
+import tempfile
+import time
+import unittest
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import replace
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from torrent_downloader.config import ConfigStore
+from torrent_downloader.postprocess import (DONE, FAILED, LINK_COPY, QUEUED, RUNNING, JobSpec, JobStore,
+                                            PostProcessor, PostProcessSettings, StageError, extract_archives,
+                                            link_to_library, run_job, run_script, verify_manifests)
+from torrent_downloader.torrent import TorrentManager
+
+
+def write(path, data=b"data"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+class StageTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.save_path = os.path.join(self.tmp.name, "downloads")
+        self.payload = os.path.join(self.save_path, "album")
+        write(os.path.join(self.payload, "a.flac"), b"a" * 1000)
+        write(os.path.join(self.payload, "cd2", "b.flac"), b"b" * 500)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+
+class TestStages(StageTestCase):
+    def test_verify_manifests(self):
+        self.assertEqual(verify_manifests(self.payload), "no checksum manifest")
+        digest = hashlib.sha256(b"a" * 1000).hexdigest()
+        write(os.path.join(self.payload, "SHA256SUMS"), f"{digest}  a.flac\n".encode())
+        write(os.path.join(self.payload, "cd2", "b.flac.md5"), hashlib.md5(b"b" * 500).hexdigest().encode())
+        self.assertEqual(verify_manifests(self.payload), "2 files verified")
+        write(os.path.join(self.payload, "a.flac"), b"corrupt")
+        with self.assertRaisesRegex(StageError, "checksum mismatch: album/a.flac"):
+            verify_manifests(self.payload)
+        write(os.path.join(self.payload, "SHA256SUMS"), f"{digest}  ../../etc/passwd\n".encode())
+        with self.assertRaisesRegex(StageError, "outside the payload"):
+            verify_manifests(self.payload)
+
+    def test_link_to_library(self):
+        library = os.path.join(self.tmp.name, "library")
+        root, message = link_to_library(self.payload, library, "hardlink")
+        self.assertEqual(root, os.path.join(library, "album"))
+        self.assertEqual(message, "2 linked, 0 copied, 0 already there")
+        self.assertTrue(os.path.samefile(os.path.join(root, "cd2", "b.flac"),
+                                         os.path.join(self.payload, "cd2", "b.flac")))
+        self.assertEqual(link_to_library(self.payload, library, "hardlink")[1], "0 linked, 0 copied, 2 already there")
+        single = os.path.join(self.payload, "a.flac")
+        _root, message = link_to_library(single, os.path.join(self.tmp.name, "copies"), LINK_COPY)
+        self.assertEqual(message, "0 linked, 1 copied, 0 already there")
+
+    def test_extract_archives(self):
+        with zipfile.ZipFile(os.path.join(self.payload, "extras.zip"), "w") as archive:
+            archive.writestr("notes.txt", "hello")
+        buffer = io.BytesIO(b"x" * 10)
+        with tarfile.open(os.path.join(self.payload, "cd2", "art.tar.gz"), "w:gz") as archive:
+            info = tarfile.TarInfo("cover.jpg")
+            info.size = 10
+            archive.addfile(info, buffer)
+        self.assertEqual(extract_archives(self.payload), "2 archives extracted")
+        self.assertTrue(os.path.isfile(os.path.join(self.payload, "extras", "notes.txt")))
+        self.assertTrue(os.path.isfile(os.path.join(self.payload, "cd2", "art", "cover.jpg")))
+        self.assertEqual(extract_archives(self.payload), "no archives")  # already unpacked
+        write(os.path.join(self.payload, "broken.zip"), b"not a zip")
+        with self.assertRaisesRegex(StageError, "cannot extract broken.zip"):
+            extract_archives(self.payload)
+        self.assertFalse(os.path.exists(os.path.join(self.payload, "broken.partial")))
+
+    def test_run_script(self):
+        out = os.path.join(self.tmp.name, "out.txt")
+        script = (f'{sys.executable} -c "import os, sys; '
+                  f'open(sys.argv[1], \'w\').write(os.environ[\'TD_NAME\'] + \' \' + sys.argv[2])" {out}')
+        spec = JobSpec("ab", "album", self.save_path, ["script"], script=script)
+        self.assertEqual(run_script(spec, self.payload), "script finished")
+        with open(out) as f:
+            self.assertEqual(f.read(), f"album {self.payload}")
+        failing = JobSpec("ab", "album", self.save_path, ["script"],
+                          script=f"{sys.executable} -c \"import sys; sys.exit('bad payload')\"")
+        with self.assertRaisesRegex(StageError, "script exited with 1: bad payload"):
+            run_script(failing, self.payload)
+
+    def test_run_job_stops_at_the_first_failure(self):
+        library = os.path.join(self.tmp.name, "library")
+        write(os.path.join(self.payload, "SHA1SUMS"), b"0" * 40 + b"  a.flac\n")
+        spec = PostProcessSettings(verify=True, library_dir=library).spec("ab", "album", self.save_path)
+        results = run_job(spec)
+        self.assertEqual([(r.stage, r.ok) for r in results], [("verify", False)])
+        self.assertFalse(os.path.exists(library))
+        missing = run_job(JobSpec("ab", "gone", self.save_path, ["extract"]))
+        self.assertIn("payload not found", missing[0].message)
+
+
+class TestPostProcessor(StageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.store = JobStore(os.path.join(self.tmp.name, "session.dat.db"))
+        self.library = os.path.join(self.tmp.name, "library")
+        self.settings = PostProcessSettings(library_dir=self.library, extract=True, workers=1)
+        self.pools = []
+
+    def tearDown(self):
+        for pool in self.pools:
+            pool.shutdown()
+        self.store.close()
+        super().tearDown()
+
+    def processor(self, settings=None):
+        def thread_pool(workers):
+            self.pools.append(ThreadPoolExecutor(workers))
+            return self.pools[-1]
+        return PostProcessor(self.store, settings or self.settings, executor_factory=thread_pool)
+
+    def drain(self, processor):
+        """Poll until no job is queued or running."""
+        for _ in range(500):
+            processor.poll()
+            if not processor.running() and all(job.state not in (QUEUED, RUNNING) for job in self.store.jobs()):
+                return
+            time.sleep(0.01)
+        self.fail("jobs did not finish")
+
+    def test_jobs_run_once_per_torrent_in_order(self):
+        processor = self.processor()
+        self.assertIsNotNone(processor.enqueue("ab", "album", self.save_path))
+        self.assertIsNone(processor.enqueue("ab", "album", self.save_path))  # finished again after a recheck
+        processor.enqueue("cd", "missing", self.save_path)
+        processor.poll()
+        self.assertEqual([job.state for job in self.store.jobs()], [QUEUED, RUNNING])  # one worker
+        self.drain(processor)
+        jobs = {job.info_hash: job for job in self.store.jobs()}
+        self.assertEqual(jobs["ab"].state, DONE)
+        self.assertEqual([r.stage for r in jobs["ab"].results], ["library", "extract"])
+        self.assertTrue(os.path.isfile(os.path.join(self.library, "album", "a.flac")))
+        self.assertEqual((jobs["cd"].state, jobs["cd"].stage), (FAILED, "library"))
+
+    def test_failed_jobs_retry_with_the_current_settings(self):
+        processor = self.processor(PostProcessSettings(script=f"{sys.executable} -c \"raise SystemExit(3)\""))
+        processor.enqueue("ab", "album", self.save_path)
+        self.drain(processor)
+        self.assertEqual(self.store.jobs()[0].message, "script exited with 3")
+        self.assertFalse(processor.retry("unknown"))
+        processor.configure(PostProcessSettings(extract=True))
+        self.assertTrue(processor.retry("ab"))
+        self.drain(processor)
+        job = self.store.jobs()[0]
+        self.assertEqual((job.state, job.stage), (DONE, "extract"))
+
+    def test_disabled_pipeline_and_interrupted_jobs(self):
+        self.assertIsNone(self.processor(PostProcessSettings()).enqueue("ab", "album", self.save_path))
+        self.store.add(self.settings.spec("ab", "album", self.save_path), 0.0)
+        self.store.claim(1)  # running when the app stopped
+        processor = self.processor()
+        self.assertEqual(self.store.jobs()[0].state, QUEUED)
+        self.drain(processor)
+        self.assertEqual(self.store.jobs()[0].state, DONE)
+
+    def test_broken_pool_is_replaced_and_jobs_requeued(self):
+        broken = MagicMock()
+        broken.submit.side_effect = BrokenProcessPool("a worker died")
+        pools = [broken]
+
+        def factory(workers):
+            if pools:
+                return pools.pop()
+            self.pools.append(ThreadPoolExecutor(workers))
+            return self.pools[-1]
+
+        processor = PostProcessor(self.store, replace(self.settings, workers=2), executor_factory=factory)
+        processor.enqueue("ab", "album", self.save_path)
+        processor.enqueue("cd", "album", self.save_path)
+        processor.poll()  # must not raise out of the manager's tick()
+        broken.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+        self.assertEqual([job.state for job in self.store.jobs()], [QUEUED, QUEUED])
+        self.drain(processor)
+        self.assertEqual([job.state for job in self.store.jobs()], [DONE, DONE])
+
+    def test_process_pool(self):
+        processor = PostProcessor(self.store, self.settings)
+        try:
+            processor.enqueue("ab", "album", self.save_path)
+            processor.poll()
+            for _ in range(300):
+                if processor.poll():
+                    break
+                time.sleep(0.1)
+            self.assertEqual(self.store.jobs()[0].state, DONE)
+        finally:
+            processor.shutdown()
+
+    def test_settings_from_config(self):
+        store = ConfigStore(os.path.join(self.tmp.name, "config.json"))
+        self.assertEqual(store.postprocess_settings().stages, ())
+        store.set(postprocess_verify=True, postprocess_script="notify-send done", postprocess_workers=4)
+        settings = store.postprocess_settings()
+        self.assertEqual((settings.stages, settings.workers), (("verify", "script"), 4))
+
+
+@patch('torrent_downloader.torrent.lt')
+class TestManagerPostProcessing(unittest.TestCase):
+    def test_finished_torrents_are_queued(self, mock_lt):
+        with tempfile.TemporaryDirectory() as tmp:
+            mock_lt.session.return_value = MagicMock()
+            manager = TorrentManager(tmp, os.path.join(tmp, "session.dat"),
+                                     postprocess=PostProcessSettings(verify=True))
+            torrent_finished_alert = type("torrent_finished_alert", (), {})
+            for key, downloaded in (("aa", 0), ("bb", 4096)):  # "aa" was complete when loaded
+                alert = torrent_finished_alert()
+                alert.handle = MagicMock()
+                alert.handle.info_hashes.return_value.get_best.return_value = key
+                alert.handle.status.return_value = SimpleNamespace(name=key, save_path=tmp,
+                                                                   total_payload_download=downloaded)
+                manager._dispatch_alert(alert)
+            self.assertEqual([(job.info_hash, job.state) for job in manager.postprocess_jobs()], [("bb", QUEUED)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 
-from torrent_downloader.torrent import _compute_progress, _compute_eta, _status_from_handle, TorrentStatus
+from torrent_downloader.torrent import _compute_progress, _compute_eta, _magnet_summary, _status_from_handle, TorrentStatus
 
 
 class FakeStatus:
@@ -63,6 +63,11 @@ class TestProgressEta(unittest.TestCase):
         self.assertEqual(st.download_rate, 128)
         self.assertEqual(st.upload_rate, 64)
 
+    def test_magnet_summary(self):
+        uri = "magnet:?dn=name&xt=urn:btih:abcdef&tr=" + "udp://tracker" * 50
+        self.assertEqual(_magnet_summary(uri), "urn:btih:abcdef")
+        self.assertEqual(_magnet_summary("magnet:?dn=x"), "magnet:?dn=x")
+
 
 if __name__ == '__main__':  # pragma: no cover
     unittest.main()
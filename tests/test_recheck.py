@@ -0,0 +1,169 @@
+import os
+import tempfile
+import unittest
+
+from benchmarks.simlt import MIB, SimBackend, SwarmModel, write_torrent
+from torrent_downloader.recheck import ORDER_FIFO, START_TIMEOUT_S, RecheckScheduler
+from torrent_downloader.torrent import TorrentManager
+
+
+class FakeStatus:
+    def __init__(self):
+        self.paused = False
+        self.auto_managed = True
+        self.checking = False
+
+
+class FakeHandle:
+    def __init__(self, name: str):
+        self.name = name
+        self._status = FakeStatus()
+        self.rechecks = 0
+        self.flags_set = []
+        self.flags_unset = []
+
+    def status(self):
+        return self._status
+
+    def pause(self):
+        self._status.paused = True
+
+    def resume(self):
+        self._status.paused = False
+
+    def force_recheck(self):
+        self.rechecks += 1
+        self._status.checking = True
+
+    def set_flags(self, flag):
+        self.flags_set.append(flag)
+
+    def unset_flags(self, flag):
+        self.flags_unset.append(flag)
+
+
+class TestRecheckScheduler(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.sched = RecheckScheduler(is_checking=lambda s: s.checking, auto_managed_flag="AM",
+                                      max_active=1, clock=lambda: self.now)
+
+    def test_limits_concurrency_and_orders_by_size(self):
+        big, small, mid = FakeHandle("big"), FakeHandle("small"), FakeHandle("mid")
+        self.sched.enqueue("big", big, 3000)
+        self.sched.enqueue("small", small, 10)
+        self.sched.enqueue("mid", mid, 500)
+        # queued torrents are held paused and not auto-managed
+        self.assertTrue(big.status().paused)
+        self.assertEqual(big.flags_unset, ["AM"])
+        self.assertEqual([self.sched.queue_position(k) for k in ("small", "mid", "big")], [1, 2, 3])
+
+        self.sched.tick()
+        self.assertEqual((small.rechecks, mid.rechecks, big.rechecks), (1, 0, 0))
+        self.assertEqual(self.sched.queue_position("small"), 0)
+        self.assertEqual(self.sched.queue_position("mid"), 1)
+
+        # Still checking: nothing else starts
+        self.now = 1.0
+        self.sched.tick()
+        self.assertEqual(mid.rechecks, 0)
+
+        # Check completes -> next smallest starts, throughput recorded
+        small.status().checking = False
+        self.now = 2.0
+        self.sched.tick()
+        self.assertEqual(mid.rechecks, 1)
+        self.assertIsNone(self.sched.queue_position("small"))
+        result = self.sched.results["small"]
+        self.assertEqual(result.seconds, 2.0)
+        self.assertEqual(small.flags_set, ["AM"])  # auto-management restored
+
+    def test_priority_and_fifo_order(self):
+        sched = RecheckScheduler(is_checking=lambda s: s.checking, order=ORDER_FIFO, clock=lambda: 0.0)
+        a, b, c = FakeHandle("a"), FakeHandle("b"), FakeHandle("c")
+        sched.enqueue("a", a, 1)
+        sched.enqueue("b", b, 1)
+        sched.enqueue("c", c, 1000, priority=5)
+        self.assertEqual([sched.queue_position(k) for k in ("c", "a", "b")], [1, 2, 3])
+        self.assertFalse(sched.enqueue("a", a, 1))  # duplicates ignored
+
+    def test_checked_alert_and_paused_torrents_stay_paused(self):
+        h = FakeHandle("h")
+        h.pause()
+        self.sched.enqueue("h", h, 100)
+        self.sched.tick()
+        self.assertFalse(h.status().paused)  # resumed so the check can run
+        # Check finished before we ever saw the checking state
+        h.status().checking = False
+        self.sched.mark_checked("h")
+        self.sched.tick()
+        self.assertIn("h", self.sched.results)
+        self.assertTrue(h.status().paused)
+        self.assertFalse(self.sched.pending())
+
+    def test_restored_checks_and_hold_events(self):
+        events = []
+        sched = RecheckScheduler(is_checking=lambda s: s.checking, auto_managed_flag="AM", clock=lambda: 0.0,
+                                 on_hold=lambda j: events.append(("hold", j.key)),
+                                 on_release=lambda key: events.append(("release", key)))
+        a, b = FakeHandle("a"), FakeHandle("b")
+        a.pause()  # paused by the queue before the restart
+        sched.restore("a", a, 10, 0, was_paused=False, was_auto_managed=True)
+        sched.enqueue("b", b, 5)
+        self.assertEqual([sched.queue_position(k) for k in "ab"], [2, 1])
+        sched.discard("b")
+        self.assertEqual(sched.queue_position("a"), 1)
+        sched.tick()
+        sched.mark_checked("a")
+        sched.tick()
+        self.assertFalse(a.status().paused)
+        self.assertEqual(a.flags_set, ["AM"])
+        self.assertEqual(events, [("hold", "a"), ("hold", "b"), ("release", "b"), ("release", "a")])
+
+    def test_start_timeout_and_discard(self):
+        h = FakeHandle("h")
+        h.force_recheck = lambda: None  # libtorrent never reports checking
+        self.sched.enqueue("h", h, 100)
+        self.sched.tick()
+        self.now = START_TIMEOUT_S - 1
+        self.sched.tick()
+        self.assertTrue(self.sched.pending())
+        self.now = START_TIMEOUT_S + 1
+        self.sched.tick()
+        self.assertFalse(self.sched.pending())
+
+        self.sched.enqueue("x", FakeHandle("x"), 1)
+        self.sched.discard("x")
+        self.assertFalse(self.sched.pending())
+
+
+class TestRechecksAcrossRestarts(unittest.TestCase):
+    def test_queued_rechecks_continue_after_a_restart(self):
+        backend = SimBackend(SwarmModel(seed=1))
+        with tempfile.TemporaryDirectory() as tmp, backend.install():
+            args = (os.path.join(tmp, "downloads"), os.path.join(tmp, "session.dat"))
+            manager = TorrentManager(*args, settings={'active_downloads': -1})
+            for name in ("a", "b"):
+                torrent = os.path.join(tmp, name + ".torrent")
+                write_torrent(torrent, name, [8 * MIB])
+                manager.add_torrent_file(torrent)
+            self.assertTrue(manager.force_recheck_at(0) and manager.force_recheck_at(1))
+            manager.tick()  # "a" checks, "b" waits paused and not auto-managed
+            manager.save_state()
+            manager.close()
+
+            restarted = TorrentManager(*args, settings={'active_downloads': -1})
+            keys = restarted.torrent_keys()
+            self.assertEqual([restarted._rechecks.queue_position(k) for k in keys], [1, 2])
+            for _ in range(60):
+                backend.advance(1)
+                restarted.process_alerts()
+                restarted.tick()
+            self.assertFalse(restarted._rechecks.pending())
+            self.assertTrue(all(h.status().auto_managed for h in restarted.get_torrents()))
+            self.assertEqual(restarted._catalog.holds("recheck"), [])
+            restarted.close()
+
+
+if __name__ == '__main__':  # pragma: no cover
+    unittest.main()
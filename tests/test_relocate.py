@@ -0,0 +1,143 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from torrent_downloader.catalog import TorrentCatalog
+from torrent_downloader.relocate import DONE, FAILED, FINISHED_LINGER_S, RelocationQueue, same_filesystem
+from torrent_downloader.torrent import TorrentManager, TorrentStatus
+
+
+class FakeHandle:
+    def __init__(self):
+        self.moves = []
+
+    def move_storage(self, dest, flags=None):
+        self.moves.append((dest, flags))
+
+
+class TestRelocationQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.now = 0.0
+        self.moved = []
+        self.queue = RelocationQueue(move_flags="DONT_REPLACE", max_active=2, clock=lambda: self.now,
+                                     on_moved=lambda key, path: self.moved.append((key, path)))
+        self.dest = os.path.join(self.tmp, "new", "library")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_limits_concurrency_and_reports_positions(self):
+        handles = {key: FakeHandle() for key in ("a", "b", "c")}
+        for key, handle in handles.items():
+            self.assertTrue(self.queue.enqueue(key, handle, self.tmp, self.dest, 100))
+        self.assertFalse(self.queue.enqueue("a", handles["a"], self.tmp, self.dest, 100))  # already queued
+
+        self.queue.tick()
+        self.assertTrue(os.path.isdir(self.dest))
+        self.assertEqual(handles["a"].moves, [(self.dest, "DONT_REPLACE")])
+        self.assertEqual(handles["c"].moves, [])
+        self.assertEqual([self.queue.queue_position(k) for k in "abc"], [0, 0, 1])
+
+        self.queue.storage_moved("a", self.dest)
+        self.queue.tick()
+        self.assertEqual(len(handles["c"].moves), 1)
+        self.assertEqual(self.moved, [("a", self.dest)])
+        self.assertIsNone(self.queue.queue_position("a"))
+
+    def test_failure_and_progress(self):
+        self.queue.enqueue("a", FakeHandle(), self.tmp, self.dest, 100)
+        self.queue.enqueue("b", FakeHandle(), self.tmp, self.dest, 300)
+        self.queue.tick()
+        self.queue.storage_moved("a", self.dest)
+        self.queue.storage_move_failed("b", "disk full")
+
+        progress = self.queue.progress()
+        self.assertTrue(progress.finished)
+        self.assertEqual((progress.done, progress.failed), (1, 1))
+        self.assertEqual((progress.bytes_done, progress.bytes_total), (100, 400))
+        self.assertEqual(self.queue.jobs["a"].state, DONE)
+        self.assertEqual(self.queue.jobs["b"].state, FAILED)
+        self.assertEqual(self.queue.jobs["b"].error, "disk full")
+        self.assertFalse(self.queue.pending())
+
+        self.queue.clear_finished()
+        self.assertEqual(self.queue.progress().total, 0)
+
+    def test_drained_batches_are_cleared(self):
+        self.queue.enqueue("a", FakeHandle(), self.tmp, self.dest, 100)
+        self.queue.tick()
+        self.queue.storage_moved("a", self.dest)
+        self.queue.enqueue("b", FakeHandle(), self.tmp, self.dest, 100)  # a new batch
+        self.assertEqual(self.queue.progress().total, 1)
+        self.queue.tick()
+        self.now = 5.0
+        self.queue.storage_moved("b", self.dest)
+        self.queue.tick()
+        self.assertEqual(self.queue.progress().done, 1)  # the result is shown for a while
+        self.now += FINISHED_LINGER_S
+        self.queue.tick()
+        self.assertEqual((self.queue.progress().total, self.queue.jobs), (0, {}))
+
+    def test_positions_follow_the_queue(self):
+        for key in "abcd":
+            self.queue.enqueue(key, FakeHandle(), self.tmp, self.dest, 1)
+        self.assertEqual([self.queue.queue_position(k) for k in "abcd"], [1, 2, 3, 4])
+        self.queue.tick()
+        self.queue.discard("c")
+        self.assertEqual([self.queue.queue_position(k) for k in "abcd"], [0, 0, None, 1])
+
+    def test_skips_move_to_same_directory(self):
+        self.assertFalse(self.queue.enqueue("a", FakeHandle(), self.tmp, self.tmp + os.sep, 1))
+
+    def test_same_filesystem(self):
+        self.assertTrue(same_filesystem(self.tmp, os.path.join(self.tmp, "missing", "dir")))
+        job_dest = os.path.join(self.tmp, "x")
+        self.queue.enqueue("a", FakeHandle(), self.tmp, job_dest, 1)
+        self.assertTrue(self.queue.jobs["a"].same_filesystem)
+
+
+@patch('torrent_downloader.torrent.lt')
+class TestManagerRelocation(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.download_dir = os.path.join(self.tmp, "downloads")
+        self.session_file = os.path.join(self.tmp, "session.dat")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_moved_path_is_persisted_and_used_on_load(self, mock_lt):
+        manager = TorrentManager(self.download_dir, self.session_file)
+        handle = MagicMock()
+        handle.info_hashes.return_value.get_best.return_value = "aa"
+        handle.status.return_value.save_path = self.download_dir
+        handle.status.return_value.total_wanted = 10
+        manager._handles = [handle]
+        dest = os.path.join(self.tmp, "elsewhere")
+
+        self.assertTrue(manager.relocate_at(0, dest))
+        manager.tick()
+        handle.move_storage.assert_called_once()
+        with patch('torrent_downloader.torrent._status_from_handle',
+                   side_effect=lambda h: TorrentStatus("n", 0.0, 0, 0, 0, None, True, "downloading")):
+            self.assertEqual(manager.get_status_list()[0].move_position, 0)
+
+        alert = MagicMock()
+        type(alert).__name__ = "storage_moved_alert"
+        alert.handle = handle
+        alert.storage_path.return_value = dest
+        mock_lt.session.return_value.pop_alerts.return_value = [alert]
+        manager.process_alerts()
+
+        self.assertTrue(manager.get_relocation_progress().finished)
+        self.assertEqual(TorrentCatalog(self.session_file + ".db").save_paths(), {"aa": dest})
+
+        reloaded = TorrentManager(self.download_dir, self.session_file)
+        self.assertEqual(reloaded._save_paths, {"aa": dest})
+
+
+if __name__ == '__main__':
+    unittest.main()
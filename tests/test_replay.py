@@ -0,0 +1,113 @@
+import gzip
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from benchmarks.replay import replay_headless
+from torrent_downloader.replay import Recorder, ReplayManager, read_recording
+from torrent_downloader.torrent import TorrentStatus
+
+
+def status(name, progress=0.0, state="downloading"):
+    return TorrentStatus(name=name, progress=progress, download_rate=100, upload_rate=0, num_peers=3,
+                         eta_seconds=None, has_metadata=True, state=state)
+
+
+def alert(kind, key=None, message="", values=None):
+    a = type(kind, (), {"message": lambda self: message})()
+    if key is not None:
+        a.handle = SimpleNamespace(info_hashes=lambda: SimpleNamespace(get_best=lambda: key), is_valid=lambda: True)
+    if values is not None:
+        a.values = values
+    return a
+
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "session.td.gz")
+        self.now = [0.0]
+        recorder = Recorder(self.path, clock=lambda: self.now[0])
+        recorder.snapshot([status("a"), status("b")], ["a" * 40, "b" * 40])
+        self.now[0] = 1.0
+        recorder.record_alert(alert("torrent_finished_alert", "a" * 40, "a finished"))
+        recorder.record_alert(alert("session_stats_alert", values={
+            'disk.queued_disk_jobs': 7, 'peer.num_peers_up_disk': 2, 'net.sent_bytes': 1}))
+        recorder.snapshot([status("b"), status("a", 1.0, "seeding")], ["b" * 40, "a" * 40])
+        self.now[0] = 2.0
+        recorder.snapshot([status("a", 1.0, "seeding")], ["a" * 40])
+        recorder.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_snapshots_only_store_changes(self):
+        records = list(read_recording(self.path))
+        self.assertEqual(len(records), 5)
+        self.assertEqual(list(records[3]["s"]), ["a" * 40])  # "b" did not change
+        self.assertNotIn("s", records[4])  # "a" did not change either
+        self.assertEqual(records[4]["r"], ["b" * 40])
+        self.assertEqual(records[2]["v"], {'disk.queued_disk_jobs': 7, 'peer.num_peers_up_disk': 2})
+
+    def test_timed_replay(self):
+        clock = [0.0]
+        manager = ReplayManager(self.path, speed=2.0, clock=lambda: clock[0])
+        seen = []
+        manager.add_alert_listener("torrent_finished_alert", lambda a: seen.append((a.handle.info_hashes().get_best(),
+                                                                                    a.message())))
+        self.assertEqual([s.name for s in manager.get_status_list()], ["a", "b"])
+        self.assertIsNone(manager.get_disk_stats())
+        clock[0] = 0.5  # 1 s of recording at double speed
+        self.assertEqual(manager.process_alerts(), 2)
+        self.assertEqual(seen, [("a" * 40, "a finished")])
+        self.assertEqual(manager.get_disk_stats().queued_jobs, 7)
+        self.assertEqual([(s.name, s.state) for s in manager.get_status_list()],
+                         [("b", "downloading"), ("a", "seeding")])
+        self.assertFalse(manager.finished)
+        self.assertFalse(manager.pause_at(0))  # commands are ignored
+        clock[0] = 1.0
+        self.assertEqual(manager.torrent_keys(), ["b" * 40, "a" * 40])  # only refreshes advance
+        self.assertEqual(manager.get_status_list()[0].name, "a")
+        self.assertEqual(manager.torrent_keys(), ["a" * 40])
+        self.assertTrue(manager.finished)
+
+    def test_read_side_getters_and_unknown_names(self):
+        manager = ReplayManager(self.path, speed=None)
+        self.assertEqual(manager.get_peers_at(0), [])
+        self.assertIsNone(manager.get_files_at(0))
+        self.assertIsNone(manager.get_seeding_policy_at(0))
+        self.assertEqual(manager.postprocess_jobs(), [])
+        report = manager.traffic_report(3600)
+        self.assertEqual((report.resolution, report.buckets, report.top), (60, [], []))
+        self.assertLess(report.since, report.until)
+        self.assertFalse(manager.remove_at(0))
+        with self.assertRaises(AttributeError):
+            manager.get_labels_at(0)
+        manager.close()
+
+    def test_stepping_and_truncated_recordings(self):
+        with gzip.open(self.path, "rb") as f:
+            data = f.read()
+        with gzip.open(self.path, "wb") as f:
+            f.write(data[:-10])  # killed while writing the last record
+        manager = ReplayManager(self.path, speed=None)
+        self.assertEqual(len(manager.get_status_list()), 2)
+        self.assertEqual(len(manager.get_status_list()), 2)
+        self.assertEqual(manager.process_alerts(), 2)
+        self.assertEqual(len(manager.get_status_list()), 2)  # the last refresh was lost
+        self.assertTrue(manager.finished)
+
+    def test_rejects_other_files(self):
+        with gzip.open(self.path, "wt") as f:
+            f.write('{"format": "something else"}\n')
+        with self.assertRaises(ValueError):
+            ReplayManager(self.path)
+
+    def test_headless_benchmark(self):
+        stages = {s.stage: s.count for s in replay_headless(self.path)}
+        self.assertEqual(stages["_build_rows"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
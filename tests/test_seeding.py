@@ -0,0 +1,134 @@
+import datetime
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from torrent_downloader.seeding import (ACTION_PAUSE, ACTION_REMOVE, WELL_SEEDED_UPLOAD_SLOTS, SeedingEngine,
+                                        SeedingPolicy, SeedSnapshot, is_underseeded, share_ratio)
+from torrent_downloader.torrent import TorrentManager
+
+
+def snap(key="a", uploaded=0, downloaded=100, seeding=True, paused=False, seeding_s=0.0, seeds=-1, leechers=-1):
+    return SeedSnapshot(key=key, handle=MagicMock(), seeding=seeding, paused=paused, uploaded=uploaded,
+                        downloaded=downloaded, seeding_s=seeding_s, num_complete=seeds, num_incomplete=leechers)
+
+
+class TestSeedingEngine(unittest.TestCase):
+    def setUp(self):
+        self.now = [100.0]
+        self.engine = SeedingEngine(clock=lambda: self.now[0], interval_s=5.0)
+
+    def test_helpers(self):
+        self.assertEqual(share_ratio(150, 100), 1.5)
+        self.assertEqual(share_ratio(10, 0), 0.0)
+        self.assertIsNone(is_underseeded(-1, 3))
+        self.assertTrue(is_underseeded(2, 0))
+        self.assertTrue(is_underseeded(10, 20))
+        self.assertFalse(is_underseeded(50, 5))
+        self.assertFalse(SeedingPolicy().has_limits)
+        policy = SeedingPolicy(ratio_limit=2.0, action=ACTION_REMOVE)
+        self.assertEqual(SeedingPolicy.from_dict(policy.to_dict()), policy)
+
+    def test_ratio_limit_and_per_torrent_override(self):
+        self.engine.global_policy = SeedingPolicy(ratio_limit=1.0)
+        self.engine.set_policy("b", SeedingPolicy(ratio_limit=3.0, action=ACTION_REMOVE))
+        self.engine.update([snap("a", uploaded=120), snap("b", uploaded=120), snap("c", uploaded=120, seeding=False)])
+        hits = self.engine.tick()
+        self.assertEqual([(h.key, h.action) for h in hits], [("a", ACTION_PAUSE)])
+        self.assertEqual(self.engine.tick(), [])  # not due yet
+        self.now[0] += 5
+        self.assertEqual(self.engine.tick(), [])  # already acted on, waits for a new snapshot
+        self.engine.update([snap("b", uploaded=300)])
+        self.now[0] += 5
+        self.assertEqual([(h.key, h.action) for h in self.engine.tick()], [("b", ACTION_REMOVE)])
+
+    def test_seed_time_runs_on_between_updates(self):
+        self.engine.global_policy = SeedingPolicy(seed_time_limit_s=600)
+        self.engine.update([snap(seeding_s=500)])
+        self.assertEqual(self.engine.evaluate(), [])
+        self.now[0] += 120  # no new snapshot: seed time is extrapolated
+        self.assertEqual(len(self.engine.evaluate()), 1)
+
+    def test_idle_time_resets_on_upload(self):
+        self.engine.global_policy = SeedingPolicy(idle_time_limit_s=300)
+        self.engine.update([snap(uploaded=10)])
+        self.now[0] += 200
+        self.engine.update([snap(uploaded=20)])  # uploaded more: not idle
+        self.now[0] += 200
+        self.assertEqual(self.engine.evaluate(), [])
+        self.engine.update([snap(uploaded=20)])
+        self.now[0] += 150
+        self.assertEqual(len(self.engine.evaluate()), 1)
+
+    def test_tick_requests_updates(self):
+        request = MagicMock()
+        self.engine.request_updates = request
+        self.engine.tick()
+        self.engine.tick()
+        request.assert_called_once()
+
+    def test_well_seeded_swarms_get_fewer_upload_slots(self):
+        self.engine.set_global(SeedingPolicy(), prioritize_underseeded=True)
+        crowded, starved = snap("a", seeds=40, leechers=2), snap("b", seeds=1, leechers=9)
+        self.engine.update([crowded, starved])
+        self.engine.evaluate()
+        crowded.handle.set_max_uploads.assert_called_once_with(WELL_SEEDED_UPLOAD_SLOTS)
+        starved.handle.set_max_uploads.assert_not_called()
+        self.engine.evaluate()  # unchanged: no further handle calls
+        crowded.handle.set_max_uploads.assert_called_once()
+        self.engine.set_global(SeedingPolicy(), prioritize_underseeded=False)
+        crowded.handle.set_max_uploads.assert_called_with(-1)
+
+
+def lt_status(key, handle, uploaded, finished=True):
+    return SimpleNamespace(info_hashes=SimpleNamespace(get_best=lambda: key), handle=handle, is_finished=finished,
+                           paused=False, all_time_upload=uploaded, all_time_download=0, total_done=100,
+                           seeding_duration=datetime.timedelta(seconds=30), num_complete=5, num_incomplete=1,
+                           name="t", total_payload_download=0, total_payload_upload=uploaded)
+
+
+@patch('torrent_downloader.torrent.lt')
+class TestManagerSeeding(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.session_file = os.path.join(self.tmp.name, "session.dat")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_limits_from_state_updates_pause_torrent(self, mock_lt):
+        session = MagicMock()
+        mock_lt.session.return_value = session
+        manager = TorrentManager(self.tmp.name, self.session_file, seeding_policy=SeedingPolicy(ratio_limit=2.0))
+        handle = MagicMock()
+        state_update_alert = type("state_update_alert", (), {})
+        alert = state_update_alert()
+        alert.status = [lt_status("ab" * 20, handle, uploaded=250)]
+        session.pop_alerts.return_value = [alert]
+        manager.process_alerts()
+        manager.tick()
+        session.post_torrent_updates.assert_called_once()
+        handle.unset_flags.assert_called_once_with(mock_lt.torrent_flags.auto_managed)
+        handle.pause.assert_called_once()
+
+    def test_per_torrent_policy_is_persisted(self, mock_lt):
+        mock_lt.session.return_value = MagicMock()
+        manager = TorrentManager(self.tmp.name, self.session_file)
+        handle = MagicMock()
+        handle.info_hashes.return_value.get_best.return_value = "cd" * 20
+        manager._handles.append(handle)
+        policy = SeedingPolicy(seed_time_limit_s=3600, action=ACTION_REMOVE)
+        self.assertTrue(manager.set_seeding_policy_at(0, policy))
+        self.assertFalse(manager.set_seeding_policy_at(1, policy))
+
+        reloaded = TorrentManager(self.tmp.name, self.session_file)
+        reloaded._handles.append(handle)
+        self.assertEqual(reloaded.get_seeding_policy_at(0), policy)
+        reloaded.remove_at(0)
+        self.assertIsNone(TorrentManager(self.tmp.name, self.session_file)._seeding.policies.get("cd" * 20))
+
+
+if __name__ == '__main__':
+    unittest.main()
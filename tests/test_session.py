@@ -20,19 +20,17 @@ class TestSession(unittest.TestCase):
     @patch('torrent_downloader.torrent.lt')
     def test_session_save_and_load(self, mock_lt):
         # Mock libtorrent components
-        mock_session_state_data = b"mock_session_state"  # bytes written for session state
-        resume_dict = {'resume': 'data'}  # resume data element stored in list
-        mock_bencoded_resume_data_list = b"mock_bencoded_resume_data_list"  # bytes written for whole resume list
-        mock_bencoded_resume_entry = b"mock_bencoded_resume_entry"  # bytes produced when bencoding each resume dict during load
+        mock_session_state_data = b"mock_session_state"  # bytes stored for session state
+        resume_dict = {'resume': 'data'}  # resume data delivered by the alert
+        mock_bencoded_resume_entry = b"mock_bencoded_resume_entry"  # row stored in the catalog
 
         # bencode is called in this order:
         # 1) session state dict {}
-        # 2) list of resume dicts [resume_dict]
-        # 3) each resume dict during load (resume_dict)
-        mock_lt.bencode.side_effect = [mock_session_state_data, mock_bencoded_resume_data_list, mock_bencoded_resume_entry]
+        # 2) the resume dict of each torrent (one catalog row each)
+        mock_lt.bencode.side_effect = [mock_session_state_data, mock_bencoded_resume_entry]
 
-        # For loading phase (bdecode called with session state bytes, then resume list bytes)
-        mock_lt.bdecode.side_effect = [mock_session_state_data, [resume_dict]]
+        # For loading phase (bdecode called with the session state bytes only)
+        mock_lt.bdecode.side_effect = [mock_session_state_data]
 
         mock_session = MagicMock()
         mock_lt.session.return_value = mock_session
@@ -45,6 +43,13 @@ class TestSession(unittest.TestCase):
         mock_alert = MagicMock()
         mock_alert.__class__ = mock_lt.save_resume_data_alert
         mock_alert.resume_data = resume_dict
+        mock_alert.handle.info_hashes.return_value.get_best.return_value = "test_info_hash"
+        mock_alert.params.name = "test"
+        mock_alert.params.added_time = 1700000000
+        mock_alert.params.completed_time = 0
+        mock_alert.params.download_limit = -1
+        mock_alert.params.upload_limit = 1000
+        mock_alert.params.file_priorities = [4, 0]
         mock_session.pop_alerts.return_value = [mock_alert]
 
         # Mock a torrent handle
@@ -65,7 +70,10 @@ class TestSession(unittest.TestCase):
         mock_lt.bencode.assert_any_call({})  # Session state encoded
         mock_handle.save_resume_data.assert_called_once()
         mock_session.pop_alerts.assert_called_once()
-        mock_lt.bencode.assert_any_call([resume_dict])  # Resume list encoded
+        mock_lt.bencode.assert_any_call(resume_dict)  # one row per torrent
+        entry = manager1._catalog.get("test_info_hash")
+        self.assertEqual((entry.name, entry.added_at, entry.completed_at), ("test", 1700000000, None))
+        self.assertEqual((entry.upload_limit, entry.file_priorities), (1000, [4, 0]))
 
         # -- Phase 2: Create a new session and load the state --
         mock_session2 = MagicMock()
@@ -84,10 +92,8 @@ class TestSession(unittest.TestCase):
         manager2 = TorrentManager(self.download_dir, self.session_file)
 
         # Assert load_state calls
-        mock_lt.bdecode.assert_any_call(mock_session_state_data)  # decode session state bytes
-        mock_lt.bdecode.assert_any_call(mock_bencoded_resume_data_list)  # decode resume list bytes
-        mock_lt.bencode.assert_any_call(resume_dict)  # each resume dict re-bencoded
-        mock_lt.read_resume_data.assert_called_once_with(mock_bencoded_resume_entry)
+        mock_lt.bdecode.assert_called_once_with(mock_session_state_data)  # decode session state bytes
+        mock_lt.read_resume_data.assert_called_once_with(mock_bencoded_resume_entry)  # row bytes as stored
         mock_session2.add_torrent.assert_called_once_with(mock_atp)
         self.assertEqual(mock_atp.save_path, self.download_dir)
 
@@ -0,0 +1,112 @@
+import base64
+import os
+import tempfile
+import unittest
+from collections import Counter
+
+from torrent_downloader.create import FORMAT_HYBRID, create_torrent
+from torrent_downloader.disk import DiskStats
+from torrent_downloader.relocate import RelocationProgress
+from torrent_downloader.sharding import (ShardedTorrentManager, magnet_key, merge_disk_stats, merge_relocation,
+                                         shard_for, shard_session_file, shard_settings)
+
+from benchmarks.fakes import OFFLINE_SETTINGS
+from benchmarks.shards import make_magnets
+
+try:
+    import libtorrent  # noqa: F401
+    HAVE_LIBTORRENT = True
+except ImportError:  # pragma: no cover - environment specific
+    HAVE_LIBTORRENT = False
+
+
+class TestShardHelpers(unittest.TestCase):
+    def test_shard_for_is_stable_and_spreads_keys(self):
+        keys = [magnet_key(m) for m in make_magnets(400)]
+        self.assertEqual([shard_for(k, 4) for k in keys], [shard_for(k.upper(), 4) for k in keys])
+        counts = Counter(shard_for(k, 4) for k in keys)
+        self.assertEqual(set(counts), {0, 1, 2, 3})
+        self.assertTrue(all(60 <= c <= 140 for c in counts.values()), counts)
+        self.assertEqual(shard_for(keys[0], 1), 0)
+
+    def test_magnet_key_formats(self):
+        digest = bytes(range(20))
+        hex_uri = f"magnet:?xt=urn:btih:{digest.hex().upper()}&dn=x"
+        b32_uri = f"magnet:?dn=x&xt=urn:btih:{base64.b32encode(digest).decode()}"
+        self.assertEqual(magnet_key(hex_uri), digest.hex())
+        self.assertEqual(magnet_key(b32_uri), digest.hex())
+        v2 = "ab" * 32
+        self.assertEqual(magnet_key(f"magnet:?xt=urn:btmh:1220{v2}"), v2)
+        self.assertEqual(len(magnet_key("magnet:?dn=no-hash")), 40)
+
+    def test_shard_settings_and_files(self):
+        settings = shard_settings({'enable_dht': False}, 2, 6881, 10)
+        self.assertEqual(settings['listen_interfaces'], "0.0.0.0:6901,[::]:6901")
+        self.assertEqual(settings['max_retry_port_bind'], 9)
+        self.assertFalse(settings['enable_dht'])
+        explicit = shard_settings({'listen_interfaces': '127.0.0.1:0'}, 3, 6881, 10)
+        self.assertEqual(explicit, {'listen_interfaces': '127.0.0.1:0'})
+        self.assertEqual(shard_session_file("/s/session.dat", 0), "/s/session.dat")
+        self.assertEqual(shard_session_file("/s/session.dat", 1), "/s/session.dat.shard1")
+
+    def test_merge_aggregates(self):
+        a = DiskStats(1, 100, 2, 1000, None, 50.0)
+        b = DiskStats(3, 300, 0, 3000, 10.0, 150.0)
+        merged = merge_disk_stats([a, None, b])
+        self.assertEqual((merged.queued_jobs, merged.queued_write_bytes, merged.peers_blocked_on_disk), (4, 400, 2))
+        self.assertEqual(merged.request_latency_us, 2000)
+        self.assertEqual((merged.read_latency_us, merged.write_latency_us), (10.0, 100.0))
+        self.assertIsNone(merge_disk_stats([None]))
+        progress = merge_relocation([RelocationProgress(2, 1, 0, 1, 10, 5), RelocationProgress(1, 0, 1, 0, 4, 0)])
+        self.assertEqual(progress, RelocationProgress(3, 1, 1, 1, 14, 5))
+
+
+@unittest.skipUnless(HAVE_LIBTORRENT, "libtorrent not installed")
+class TestShardedTorrentManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.download_dir = os.path.join(self.tmp.name, "downloads")
+        self.session_file = os.path.join(self.tmp.name, "session.dat")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _start(self) -> ShardedTorrentManager:
+        return ShardedTorrentManager(self.download_dir, self.session_file, settings=dict(OFFLINE_SETTINGS), shards=2)
+
+    def test_commands_and_merged_status_across_restart(self):
+        magnets = make_magnets(8)
+        with self._start() as manager:
+            keys = [manager.add_magnet(m) for m in magnets]
+            self.assertEqual({shard_for(magnet_key(m), 2) for m in magnets}, {0, 1})
+            self.assertEqual(sorted(manager.torrent_keys()), sorted(keys))
+            statuses = manager.get_status_list()
+            self.assertEqual(len(statuses), 8)
+            self.assertEqual(manager.torrent_count(), 8)
+            self.assertEqual(len(manager.get_torrents()), 8)
+            # freshly added torrents are queued (paused) by auto-management
+            self.assertGreater(manager.run_batch('resume_at', range(8)), 0)
+            self.assertFalse(manager.pause_at(99))
+            self.assertTrue(manager.remove_at(7))
+            self.assertTrue(manager.remove_at(0))
+            self.assertEqual(len(manager.get_status_list()), 6)
+            with self.assertRaises(FileNotFoundError):
+                manager.add_torrent_file(os.path.join(self.tmp.name, "missing.torrent"))
+        self.assertTrue(os.path.exists(self.session_file + ".shard1.db"))
+
+        with self._start() as manager:
+            self.assertEqual(manager.torrent_count(), 6)
+
+    def test_hybrid_torrent_key_matches_torrent_keys(self):
+        source = os.path.join(self.tmp.name, "data.bin")
+        with open(source, "wb") as f:
+            f.write(os.urandom(64 * 1024))
+        created = create_torrent(source, os.path.join(self.tmp.name, "data.torrent"), fmt=FORMAT_HYBRID)
+        with self._start() as manager:
+            key = manager.add_torrent_file(created.output, save_path=self.tmp.name)
+            self.assertEqual(key, created.info_hash)  # the v2 hash, not the one it was routed by
+            self.assertIn(key, manager.torrent_keys())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import unittest
+
+from benchmarks.scale import run_size
+from benchmarks.simlt import MIB, SimBackend, SwarmModel, bdecode, bencode, write_torrent
+from torrent_downloader.torrent import TorrentManager
+
+SMALL = SwarmModel(seed=1, min_size=MIB, max_size=8 * MIB, dead_fraction=0.0)
+UNLIMITED = {'active_downloads': -1, 'active_seeds': -1}
+
+
+def magnet(i):
+    return f"magnet:?xt=urn:btih:{i:040x}&dn=torrent-{i}"
+
+
+class TestSimulatedBackend(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.args = (os.path.join(self.tmp.name, "downloads"), os.path.join(self.tmp.name, "session.dat"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_swarm(self, order, model=SMALL, seconds=5):
+        backend = SimBackend(model)
+        with backend.install():
+            manager = TorrentManager(*self.args, settings=dict(UNLIMITED))
+            for i in order:
+                manager.add_magnet(magnet(i))
+            backend.advance(seconds)
+            manager.process_alerts()
+            statuses = dict(zip(manager.torrent_keys(), manager.get_status_list()))
+            manager.close()
+        return statuses
+
+    def test_swarms_are_deterministic_per_torrent(self):
+        first = self.run_swarm(range(20))
+        again = self.run_swarm(reversed(range(20)))
+        self.assertEqual(first, again)
+        self.assertNotEqual(first, self.run_swarm(range(20), SwarmModel(seed=2, min_size=MIB, max_size=8 * MIB)))
+
+    def test_torrents_download_finish_and_survive_a_restart(self):
+        backend = SimBackend(SMALL)
+        with backend.install():
+            manager = TorrentManager(*self.args, settings=dict(UNLIMITED))
+            finished = []
+            manager.add_alert_listener("torrent_finished_alert", lambda a: finished.append(a.handle.name()))
+            for i in range(5):
+                manager.add_magnet(magnet(i))
+            self.assertEqual({s.state for s in manager.get_status_list()}, {"paused"})  # queued until started
+            backend.advance(3600)
+            manager.process_alerts()
+            self.assertEqual(sorted(finished), [f"torrent-{i}" for i in range(5)])
+            self.assertEqual({s.state for s in manager.get_status_list()}, {"seeding"})
+
+            torrent = os.path.join(self.tmp.name, "big.torrent")
+            write_torrent(torrent, "big", [512 * MIB, 512 * MIB])
+            manager.add_torrent_file(torrent)
+            backend.advance(10)
+            progress = manager.get_status_list()[-1].progress
+            self.assertTrue(0 < progress < 1)
+            self.assertEqual([f.path for f in manager.get_files_at(5).files],
+                             [os.path.join("big", "file000.bin"), os.path.join("big", "file001.bin")])
+            manager.save_state()
+            manager.close()
+
+            restarted = TorrentManager(*self.args, settings=dict(UNLIMITED))
+            statuses = restarted.get_status_list()
+            self.assertEqual([s.name for s in statuses], [f"torrent-{i}" for i in range(5)] + ["big"])
+            self.assertEqual(statuses[-1].progress, progress)
+            restarted.close()
+
+    def test_queue_limits_and_pausing(self):
+        backend = SimBackend(SMALL)
+        with backend.install():
+            manager = TorrentManager(*self.args, settings={'active_downloads': 1})
+            for i in range(3):
+                manager.add_magnet(magnet(i))
+            backend.advance(1)
+            self.assertEqual([s.state == "paused" for s in manager.get_status_list()], [False, True, True])
+            manager.remove_at(0)
+            backend.advance(1)
+            self.assertNotEqual(manager.get_status_list()[0].state, "paused")
+            manager.get_torrents()[1].unset_flags(backend.torrent_flags.auto_managed)
+            manager.apply_settings({'active_downloads': -1})
+            backend.advance(1)
+            self.assertEqual(manager.get_status_list()[1].state, "paused")  # not auto-managed: stays paused
+            manager.close()
+
+    def test_alerts_beyond_the_queue_size_are_dropped(self):
+        backend = SimBackend(SMALL)
+        with backend.install():
+            manager = TorrentManager(*self.args, settings={'alert_queue_size': 10})
+            kinds = []
+            manager.add_alert_listener("*", lambda a: kinds.append(type(a).__name__))
+            for i in range(20):
+                manager.add_magnet(magnet(i))
+            manager.process_alerts()
+            self.assertEqual(kinds.count("add_torrent_alert"), 10)
+            self.assertEqual(kinds[-1], "alerts_dropped_alert")
+            manager.save_state()  # resume data is handed out as the queue drains
+            manager.close()
+            self.assertEqual(len(TorrentManager(*self.args).get_status_list()), 20)
+
+    def test_bencoding(self):
+        data = bencode({"b": [1, "x"], "a": b"\x00\xff"})
+        self.assertEqual(data, b"d1:a2:\x00\xff1:bli1e1:xee")
+        self.assertEqual(bdecode(data), {b"a": b"\x00\xff", b"b": [1, b"x"]})
+        with self.assertRaises(ValueError):
+            bdecode(data[:-2])
+
+    def test_scale_benchmark(self):
+        results = {r.name: r for r in run_size(50, seconds=2)}
+        self.assertEqual(results["get_status_list"].repeat, 2)
+        self.assertIn("load", results)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from torrent_downloader.gui import STARTING_TEXT, TorrentDownloaderApp
+from torrent_downloader.perf import StartupTimeline
+from torrent_downloader.torrent import _LazyModule
+
+# Constructing the window must not wait for libtorrent or the session.
+FIRST_FRAME_BUDGET_S = 0.5
+
+
+class TestLazyImports(unittest.TestCase):
+    def test_importing_gui_does_not_load_libtorrent(self):
+        for module in ("torrent_downloader.gui", "torrent_downloader.torrent_downloader"):
+            code = f"import sys, {module}; print('libtorrent' in sys.modules)"
+            out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                 cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            self.assertEqual(out.stdout.strip(), "False", module)
+
+    def test_lazy_module_imports_on_first_attribute_access(self):
+        fake = MagicMock()
+        with patch('torrent_downloader.torrent.importlib.import_module', return_value=fake) as imp:
+            mod = _LazyModule("libtorrent")
+            imp.assert_not_called()
+            self.assertIs(mod.session, fake.session)
+            self.assertIs(mod.version, fake.version)
+        imp.assert_called_once_with("libtorrent")
+
+
+class TestStartupTimeline(unittest.TestCase):
+    def test_marks_are_relative_to_start(self):
+        now = [10.0]
+        timeline = StartupTimeline(clock=lambda: now[0])
+        timeline.start()
+        now[0] = 10.25
+        self.assertAlmostEqual(timeline.mark("first_frame"), 250.0)
+        now[0] = 11.0
+        timeline.mark("session_ready")
+        self.assertAlmostEqual(timeline.get("session_ready"), 1000.0)
+        self.assertIsNone(timeline.get("missing"))
+        report = timeline.report()
+        self.assertIn("first_frame", report)
+        self.assertIn("(+750.0)", report)
+
+
+@patch('torrent_downloader.gui.messagebox')
+@patch('torrent_downloader.gui.ttk')
+@patch('torrent_downloader.gui.tk')
+class TestWindowFirstStartup(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.master = MagicMock()
+        patches = [
+            patch.object(TorrentDownloaderApp, '_resolve_download_dir', return_value=self.tmp),
+            patch.object(TorrentDownloaderApp, '_load_disk_settings', return_value=('default', False)),
+            patch('torrent_downloader.gui.util.get_cache_dir', return_value=self.tmp),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _wait_for_result(self, app):
+        deadline = time.monotonic() + 5
+        while app._startup_queue.empty() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_first_frame_does_not_wait_for_session(self, _tk, _ttk, _messagebox):
+        release = threading.Event()
+        manager = MagicMock()
+        manager.get_status_list.return_value = []
+        manager.get_loaded_torrents_info.return_value = []
+        manager.get_disk_stats.return_value = None
+        manager.get_relocation_progress.return_value.total = 0
+
+        def slow_manager(*_args, **_kwargs):
+            release.wait(5)  # e.g. importing libtorrent and loading many torrents
+            return manager
+
+        with patch('torrent_downloader.gui.TorrentManager', side_effect=slow_manager):
+            start = time.perf_counter()
+            app = TorrentDownloaderApp(self.master)
+            elapsed = time.perf_counter() - start
+        self.addCleanup(app._unsubscribe_config)
+        self.assertLess(elapsed, FIRST_FRAME_BUDGET_S)
+        self.assertIsNone(app.manager)
+        self.assertEqual(app._last_rows, [(STARTING_TEXT, "", "", "", "", "")])
+
+        app._poll_manager_ready()  # still starting: polls again
+        self.assertIsNone(app.manager)
+
+        release.set()
+        self._wait_for_result(app)
+        app._poll_manager_ready()
+        self.assertIs(app.manager, manager)
+        manager.process_alerts.assert_called_once()
+        self.assertEqual(app._last_rows, [("No active torrents", "", "", "", "", "")])
+
+        # settings changes are applied to the running app and session
+        app._on_config_changed({'poll_interval_ms': 250, 'upload_rate_limit': 2048})
+        self.assertEqual(app.poll_interval_ms, 250)
+        manager.apply_settings.assert_called_once()
+
+    def test_startup_failure_is_reported(self, _tk, _ttk, messagebox):
+        with patch('torrent_downloader.gui.TorrentManager', side_effect=ImportError("no libtorrent")):
+            app = TorrentDownloaderApp(self.master)
+        self.addCleanup(app._unsubscribe_config)
+        self._wait_for_result(app)
+        app._poll_manager_ready()
+        self.assertIsNone(app.manager)
+        messagebox.showerror.assert_called_once()
+        self.assertIn("libtorrent", messagebox.showerror.call_args[0][1])
+        self.master.destroy.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from torrent_downloader.stats import (DAY, HOUR, MINUTE, NODE, TorrentTraffic, TrafficBucket, TrafficRecorder,
+                                      TrafficReport, TrafficStore, merge_reports, resolution_for)
+from torrent_downloader.torrent import TorrentManager
+
+T0 = 1_700_000_000 // DAY * DAY  # midnight UTC
+
+
+class TestTrafficRecorder(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = TrafficStore(os.path.join(self.tmp.name, "stats.db"))
+        self.now = [T0 + 10.0]
+        self.recorder = TrafficRecorder(self.store, clock=lambda: self.now[0])
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_deltas_are_bucketed_per_minute_and_rolled_up(self):
+        self.recorder.sample([("a", "A", 100, 10), ("b", "B", 0, 0)])
+        self.recorder.sample([("a", "A", 300, 10)])
+        self.assertEqual(self.recorder.flush(), 0)  # the minute is still running
+        self.now[0] += MINUTE
+        self.recorder.sample([("a", "A", 50, 20)])  # counter restarted: counts in full
+        self.assertEqual(self.recorder.flush(), 2)  # node + "a"; "b" transferred nothing
+        self.assertEqual(self.store.buckets(MINUTE, T0, T0 + HOUR), [TrafficBucket(T0, 300, 10)])
+        self.now[0] += HOUR
+        self.recorder.flush()
+        self.assertEqual(self.store.buckets(HOUR, T0, T0 + DAY), [TrafficBucket(T0, 350, 30)])
+        self.assertEqual(self.store.buckets(DAY, T0, T0 + DAY, info_hash="a"), [TrafficBucket(T0, 350, 30)])
+
+    def test_report_includes_current_minute_and_ranks_torrents(self):
+        self.recorder.sample([("a", "A", 100, 0), ("b", "B", 0, 500), ("c", "", 1, 0)])
+        report = self.recorder.report(HOUR, top_n=2)
+        self.assertEqual(report.resolution, MINUTE)
+        self.assertEqual((report.downloaded, report.uploaded), (101, 500))
+        self.assertEqual([(t.info_hash, t.name, t.total) for t in report.top], [("b", "B", 500), ("a", "A", 100)])
+
+    def test_retention(self):
+        self.recorder.sample([("a", "A", 100, 0)])
+        self.now[0] += MINUTE
+        self.recorder.flush()
+        self.now[0] += 3 * DAY  # minute buckets are kept 2 days
+        self.recorder.sample([("a", "A", 200, 0)])
+        self.recorder.flush(force=True)
+        self.assertEqual(len(self.store.buckets(MINUTE, 0, T0 + 4 * DAY)), 1)
+        self.assertEqual(len(self.store.buckets(HOUR, 0, T0 + 4 * DAY)), 2)
+
+    def test_helpers(self):
+        self.assertEqual([resolution_for(s) for s in (HOUR, 7 * DAY, 30 * DAY)], [MINUTE, HOUR, DAY])
+        a = TrafficReport(HOUR, 0, DAY, [TrafficBucket(0, 1, 2)], [TorrentTraffic("a", "A", 5, 0)])
+        b = TrafficReport(HOUR, 0, DAY, [TrafficBucket(0, 1, 0), TrafficBucket(HOUR, 3, 0)],
+                          [TorrentTraffic("b", "B", 9, 0)])
+        merged = merge_reports([a, b], top_n=1)
+        self.assertEqual(merged.buckets, [TrafficBucket(0, 2, 2), TrafficBucket(HOUR, 3, 0)])
+        self.assertEqual([t.info_hash for t in merged.top], ["b"])
+        self.assertEqual(NODE, "")
+
+
+@patch('torrent_downloader.torrent.lt')
+class TestManagerTraffic(unittest.TestCase):
+    def test_state_updates_feed_the_recorder(self, mock_lt):
+        with tempfile.TemporaryDirectory() as tmp:
+            session = MagicMock()
+            mock_lt.session.return_value = session
+            manager = TorrentManager(tmp, os.path.join(tmp, "session.dat"))
+            state_update_alert = type("state_update_alert", (), {})
+            alert = state_update_alert()
+            alert.status = [SimpleNamespace(info_hashes=SimpleNamespace(get_best=lambda: "ab" * 20), handle=None,
+                                            name="linux.iso", is_finished=False, paused=False, all_time_upload=0,
+                                            all_time_download=0, total_done=0, seeding_duration=None,
+                                            num_complete=-1, num_incomplete=-1, total_payload_download=4096,
+                                            total_payload_upload=1024)]
+            manager._dispatch_alert(alert)
+            report = manager.traffic_report(DAY)
+            self.assertEqual((report.downloaded, report.uploaded), (4096, 1024))
+            self.assertEqual(report.top[0].name, "linux.iso")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,14 @@
 import unittest
-from unittest.mock import MagicMock, patch, mock_open
+from unittest.mock import MagicMock, patch
 import os
+import tempfile
 
 # It's better to patch the library where it is used, not in sys.modules.
 # We will patch 'torrent_downloader.torrent.lt' which is how the TorrentManager
 # module sees libtorrent.
 
-from torrent_downloader.torrent import TorrentManager
+from torrent_downloader.catalog import ResumeRow, TorrentCatalog
+from torrent_downloader.torrent import TorrentManager, TorrentStatus
 
 @patch('torrent_downloader.torrent.lt')
 class TestTorrentManager(unittest.TestCase):
@@ -16,8 +18,12 @@ class TestTorrentManager(unittest.TestCase):
         The mock_lt object is passed by the @patch decorator.
         We don't use it here but in the test methods themselves.
         """
-        self.download_dir = '/tmp/downloads'
-        self.session_file = '/tmp/session.dat'
+        self.tmp = tempfile.TemporaryDirectory()
+        self.download_dir = os.path.join(self.tmp.name, 'downloads')
+        self.session_file = os.path.join(self.tmp.name, 'session.dat')
+
+    def tearDown(self):
+        self.tmp.cleanup()
 
     def test_init(self, mock_lt):
         """Test that the TorrentManager initializes correctly."""
@@ -28,14 +34,103 @@ class TestTorrentManager(unittest.TestCase):
         # Instantiate the manager
         manager = TorrentManager(self.download_dir, self.session_file)
 
-        # Check that a session is created
+        # Check that the session is created with the settings, before any torrent is added
         mock_lt.session.assert_called_once()
-        # Check that settings are applied
-        mock_session.apply_settings.assert_called_once()
+        self.assertIn('listen_interfaces', mock_lt.session.call_args[0][0])
+        mock_session.apply_settings.assert_not_called()  # no saved state to override them
         # Check that it tries to load a session (this happens inside __init__)
         # Since we can't easily mock the internal call, we trust the next test
 
 
+    def test_init_settings_override(self, mock_lt):
+        """Explicit settings override the defaults the session is created with."""
+        mock_session = MagicMock()
+        mock_lt.session.return_value = mock_session
+
+        TorrentManager(self.download_dir, self.session_file,
+                       settings={'enable_dht': False, 'listen_interfaces': '127.0.0.1:7000'})
+
+        applied = mock_lt.session.call_args[0][0]
+        self.assertFalse(applied['enable_dht'])
+        self.assertEqual(applied['listen_interfaces'], '127.0.0.1:7000')
+        self.assertTrue(applied['enable_lsd'])  # untouched defaults remain
+
+    def test_settings_win_over_the_saved_session_state(self, mock_lt):
+        catalog = TorrentCatalog(self.session_file + ".db")
+        catalog.set_meta("session_state", b"d8:settingsdee")
+        catalog.close()
+        mock_session = mock_lt.session.return_value
+
+        TorrentManager(self.download_dir, self.session_file, settings={'enable_dht': False})
+        mock_session.load_state.assert_called_once()
+        self.assertEqual(mock_session.apply_settings.call_args[0][0], mock_lt.session.call_args[0][0])
+
+    def test_disk_preset_and_allocation(self, mock_lt):
+        """The disk preset is applied at start-up and can be switched live."""
+        mock_session = MagicMock()
+        mock_lt.session.return_value = mock_session
+
+        manager = TorrentManager(self.download_dir, self.session_file, disk_preset='hdd', full_allocation=True)
+        applied = mock_lt.session.call_args[0][0]
+        self.assertEqual(applied['aio_threads'], 2)
+        self.assertEqual(manager._params['storage_mode'], mock_lt.storage_mode_t.storage_mode_allocate)
+
+        manager.apply_disk_profile('nvme', False)
+        self.assertEqual(mock_session.apply_settings.call_args[0][0]['aio_threads'], 16)
+        self.assertEqual(manager._params['storage_mode'], mock_lt.storage_mode_t.storage_mode_sparse)
+        manager.apply_disk_profile('default', False)  # back to libtorrent's values, not nvme's
+        self.assertEqual(mock_session.apply_settings.call_args[0][0]['aio_threads'], 10)
+
+    def test_apply_settings_updates_running_session(self, mock_lt):
+        """Settings changes are applied live to the existing session."""
+        manager = TorrentManager(self.download_dir, self.session_file)
+        mock_lt.session.assert_called_once()
+        manager.apply_settings({'upload_rate_limit': 1024})
+        manager._session.apply_settings.assert_called_with({'upload_rate_limit': 1024})
+        calls = manager._session.apply_settings.call_count
+        manager.apply_settings({})
+        self.assertEqual(manager._session.apply_settings.call_count, calls)
+        mock_lt.session.assert_called_once()
+
+    def test_process_alerts_dispatches_by_type_name(self, mock_lt):
+        """Listeners receive alerts by class name; '*' receives everything."""
+        manager = TorrentManager(self.download_dir, self.session_file)
+        session_stats_alert = type("session_stats_alert", (), {})
+        other_alert = type("other_alert", (), {})
+        stats = session_stats_alert()
+        stats.values = {'disk.queued_disk_jobs': 3}
+        manager._session.pop_alerts.return_value = [stats, other_alert()]
+
+        seen_all = []
+        manager.add_alert_listener("*", seen_all.append)
+        self.assertEqual(manager.process_alerts(), 2)
+
+        self.assertEqual(len(seen_all), 2)
+        self.assertEqual(manager.get_disk_stats().queued_jobs, 3)
+
+    def test_force_recheck_at_queues_and_reports_position(self, mock_lt):
+        """Rechecks are queued in the scheduler and surface in the status list."""
+        manager = TorrentManager(self.download_dir, self.session_file, max_active_checks=1)
+        self.assertEqual(mock_lt.session.call_args[0][0]['active_checking'], 1)
+        h1, h2 = MagicMock(), MagicMock()
+        h1.info_hashes.return_value.get_best.return_value = "aa"
+        h2.info_hashes.return_value.get_best.return_value = "bb"
+        h1.status.return_value.total_wanted = 100
+        h2.status.return_value.total_wanted = 50
+        manager._handles = [h1, h2]
+
+        self.assertTrue(manager.force_recheck_at(0))
+        self.assertTrue(manager.force_recheck_at(1))
+        self.assertFalse(manager.force_recheck_at(5))
+        manager.tick()
+        h2.force_recheck.assert_called_once()  # smaller torrent first
+        h1.force_recheck.assert_not_called()
+
+        with patch('torrent_downloader.torrent._status_from_handle',
+                   side_effect=lambda h: TorrentStatus("n", 0.0, 0, 0, 0, None, True, "downloading")):
+            positions = [st.check_position for st in manager.get_status_list()]
+        self.assertEqual(positions, [1, 0])
+
     def test_add_magnet(self, mock_lt):
         """Test adding a magnet link."""
         manager = TorrentManager(self.download_dir, self.session_file)
@@ -50,6 +145,17 @@ class TestTorrentManager(unittest.TestCase):
         manager._session.add_magnet_uri.assert_called_once_with(magnet_uri, manager._params)
         self.assertIn(mock_handle, manager._handles)
 
+    def test_add_magnet_libtorrent2(self, mock_lt):
+        """Without session.add_magnet_uri (libtorrent 2.x) the magnet is parsed into params."""
+        manager = TorrentManager(self.download_dir, self.session_file)
+        manager._session = MagicMock(spec=['add_torrent'])
+        handle = manager.add_magnet("magnet:?xt=urn:btih:0123456789abcdef")
+        mock_lt.parse_magnet_uri.assert_called_once_with("magnet:?xt=urn:btih:0123456789abcdef")
+        atp = mock_lt.parse_magnet_uri.return_value
+        self.assertEqual(atp.save_path, self.download_dir)
+        manager._session.add_torrent.assert_called_once_with(atp)
+        self.assertIs(handle, manager._session.add_torrent.return_value)
+
     @patch('os.path.isfile', return_value=True)
     def test_add_torrent_file(self, mock_isfile, mock_lt):
         """Test adding a torrent file."""
@@ -103,6 +209,30 @@ class TestTorrentManager(unittest.TestCase):
         self.assertTrue(result)
         manager._session.remove_torrent.assert_called_once_with(mock_handle, mock_lt.options_t.delete_files)
 
+    def test_get_peers_at(self, mock_lt):
+        """Peer info of one torrent is translated; invalid indices give no peers."""
+        flags = dict(interesting=1, choked=2, remote_interested=4, remote_choked=8, outgoing_connection=0x20,
+                     optimistic_unchoke=0x800, snubbed=0x1000, rc4_encrypted=0x80000, plaintext_encrypted=0x100000,
+                     tracker=1, dht=2, pex=4, lsd=8, standard_bittorrent=0, web_seed=1, http_seed=2)
+        for name, value in flags.items():
+            setattr(mock_lt.peer_info, name, value)
+        manager = TorrentManager(self.download_dir, self.session_file)
+        peer = MagicMock(ip=('10.0.0.2', 6881), client=b'Transmission 4.0', flags=1 | 2 | 4 | 0x80000 | (1 << 17),
+                         source=4, connection_type=0, down_speed=100, up_speed=5, progress=0.25)
+        web = MagicMock(ip=('2001:db8::1', 443), client=b'', flags=0x20 | 1, source=0, connection_type=1,
+                        down_speed=0, up_speed=0, progress=1.5)
+        handle = MagicMock()
+        handle.get_peer_info.return_value = [peer, web]
+        manager._handles = [handle]
+
+        peers = manager.get_peers_at(0)
+        self.assertEqual([p.endpoint for p in peers], ['10.0.0.2:6881', '[2001:db8::1]:443'])
+        self.assertEqual(peers[0].flags, 'D u E I X')
+        self.assertEqual((peers[0].client, peers[0].connection, peers[0].download_rate), ('Transmission 4.0', 'uTP', 100))
+        self.assertEqual((peers[1].client, peers[1].connection, peers[1].progress, peers[1].flags),
+                         ('(unknown)', 'Web', 1.0, 'D'))
+        self.assertEqual(manager.get_peers_at(1), [])
+
     def test_pause_and_resume_at(self, mock_lt):
         """Test pausing and resuming a torrent."""
         manager = TorrentManager(self.download_dir, self.session_file)
@@ -124,50 +254,47 @@ class TestTorrentManager(unittest.TestCase):
         mock_handle.resume.assert_called_once()
 
 
-    @patch("builtins.open", new_callable=mock_open)
-    def test_save_state(self, mock_file, mock_lt):
-        """Test that session state is saved correctly."""
+    def test_save_state(self, mock_lt):
+        """Session state goes to the catalog; unchanged torrents are not saved again."""
         manager = TorrentManager(self.download_dir, self.session_file)
         mock_session_dict = {'test': 'state'}
         manager._session.save_state.return_value = mock_session_dict
+        mock_lt.bencode.return_value = b"state"
+        unchanged = MagicMock()
+        unchanged.info_hashes.return_value.get_best.return_value = "aa"
+        unchanged.need_save_resume_data.return_value = False
+        manager._catalog.put_resume([ResumeRow("aa", b"resume")])
+        manager._handles = [unchanged]
 
         manager.save_state()
 
         manager._session.save_state.assert_called_once()
-        mock_file.assert_called_once_with(self.session_file, 'wb')
         mock_lt.bencode.assert_called_once_with(mock_session_dict)
-        mock_file().write.assert_called_once_with(mock_lt.bencode.return_value)
-
-    @patch("os.path.exists")
-    @patch("builtins.open", new_callable=mock_open)
-    def test_load_state(self, mock_file, mock_exists, mock_lt):
-        """Test that session state and resume data are loaded correctly.
+        self.assertEqual(manager._catalog.get_meta("session_state"), b"state")
+        unchanged.save_resume_data.assert_not_called()
 
-        The implementation stores a list of resume data dictionaries which are
-        bencoded again before calling read_resume_data. So we emulate that by
-        returning a list with a single dictionary from the second bdecode call.
-        """
-        mock_exists.side_effect = lambda path: path in [self.session_file, self.session_file + ".resume"]
+    def test_load_state(self, mock_lt):
+        """Session state and the resume data rows are loaded from the catalog."""
+        catalog = TorrentCatalog(self.session_file + ".db")
+        catalog.set_meta("session_state", b"state")
+        catalog.put_resume([ResumeRow("bb", b"resume-b"), ResumeRow("aa", b"resume-a")])
+        catalog.set_save_path("aa", "/elsewhere")
+        catalog.close()
 
         mock_session = MagicMock()
         mock_lt.session.return_value = mock_session
-        resume_dict = {'resume': 'data'}
-        mock_lt.bdecode.side_effect = [{'a': 'b'}, [resume_dict]]
-        mock_lt.read_resume_data.return_value = MagicMock()
+        mock_lt.bdecode.return_value = {'a': 'b'}
+        atps = [MagicMock(), MagicMock()]
+        mock_lt.read_resume_data.side_effect = atps
 
         manager = TorrentManager(self.download_dir, self.session_file)
 
-        mock_exists.assert_any_call(self.session_file)
-        mock_exists.assert_any_call(self.session_file + ".resume")
-
-        mock_file.assert_any_call(self.session_file, 'rb')
-        mock_file.assert_any_call(self.session_file + ".resume", 'rb')
-
-        self.assertEqual(mock_lt.bdecode.call_count, 2)
+        mock_lt.bdecode.assert_called_once_with(b"state")
         mock_session.load_state.assert_called_once_with({'a': 'b'})
-        mock_lt.bencode.assert_called_once_with(resume_dict)
-        mock_lt.read_resume_data.assert_called_once_with(mock_lt.bencode.return_value)
-        mock_session.add_torrent.assert_called_once_with(mock_lt.read_resume_data.return_value)
+        self.assertEqual([c.args[0] for c in mock_lt.read_resume_data.call_args_list], [b"resume-b", b"resume-a"])
+        self.assertEqual([c.args[0] for c in mock_session.add_torrent.call_args_list], atps)
+        self.assertEqual((atps[0].save_path, atps[1].save_path), (self.download_dir, "/elsewhere"))
+        self.assertEqual(len(manager.get_torrents()), 2)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,6 +1,6 @@
 __version__ = "0.0.1"
 
-# Re-export logging setup helper for convenience
-from .logging import setup_logging  # noqa: E402,F401
+# Re-export logging setup helpers for convenience
+from .logging import flush_logging, set_log_level, setup_logging  # noqa: E402,F401
 
-__all__ = ["__version__", "setup_logging"]
\ No newline at end of file
+__all__ = ["__version__", "flush_logging", "set_log_level", "setup_logging"]
\ No newline at end of file
@@ -0,0 +1,267 @@
+"""Disk-space admission control for new and queued torrents.
+
+libtorrent creates files sparse and writes them as pieces arrive, so a
+volume fills up long after the torrents were added; once it is full every
+torrent writing to it fails. The ``AdmissionController`` keeps track of
+the bytes each torrent still has to write (``total_wanted -
+total_wanted_done`` from the status updates) per volume and compares their
+sum with the volume's free space minus a reserve:
+
+* ``admit`` lets a new torrent start when its remaining bytes fit, and
+  otherwise holds it: paused and taken out of auto-management, like the
+  recheck queue does.
+* ``tick`` refreshes the free space every ``refresh_s`` and starts held
+  torrents that fit again (first fit, in the order they were held). If a
+  volume is over-committed (a magnet's size only becomes known with its
+  metadata, torrents loaded from the session report their size with the
+  first status update) the newest torrents still downloading are held
+  until it is not.
+
+Holds are reported through ``on_hold``/``on_release`` so the manager can
+keep them in the catalog: a held torrent's resume data says "paused, not
+auto-managed", and ``restore`` puts it back into the queue after a restart.
+
+Free space is only queried on the timer (and once per new volume), never
+per add; bytes admitted in the meantime are counted as committed. With full
+allocation the space of started torrents is taken up front, so the
+estimate is on the safe side.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+import os
+import shutil
+import time
+
+MIB = 1024 * 1024
+DEFAULT_RESERVE_BYTES = 512 * MIB  # kept free on every volume
+DEFAULT_REFRESH_S = 30.0
+
+
+def volume_of(path: str) -> Tuple[int, str]:
+    """(device id, closest existing directory) of the volume ``path`` is or will be on."""
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return os.stat(path).st_dev, path
+
+
+def free_bytes(path: str) -> int:
+    return shutil.disk_usage(path).free
+
+
+@dataclass
+class AdmissionEntry:
+    key: str  # info-hash string
+    handle: Any
+    volume: int  # device id
+    remaining: int  # bytes still to be written
+    seq: int = 0  # order of admission / holding
+    forced: bool = False  # started by the user, never held
+    was_paused: bool = False
+    was_auto_managed: bool = False
+    sized: bool = True  # False for restored holds until the first status update
+
+
+class AdmissionController:
+    """Holds torrents whose remaining bytes don't fit their volume's free space."""
+
+    def __init__(self, reserve_bytes: int = DEFAULT_RESERVE_BYTES, refresh_s: float = DEFAULT_REFRESH_S,
+                 auto_managed_flag: Any = None, free_space: Callable[[str], int] = free_bytes,
+                 clock: Callable[[], float] = time.monotonic,
+                 on_hold: Optional[Callable[[AdmissionEntry], None]] = None,
+                 on_release: Optional[Callable[[str], None]] = None):
+        assert isinstance(reserve_bytes, int) and reserve_bytes >= 0, "reserve_bytes must be an integer >= 0"
+        assert refresh_s > 0, "refresh_s must be positive"
+        self.reserve_bytes = reserve_bytes
+        self.refresh_s = refresh_s
+        self._auto_managed_flag = auto_managed_flag  # lt.torrent_flags.auto_managed
+        self._free_space = free_space
+        self._clock = clock
+        self._on_hold = on_hold
+        self._on_release = on_release
+        self._free: Dict[int, int] = {}  # volume -> free bytes at the last refresh
+        self._paths: Dict[int, str] = {}  # volume -> directory to query
+        self._refreshed_at = clock()
+        self._admitted: Dict[str, AdmissionEntry] = {}
+        self._committed: Dict[int, int] = {}  # volume -> remaining bytes of its admitted torrents
+        self._waiting: List[AdmissionEntry] = []  # in the order they were held
+        self._held: Dict[str, AdmissionEntry] = {}  # key -> entry of ``_waiting``
+        self._positions: Optional[Dict[str, int]] = None  # key -> queue position, rebuilt when stale
+        self._seq = 0
+
+    # --- Bookkeeping --------------------------------------------------------
+    def _volume(self, save_path: str) -> int:
+        volume, path = volume_of(save_path)
+        if volume not in self._free:  # first torrent on this volume
+            self._paths[volume] = path
+            self._free[volume] = self._query(path)
+        return volume
+
+    def _query(self, path: str) -> int:
+        try:
+            return self._free_space(path)
+        except OSError as e:  # e.g. an unmounted drive: nothing fits until it is back
+            logging.warning("Failed to query free space of %s: %s", path, e)
+            return 0
+
+    def _next_seq(self) -> int:
+        self._seq += 1
+        return self._seq
+
+    def committed(self, volume: int) -> int:
+        """Bytes the admitted torrents on ``volume`` still have to write."""
+        return self._committed.get(volume, 0)
+
+    def _add_admitted(self, entry: AdmissionEntry) -> None:
+        self._admitted[entry.key] = entry
+        self._committed[entry.volume] = self._committed.get(entry.volume, 0) + entry.remaining
+
+    def _pop_admitted(self, key: str) -> Optional[AdmissionEntry]:
+        entry = self._admitted.pop(key, None)
+        if entry is not None:
+            self._committed[entry.volume] -= entry.remaining
+        return entry
+
+    def _set_waiting(self, waiting: List[AdmissionEntry]) -> None:
+        self._waiting = waiting
+        self._held = {e.key: e for e in waiting}
+        self._positions = None
+
+    def _append_waiting(self, entry: AdmissionEntry) -> None:
+        self._waiting.append(entry)
+        self._held[entry.key] = entry
+        if self._positions is not None:
+            self._positions[entry.key] = len(self._waiting)
+
+    def available(self, volume: int) -> int:
+        """Free bytes of ``volume`` not yet promised to an admitted torrent."""
+        return self._free.get(volume, 0) - self.reserve_bytes - self.committed(volume)
+
+    def pending(self) -> bool:
+        return bool(self._waiting)
+
+    def queue_position(self, key: str) -> Optional[int]:
+        """1-based position among the held torrents, None if not held."""
+        if self._positions is None:  # once per change of the queue, not per call
+            self._positions = {e.key: i + 1 for i, e in enumerate(self._waiting)}
+        return self._positions.get(key)
+
+    # --- Admission ----------------------------------------------------------
+    def admit(self, key: str, handle: Any, save_path: str, remaining: int) -> bool:
+        """Start tracking a torrent; holds it and returns False if it doesn't fit."""
+        assert isinstance(key, str) and key, "key must be a non-empty string"
+        self.discard(key)
+        entry = AdmissionEntry(key, handle, self._volume(save_path), max(0, int(remaining)), self._next_seq())
+        available = self.available(entry.volume)
+        if entry.remaining == 0 or entry.remaining <= available:  # 0: seeding or size unknown
+            self._add_admitted(entry)
+            return True
+        self._hold(entry, available)
+        return False
+
+    def restore(self, key: str, handle: Any, save_path: str, was_paused: bool, was_auto_managed: bool) -> None:
+        """Queue a torrent that was held when the session was saved (it is still paused)."""
+        assert isinstance(key, str) and key, "key must be a non-empty string"
+        self.discard(key)
+        self._append_waiting(AdmissionEntry(key, handle, self._volume(save_path), 0, self._next_seq(),
+                                            was_paused=was_paused, was_auto_managed=was_auto_managed, sized=False))
+
+    def update(self, remaining: Iterable[Tuple[str, int]]) -> None:
+        """Record the remaining bytes of tracked torrents (from status updates)."""
+        for key, value in remaining:
+            value = max(0, int(value))
+            entry = self._admitted.get(key)
+            if entry is not None:
+                self._committed[entry.volume] += value - entry.remaining
+            else:
+                entry = self._held.get(key)
+                if entry is None:
+                    continue
+            entry.remaining = value
+            entry.sized = True
+
+    def force(self, key: str) -> bool:
+        """Start a held torrent regardless of space (the user resumed it); False if not held."""
+        entry = self._held.get(key)
+        if entry is None:
+            return False
+        self._set_waiting([e for e in self._waiting if e is not entry])
+        entry.forced = True
+        self._start(entry)
+        return True
+
+    def discard(self, key: str) -> None:
+        """Forget a torrent (e.g. after it was removed from the session)."""
+        self._pop_admitted(key)
+        if key in self._held:  # only rebuild the queue when the torrent is in it
+            self._set_waiting([e for e in self._waiting if e.key != key])
+            if self._on_release is not None:
+                self._on_release(key)
+
+    def release_all(self) -> None:
+        """Start every held torrent (admission control is being switched off)."""
+        waiting = self._waiting
+        self._set_waiting([])
+        for entry in waiting:
+            self._start(entry)
+
+    def tick(self) -> None:
+        """Refresh the free space when due, hold over-committed and start fitting torrents."""
+        now = self._clock()
+        if now - self._refreshed_at < self.refresh_s:
+            return
+        self._refreshed_at = now
+        for volume, path in self._paths.items():
+            self._free[volume] = self._query(path)
+        available = {volume: self.available(volume) for volume in self._free}
+        over = {volume for volume, value in available.items() if value < 0}
+        if over:  # only then look at the admitted torrents, in one pass
+            candidates: Dict[int, List[AdmissionEntry]] = {}
+            for entry in self._admitted.values():
+                if entry.volume in over and entry.remaining > 0 and not entry.forced:
+                    candidates.setdefault(entry.volume, []).append(entry)
+            for volume, entries in candidates.items():
+                for entry in sorted(entries, key=lambda e: e.seq, reverse=True):  # newest first
+                    self._pop_admitted(entry.key)
+                    available[volume] += entry.remaining
+                    self._hold(entry, available[volume])
+                    if available[volume] >= 0:
+                        break
+        waiting, still_waiting = self._waiting, []
+        for entry in waiting:
+            if entry.sized and entry.remaining <= available.get(entry.volume, 0):
+                available[entry.volume] -= entry.remaining
+                self._start(entry)
+            else:
+                still_waiting.append(entry)
+        if len(still_waiting) != len(waiting):
+            self._set_waiting(still_waiting)
+
+    def _hold(self, entry: AdmissionEntry, available: int) -> None:
+        status = entry.handle.status()
+        entry.was_paused = bool(status.paused)
+        entry.was_auto_managed = bool(getattr(status, 'auto_managed', False))
+        if self._auto_managed_flag is not None:
+            entry.handle.unset_flags(self._auto_managed_flag)
+        entry.handle.pause()
+        entry.seq = self._next_seq()
+        self._append_waiting(entry)
+        if self._on_hold is not None:
+            self._on_hold(entry)
+        logging.warning("Holding %s: %d bytes to write, %d bytes available on its volume", entry.key,
+                        entry.remaining, max(0, available))
+
+    def _start(self, entry: AdmissionEntry) -> None:
+        self._add_admitted(entry)
+        if entry.was_auto_managed and self._auto_managed_flag is not None:
+            entry.handle.set_flags(self._auto_managed_flag)
+        if not entry.was_paused:
+            entry.handle.resume()
+        if self._on_release is not None:
+            self._on_release(entry.key)
+        logging.info("Starting %s: enough disk space for %d bytes", entry.key, entry.remaining)
@@ -0,0 +1,280 @@
+"""asyncio facade over ``TorrentManager``.
+
+Most manager calls block (adding a .torrent parses it, ``save_state`` writes
+the catalog, every status query takes libtorrent's lock) and a manager is
+only used from one thread. ``AsyncTorrentManager`` creates the manager on a
+single engine thread and runs everything there: awaited commands are
+queued to it (an ``api.CommandQueue``) and come back through
+``asyncio.wrap_future``, which resolves them with
+``loop.call_soon_threadsafe``. The engine thread also does what the GUI
+poll loop does otherwise (alerts, ``tick``) and publishes
+
+* ``StatusEvent``: torrents whose status changed since the previous
+  refresh, the same versioned deltas the HTTP API serves (see
+  ``api.StatusFeed``); a subscriber gets the full list first,
+* ``AlertEvent``: copies of selected libtorrent alerts (libtorrent reuses
+  alert objects on the next ``pop_alerts``, so they can't be handed over).
+
+``events()`` iterates over both. Each subscriber has its own asyncio queue
+that the engine thread fills with ``call_soon_threadsafe``, so nothing
+polls on the event loop. Statuses are only computed while someone
+subscribes.
+"""
+
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, FrozenSet, List, Optional, Union
+import asyncio
+import logging
+import threading
+import time
+
+from .api import ApiError, CommandQueue, StatusFeed, _index_of as _api_index_of
+from .torrent import _handle_key
+
+DEFAULT_REFRESH_S = 1.0
+ENGINE_WAIT_S = 0.05  # longest wait before newly queued alerts are dispatched
+MAX_QUEUED_EVENTS = 10_000  # per subscriber
+
+DEFAULT_ALERTS: FrozenSet[str] = frozenset({
+    'add_torrent_alert', 'torrent_removed_alert', 'metadata_received_alert', 'torrent_finished_alert',
+    'torrent_paused_alert', 'torrent_resumed_alert', 'torrent_checked_alert', 'torrent_error_alert',
+    'file_error_alert', 'storage_moved_alert', 'storage_moved_failed_alert',
+})
+
+
+@dataclass
+class StatusEvent:
+    version: int
+    full: bool  # torrents is the complete list
+    torrents: List[Dict[str, Any]] = field(default_factory=list)  # TorrentStatus fields plus info_hash
+    removed: List[str] = field(default_factory=list)  # info-hashes
+
+
+@dataclass
+class AlertEvent:
+    kind: str  # alert class name, e.g. "torrent_finished_alert"
+    info_hash: Optional[str]  # None for session alerts
+    message: str
+
+
+Event = Union[StatusEvent, AlertEvent]
+
+
+class EventOverflow(Exception):
+    """The subscriber fell more than ``MAX_QUEUED_EVENTS`` behind and was dropped."""
+
+
+_CLOSED = object()
+_OVERFLOW = object()
+
+
+class _Subscriber:
+    """An asyncio queue filled from the engine thread; only touched on its loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_queued: int):
+        self.loop = loop
+        self.queue: "asyncio.Queue[Any]" = asyncio.Queue()
+        self._max_queued = max_queued
+        self._done = False
+
+    def put(self, event: Any) -> None:
+        if self._done:
+            return
+        if event is not _CLOSED and self.queue.qsize() >= self._max_queued:
+            event = _OVERFLOW
+        self._done = event is _CLOSED or event is _OVERFLOW
+        self.queue.put_nowait(event)
+
+
+class AsyncTorrentManager:
+    """Awaitable manager commands and an event stream, backed by one engine thread.
+
+    ``factory`` builds the manager (``TorrentManager`` or
+    ``ShardedTorrentManager``) and runs on the engine thread. Use as
+    ``async with AsyncTorrentManager(factory) as manager:`` or call
+    ``start`` and ``close``; closing saves the state.
+    """
+
+    def __init__(self, factory: Callable[[], Any], *, refresh_s: float = DEFAULT_REFRESH_S,
+                 alert_types: FrozenSet[str] = DEFAULT_ALERTS, max_queued: int = MAX_QUEUED_EVENTS):
+        assert callable(factory), "factory must be callable"
+        assert refresh_s > 0, "refresh_s must be positive"
+        assert isinstance(max_queued, int) and max_queued > 0, "max_queued must be a positive integer"
+        self._factory = factory
+        self._refresh_s = refresh_s
+        self._alert_types = frozenset(alert_types)
+        self._max_queued = max_queued
+        self._commands = CommandQueue()
+        self._feed = StatusFeed()
+        self._subscribers: List[_Subscriber] = []
+        self._lock = threading.Lock()  # guards _subscribers
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._started: Future = Future()
+        self._stopped: Future = Future()
+        self._thread = threading.Thread(target=self._engine, name="torrent-engine", daemon=True)
+
+    # --- Lifecycle ------------------------------------------------------------
+    async def start(self) -> "AsyncTorrentManager":
+        """Start the engine thread; returns once the manager exists (raises if creating it failed)."""
+        self._thread.start()
+        await asyncio.wrap_future(self._started)
+        return self
+
+    async def close(self) -> None:
+        """Run queued commands, save the state, close the manager and end all ``events()`` iterators."""
+        if not self._thread.is_alive():
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        await asyncio.wrap_future(self._stopped)
+
+    async def __aenter__(self) -> "AsyncTorrentManager":
+        return await self.start()
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    # --- Commands -------------------------------------------------------------
+    async def call(self, command: Callable[[Any], Any]) -> Any:
+        """Run ``command(manager)`` on the engine thread and return its result."""
+        if self._stopping.is_set() or self._stopped.done() or not self._started.done():
+            raise RuntimeError("the engine is not running")
+        future = self._commands.submit(command)
+        self._wakeup.set()
+        return await asyncio.wrap_future(future)
+
+    async def add_magnet(self, magnet_uri: str) -> str:
+        """Add a magnet link; returns its info-hash."""
+        assert isinstance(magnet_uri, str) and magnet_uri.startswith("magnet:?"), "magnet_uri must be a magnet link"
+        return await self.call(lambda manager: _added_key(manager.add_magnet(magnet_uri)))
+
+    async def add_torrent_file(self, torrent_path: str, save_path: Optional[str] = None,
+                               seed_mode: bool = False) -> str:
+        """Add a .torrent file (see ``TorrentManager.add_torrent_file``); returns its info-hash."""
+        return await self.call(lambda manager: _added_key(manager.add_torrent_file(torrent_path, save_path, seed_mode)))
+
+    async def pause(self, info_hash: str) -> bool:
+        return await self.call(lambda manager: manager.pause_at(_index_of(manager, info_hash)))
+
+    async def resume(self, info_hash: str) -> bool:
+        return await self.call(lambda manager: manager.resume_at(_index_of(manager, info_hash)))
+
+    async def remove(self, info_hash: str, *, delete_files: bool = False) -> bool:
+        return await self.call(lambda manager: manager.remove_at(_index_of(manager, info_hash),
+                                                                 delete_files=delete_files))
+
+    async def save_state(self) -> None:
+        await self.call(lambda manager: manager.save_state())
+
+    # --- Events ---------------------------------------------------------------
+    async def events(self) -> AsyncIterator[Event]:
+        """Status deltas and alerts until ``close``; raises ``EventOverflow`` if the consumer falls behind."""
+        subscriber = _Subscriber(asyncio.get_running_loop(), self._max_queued)
+        await self.call(lambda manager: self._subscribe(manager, subscriber))
+        try:
+            while True:
+                event = await subscriber.queue.get()
+                if event is _CLOSED:
+                    return
+                if event is _OVERFLOW:
+                    raise EventOverflow(f"more than {self._max_queued} events queued")
+                yield event
+        finally:
+            with self._lock:
+                if subscriber in self._subscribers:
+                    self._subscribers.remove(subscriber)
+
+    def _subscribe(self, manager: Any, subscriber: _Subscriber) -> None:
+        """Engine thread: register ``subscriber`` and send it the full list."""
+        self._refresh(manager)
+        with self._lock:
+            self._subscribers.append(subscriber)
+        self._send(subscriber, StatusEvent(**self._feed.full()))
+
+    def _send(self, subscriber: _Subscriber, event: Any) -> None:
+        try:
+            subscriber.loop.call_soon_threadsafe(subscriber.put, event)
+        except RuntimeError:  # its event loop is closed
+            with self._lock:
+                if subscriber in self._subscribers:
+                    self._subscribers.remove(subscriber)
+
+    def _publish(self, event: Any) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            self._send(subscriber, event)
+
+    def _on_alert(self, alert: Any) -> None:
+        kind = type(alert).__name__
+        if kind not in self._alert_types or not self._subscribers:
+            return
+        info_hash = None
+        handle = getattr(alert, 'handle', None)
+        if handle is not None:
+            try:
+                info_hash = _handle_key(handle) if handle.is_valid() else None
+            except Exception:  # pragma: no cover - handle went away
+                pass
+        self._publish(AlertEvent(kind, info_hash, alert.message()))
+
+    def _refresh(self, manager: Any) -> None:
+        """Engine thread: publish the torrents that changed since the last refresh."""
+        since = self._feed.version
+        statuses = manager.get_status_list()
+        keys = manager.torrent_keys()
+        if len(keys) == len(statuses) and self._feed.publish(statuses, keys):  # else: next refresh
+            self._publish(StatusEvent(**self._feed.delta(since)))
+
+    # --- Engine thread --------------------------------------------------------
+    def _engine(self) -> None:
+        try:
+            manager = self._factory()
+            if hasattr(manager, 'add_alert_listener'):  # not forwarded by the sharded manager
+                manager.add_alert_listener("*", self._on_alert)
+        except BaseException as e:
+            self._commands.close("the engine is not running")
+            self._started.set_exception(e)
+            self._stopped.set_result(None)
+            return
+        self._started.set_result(None)
+        next_refresh = 0.0
+        try:
+            while not self._stopping.is_set():
+                try:
+                    self._commands.run_pending(manager)
+                    manager.process_alerts()
+                    now = time.monotonic()
+                    if now >= next_refresh:
+                        next_refresh = now + self._refresh_s
+                        manager.tick()
+                        if self._subscribers:
+                            self._refresh(manager)
+                except Exception as e:  # a failing refresh must not end the engine
+                    logging.error("Torrent engine error: %s", e)
+                self._wakeup.wait(ENGINE_WAIT_S)
+                self._wakeup.clear()
+            self._commands.run_pending(manager)
+            manager.save_state()
+            manager.close()
+        except Exception as e:
+            logging.error("Failed to shut the torrent engine down cleanly: %s", e)
+        finally:
+            # Commands submitted after the last run_pending would wait forever.
+            self._commands.close("the engine is not running")
+            self._publish(_CLOSED)
+            self._stopped.set_result(None)
+
+
+def _index_of(manager: Any, info_hash: str) -> int:
+    try:
+        return _api_index_of(manager, info_hash)
+    except ApiError as e:
+        raise KeyError(str(e)) from None
+
+
+def _added_key(result: Any) -> str:
+    """Key (as in ``torrent_keys``) of an added torrent: a handle, or the key a sharded manager returns."""
+    return result if isinstance(result, str) else _handle_key(result)
@@ -0,0 +1,441 @@
+"""Optional local HTTP API for dashboards and automation (stdlib only).
+
+Endpoints (JSON unless noted; torrents are addressed by info-hash):
+
+* ``GET  /torrents`` – all torrents and the current feed version
+* ``GET  /status?since=<version>&timeout=<s>`` – long-poll: waits until the
+  feed is newer than ``since`` and returns only the torrents that changed
+  (plus removed info-hashes); ``since`` older than the retained history
+  gives a full list with ``"full": true``
+* ``POST /torrents`` – add a magnet (``{"magnet": "magnet:?..."}``) or a
+  .torrent file (raw body with ``Content-Type: application/x-bittorrent``)
+* ``POST /torrents/<hash>/pause`` and ``/resume``
+* ``DELETE /torrents/<hash>`` (``?delete_files=1`` also deletes the data)
+* ``POST /create`` – create a .torrent from local data (``{"source": "/abs/path",
+  "output": ..., "format": "hybrid|v1|v2", "trackers": [...], "private": false,
+  "seed": true}``); answers when hashing is done and, with ``seed``, starts
+  seeding the source without a recheck. Only with a configured token, and
+  ``source``/``output`` must be inside one of ``create_roots`` (the GUI
+  passes the download directory), so a leaked request can't publish ~/.ssh
+
+The server only binds to loopback and every request must send
+``Authorization: Bearer <token>`` (a random token is generated if none is
+given). Because any web page the user opens can send requests to
+127.0.0.1, requests with a non-loopback ``Origin`` or ``Host`` header
+(cross-site requests, DNS rebinding) are refused, and JSON bodies must be
+sent as ``application/json``, which browsers can't do cross-origin without a
+CORS preflight (never answered).
+
+Status is not read from libtorrent per request: the GUI poll publishes each
+status refresh to a ``StatusFeed``, which versions it, keeps per-torrent
+change versions and caches the encoded responses, so any number of clients
+share one snapshot. Commands are queued (``CommandQueue``) and executed on
+the thread that owns the torrent manager.
+"""
+
+from concurrent.futures import Future
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import hmac
+import json
+import logging
+import os
+import queue
+import secrets
+import socket
+import tempfile
+import threading
+import urllib.parse
+
+from .create import FORMAT_HYBRID, FORMATS, create_torrent
+from .torrent import TorrentStatus
+
+LOOPBACK_HOSTS = ('127.0.0.1', '::1', 'localhost')
+DEFAULT_POLL_TIMEOUT_S = 30.0
+MAX_POLL_TIMEOUT_S = 60.0
+COMMAND_TIMEOUT_S = 10.0
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+# Removed torrents remembered for delta responses; older clients get a full list.
+MAX_TOMBSTONES = 1000
+# Encoded responses kept per version (clients usually ask for the same few).
+MAX_ENCODED = 64
+
+Command = Callable[[Any], Any]  # manager -> result
+
+
+class StatusFeed:
+    """Versioned, shared status snapshot with per-torrent change tracking."""
+
+    def __init__(self, max_tombstones: int = MAX_TOMBSTONES):
+        assert isinstance(max_tombstones, int) and max_tombstones > 0, "max_tombstones must be positive"
+        self.version = 0
+        self._max_tombstones = max_tombstones
+        self._torrents: Dict[str, Dict[str, Any]] = {}  # info-hash -> serialisable status
+        self._changed_at: Dict[str, int] = {}
+        self._removed_at: Dict[str, int] = {}
+        self._history_start = 0  # deltas are complete for since >= this
+        self._encoded: Dict[Optional[int], bytes] = {}  # since (None = full) -> response body
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def publish(self, statuses: Sequence[TorrentStatus], keys: Sequence[str]) -> bool:
+        """Record a status refresh; returns True if anything changed (new version).
+
+        ``keys`` are the info-hashes of ``statuses`` (same order).
+        """
+        assert len(statuses) == len(keys), "statuses and keys must have the same length"
+        current = {key: dict(asdict(st), info_hash=key) for st, key in zip(statuses, keys)}
+        with self._cond:
+            changed = [key for key, data in current.items() if self._torrents.get(key) != data]
+            removed = [key for key in self._torrents if key not in current]
+            if not changed and not removed:
+                return False
+            self.version += 1
+            for key in changed:
+                self._changed_at[key] = self.version
+                self._removed_at.pop(key, None)
+            for key in removed:
+                del self._changed_at[key]
+                self._removed_at[key] = self.version
+            if len(self._removed_at) > self._max_tombstones:
+                oldest = sorted(self._removed_at.items(), key=lambda kv: kv[1])
+                for key, version in oldest[:len(oldest) - self._max_tombstones]:
+                    del self._removed_at[key]
+                    self._history_start = max(self._history_start, version)
+            self._torrents = current
+            self._encoded.clear()
+            self._cond.notify_all()
+        return True
+
+    def full(self) -> Dict[str, Any]:
+        with self._cond:
+            return {'version': self.version, 'full': True, 'torrents': list(self._torrents.values()), 'removed': []}
+
+    def delta(self, since: int) -> Dict[str, Any]:
+        """Torrents changed after version ``since`` (a full list if that is too old)."""
+        with self._cond:
+            if since < self._history_start or since > self.version:
+                return self.full()
+            changed = [self._torrents[key] for key, v in self._changed_at.items() if v > since]
+            removed = [key for key, v in self._removed_at.items() if v > since]
+            return {'version': self.version, 'full': False, 'torrents': changed, 'removed': removed}
+
+    def encoded(self, since: Optional[int]) -> bytes:
+        """JSON body for ``full()`` (since None) or ``delta(since)``, shared between clients."""
+        with self._cond:
+            body = self._encoded.get(since)
+            if body is None:
+                data = self.full() if since is None else self.delta(since)
+                body = json.dumps(data).encode('utf-8')
+                if len(self._encoded) < MAX_ENCODED:
+                    self._encoded[since] = body
+            return body
+
+    def wait(self, since: int, timeout: float) -> bool:
+        """Block until the version is newer than ``since``; False on timeout or close."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._closed or self.version != since, timeout) and not self._closed
+
+    def close(self) -> None:
+        """Wake up all waiting long-polls (server shutdown)."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class CommandQueue:
+    """Commands from HTTP threads, run by the manager's owner via ``run_pending``."""
+
+    def __init__(self) -> None:
+        self._queue: "queue.Queue[Tuple[Command, Future]]" = queue.Queue()
+        self._lock = threading.Lock()  # orders submit against close
+        self._closed: Optional[str] = None  # why commands are refused after close
+
+    def submit(self, command: Command) -> Future:
+        future: Future = Future()
+        with self._lock:
+            if self._closed is None:
+                self._queue.put((command, future))
+                return future
+        future.set_exception(RuntimeError(self._closed))
+        return future
+
+    def close(self, reason: str) -> int:
+        """Refuse new commands and fail the queued ones with ``RuntimeError(reason)``; returns how many failed."""
+        with self._lock:
+            self._closed = reason
+        count = 0
+        while True:
+            try:
+                _command, future = self._queue.get_nowait()
+            except queue.Empty:
+                return count
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError(reason))
+                count += 1
+
+    def run_pending(self, manager: Any) -> int:
+        """Execute queued commands against ``manager``; returns how many ran."""
+        count = 0
+        while True:
+            try:
+                command, future = self._queue.get_nowait()
+            except queue.Empty:
+                return count
+            count += 1
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(command(manager))
+            except Exception as e:
+                future.set_exception(e)
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _index_of(manager: Any, info_hash: str) -> int:
+    keys = manager.torrent_keys()
+    if info_hash not in keys:
+        raise ApiError(404, f"unknown torrent {info_hash}")
+    return keys.index(info_hash)
+
+
+def _add_torrent_data(manager: Any, data: bytes) -> None:
+    fd, path = tempfile.mkstemp(suffix=".torrent")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        manager.add_torrent_file(path)
+    finally:
+        os.unlink(path)
+
+
+def _inside(path: str, roots: Sequence[str]) -> bool:
+    real = os.path.realpath(path)  # no way out through symlinks or ".."
+    try:
+        return any(os.path.commonpath([real, root]) == root for root in roots)
+    except ValueError:  # different drives on Windows
+        return False
+
+
+def _parse_create(body: bytes, roots: Sequence[str]) -> Dict[str, Any]:
+    """Validate a ``POST /create`` body; returns ``create_torrent`` arguments plus ``seed``."""
+    try:
+        request = json.loads(body or b"{}")
+    except ValueError:
+        raise ApiError(400, "body must be a JSON object") from None
+    if not isinstance(request, dict):
+        raise ApiError(400, "body must be a JSON object")
+    source = request.get("source")
+    if not isinstance(source, str) or not os.path.isabs(source):
+        raise ApiError(400, "source must be an absolute path")
+    if not _inside(source, roots):
+        raise ApiError(403, "source must be inside the download directory")
+    if not os.path.exists(source):
+        raise ApiError(404, f"source not found: {source}")
+    output = request.get("output") or os.path.normpath(source) + ".torrent"
+    if not isinstance(output, str) or not os.path.isabs(output):
+        raise ApiError(400, "output must be an absolute path")
+    if not _inside(output, roots):
+        raise ApiError(403, "output must be inside the download directory")
+    fmt = request.get("format", FORMAT_HYBRID)
+    if fmt not in FORMATS:
+        raise ApiError(400, f"format must be one of {', '.join(FORMATS)}")
+    trackers = request.get("trackers", [])
+    if not isinstance(trackers, list) or not all(isinstance(t, str) for t in trackers):
+        raise ApiError(400, "trackers must be a list of URLs")
+    return {'source': source, 'output': output, 'fmt': fmt, 'trackers': trackers,
+            'private': bool(request.get("private", False)), 'seed': bool(request.get("seed", True))}
+
+
+def _hostname(netloc: str) -> str:
+    """Host part of a ``Host`` header / URL netloc (``[::1]:8081`` -> ``::1``)."""
+    if netloc.startswith("["):
+        return netloc[1:netloc.find("]")]
+    return netloc.rsplit(":", 1)[0] if netloc.count(":") == 1 else netloc
+
+
+def _require_json(content_type: str) -> None:
+    if content_type.split(";")[0].strip().lower() != "application/json":
+        raise ApiError(415, "Content-Type must be application/json")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - stdlib signature
+        logging.debug("API %s - %s", self.address_string(), format % args)
+
+    # --- Plumbing -------------------------------------------------------------
+    def _send(self, status: int, body: bytes) -> None:
+        self.send_response(status)
+        if not self._body_read:  # the unread body would be parsed as the next request
+            self.send_header("Connection", "close")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, data: Any) -> None:
+        self._send(status, json.dumps(data).encode('utf-8'))
+
+    def _check_origin(self) -> None:
+        """Refuse browser requests from other sites and DNS rebinding (the Host names another domain)."""
+        host = self.headers.get("Host")
+        if host is not None and _hostname(host) not in LOOPBACK_HOSTS:
+            raise ApiError(403, "Host must be a loopback address")
+        origin = self.headers.get("Origin")
+        if origin is not None and _hostname(urllib.parse.urlsplit(origin).netloc) not in LOOPBACK_HOSTS:
+            raise ApiError(403, "cross-origin requests are not allowed")
+
+    def _dispatch(self, method: str) -> None:
+        api = self.server.api
+        self._body_read = self.headers.get("Content-Length", "0").strip() == "0" \
+            and "Transfer-Encoding" not in self.headers
+        try:
+            self._check_origin()
+            if not hmac.compare_digest(self.headers.get("Authorization", ""), f"Bearer {api.token}"):
+                raise ApiError(401, "missing or wrong token")
+            url = urllib.parse.urlsplit(self.path)
+            query = urllib.parse.parse_qs(url.query)
+            parts = [p for p in url.path.split("/") if p]
+            status, body = api.route(method, parts, query, self._read_body, self.headers.get("Content-Type", ""))
+            self._send(status, body)
+        except ApiError as e:
+            self._send_json(e.status, {'error': str(e)})
+        except Exception as e:
+            logging.error("API request %s %s failed: %s", method, self.path, e)
+            self._send_json(500, {'error': str(e)})
+
+    def _read_body(self) -> bytes:
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            raise ApiError(400, "invalid Content-Length") from None
+        if length < 0:
+            raise ApiError(400, "invalid Content-Length")
+        if length > MAX_UPLOAD_BYTES:
+            raise ApiError(413, "request body too large")
+        body = self.rfile.read(length) if length else b""
+        self._body_read = "Transfer-Encoding" not in self.headers  # chunked bodies are not read
+        return body
+
+    def do_GET(self) -> None:  # noqa: N802 - stdlib naming
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:  # noqa: N802
+        self._dispatch("POST")
+
+    def do_DELETE(self) -> None:  # noqa: N802
+        self._dispatch("DELETE")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], api: "ApiServer"):
+        if ":" in address[0]:
+            self.address_family = socket.AF_INET6
+        self.api = api
+        super().__init__(address, _Handler)
+
+
+class ApiServer:
+    """HTTP API on a background thread; see the module docstring for the endpoints."""
+
+    def __init__(self, feed: StatusFeed, commands: CommandQueue, *, host: str = '127.0.0.1', port: int = 0,
+                 token: Optional[str] = None, create_roots: Sequence[str] = (),
+                 command_timeout_s: float = COMMAND_TIMEOUT_S):
+        assert host in LOOPBACK_HOSTS, "the API only binds to loopback"
+        assert isinstance(port, int) and 0 <= port < 65536, "port must be 0..65535"
+        assert all(os.path.isabs(root) for root in create_roots), "create_roots must be absolute paths"
+        self.feed = feed
+        self.commands = commands
+        self.token = token or secrets.token_urlsafe(24)  # never without one, see the module docstring
+        # /create reads and publishes local files: only for callers that set up a token and roots.
+        self.create_roots = [os.path.realpath(root) for root in create_roots] if token else []
+        self.command_timeout_s = command_timeout_s
+        self._server = _Server((host, port), self)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="api-server", daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> "ApiServer":
+        self._thread.start()
+        logging.info("API listening on http://%s:%d", self._server.server_address[0], self.port)
+        return self
+
+    def close(self) -> None:
+        self.feed.close()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _run(self, command: Command) -> Any:
+        future = self.commands.submit(command)
+        try:
+            return future.result(self.command_timeout_s)
+        except TimeoutError:
+            future.cancel()
+            raise ApiError(503, "the application did not process the command in time") from None
+
+    def route(self, method: str, parts: List[str], query: Dict[str, List[str]], read_body: Callable[[], bytes],
+              content_type: str) -> Tuple[int, bytes]:
+        """Handle one request; returns (HTTP status, JSON body)."""
+        if method == "GET" and parts == ["torrents"]:
+            return 200, self.feed.encoded(None)
+        if method == "GET" and parts == ["status"]:
+            try:
+                since = int(query.get("since", ["0"])[0])
+                timeout = min(float(query.get("timeout", [DEFAULT_POLL_TIMEOUT_S])[0]), MAX_POLL_TIMEOUT_S)
+            except ValueError:
+                raise ApiError(400, "since must be an integer and timeout a number") from None
+            if since == self.feed.version:
+                self.feed.wait(since, max(timeout, 0.0))
+            return 200, self.feed.encoded(since)
+        if method == "POST" and parts == ["torrents"]:
+            body = read_body()
+            if content_type.split(";")[0].strip() == "application/x-bittorrent":
+                if not body:
+                    raise ApiError(400, "empty torrent file")
+                self._run(lambda manager: _add_torrent_data(manager, body))
+            else:
+                _require_json(content_type)
+                try:
+                    magnet = json.loads(body or b"{}").get("magnet")
+                except (ValueError, AttributeError):
+                    raise ApiError(400, "body must be a JSON object") from None
+                if not isinstance(magnet, str) or not magnet.startswith("magnet:?"):
+                    raise ApiError(400, "magnet must be a magnet link")
+                self._run(lambda manager: manager.add_magnet(magnet))
+            return 201, b'{"ok": true}'
+        if len(parts) == 3 and parts[0] == "torrents" and method == "POST" and parts[2] in ("pause", "resume"):
+            info_hash, action = parts[1].lower(), parts[2]
+            done = self._run(lambda manager: getattr(manager, f"{action}_at")(_index_of(manager, info_hash)))
+            return 200, json.dumps({'ok': bool(done)}).encode('utf-8')
+        if len(parts) == 2 and parts[0] == "torrents" and method == "DELETE":
+            info_hash = parts[1].lower()
+            delete_files = query.get("delete_files", ["0"])[0] in ("1", "true")
+            done = self._run(lambda manager: manager.remove_at(_index_of(manager, info_hash),
+                                                               delete_files=delete_files))
+            return 200, json.dumps({'ok': bool(done)}).encode('utf-8')
+        if method == "POST" and parts == ["create"]:
+            if not self.create_roots:
+                raise ApiError(403, "creating torrents needs a configured token and download directory")
+            _require_json(content_type)
+            args = _parse_create(read_body(), self.create_roots)
+            seed = args.pop('seed')
+            # Hashing runs on this request's thread; only the add goes through the queue.
+            result = create_torrent(**args)
+            if seed:
+                self._run(lambda manager: manager.add_torrent_file(result.output, save_path=result.save_path,
+                                                                   seed_mode=True))
+            return 201, json.dumps(asdict(result)).encode('utf-8')
+        raise ApiError(404, f"no route for {method} /{'/'.join(parts)}")
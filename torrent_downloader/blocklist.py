@@ -0,0 +1,284 @@
+"""IP blocklists: streaming parser, range merging and a compiled binary cache.
+
+Supported line formats (detected per line, so lists can be mixed):
+
+* P2P / PeerGuardian: ``Some description:1.2.3.0-1.2.3.255``
+* DAT / eMule ``ipfilter.dat``: ``001.002.003.000 - 001.002.003.255 , 000 , desc``
+  (entries with an access level of 128 or more allow rather than block)
+* CIDR: ``1.2.3.0/24`` or ``2001:db8::/32``, a plain range ``a - b`` or a
+  single address
+
+Files may be gzip compressed. Ranges are merged (overlapping and adjacent
+ones joined) and kept as sorted arrays of integers per address family.
+
+Parsing millions of lines takes seconds, so ``load_blocklist`` stores the
+compiled result under ``util.get_cache_dir()`` keyed by the SHA-256 of the
+source file; later start-ups read the arrays straight from the cache.
+"""
+
+from array import array
+from dataclasses import dataclass, field
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
+import bisect
+import glob
+import gzip
+import hashlib
+import ipaddress
+import logging
+import os
+import socket
+import struct
+import sys
+import time
+
+from . import util
+
+CACHE_VERSION = 1
+_MAGIC = b"TDBL"
+_HEADER = struct.Struct("<4sHxxII")  # magic, cache version, IPv4 ranges, IPv6 ranges
+DAT_ALLOW_LEVEL = 128  # eMule: entries at or above this level are not blocked
+
+Range = Tuple[int, int]  # first and last address, inclusive
+
+
+@dataclass
+class ParseStats:
+    lines: int = 0
+    ranges: int = 0  # blocking ranges before merging
+    malformed: int = 0
+
+
+@dataclass
+class Blocklist:
+    """Merged, sorted address ranges (inclusive) per family."""
+    starts4: array = field(default_factory=lambda: array("I"))
+    ends4: array = field(default_factory=lambda: array("I"))
+    starts6: List[int] = field(default_factory=list)
+    ends6: List[int] = field(default_factory=list)
+    from_cache: bool = False
+
+    def __len__(self) -> int:
+        return len(self.starts4) + len(self.starts6)
+
+    def blocked(self, address: str) -> bool:
+        """Whether ``address`` falls into a range (bisect over the sorted starts)."""
+        ip = ipaddress.ip_address(address)
+        starts, ends = (self.starts4, self.ends4) if ip.version == 4 else (self.starts6, self.ends6)
+        value = int(ip)
+        i = bisect.bisect_right(starts, value) - 1
+        return i >= 0 and value <= ends[i]
+
+    def address_ranges(self) -> Iterator[Tuple[str, str]]:
+        """(first, last) address strings of every range, IPv4 first."""
+        pack = struct.Struct(">I").pack
+        for first, last in zip(self.starts4, self.ends4):
+            yield socket.inet_ntoa(pack(first)), socket.inet_ntoa(pack(last))
+        for first, last in zip(self.starts6, self.ends6):
+            yield str(ipaddress.IPv6Address(first)), str(ipaddress.IPv6Address(last))
+
+
+# --- Parsing ----------------------------------------------------------------
+
+def _ipv4(text: str) -> int:
+    """Dotted quad to int; tolerates the zero padding of DAT files ("001.009.096.105")."""
+    parts = text.split(".")
+    if len(parts) != 4:
+        raise ValueError(text)
+    value = 0
+    for part in parts:
+        octet = int(part)
+        if not 0 <= octet <= 255:
+            raise ValueError(text)
+        value = (value << 8) | octet
+    return value
+
+
+def _address(text: str) -> Tuple[int, int]:
+    """(family, int) of an address string."""
+    text = text.strip()
+    if ":" in text:
+        return 6, int(ipaddress.IPv6Address(text))
+    return 4, _ipv4(text)
+
+
+def _range(first: str, last: str) -> Tuple[int, int, int]:
+    family, start = _address(first)
+    family_last, end = _address(last)
+    if family != family_last or end < start:
+        raise ValueError(f"{first} - {last}")
+    return family, start, end
+
+
+def _dat_entry(line: str) -> Optional[Tuple[int, int, int]]:
+    addresses, _, rest = line.partition(",")
+    level = rest.partition(",")[0].strip()
+    first, _, last = addresses.partition("-")
+    entry = _range(first, last)
+    if level and int(level) >= DAT_ALLOW_LEVEL:
+        return None
+    return entry
+
+
+def parse_line(line: str) -> Optional[Tuple[int, int, int]]:
+    """(family, first, last) of a blocking entry, None for comments, blanks and allow entries.
+
+    Raises ``ValueError`` for lines that can't be parsed.
+    """
+    line = line.strip()
+    if not line or line.startswith(("#", "//")):
+        return None
+    if "," in line:  # DAT: "first - last , level , description"
+        try:
+            return _dat_entry(line)
+        except ValueError:  # a P2P description with a comma
+            pass
+    _head, sep, tail = line.rpartition(":")
+    if sep and "-" in tail and "." in tail:  # P2P: "description:first-last" (IPv4 only)
+        first, _, last = tail.partition("-")
+        return _range(first, last)
+    if "/" in line:  # CIDR
+        network = ipaddress.ip_network(line.split()[0], strict=False)
+        return network.version, int(network.network_address), int(network.broadcast_address)
+    if "-" in line:
+        first, _, last = line.partition("-")
+        return _range(first, last)
+    family, value = _address(line)
+    return family, value, value
+
+
+def parse_lines(lines: Iterable[str], stats: Optional[ParseStats] = None) -> Iterator[Tuple[int, int, int]]:
+    """Stream the blocking entries of ``lines``; malformed lines are counted and skipped."""
+    stats = stats if stats is not None else ParseStats()
+    for line in lines:
+        stats.lines += 1
+        try:
+            entry = parse_line(line)
+        except ValueError:
+            stats.malformed += 1
+            continue
+        if entry is not None:
+            stats.ranges += 1
+            yield entry
+
+
+def merge_ranges(ranges: Iterable[Range]) -> List[Range]:
+    """Sort ``ranges`` and join overlapping and adjacent ones."""
+    merged: List[Range] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _open_text(path: str) -> IO[str]:
+    with open(path, "rb") as f:
+        gzipped = f.read(2) == b"\x1f\x8b"
+    if gzipped:
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, "r", encoding="utf-8", errors="replace")
+
+
+def compile_blocklist(path: str, stats: Optional[ParseStats] = None) -> Blocklist:
+    """Parse and merge the list at ``path``."""
+    ranges4: List[Range] = []
+    ranges6: List[Range] = []
+    with _open_text(path) as f:
+        for family, start, end in parse_lines(f, stats):
+            (ranges4 if family == 4 else ranges6).append((start, end))
+    blocklist = Blocklist()
+    merged4 = merge_ranges(ranges4)
+    del ranges4
+    blocklist.starts4 = array("I", (start for start, _end in merged4))
+    blocklist.ends4 = array("I", (end for _start, end in merged4))
+    merged6 = merge_ranges(ranges6)
+    blocklist.starts6 = [start for start, _end in merged6]
+    blocklist.ends6 = [end for _start, end in merged6]
+    return blocklist
+
+
+# --- Binary cache -----------------------------------------------------------
+
+def _le(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_le(data: bytes) -> array:
+    values = array("I")
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def write_cache(blocklist: Blocklist, path: str) -> None:
+    """Write ``blocklist`` to ``path`` atomically."""
+    tmp = f"{path}.{os.getpid()}.tmp"  # shard workers may compile the same list at once
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, CACHE_VERSION, len(blocklist.starts4), len(blocklist.starts6)))
+        f.write(_le(blocklist.starts4))
+        f.write(_le(blocklist.ends4))
+        for value in blocklist.starts6 + blocklist.ends6:
+            f.write(value.to_bytes(16, "big"))
+    os.replace(tmp, path)
+
+
+def read_cache(path: str) -> Blocklist:
+    """Read a cache written by ``write_cache``; raises ``ValueError`` if it is not one."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < _HEADER.size:
+        raise ValueError(f"truncated blocklist cache {path}")
+    magic, version, count4, count6 = _HEADER.unpack_from(data)
+    if magic != _MAGIC or version != CACHE_VERSION or len(data) != _HEADER.size + count4 * 8 + count6 * 32:
+        raise ValueError(f"not a blocklist cache (version {CACHE_VERSION}): {path}")
+    offset = _HEADER.size
+    starts4 = _from_le(data[offset:offset + count4 * 4])
+    ends4 = _from_le(data[offset + count4 * 4:offset + count4 * 8])
+    offset += count4 * 8
+    v6 = [int.from_bytes(data[i:i + 16], "big") for i in range(offset, len(data), 16)]
+    return Blocklist(starts4, ends4, v6[:count6], v6[count6:], from_cache=True)
+
+
+def cache_path(source: str, cache_dir: Optional[str] = None) -> str:
+    """Cache file of ``source``, named after its content hash."""
+    with open(source, "rb") as f:
+        digest = hashlib.file_digest(f, "sha256").hexdigest()
+    return os.path.join(cache_dir or util.get_cache_dir(), f"blocklist-{digest[:32]}.v{CACHE_VERSION}.bin")
+
+
+def load_blocklist(source: str, cache_dir: Optional[str] = None) -> Blocklist:
+    """Load ``source`` from its compiled cache, compiling (and caching) it first if needed.
+
+    Caches of other source contents are deleted, so only the current list
+    takes up space.
+    """
+    assert isinstance(source, str) and source, "source must be a non-empty string"
+    start = time.perf_counter()
+    path = cache_path(source, cache_dir)
+    if os.path.exists(path):
+        try:
+            blocklist = read_cache(path)
+            logging.info("Loaded %d blocked ranges from %s in %.0f ms", len(blocklist), path,
+                         (time.perf_counter() - start) * 1000)
+            return blocklist
+        except (OSError, ValueError) as e:
+            logging.warning("Ignoring blocklist cache: %s", e)
+    stats = ParseStats()
+    blocklist = compile_blocklist(source, stats)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        for old in glob.glob(os.path.join(os.path.dirname(path), "blocklist-*.bin")):
+            if old != path:
+                os.remove(old)
+        write_cache(blocklist, path)
+    except OSError as e:
+        logging.error("Failed to write blocklist cache %s: %s", path, e)
+    logging.info("Compiled %s: %d lines, %d ranges merged into %d, %d malformed lines, %.1f s", source,
+                 stats.lines, stats.ranges, len(blocklist), stats.malformed, time.perf_counter() - start)
+    return blocklist
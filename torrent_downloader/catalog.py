@@ -0,0 +1,310 @@
+"""SQLite catalog of the torrents in a session (one row per torrent).
+
+Replaces the monolithic bencoded resume list: each torrent's resume data,
+save path, timestamps, rate limits, file priorities, seeding policy and
+labels live in their own row of an SQLite database in WAL mode. Torrents
+the manager itself paused (held for disk space, queued for a recheck) are
+recorded in ``holds`` with the flags to give back, since the paused state
+also ends up in their resume data. Saving
+only touches the rows that changed (batched into one transaction) and
+queries go through indexes, so they cost what they return rather than the
+size of the library.
+
+The catalog only stores bytes and plain values; encoding resume data is
+left to the ``TorrentManager``.
+"""
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+from .seeding import SeedingPolicy
+
+SCHEMA_VERSION = 1
+UNLIMITED = -1  # libtorrent's "no rate limit"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS torrents (
+    info_hash TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    resume BLOB,
+    save_path TEXT,
+    added_at REAL,
+    completed_at REAL,
+    download_limit INTEGER NOT NULL DEFAULT -1,
+    upload_limit INTEGER NOT NULL DEFAULT -1,
+    file_priorities TEXT NOT NULL DEFAULT '[]',
+    seeding_policy TEXT
+);
+CREATE INDEX IF NOT EXISTS torrents_by_position ON torrents(position);
+CREATE INDEX IF NOT EXISTS torrents_by_completed ON torrents(completed_at);
+CREATE TABLE IF NOT EXISTS labels (
+    label TEXT NOT NULL,
+    info_hash TEXT NOT NULL REFERENCES torrents(info_hash) ON DELETE CASCADE,
+    PRIMARY KEY (label, info_hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS labels_by_torrent ON labels(info_hash);
+CREATE TABLE IF NOT EXISTS holds (
+    kind TEXT NOT NULL,
+    info_hash TEXT NOT NULL REFERENCES torrents(info_hash) ON DELETE CASCADE,
+    was_paused INTEGER NOT NULL,
+    was_auto_managed INTEGER NOT NULL,
+    seq INTEGER NOT NULL DEFAULT 0,
+    priority INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, info_hash)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value BLOB
+);
+"""
+
+_ENTRY_COLUMNS = ("info_hash, name, save_path, added_at, completed_at, download_limit, upload_limit, "
+                  "file_priorities, seeding_policy")
+
+
+@dataclass
+class CatalogEntry:
+    """A catalog row without its resume data (listing queries don't need it)."""
+    info_hash: str
+    name: str = ""
+    save_path: Optional[str] = None  # None: follows the download directory
+    added_at: Optional[float] = None  # unix time
+    completed_at: Optional[float] = None  # None until finished
+    download_limit: int = UNLIMITED  # bytes/s
+    upload_limit: int = UNLIMITED
+    file_priorities: List[int] = field(default_factory=list)
+    seeding_policy: Optional[SeedingPolicy] = None  # None: the global policy applies
+
+
+@dataclass
+class ResumeRow:
+    """What a resume data save writes for one torrent."""
+    info_hash: str
+    resume: bytes
+    name: str = ""
+    added_at: Optional[float] = None
+    completed_at: Optional[float] = None
+    download_limit: int = UNLIMITED
+    upload_limit: int = UNLIMITED
+    file_priorities: List[int] = field(default_factory=list)
+
+
+@dataclass
+class Hold:
+    """A torrent paused and taken out of auto-management by the manager, with what to restore."""
+    info_hash: str
+    was_paused: bool
+    was_auto_managed: bool
+    seq: int = 0  # order within its kind
+    priority: int = 0
+
+
+def _entry(row: Tuple) -> CatalogEntry:
+    policy = SeedingPolicy.from_dict(json.loads(row[8])) if row[8] else None
+    return CatalogEntry(info_hash=row[0], name=row[1], save_path=row[2], added_at=row[3], completed_at=row[4],
+                        download_limit=row[5], upload_limit=row[6], file_priorities=json.loads(row[7]),
+                        seeding_policy=policy)
+
+
+class TorrentCatalog:
+    """Torrent rows in an SQLite database (WAL mode).
+
+    The connection is shared by the threads that use the manager (it is
+    created on the start-up thread), guarded by a lock.
+    """
+
+    def __init__(self, path: str):
+        assert isinstance(path, str) and path, "path must be a non-empty string"
+        self.path = path
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints; WAL keeps it consistent
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        with self.transaction() as conn:
+            for statement in _SCHEMA.split(";"):  # executescript() would commit the transaction
+                if statement.strip():
+                    conn.execute(statement)
+            self.created = self.get_meta("schema_version") is None
+            if self.created:
+                self.set_meta("schema_version", str(SCHEMA_VERSION).encode())
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Group writes into one transaction (nested calls join the outer one)."""
+        with self._lock:
+            if self._conn.in_transaction:
+                yield self._conn
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    # --- Meta -----------------------------------------------------------------
+    def get_meta(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return None if row is None else bytes(row[0])
+
+    def set_meta(self, key: str, value: bytes) -> None:
+        with self.transaction() as conn:
+            conn.execute("INSERT INTO meta(key, value) VALUES (?, ?) "
+                         "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (key, value))
+
+    # --- Writes ---------------------------------------------------------------
+    def _ensure(self, conn: sqlite3.Connection, info_hash: str) -> None:
+        conn.execute("INSERT INTO torrents(info_hash, position) "
+                     "VALUES (?, (SELECT COALESCE(MAX(position), -1) + 1 FROM torrents)) "
+                     "ON CONFLICT(info_hash) DO NOTHING", (info_hash,))
+
+    def put_resume(self, rows: Iterable[ResumeRow]) -> int:
+        """Store resume data of several torrents in one transaction; returns the row count."""
+        count = 0
+        with self.transaction() as conn:
+            for row in rows:
+                assert isinstance(row.resume, bytes), "resume must be bytes"
+                self._ensure(conn, row.info_hash)
+                conn.execute("UPDATE torrents SET resume = ?, name = ?, added_at = COALESCE(?, added_at), "
+                             "completed_at = ?, download_limit = ?, upload_limit = ?, file_priorities = ? "
+                             "WHERE info_hash = ?",
+                             (row.resume, row.name, row.added_at, row.completed_at, row.download_limit,
+                              row.upload_limit, json.dumps(row.file_priorities), row.info_hash))
+                count += 1
+        return count
+
+    def set_save_path(self, info_hash: str, save_path: Optional[str]) -> None:
+        """Own save path of a torrent (None: follow the download directory)."""
+        with self.transaction() as conn:
+            self._ensure(conn, info_hash)
+            conn.execute("UPDATE torrents SET save_path = ? WHERE info_hash = ?", (save_path, info_hash))
+
+    def set_seeding_policy(self, info_hash: str, policy: Optional[SeedingPolicy]) -> None:
+        encoded = None if policy is None else json.dumps(policy.to_dict())
+        with self.transaction() as conn:
+            self._ensure(conn, info_hash)
+            conn.execute("UPDATE torrents SET seeding_policy = ? WHERE info_hash = ?", (encoded, info_hash))
+
+    def set_labels(self, info_hash: str, labels: Sequence[str]) -> None:
+        assert all(isinstance(label, str) and label for label in labels), "labels must be non-empty strings"
+        with self.transaction() as conn:
+            self._ensure(conn, info_hash)
+            conn.execute("DELETE FROM labels WHERE info_hash = ?", (info_hash,))
+            conn.executemany("INSERT OR IGNORE INTO labels(label, info_hash) VALUES (?, ?)",
+                             [(label, info_hash) for label in labels])
+
+    def set_hold(self, kind: str, hold: Hold) -> None:
+        with self.transaction() as conn:
+            self._ensure(conn, hold.info_hash)
+            conn.execute("INSERT OR REPLACE INTO holds(kind, info_hash, was_paused, was_auto_managed, seq, priority) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", (kind, hold.info_hash, int(hold.was_paused),
+                                                       int(hold.was_auto_managed), hold.seq, hold.priority))
+
+    def clear_hold(self, kind: str, info_hash: str) -> None:
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM holds WHERE kind = ? AND info_hash = ?", (kind, info_hash))
+
+    def delete(self, info_hash: str) -> bool:
+        """Forget a torrent (its labels go with it); False if it was unknown."""
+        with self.transaction() as conn:
+            return conn.execute("DELETE FROM torrents WHERE info_hash = ?", (info_hash,)).rowcount > 0
+
+    # --- Reads ----------------------------------------------------------------
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM torrents").fetchone()[0]
+
+    def __contains__(self, info_hash: object) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM torrents WHERE info_hash = ?",
+                                      (info_hash,)).fetchone() is not None
+
+    def iter_resume(self, batch_size: int = 256) -> Iterator[Tuple[str, bytes]]:
+        """(info-hash, resume data) of every saved torrent in list order, fetched in batches."""
+        last = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute("SELECT position, info_hash, resume FROM torrents "
+                                          "WHERE position > ? AND resume IS NOT NULL ORDER BY position LIMIT ?",
+                                          (last, batch_size)).fetchall()
+            for _position, info_hash, resume in rows:
+                yield info_hash, bytes(resume)
+            if len(rows) < batch_size:
+                return
+            last = rows[-1][0]
+
+    def resume_keys(self) -> Set[str]:
+        """Info-hashes that have resume data."""
+        with self._lock:
+            rows = self._conn.execute("SELECT info_hash FROM torrents WHERE resume IS NOT NULL").fetchall()
+        return {r[0] for r in rows}
+
+    def get(self, info_hash: str) -> Optional[CatalogEntry]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_ENTRY_COLUMNS} FROM torrents WHERE info_hash = ?",
+                                     (info_hash,)).fetchone()
+        return None if row is None else _entry(row)
+
+    def entries(self, *, label: Optional[str] = None, completed: Optional[bool] = None,
+                limit: int = -1, offset: int = 0) -> List[CatalogEntry]:
+        """Rows in list order, optionally only those with ``label`` or (not) completed."""
+        query = f"SELECT {_ENTRY_COLUMNS} FROM torrents"
+        where: List[str] = []
+        params: List[object] = []
+        if label is not None:
+            where.append("info_hash IN (SELECT info_hash FROM labels WHERE label = ?)")
+            params.append(label)
+        if completed is not None:
+            where.append("completed_at IS NOT NULL" if completed else "completed_at IS NULL")
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY position LIMIT ? OFFSET ?"
+        with self._lock:
+            rows = self._conn.execute(query, (*params, limit, offset)).fetchall()
+        return [_entry(row) for row in rows]
+
+    def labels_of(self, info_hash: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT label FROM labels WHERE info_hash = ? ORDER BY label",
+                                      (info_hash,)).fetchall()
+        return [r[0] for r in rows]
+
+    def save_paths(self) -> Dict[str, str]:
+        """info-hash -> save path of torrents that don't follow the download directory."""
+        with self._lock:
+            rows = self._conn.execute("SELECT info_hash, save_path FROM torrents WHERE save_path IS NOT NULL")
+            return dict(rows.fetchall())
+
+    def holds(self, kind: str) -> List[Hold]:
+        """Torrents held by ``kind`` (e.g. "space"), in the order they were held."""
+        with self._lock:
+            rows = self._conn.execute("SELECT info_hash, was_paused, was_auto_managed, seq, priority FROM holds "
+                                      "WHERE kind = ? ORDER BY seq", (kind,)).fetchall()
+        return [Hold(row[0], bool(row[1]), bool(row[2]), row[3], row[4]) for row in rows]
+
+    def seeding_policies(self) -> Dict[str, SeedingPolicy]:
+        with self._lock:
+            rows = self._conn.execute("SELECT info_hash, seeding_policy FROM torrents "
+                                      "WHERE seeding_policy IS NOT NULL").fetchall()
+        policies: Dict[str, SeedingPolicy] = {}
+        for info_hash, encoded in rows:
+            try:
+                policies[info_hash] = SeedingPolicy.from_dict(json.loads(encoded))
+            except Exception as e:
+                logging.error("Ignoring bad seeding policy of %s: %s", info_hash, e)
+        return policies
@@ -1,26 +1,348 @@
+"""Persistent application settings.
+
+All tunables live in one JSON file described by ``SCHEMA``. A ``ConfigStore``
+caches the parsed file in memory, validates values against the schema,
+writes atomically (temp file + ``os.replace``) and notifies subscribers with
+the changed keys so the session, the GUI poller and logging can apply new
+values without a restart.
+
+The module level ``save_*`` / ``load_*`` helpers are kept as thin wrappers
+around the process wide ``STORE``.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 import json
+import logging
 import os
-from typing import Optional
+import threading
 
 from . import util
+from .peerclass import PeerClasses, PeerClassRule
+from .postprocess import DEFAULT_WORKERS, LINK_HARDLINK, LINK_MODES, PostProcessSettings
+from .seeding import ACTION_PAUSE, ACTIONS, SeedingPolicy
+
+SCHEMA_VERSION = 1
+VERSION_KEY = "schema_version"
+
+Subscriber = Callable[[Dict[str, Any]], None]
+
+# libtorrent choking_algorithm_t / seed_choking_algorithm_t values by name.
+CHOKERS = {'fixed_slots': 0, 'rate_based': 2}
+SEED_CHOKERS = {'round_robin': 0, 'fastest_upload': 1, 'anti_leech': 2}
+_SESSION_VALUES = {'choking_algorithm': CHOKERS, 'seed_choking_algorithm': SEED_CHOKERS}
+
+
+@dataclass(frozen=True)
+class Setting:
+    kind: type
+    default: Any
+    optional: bool = False  # None is a valid value
+    minimum: Optional[int] = None  # for int settings
+    maximum: Optional[int] = None
+    description: str = ""
+    choices: Optional[Tuple[str, ...]] = None  # for str settings
+
+
+SCHEMA: Dict[str, Setting] = {
+    'download_directory': Setting(str, None, optional=True, description="Default save path for new torrents"),
+    'log_level': Setting(str, None, optional=True, description="Root log level name, e.g. INFO"),
+    'disk_preset': Setting(str, 'default', description="Disk I/O preset (see disk.DISK_PRESETS)"),
+    'full_allocation': Setting(bool, False, description="Pre-allocate files of new torrents"),
+    'low_memory': Setting(bool, False, description="Cap libtorrent memory use and trim cached state"),
+    'disk_reserve_mb': Setting(int, 512, optional=True, minimum=0,
+                               description="Hold torrents that would leave less free disk space (None = no check)"),
+    'poll_interval_ms': Setting(int, 1000, minimum=100, description="GUI refresh interval"),
+    'max_name_len': Setting(int, 50, minimum=10, description="Name column truncation length"),
+    'download_rate_limit': Setting(int, 0, minimum=0, description="Session download limit in bytes/s (0 = none)"),
+    'upload_rate_limit': Setting(int, 0, minimum=0, description="Session upload limit in bytes/s (0 = none)"),
+    'session': Setting(dict, {}, description="Extra libtorrent settings_pack overrides"),
+    'shards': Setting(int, 1, minimum=1, description="Session worker processes (restart to apply)"),
+    'seed_ratio_limit_percent': Setting(int, 0, minimum=0, description="Stop seeding at this ratio x100 (0 = none)"),
+    'seed_time_limit_min': Setting(int, 0, minimum=0, description="Stop seeding after minutes (0 = none)"),
+    'seed_idle_limit_min': Setting(int, 0, minimum=0, description="Stop seeding after idle minutes (0 = none)"),
+    'seed_limit_action': Setting(str, ACTION_PAUSE, choices=ACTIONS, description="What to do at a seeding limit"),
+    'prioritize_underseeded': Setting(bool, False, description="Limit upload slots in well seeded swarms"),
+    'choking_algorithm': Setting(str, 'fixed_slots', choices=tuple(CHOKERS), description="Unchoke slot policy"),
+    'seed_choking_algorithm': Setting(str, 'round_robin', choices=tuple(SEED_CHOKERS),
+                                      description="Which peers seeding torrents unchoke"),
+    'api_port': Setting(int, 0, minimum=0, maximum=65535, description="Local HTTP API port on 127.0.0.1 (0 = off)"),
+    'api_token': Setting(str, None, optional=True, description="Bearer token required by the HTTP API (generated when unset)"),
+    'blocklist_path': Setting(str, None, optional=True,
+                              description="IP blocklist file in P2P, DAT or CIDR format, may be gzipped"),
+    'lan_unthrottled': Setting(bool, True, description="Exempt local network peers from the rate limits"),
+    'peer_classes': Setting(dict, {}, description="Rate limited IP ranges: name -> {networks, upload_limit, "
+                                                  "download_limit} (bytes/s, 0 = none)"),
+    'postprocess_verify': Setting(bool, False, description="Check checksum manifests of finished torrents"),
+    'postprocess_library': Setting(str, None, optional=True,
+                                   description="Link finished torrents into this folder (None = off)"),
+    'postprocess_link_mode': Setting(str, LINK_HARDLINK, choices=LINK_MODES,
+                                     description="How payloads get into the library"),
+    'postprocess_extract': Setting(bool, False, description="Unpack zip/tar archives of finished torrents"),
+    'postprocess_script': Setting(str, None, optional=True,
+                                  description="Command run for finished torrents (payload path appended)"),
+    'postprocess_workers': Setting(int, DEFAULT_WORKERS, minimum=1, maximum=16,
+                                   description="Post-processing worker processes"),
+}
+
+# Settings forwarded to libtorrent's settings_pack under the same name.
+SESSION_KEYS = ('download_rate_limit', 'upload_rate_limit', 'choking_algorithm', 'seed_choking_algorithm')
+# Settings read by the seeding policy engine.
+SEEDING_KEYS = ('seed_ratio_limit_percent', 'seed_time_limit_min', 'seed_idle_limit_min', 'seed_limit_action',
+                'prioritize_underseeded')
+# Settings of the post-processing pipeline.
+POSTPROCESS_KEYS = ('postprocess_verify', 'postprocess_library', 'postprocess_link_mode', 'postprocess_extract',
+                    'postprocess_script', 'postprocess_workers')
+
 
 def get_config_file_path() -> str:
     """Returns the path to the config file."""
     return os.path.join(util.get_app_data_dir(), "config.json")
 
+
+def validate(key: str, value: Any) -> Any:
+    """Return ``value`` checked against the schema entry for ``key``.
+
+    Raises ``ValueError`` for values of the wrong type or below the minimum.
+    """
+    assert key in SCHEMA, f"unknown setting: {key}"
+    setting = SCHEMA[key]
+    if value is None and setting.optional:
+        return None
+    # bool is an int subclass; don't let True pass as a number (or vice versa)
+    if not isinstance(value, setting.kind) or (setting.kind is int and isinstance(value, bool)):
+        raise ValueError(f"{key} must be of type {setting.kind.__name__}, got {value!r}")
+    if setting.kind is str and not value:
+        raise ValueError(f"{key} must be a non-empty string")
+    if setting.choices is not None and value not in setting.choices:
+        raise ValueError(f"{key} must be one of {', '.join(setting.choices)}, got {value!r}")
+    if setting.minimum is not None and value < setting.minimum:
+        raise ValueError(f"{key} must be >= {setting.minimum}, got {value}")
+    if setting.maximum is not None and value > setting.maximum:
+        raise ValueError(f"{key} must be <= {setting.maximum}, got {value}")
+    if setting.kind is dict:
+        return dict(value)
+    return value
+
+
+def _migrate(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Bring a parsed config file up to ``SCHEMA_VERSION``.
+
+    Version 0 is the unversioned flat file written before the schema existed;
+    its keys are a subset of version 1, so only the version is stamped.
+    """
+    version = raw.get(VERSION_KEY, 0)
+    if not isinstance(version, int) or version > SCHEMA_VERSION:
+        logging.warning("Config schema version %r is newer than supported (%d), reading known keys",
+                        version, SCHEMA_VERSION)
+    raw = dict(raw)
+    raw[VERSION_KEY] = SCHEMA_VERSION
+    return raw
+
+
+class ConfigStore:
+    """Cached, validated, atomically written settings with change notifications."""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        assert path is None or (isinstance(path, str) and path), "path must be None or a non-empty string"
+        self._fixed_path = path
+        self._lock = threading.RLock()
+        self._cache_path: Optional[str] = None
+        self._raw: Dict[str, Any] = {}  # file contents, including unknown keys
+        self._subscribers: List[Tuple[Optional[frozenset], Subscriber]] = []
+
+    @property
+    def path(self) -> str:
+        return self._fixed_path or get_config_file_path()
+
+    def _data(self) -> Dict[str, Any]:
+        """Return the cached file contents, (re)reading when the path changed."""
+        path = self.path
+        if self._cache_path != path:
+            self._raw = self._read(path)
+            self._cache_path = path
+        return self._raw
+
+    @staticmethod
+    def _read(path: str) -> Dict[str, Any]:
+        if not os.path.exists(path):
+            return {VERSION_KEY: SCHEMA_VERSION}
+        try:
+            with open(path, "r") as f:
+                raw = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error("Failed to read config file %s: %s", path, e)
+            return {VERSION_KEY: SCHEMA_VERSION}
+        if not isinstance(raw, dict):
+            logging.error("Ignoring config file %s: not a JSON object", path)
+            return {VERSION_KEY: SCHEMA_VERSION}
+        return _migrate(raw)
+
+    def _write(self, path: str, raw: Dict[str, Any]) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(raw, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+
+    def get(self, key: str) -> Any:
+        """Return the value of ``key`` or its default (invalid stored values fall back too)."""
+        assert key in SCHEMA, f"unknown setting: {key}"
+        with self._lock:
+            data = self._data()
+            if key not in data:
+                return validate(key, SCHEMA[key].default)
+            try:
+                return validate(key, data[key])
+            except ValueError as e:
+                logging.warning("Invalid config value, using default: %s", e)
+                return validate(key, SCHEMA[key].default)
+
+    def values(self) -> Dict[str, Any]:
+        """All settings (stored or default)."""
+        with self._lock:
+            return {key: self.get(key) for key in SCHEMA}
+
+    def set(self, **values: Any) -> Dict[str, Any]:
+        """Validate, persist and publish ``values``; returns the keys that changed.
+
+        Nothing is written if any value is invalid.
+        """
+        changed: Dict[str, Any] = {}
+        with self._lock:
+            checked = {key: validate(key, value) for key, value in values.items()}
+            for key, value in checked.items():
+                if self.get(key) != value:
+                    changed[key] = value
+            if not changed:
+                return {}
+            path = self.path
+            raw = dict(self._data())
+            raw.update(changed)
+            raw[VERSION_KEY] = SCHEMA_VERSION
+            self._write(path, raw)
+            self._raw, self._cache_path = raw, path
+            subscribers = list(self._subscribers)
+        self._notify(subscribers, changed)
+        return changed
+
+    def reload(self) -> Dict[str, Any]:
+        """Re-read the file (e.g. after an external edit) and publish differences."""
+        with self._lock:
+            before = self.values()
+            self._cache_path = None
+            changed = {key: value for key, value in self.values().items() if before[key] != value}
+            subscribers = list(self._subscribers)
+        if changed:
+            self._notify(subscribers, changed)
+        return changed
+
+    def subscribe(self, callback: Subscriber, keys: Optional[Iterable[str]] = None) -> Callable[[], None]:
+        """Call ``callback(changed)`` after changes to ``keys`` (all when None).
+
+        Callbacks run on the thread that called ``set``/``reload``. Returns a
+        function that removes the subscription.
+        """
+        assert callable(callback), "callback must be callable"
+        key_set = None if keys is None else frozenset(keys)
+        assert key_set is None or key_set <= set(SCHEMA), "keys must be known settings"
+        entry = (key_set, callback)
+        with self._lock:
+            self._subscribers.append(entry)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+        return unsubscribe
+
+    @staticmethod
+    def _notify(subscribers: List[Tuple[Optional[frozenset], Subscriber]], changed: Dict[str, Any]) -> None:
+        for key_set, callback in subscribers:
+            relevant = changed if key_set is None else {k: v for k, v in changed.items() if k in key_set}
+            if not relevant:
+                continue
+            try:
+                callback(relevant)
+            except Exception as e:  # a broken subscriber must not stop the others
+                logging.error("Config subscriber %r failed: %s", callback, e)
+
+    def session_settings(self) -> Dict[str, Any]:
+        """libtorrent settings derived from the config (rate limits, chokers + overrides)."""
+        settings = {key: self.get(key) for key in SESSION_KEYS}
+        for key, names in _SESSION_VALUES.items():
+            settings[key] = names[settings[key]]
+        settings.update(self.get('session'))
+        return settings
+
+    def seeding_policy(self) -> SeedingPolicy:
+        """Global seeding policy from the ``seed_*`` settings (0 disables a limit)."""
+        ratio = self.get('seed_ratio_limit_percent')
+        seed_min = self.get('seed_time_limit_min')
+        idle_min = self.get('seed_idle_limit_min')
+        return SeedingPolicy(ratio_limit=ratio / 100 if ratio else None,
+                             seed_time_limit_s=seed_min * 60 if seed_min else None,
+                             idle_time_limit_s=idle_min * 60 if idle_min else None,
+                             action=self.get('seed_limit_action'))
+
+    def peer_classes(self) -> PeerClasses:
+        """Peer class setup from ``lan_unthrottled`` and ``peer_classes``; invalid classes are skipped."""
+        rules = []
+        for name, data in sorted(self.get('peer_classes').items()):
+            try:
+                rules.append(PeerClassRule.from_dict(name, data))
+            except (TypeError, ValueError) as e:
+                logging.error("Ignoring peer class %s: %s", name, e)
+        return PeerClasses(local_unthrottled=self.get('lan_unthrottled'), rules=tuple(rules))
+
+    def disk_reserve(self) -> Optional[int]:
+        """Bytes kept free by disk-space admission control (None = off)."""
+        reserve_mb = self.get('disk_reserve_mb')
+        return None if reserve_mb is None else reserve_mb * 1024 * 1024
+
+    def postprocess_settings(self) -> PostProcessSettings:
+        """Stages run for finished torrents, from the ``postprocess_*`` settings."""
+        return PostProcessSettings(verify=self.get('postprocess_verify'),
+                                   library_dir=self.get('postprocess_library'),
+                                   link_mode=self.get('postprocess_link_mode'),
+                                   extract=self.get('postprocess_extract'),
+                                   script=self.get('postprocess_script'),
+                                   workers=self.get('postprocess_workers'))
+
+
+# Process wide store backing the helpers below.
+STORE = ConfigStore()
+
+
 def save_download_directory(path: str) -> None:
     """Saves the download directory to the config file."""
     assert isinstance(path, str) and path, "path must be a non-empty string"
-    config = {"download_directory": path}
-    with open(get_config_file_path(), "w") as f:
-        json.dump(config, f)
+    STORE.set(download_directory=path)
+
 
 def load_download_directory() -> Optional[str]:
     """Loads the download directory from the config file."""
-    config_file = get_config_file_path()
-    if os.path.exists(config_file):
-        with open(config_file, "r") as f:
-            config = json.load(f)
-            assert isinstance(config, dict), "config must be a dictionary"
-            return config.get("download_directory")
-    return None
+    return STORE.get('download_directory')
+
+
+def save_log_level(level: str) -> None:
+    """Saves the log level name (e.g. "INFO") to the config file."""
+    assert isinstance(level, str) and level, "level must be a non-empty string"
+    STORE.set(log_level=level.upper())
+
+
+def load_log_level() -> Optional[str]:
+    """Loads the log level name from the config file."""
+    return STORE.get('log_level')
+
+
+def save_disk_settings(preset: str, full_allocation: bool) -> None:
+    """Saves the disk I/O preset name and allocation mode."""
+    assert isinstance(preset, str) and preset, "preset must be a non-empty string"
+    assert isinstance(full_allocation, bool), "full_allocation must be a boolean"
+    STORE.set(disk_preset=preset, full_allocation=full_allocation)
+
+
+def load_disk_settings() -> Tuple[str, bool]:
+    """Loads (disk preset, full allocation), defaulting to ("default", False)."""
+    return STORE.get('disk_preset'), STORE.get('full_allocation')
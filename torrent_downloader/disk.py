@@ -0,0 +1,126 @@
+"""Disk I/O tuning presets and disk statistics from libtorrent session stats.
+
+Presets map a storage type to libtorrent disk settings. They are applied on
+top of libtorrent's defaults for the same keys (``DISK_DEFAULTS``) and can be
+switched at runtime with ``TorrentManager.apply_disk_profile``.
+
+Disk statistics come from ``session_stats_alert`` counters. Gauges (queue
+depth, peers waiting on disk) are reported as-is, cumulative counters (read /
+write time and operation counts) are turned into average latencies over the
+interval between two samples.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional
+import os
+
+_CPUS = os.cpu_count() or 2
+MIB = 1024 * 1024
+
+# libtorrent's defaults for every key a preset sets. Each preset is applied
+# on top of these, so switching presets (also back to 'default') resets the
+# keys the previous one changed.
+DISK_DEFAULTS: Dict[str, Any] = {
+    'aio_threads': 10,
+    'hashing_threads': 1,
+    'file_pool_size': 40,
+    'max_queued_disk_bytes': 100 * MIB,
+}
+
+DISK_PRESETS: Dict[str, Dict[str, Any]] = {
+    # libtorrent defaults, nothing overridden
+    'default': {},
+    # Deep queues and many threads: NVMe drives are fastest with lots of
+    # outstanding requests.
+    'nvme': {
+        'aio_threads': 16,
+        'hashing_threads': max(2, min(8, _CPUS)),
+        'file_pool_size': 500,
+        'max_queued_disk_bytes': 256 * MIB,
+    },
+    'ssd': {
+        'aio_threads': 12,
+        'hashing_threads': max(2, min(4, _CPUS)),
+        'file_pool_size': 200,
+        'max_queued_disk_bytes': 192 * MIB,
+    },
+    # Few threads to limit seeking, a large write queue so the OS can
+    # coalesce writes, and a single hashing thread (hashing is read bound).
+    'hdd': {
+        'aio_threads': 2,
+        'hashing_threads': 1,
+        'file_pool_size': 100,
+        'max_queued_disk_bytes': 128 * MIB,
+    },
+}
+
+
+def disk_settings(preset: str) -> Dict[str, Any]:
+    """Return the libtorrent settings for ``preset`` (``DISK_DEFAULTS`` plus its overrides)."""
+    assert isinstance(preset, str), "preset must be a string"
+    if preset not in DISK_PRESETS:
+        raise ValueError(f"Unknown disk preset: {preset}")
+    settings = dict(DISK_DEFAULTS)
+    settings.update(DISK_PRESETS[preset])
+    return settings
+
+
+@dataclass
+class DiskStats:
+    queued_jobs: int  # disk jobs waiting for a disk thread
+    queued_write_bytes: int  # bytes waiting to be written
+    peers_blocked_on_disk: int  # peers waiting for disk reads or writes
+    request_latency_us: int  # libtorrent's rolling average disk request latency
+    read_latency_us: Optional[float]  # average over the last sample interval
+    write_latency_us: Optional[float]
+
+
+class DiskStatsTracker:
+    """Turns ``session_stats_alert.values`` samples into ``DiskStats``."""
+
+    _COUNTERS = ('disk.disk_read_time', 'disk.num_read_ops', 'disk.disk_write_time', 'disk.num_write_ops')
+
+    def __init__(self) -> None:
+        self._previous: Optional[Dict[str, int]] = None
+        self.latest: Optional[DiskStats] = None
+
+    @staticmethod
+    def _avg(time_delta: int, ops_delta: int) -> Optional[float]:
+        return time_delta / ops_delta if ops_delta > 0 else None
+
+    def update(self, values: Mapping[str, int]) -> DiskStats:
+        """Feed one sample (metric name -> value) and return the derived stats."""
+        assert isinstance(values, Mapping), "values must be a mapping of metric name to value"
+        current = {name: int(values.get(name, 0)) for name in self._COUNTERS}
+        read_latency = write_latency = None
+        if self._previous is not None:
+            prev = self._previous
+            read_latency = self._avg(current['disk.disk_read_time'] - prev['disk.disk_read_time'],
+                                     current['disk.num_read_ops'] - prev['disk.num_read_ops'])
+            write_latency = self._avg(current['disk.disk_write_time'] - prev['disk.disk_write_time'],
+                                      current['disk.num_write_ops'] - prev['disk.num_write_ops'])
+        self._previous = current
+        self.latest = DiskStats(
+            queued_jobs=int(values.get('disk.queued_disk_jobs', 0)),
+            queued_write_bytes=int(values.get('disk.queued_write_bytes', 0)),
+            peers_blocked_on_disk=(int(values.get('peer.num_peers_up_disk', 0))
+                                   + int(values.get('peer.num_peers_down_disk', 0))),
+            request_latency_us=int(values.get('disk.request_latency', 0)),
+            read_latency_us=read_latency,
+            write_latency_us=write_latency,
+        )
+        return self.latest
+
+
+def format_disk_stats(stats: Optional[DiskStats]) -> str:
+    """One-line summary for the status bar."""
+    if stats is None:
+        return "Disk: n/a"
+
+    def ms(us: Optional[float]) -> str:
+        return "-" if us is None else f"{us / 1000:.1f}"
+
+    return (f"Disk: queue {stats.queued_jobs} jobs ({stats.queued_write_bytes / (1024 * 1024):.1f} MB)"
+            f" | peers blocked {stats.peers_blocked_on_disk}"
+            f" | latency {stats.request_latency_us / 1000:.1f} ms"
+            f" (read {ms(stats.read_latency_us)} / write {ms(stats.write_latency_us)} ms)")
@@ -0,0 +1,109 @@
+"""Per-file progress and piece map of a torrent, cached for the details view.
+
+Computing the file list means a ``file_progress`` call, the file priorities,
+the piece bitfield and the piece availability - for torrents with thousands
+of files or pieces that is too much to repeat on every refresh. A
+``FileViewCache`` keeps the last ``FileView`` per torrent and only
+recomputes it when a piece finished (``piece_finished_alert``), the number
+of downloaded pieces changed (e.g. after a recheck) or the availability is
+older than ``AVAILABILITY_MAX_AGE_S`` (it follows the connected peers).
+"""
+
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+import itertools
+import time
+
+AVAILABILITY_MAX_AGE_S = 10.0
+
+# Each computed view gets a new version so consumers (also across the shard
+# pipe, where identity is lost) can tell whether anything changed.
+_versions = itertools.count(1)
+
+
+@dataclass
+class FileEntry:
+    index: int  # file index in the torrent (pad files are skipped)
+    path: str
+    size: int  # bytes
+    progress: float  # 0..1, counted in whole pieces
+    priority: int  # 0 = skip, 1..7 (4 = default)
+
+
+@dataclass
+class FileView:
+    files: List[FileEntry]
+    pieces: List[bool]  # True for pieces we have
+    availability: List[int]  # copies of each piece among connected peers (empty without peers)
+    version: int = field(default_factory=lambda: next(_versions))
+
+    @property
+    def num_pieces(self) -> int:
+        return len(self.pieces)
+
+
+def bin_pieces(pieces: Sequence[bool], availability: Sequence[int], bins: int) -> List[Tuple[float, int]]:
+    """Reduce the piece map to ``bins`` buckets of (fraction we have, lowest availability).
+
+    Used to draw the piece bar: one bucket per pixel column at most. Without
+    availability data the lowest availability is -1.
+    """
+    assert isinstance(bins, int) and bins > 0, "bins must be a positive integer"
+    count = len(pieces)
+    if count == 0:
+        return []
+    bins = min(bins, count)
+    buckets: List[Tuple[float, int]] = []
+    for b in range(bins):
+        start, end = b * count // bins, (b + 1) * count // bins
+        have = sum(1 for p in pieces[start:end] if p)
+        avail = min(availability[start:end]) if len(availability) >= end else -1
+        buckets.append((have / (end - start), avail))
+    return buckets
+
+
+class FileViewCache:
+    """Last ``FileView`` per torrent key, recomputed only when it went stale."""
+
+    def __init__(self, max_age_s: float = AVAILABILITY_MAX_AGE_S, clock: Callable[[], float] = time.monotonic,
+                 max_entries: Optional[int] = None):
+        assert max_age_s > 0, "max_age_s must be positive"
+        assert max_entries is None or max_entries > 0, "max_entries must be positive or None"
+        self.max_age_s = max_age_s
+        self.max_entries = max_entries  # None: unbounded; else the least recently computed views go first
+        self._clock = clock
+        self._entries: Dict[str, Tuple[FileView, int, float]] = {}  # view, pieces done, computed at
+        self._dirty: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def invalidate(self, key: str) -> None:
+        """Mark ``key`` stale (a piece finished, priorities changed, ...)."""
+        if key in self._entries:
+            self._dirty.add(key)
+
+    def discard(self, key: str) -> None:
+        self._entries.pop(key, None)
+        self._dirty.discard(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._dirty.clear()
+
+    def get(self, key: str, pieces_done: int, compute: Callable[[], FileView]) -> FileView:
+        """Return the cached view of ``key`` or ``compute()`` a new one."""
+        assert isinstance(key, str) and key, "key must be a non-empty string"
+        now = self._clock()
+        entry = self._entries.get(key)
+        if entry is not None and key not in self._dirty:
+            view, done, computed_at = entry
+            if done == pieces_done and now - computed_at < self.max_age_s:
+                return view
+        view = compute()
+        self._entries.pop(key, None)  # re-inserted last: dict order is computation order
+        self._entries[key] = (view, pieces_done, now)
+        self._dirty.discard(key)
+        while self.max_entries is not None and len(self._entries) > self.max_entries:
+            self.discard(next(iter(self._entries)))
+        return view
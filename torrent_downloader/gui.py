@@ -1,25 +1,46 @@
 from tkinter import messagebox, ttk, filedialog
 import tkinter as tk
 import logging
+import queue
+import secrets
 import sys
 import os
-from typing import List, Sequence, Tuple, Optional
-
-try:  # Early feedback if libtorrent missing – GUI exits cleanly
-    import libtorrent as lt  # noqa: F401
-except ImportError as e:  # pragma: no cover - startup failure path
-    logging.error("Failed to import libtorrent: %s", e)
-    print('Error: libtorrent module not found. Install with: pip install python-libtorrent')
-    sys.exit(1)
-
-from . import util
-from .torrent import TorrentManager, TorrentStatus
-
+import threading
+import time
+from typing import Any, Callable, Dict, List, Sequence, Tuple, Optional
+
+from . import config, util
+from .create import FORMATS, CreateCancelled, CreateProgress, CreateResult, create_torrent
+from .disk import DISK_PRESETS, format_disk_stats
+from .files import FileEntry, FileView, bin_pieces
+from .memory import MemoryReport, is_tracing, memory_report, start_tracing, stop_tracing
+from .perf import PERF, STARTUP, STARTUP_ENV_VAR
+from .postprocess import FAILED, LINK_MODES, PostProcessJob
+from .replay import ENV_VAR as RECORD_ENV_VAR, Recorder
+from .seeding import ACTION_PAUSE, ACTIONS, SeedingPolicy
+from .stats import DAY, HOUR, TrafficReport
+from .torrent import PeerInfo, TorrentManager, TorrentStatus, lt
+
+# Defaults; the running values come from the config store (config.SCHEMA)
 POLL_INTERVAL_MS = 1000
+# How often the GUI checks whether the background session start-up finished.
+STARTUP_POLL_MS = 50
+STARTING_TEXT = "Starting session..."
 MAX_NAME_LEN = 50
+# Torrent details (peers, files) are fetched at their own, slower rate.
+DETAILS_POLL_MS = 2000
+# Progress of a running torrent creation is shown at this rate.
+CREATE_POLL_MS = 100
+# Top allocators in the performance panel (a tracemalloc snapshot is not cheap).
+MEMORY_REFRESH_S = 5.0
+# A GUI tick taking longer than this is counted as an overrun (visible jank).
+TICK_BUDGET_MS = 100
 
 
 class TorrentDownloaderApp:
+    # Overridden per instance from the config store and updated live
+    poll_interval_ms = POLL_INTERVAL_MS
+    max_name_len = MAX_NAME_LEN
 
     def __init__(self, master: tk.Tk):
         self.master = master
@@ -28,6 +49,7 @@ class TorrentDownloaderApp:
         master.protocol("WM_DELETE_WINDOW", self.quit_app)
 
         # Internal state
+        # Duplicate checks; left empty in low-memory mode (the manager is asked instead)
         self._magnets: set[str] = set()
         self._info_hashes: set[str] = set()  # track torrents added via file
         self._update_job: Optional[str] = None
@@ -47,6 +69,9 @@ class TorrentDownloaderApp:
         self.add_torrent_button.pack(side=tk.LEFT, padx=5, pady=5)
 
         # Remove selected torrents button
+        self.create_button = ttk.Button(self.toolbar, text="Create Torrent", command=self.open_create_dialog)
+        self.create_button.pack(side=tk.LEFT, padx=5, pady=5)
+
         self.remove_button = ttk.Button(self.toolbar, text="Remove Selected", command=self.remove_selected)
         self.remove_button.pack(side=tk.LEFT, padx=5, pady=5)
 
@@ -56,6 +81,21 @@ class TorrentDownloaderApp:
         self.pause_button = ttk.Button(self.toolbar, text="Pause Selected", command=self.pause_selected)
         self.pause_button.pack(side=tk.LEFT, padx=5, pady=5)
 
+        self.perf_button = ttk.Button(self.toolbar, text="Performance", command=self.toggle_performance_panel)
+        self.perf_button.pack(side=tk.RIGHT, padx=5, pady=5)
+        self._perf_panel: Optional["PerformancePanel"] = None
+
+        self.details_button = ttk.Button(self.toolbar, text="Details", command=self.toggle_details)
+        self.details_button.pack(side=tk.RIGHT, padx=5, pady=5)
+
+        self.stats_button = ttk.Button(self.toolbar, text="Statistics", command=self.open_statistics)
+        self.stats_button.pack(side=tk.RIGHT, padx=5, pady=5)
+        self._stats_window: Optional["StatisticsWindow"] = None
+
+        self.jobs_button = ttk.Button(self.toolbar, text="Post-processing", command=self.open_postprocess_jobs)
+        self.jobs_button.pack(side=tk.RIGHT, padx=5, pady=5)
+        self._jobs_window: Optional["PostProcessWindow"] = None
+
         # Configure style
         self.style = ttk.Style()
         self.style.configure('TFrame', background='#f0f0f0')
@@ -107,30 +147,231 @@ class TorrentDownloaderApp:
         self.frame_status.grid_columnconfigure(0, weight=1)
         self.frame_status.grid_rowconfigure(0, weight=1)
 
-        # Prepare download directory and torrent manager
+        # Peers and files of the selected torrent, hidden until toggled
+        self.details = DetailsPane(self.frame_status, master)
+        self.details.add_tab(PeerPanel(self.details.notebook, self._selected_peers))
+        self.details.add_tab(FilesPanel(self.details.notebook, self._selected_files))
+        self.tree.bind('<<TreeviewSelect>>', lambda _e: self.details.refresh_now())
+
+        # Status bar with live disk statistics and relocation progress
+        self.disk_status_var = tk.StringVar(value=format_disk_stats(None))
+        ttk.Label(self.main_container, textvariable=self.disk_status_var).pack(side=tk.BOTTOM, anchor=tk.W, pady=(5, 0))
+        self.move_status_var = tk.StringVar(value="")
+        ttk.Label(self.main_container, textvariable=self.move_status_var).pack(side=tk.BOTTOM, anchor=tk.W)
+
+        # Prepare download directory. The torrent manager (libtorrent import,
+        # session creation, resume data) is built on a worker thread so the
+        # window maps immediately; a placeholder row is shown until it is ready.
         self.download_dir = self._resolve_download_dir()
-        session_file = os.path.join(util.get_cache_dir(), "session.dat")
-        self.manager = TorrentManager(self.download_dir, session_file)
         self.download_location_text = f"Downloads folder: {self.download_dir}"
-        self._sync_state_from_manager()
-        self.update_status()  # Initial population of the list
-        self._schedule_update()
-        # Key bindings for removal (Delete / Shift+Delete for delete files)
-        self.tree.bind('<Delete>', lambda e: self.remove_selected(delete_files=bool(e.state & 0x0001)))
-        # Also allow BackSpace as alternate delete key
-        self.tree.bind('<BackSpace>', lambda _e: self.remove_selected())
+        self.disk_preset, self.full_allocation = self._load_disk_settings()
+        self.low_memory = config.STORE.get('low_memory')
+        self.poll_interval_ms = config.STORE.get('poll_interval_ms')
+        self.max_name_len = config.STORE.get('max_name_len')
+        self._unsubscribe_config = config.STORE.subscribe(self._on_config_changed)
+        self.manager: Any = None  # TorrentManager, or sharding.ShardedTorrentManager (same API)
+        self._startup_queue: "queue.Queue[Tuple[Any, Optional[BaseException]]]" = queue.Queue(maxsize=1)
+        self._startup_job: Optional[str] = None
+        self._api: Any = None  # api.ApiServer while the HTTP API is enabled
+        self._recorder: Optional[Recorder] = None  # while RECORD_ENV_VAR names a recording file
+        self._set_actions_enabled(False)
+        self._refresh_tree([(STARTING_TEXT, "", "", "", "", "")])
+        self._start_manager(os.path.join(util.get_cache_dir(), "session.dat"))
+        master.after_idle(lambda: STARTUP.mark("first_frame"))
 
         # Context menu
         self.context_menu = tk.Menu(master, tearoff=0)
         self.context_menu.add_command(label="Resume", command=self.resume_selected)
         self.context_menu.add_command(label="Pause", command=self.pause_selected)
+        self.context_menu.add_command(label="Force Recheck", command=self.recheck_selected)
+        self.context_menu.add_command(label="Move Data...", command=self.relocate_selected)
+        self.context_menu.add_command(label="Seeding Limits...", command=self.open_seeding_dialog)
         self.context_menu.add_separator()
         self.context_menu.add_command(label="Remove", command=self.remove_selected)
         self.context_menu.add_command(label="Remove and Delete Data", command=lambda: self.remove_selected(delete_files=True))
+
+    # --- Background start-up ----------------------------------------------
+    def _start_manager(self, session_file: str) -> None:
+        """Create the TorrentManager on a worker thread and poll for the result."""
+        assert isinstance(session_file, str) and session_file, "session_file must be a non-empty string"
+        factory: Any = TorrentManager  # looked up now so tests can patch it
+        args = (self.download_dir, session_file)
+        kwargs = {'settings': config.STORE.session_settings(),
+                  'disk_preset': self.disk_preset, 'full_allocation': self.full_allocation,
+                  'low_memory': self.low_memory, 'postprocess': config.STORE.postprocess_settings(),
+                  'blocklist_path': config.STORE.get('blocklist_path'), 'peer_classes': config.STORE.peer_classes(),
+                  'disk_reserve': config.STORE.disk_reserve(),
+                  'seeding_policy': config.STORE.seeding_policy(),
+                  'prioritize_underseeded': config.STORE.get('prioritize_underseeded')}
+        shards = config.STORE.get('shards')
+        self._sharded = shards > 1
+        if self._sharded:  # very large libraries: one session per worker process
+            from .sharding import ShardedTorrentManager
+            factory = ShardedTorrentManager
+            kwargs['shards'] = shards
+
+        def build():
+            try:
+                self._startup_queue.put((factory(*args, **kwargs), None))
+            except BaseException as e:  # reported on the GUI thread
+                self._startup_queue.put((None, e))
+
+        threading.Thread(target=build, name="session-startup", daemon=True).start()
+        self._startup_job = self.master.after(STARTUP_POLL_MS, self._poll_manager_ready)
+
+    def _poll_manager_ready(self):
+        self._startup_job = None
+        try:
+            manager, error = self._startup_queue.get_nowait()
+        except queue.Empty:
+            self._startup_job = self.master.after(STARTUP_POLL_MS, self._poll_manager_ready)
+            return
+        if error is not None:
+            self._on_startup_failed(error)
+        else:
+            self._on_manager_ready(manager)
+
+    def _on_manager_ready(self, manager: TorrentManager):
+        self.manager = manager
+        STARTUP.mark("session_ready")
+        self._sync_state_from_manager()
+        # Torrent actions are only bound once there is a session to act on
+        # (Delete / Shift+Delete removes, BackSpace as alternate delete key).
+        self.tree.bind('<Delete>', lambda e: self.remove_selected(delete_files=bool(e.state & 0x0001)))
+        self.tree.bind('<BackSpace>', lambda _e: self.remove_selected())
         self.tree.bind("<Button-3>", self._show_context_menu)
+        self._set_actions_enabled(True)
+        self._last_rows = []
+        self._start_api()
+        self._start_recorder()
+        self.update_status()  # Initial population of the list, reschedules itself
+        self._report_startup()
+
+    # --- HTTP API -----------------------------------------------------------
+    def _start_api(self):
+        """Start the local HTTP API if ``api_port`` is set (imported lazily, off by default)."""
+        port = config.STORE.get('api_port')
+        if not port or self.manager is None:
+            return
+        token = config.STORE.get('api_token')
+        if not token:  # any web page could drive an API without one
+            token = secrets.token_urlsafe(24)
+            try:
+                config.STORE.set(api_token=token)  # restarts the API through _on_config_changed
+                logging.info("Generated an HTTP API token, see 'api_token' in %s", config.STORE.path)
+                return
+            except OSError as e:
+                logging.error("Could not save the generated HTTP API token: %s", e)
+        from .api import ApiServer, CommandQueue, StatusFeed
+        try:
+            self._api = ApiServer(StatusFeed(), CommandQueue(), port=port, token=token,
+                                  create_roots=[os.path.abspath(self.download_dir)])
+            self._api.start()
+        except OSError as e:
+            self._api = None
+            logging.error("Could not start the HTTP API on port %d: %s", port, e)
+
+    def _stop_api(self):
+        if self._api is not None:
+            self._api.close()
+            self._api = None
+
+    def _serve_api(self, statuses: Sequence[TorrentStatus]):
+        """Publish a status refresh to API clients (runs on the Tk thread after queued commands)."""
+        keys = self.manager.torrent_keys()
+        if len(keys) == len(statuses):  # not if a handle failed to report, next refresh then
+            self._api.feed.publish(statuses, keys)
+
+    # --- Session recording ----------------------------------------------------
+    def _start_recorder(self):
+        """Record alerts and status refreshes to the file named by ``RECORD_ENV_VAR`` (see replay.py)."""
+        path = os.getenv(RECORD_ENV_VAR, "")
+        if not path or self.manager is None:
+            return
+        try:
+            self._recorder = Recorder(path)
+        except OSError as e:
+            logging.error("Could not record the session to %s: %s", path, e)
+            return
+        if hasattr(self.manager, 'add_alert_listener'):  # not forwarded by the sharded manager
+            self._recorder.attach(self.manager)
+        logging.info("Recording the session to %s", path)
+
+    def _record(self, statuses: Sequence[TorrentStatus]):
+        keys = self.manager.torrent_keys()
+        if len(keys) == len(statuses):
+            self._recorder.snapshot(statuses, keys)
+
+    def _on_startup_failed(self, error: BaseException):
+        logging.error("Failed to start torrent session: %s", error)
+        if isinstance(error, ImportError):
+            message = "libtorrent module not found. Install with: pip install python-libtorrent"
+        else:
+            message = f"Failed to start torrent session: {error}"
+        messagebox.showerror("Error", message)
+        self.master.destroy()
+
+    @staticmethod
+    def _report_startup():
+        first_frame, ready = STARTUP.get("first_frame"), STARTUP.get("session_ready")
+        logging.info("Startup: first frame after %s ms, session ready after %s ms",
+                     "n/a" if first_frame is None else f"{first_frame:.0f}",
+                     "n/a" if ready is None else f"{ready:.0f}")
+        logging.debug(STARTUP.report())
+        if os.getenv(STARTUP_ENV_VAR, "") not in ("", "0"):
+            print(STARTUP.report(), file=sys.stderr)
+
+    def _set_actions_enabled(self, enabled: bool):
+        state = tk.NORMAL if enabled else tk.DISABLED
+        for button in (self.settings_button, self.add_torrent_button, self.remove_button,
+                       self.resume_button, self.pause_button):
+            button.configure(state=state)
+
+    def _on_config_changed(self, changed: Dict[str, Any]):
+        """Apply changed settings live (config store subscriber, Tk thread)."""
+        if 'poll_interval_ms' in changed:
+            self.poll_interval_ms = changed['poll_interval_ms']  # used from the next tick on
+        if 'max_name_len' in changed:
+            self.max_name_len = changed['max_name_len']
+            self._last_rows = []  # force a redraw with the new width
+        if 'download_directory' in changed and changed['download_directory']:
+            self.download_dir = changed['download_directory']
+            self.download_location_text = f"Downloads folder: {self.download_dir}"
+            if self.manager is not None:
+                self.manager.set_download_directory(self.download_dir)
+        if 'disk_preset' in changed or 'full_allocation' in changed:
+            preset, full_allocation = self._load_disk_settings()
+            if self.manager is not None:
+                self.manager.apply_disk_profile(preset, full_allocation)
+            self.disk_preset, self.full_allocation = preset, full_allocation
+        if 'low_memory' in changed:
+            self.low_memory = changed['low_memory']
+            if self.manager is not None:
+                self.manager.apply_memory_mode(self.low_memory)
+                self.manager.apply_settings(config.STORE.session_settings())  # overrides win over the caps
+                self._magnets, self._info_hashes = set(), set()
+                self._sync_state_from_manager()
+        if self.manager is not None and changed.keys() & {'session', *config.SESSION_KEYS}:
+            self.manager.apply_settings(config.STORE.session_settings())
+        if self.manager is not None and changed.keys() & {'api_port', 'api_token', 'download_directory'}:
+            self._stop_api()
+            self._start_api()
+        if self.manager is not None and 'blocklist_path' in changed:
+            self.manager.load_blocklist(changed['blocklist_path'])  # compiled off the Tk thread
+        if self.manager is not None and 'disk_reserve_mb' in changed:
+            self.manager.set_disk_reserve(config.STORE.disk_reserve())
+        if self.manager is not None and changed.keys() & {'lan_unthrottled', 'peer_classes'}:
+            self.manager.set_peer_classes(config.STORE.peer_classes())
+        if self.manager is not None and changed.keys() & set(config.POSTPROCESS_KEYS):
+            self.manager.set_postprocess_settings(config.STORE.postprocess_settings())
+        if self.manager is not None and changed.keys() & set(config.SEEDING_KEYS):
+            self.manager.set_global_seeding_policy(config.STORE.seeding_policy(),
+                                                   config.STORE.get('prioritize_underseeded'))
 
     def _sync_state_from_manager(self):
         """Populate UI-level tracking sets from the torrent manager's state."""
+        if self.low_memory:  # one magnet link per torrent adds up; duplicates are looked up instead
+            return
         loaded_torrents = self.manager.get_loaded_torrents_info()
         for info in loaded_torrents:
             if info.magnet_link:
@@ -150,7 +391,7 @@ class TorrentDownloaderApp:
 
 
     def open_settings_dialog(self):
-        """Open a dialog to configure the download directory."""
+        """Open a dialog to configure the download directory, disk profile and limits."""
         dialog = tk.Toplevel(self.master)
         dialog.title("Settings")
         dialog.transient(self.master)
@@ -173,16 +414,135 @@ class TorrentDownloaderApp:
 
         ttk.Button(frame, text="Browse", command=browse).pack(anchor=tk.W)
 
+        ttk.Label(frame, text="IP blocklist file (P2P, DAT or CIDR; empty = none):").pack(anchor=tk.W, pady=(8, 0))
+        blocklist_row = ttk.Frame(frame)
+        blocklist_row.pack(fill=tk.X)
+        blocklist_var = tk.StringVar(value=config.STORE.get('blocklist_path') or "")
+        ttk.Entry(blocklist_row, textvariable=blocklist_var, width=60).pack(side=tk.LEFT, fill=tk.X, expand=True)
+
+        def browse_blocklist():
+            path = filedialog.askopenfilename(title="Select IP Blocklist", parent=dialog)
+            if path:
+                blocklist_var.set(path)
+
+        ttk.Button(blocklist_row, text="Browse", command=browse_blocklist).pack(side=tk.LEFT, padx=(5, 0))
+
+        ttk.Label(frame, text="Disk I/O profile:").pack(anchor=tk.W, pady=(8, 0))
+        preset_var = tk.StringVar(value=self.disk_preset)
+        ttk.Combobox(frame, textvariable=preset_var, values=list(DISK_PRESETS),
+                     state="readonly", width=12).pack(anchor=tk.W)
+        alloc_var = tk.BooleanVar(value=self.full_allocation)
+        ttk.Checkbutton(frame, text="Pre-allocate files (full allocation, new torrents only)",
+                        variable=alloc_var).pack(anchor=tk.W, pady=(4, 0))
+        low_memory_var = tk.BooleanVar(value=self.low_memory)
+        ttk.Checkbutton(frame, text="Low-memory mode (fewer peers, smaller buffers)",
+                        variable=low_memory_var).pack(anchor=tk.W, pady=(4, 0))
+        reserve = config.STORE.get('disk_reserve_mb')
+        reserve_var = tk.StringVar(value="" if reserve is None else str(reserve))
+        reserve_row = ttk.Frame(frame)
+        reserve_row.pack(anchor=tk.W, pady=(4, 0))
+        ttk.Label(reserve_row, text="Hold new torrents that would leave less free space than (MiB, empty = never):"
+                  ).pack(side=tk.LEFT)
+        ttk.Entry(reserve_row, textvariable=reserve_var, width=8).pack(side=tk.LEFT, padx=(5, 0))
+
+        # Applied live through the config store, no restart needed
+        limits = ttk.Frame(frame)
+        limits.pack(anchor=tk.W, pady=(8, 0))
+        down_var = tk.StringVar(value=str(config.STORE.get('download_rate_limit') // 1024))
+        up_var = tk.StringVar(value=str(config.STORE.get('upload_rate_limit') // 1024))
+        poll_var = tk.StringVar(value=str(self.poll_interval_ms))
+        for row, (label, var) in enumerate((("Download limit (KiB/s, 0 = unlimited):", down_var),
+                                            ("Upload limit (KiB/s, 0 = unlimited):", up_var),
+                                            ("Refresh interval (ms):", poll_var))):
+            ttk.Label(limits, text=label).grid(row=row, column=0, sticky=tk.W)
+            ttk.Entry(limits, textvariable=var, width=10).grid(row=row, column=1, sticky=tk.W, padx=(5, 0))
+        lan_var = tk.BooleanVar(value=config.STORE.get('lan_unthrottled'))
+        ttk.Checkbutton(limits, text="Don't rate limit peers on the local network",
+                        variable=lan_var).grid(row=3, column=0, columnspan=2, sticky=tk.W)
+
+        # Global seeding limits (torrents can override them from the context menu) and choking
+        seeding = ttk.LabelFrame(frame, text="Seeding", padding=5)
+        seeding.pack(fill=tk.X, pady=(8, 0))
+        seed_vars = {key: tk.StringVar(value=str(config.STORE.get(key)))
+                     for key in ('seed_ratio_limit_percent', 'seed_time_limit_min', 'seed_idle_limit_min')}
+        for row, (label, key) in enumerate((("Stop at share ratio (%, 0 = never):", 'seed_ratio_limit_percent'),
+                                            ("Stop after seeding (min, 0 = never):", 'seed_time_limit_min'),
+                                            ("Stop after idle (min, 0 = never):", 'seed_idle_limit_min'))):
+            ttk.Label(seeding, text=label).grid(row=row, column=0, sticky=tk.W)
+            ttk.Entry(seeding, textvariable=seed_vars[key], width=10).grid(row=row, column=1, sticky=tk.W,
+                                                                           padx=(5, 0))
+        choice_vars = {key: tk.StringVar(value=config.STORE.get(key))
+                       for key in ('seed_limit_action', 'choking_algorithm', 'seed_choking_algorithm')}
+        for row, (label, key) in enumerate((("At the limit:", 'seed_limit_action'),
+                                            ("Choker:", 'choking_algorithm'),
+                                            ("Seed choker:", 'seed_choking_algorithm')), start=3):
+            ttk.Label(seeding, text=label).grid(row=row, column=0, sticky=tk.W)
+            ttk.Combobox(seeding, textvariable=choice_vars[key], values=list(config.SCHEMA[key].choices or ()),
+                         state="readonly", width=14).grid(row=row, column=1, sticky=tk.W, padx=(5, 0))
+        underseeded_var = tk.BooleanVar(value=config.STORE.get('prioritize_underseeded'))
+        ttk.Checkbutton(seeding, text="Prefer swarms with few seeds",
+                        variable=underseeded_var).grid(row=6, column=0, columnspan=2, sticky=tk.W)
+
+        # Stages run in worker processes when a torrent finishes
+        post = ttk.LabelFrame(frame, text="Post-processing", padding=5)
+        post.pack(fill=tk.X, pady=(8, 0))
+        post_flags = {key: tk.BooleanVar(value=config.STORE.get(key))
+                      for key in ('postprocess_verify', 'postprocess_extract')}
+        ttk.Checkbutton(post, text="Verify checksum manifests",
+                        variable=post_flags['postprocess_verify']).grid(row=0, column=0, columnspan=2, sticky=tk.W)
+        ttk.Checkbutton(post, text="Extract zip/tar archives",
+                        variable=post_flags['postprocess_extract']).grid(row=1, column=0, columnspan=2, sticky=tk.W)
+        post_texts = {key: tk.StringVar(value=config.STORE.get(key) or "")
+                      for key in ('postprocess_library', 'postprocess_script')}
+        for row, (label, key) in enumerate((("Library folder (empty = off):", 'postprocess_library'),
+                                            ("Script (payload path appended):", 'postprocess_script')), start=2):
+            ttk.Label(post, text=label).grid(row=row, column=0, sticky=tk.W)
+            ttk.Entry(post, textvariable=post_texts[key], width=40).grid(row=row, column=1, sticky=tk.W, padx=(5, 0))
+        link_var = tk.StringVar(value=config.STORE.get('postprocess_link_mode'))
+        ttk.Label(post, text="Into the library by:").grid(row=4, column=0, sticky=tk.W)
+        ttk.Combobox(post, textvariable=link_var, values=list(LINK_MODES), state="readonly",
+                     width=10).grid(row=4, column=1, sticky=tk.W, padx=(5, 0))
+        workers_var = tk.StringVar(value=str(config.STORE.get('postprocess_workers')))
+        ttk.Label(post, text="Worker processes:").grid(row=5, column=0, sticky=tk.W)
+        ttk.Entry(post, textvariable=workers_var, width=10).grid(row=5, column=1, sticky=tk.W, padx=(5, 0))
+
         btn_frame = ttk.Frame(dialog, padding=(0, 5, 0, 10))
         btn_frame.pack(fill=tk.X)
 
         def do_save():
+            try:
+                values = {
+                    'download_rate_limit': int(down_var.get() or 0) * 1024,
+                    'upload_rate_limit': int(up_var.get() or 0) * 1024,
+                    'poll_interval_ms': int(poll_var.get() or POLL_INTERVAL_MS),
+                    'prioritize_underseeded': bool(underseeded_var.get()),
+                    'low_memory': bool(low_memory_var.get()),
+                    'lan_unthrottled': bool(lan_var.get()),
+                    'disk_reserve_mb': int(reserve_var.get()) if reserve_var.get().strip() else None,
+                    'blocklist_path': blocklist_var.get().strip() or None,
+                    'postprocess_link_mode': link_var.get(),
+                    'postprocess_workers': int(workers_var.get() or 0),
+                }
+                values.update({key: bool(var.get()) for key, var in post_flags.items()})
+                values.update({key: var.get().strip() or None for key, var in post_texts.items()})
+                values.update({key: int(var.get() or 0) for key, var in seed_vars.items()})
+                values.update({key: var.get() for key, var in choice_vars.items()})
+                for key, value in values.items():
+                    config.validate(key, value)
+            except ValueError as e:
+                messagebox.showerror("Invalid Setting", str(e), parent=dialog)
+                return
             new_dir = dir_var.get()
             if new_dir and new_dir != self.download_dir:
-                self.save_download_dir(new_dir)
-                self.download_dir = new_dir
-                self.download_location_text = f"Downloads folder: {self.download_dir}"
-                self.manager.set_download_directory(new_dir)
+                self.save_download_dir(new_dir)  # subscriber updates the manager
+                if self.manager.get_torrents() and messagebox.askyesno(
+                        "Move Existing Torrents", "Also move the data of existing torrents to the new folder?",
+                        parent=dialog):
+                    self.manager.relocate_all(new_dir)
+            preset, full_allocation = preset_var.get(), bool(alloc_var.get())
+            if (preset, full_allocation) != (self.disk_preset, self.full_allocation):
+                self.apply_disk_settings(preset, full_allocation)
+            config.STORE.set(**values)
             dialog.destroy()
 
         ttk.Button(btn_frame, text="Save", command=do_save).pack(side=tk.RIGHT, padx=5)
@@ -269,18 +629,27 @@ class TorrentDownloaderApp:
         if not magnet_link.startswith("magnet:?"):
             messagebox.showwarning("Invalid Magnet", "Magnet link should start with 'magnet:?'")
             return
-        if magnet_link in self._magnets:
+        if self.low_memory:
+            duplicate = self._is_loaded(str(lt.parse_magnet_uri(magnet_link).info_hashes.get_best()))
+        else:
+            duplicate = magnet_link in self._magnets
+        if duplicate:
             messagebox.showinfo("Duplicate", "This magnet link was already added.")
             return
         try:
             self.manager.add_magnet(magnet_link)
-            self._magnets.add(magnet_link)
+            if not self.low_memory:
+                self._magnets.add(magnet_link)
             if parent:
                 parent.destroy()
         except Exception as e:  # pragma: no cover - libtorrent edge
             logging.error("Failed to add magnet: %s", e)
             messagebox.showerror("Error", f"Failed to add magnet: {e}")
 
+    def _is_loaded(self, key: str) -> bool:
+        """Whether the session has a torrent with info-hash ``key`` (low-memory duplicate check)."""
+        return key in self.manager.torrent_keys()
+
     def _add_torrent_file_from_path(self, filename: str, parent: Optional[tk.Toplevel] = None):
         assert isinstance(filename, str) and filename, "filename must be a non-empty string"
         if not filename:
@@ -292,11 +661,16 @@ class TorrentDownloaderApp:
                 messagebox.showerror("Error", f"Failed to read torrent file: {e}")
                 return
             info_hash = str(info.info_hash()) if hasattr(info, 'info_hash') else str(info.info_hashes().v1)
-            if info_hash in self._info_hashes:
+            if self.low_memory:
+                duplicate = self._is_loaded(str(info.info_hashes().get_best()))
+            else:
+                duplicate = info_hash in self._info_hashes
+            if duplicate:
                 messagebox.showinfo("Duplicate", "This torrent file (info hash) was already added.")
                 return
             self.manager.add_torrent_file(filename)
-            self._info_hashes.add(info_hash)
+            if not self.low_memory:
+                self._info_hashes.add(info_hash)
             if parent:
                 parent.destroy()
         except FileNotFoundError:
@@ -305,8 +679,214 @@ class TorrentDownloaderApp:
             logging.error("Failed to add torrent file: %s", e)
             messagebox.showerror("Error", f"Failed to add torrent file: {e}")
 
+    # --- Torrent creation ---------------------------------------------------
+    @staticmethod
+    def _format_create_progress(progress: CreateProgress) -> str:
+        """Progress line of the create dialog: pieces and hashing throughput."""
+        rate = util.format_size(progress.bytes_per_s)
+        return f"{progress.pieces_done}/{progress.num_pieces} pieces, {rate}/s"
+
+    def open_create_dialog(self):
+        """Create a .torrent from a local file or folder and optionally seed it.
+
+        Hashing runs on a worker thread; the dialog polls its progress. The
+        finished torrent is added in seed mode, so the data is not rechecked.
+        """
+        dialog = tk.Toplevel(self.master)
+        dialog.title("Create Torrent")
+        dialog.transient(self.master)
+        dialog.resizable(False, False)
+        frame = ttk.Frame(dialog, padding=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        source_var = tk.StringVar()
+        output_var = tk.StringVar()
+        format_var = tk.StringVar(value=FORMATS[0])
+        private_var = tk.BooleanVar(value=False)
+        seed_var = tk.BooleanVar(value=True)
+
+        def set_source(path: str):
+            if path:
+                source_var.set(path)
+                output_var.set(os.path.normpath(path) + ".torrent")
+
+        ttk.Label(frame, text="Source:").grid(row=0, column=0, sticky=tk.W)
+        ttk.Entry(frame, textvariable=source_var, width=50).grid(row=0, column=1, sticky=tk.EW)
+        source_buttons = ttk.Frame(frame)
+        source_buttons.grid(row=0, column=2, padx=(5, 0))
+        ttk.Button(source_buttons, text="File",
+                   command=lambda: set_source(filedialog.askopenfilename(title="Select File"))).pack(side=tk.LEFT)
+        ttk.Button(source_buttons, text="Folder",
+                   command=lambda: set_source(filedialog.askdirectory(mustexist=True, title="Select Folder"))
+                   ).pack(side=tk.LEFT)
+        ttk.Label(frame, text="Save .torrent as:").grid(row=1, column=0, sticky=tk.W)
+        ttk.Entry(frame, textvariable=output_var, width=50).grid(row=1, column=1, sticky=tk.EW)
+        ttk.Label(frame, text="Format:").grid(row=2, column=0, sticky=tk.W)
+        ttk.Combobox(frame, textvariable=format_var, values=list(FORMATS), state="readonly",
+                     width=10).grid(row=2, column=1, sticky=tk.W)
+        ttk.Label(frame, text="Trackers (one per line):").grid(row=3, column=0, sticky=tk.NW)
+        trackers_text = tk.Text(frame, width=50, height=4)
+        trackers_text.grid(row=3, column=1, sticky=tk.EW)
+        ttk.Checkbutton(frame, text="Private", variable=private_var).grid(row=4, column=1, sticky=tk.W)
+        ttk.Checkbutton(frame, text="Start seeding", variable=seed_var).grid(row=5, column=1, sticky=tk.W)
+
+        progress_bar = ttk.Progressbar(frame, maximum=1.0, length=300)
+        progress_bar.grid(row=6, column=0, columnspan=3, sticky=tk.EW, pady=(8, 0))
+        progress_label = ttk.Label(frame, text="")
+        progress_label.grid(row=7, column=0, columnspan=3, sticky=tk.W)
+
+        btn_frame = ttk.Frame(dialog, padding=(0, 5, 0, 10))
+        btn_frame.pack(fill=tk.X)
+        cancel = threading.Event()
+        latest: List[Optional[CreateProgress]] = [None]
+        outcome: "queue.Queue[Any]" = queue.Queue()  # CreateResult or the exception
+
+        def work(args: Dict[str, Any]):
+            try:
+                outcome.put(create_torrent(**args, on_progress=lambda p: latest.__setitem__(0, p), cancel=cancel))
+            except BaseException as e:
+                outcome.put(e)
+
+        def poll():
+            if not dialog.winfo_exists():
+                return
+            progress = latest[0]
+            if progress is not None:
+                progress_bar['value'] = progress.fraction
+                progress_label.config(text=self._format_create_progress(progress))
+            try:
+                result = outcome.get_nowait()
+            except queue.Empty:
+                self.master.after(CREATE_POLL_MS, poll)
+                return
+            if isinstance(result, CreateCancelled):
+                dialog.destroy()
+            elif isinstance(result, BaseException):
+                logging.error("Failed to create torrent: %s", result)
+                messagebox.showerror("Error", f"Failed to create torrent: {result}", parent=dialog)
+                create_button.config(state=tk.NORMAL)
+            else:
+                self._created(result, seed_var.get())
+                dialog.destroy()
+
+        def do_create():
+            source, output = source_var.get().strip(), output_var.get().strip()
+            if not source or not output:
+                messagebox.showwarning("Missing Path", "Choose a source and where to save the .torrent.",
+                                       parent=dialog)
+                return
+            trackers = [t.strip() for t in trackers_text.get("1.0", tk.END).splitlines() if t.strip()]
+            args = dict(source=source, output=output, fmt=format_var.get(), trackers=trackers,
+                        private=private_var.get())
+            create_button.config(state=tk.DISABLED)
+            threading.Thread(target=work, args=(args,), name="create-torrent", daemon=True).start()
+            self.master.after(CREATE_POLL_MS, poll)
+
+        def do_cancel():
+            cancel.set()
+            if create_button.instate([tk.DISABLED]):
+                return  # the worker stops at the next piece; poll() closes the dialog
+            dialog.destroy()
+
+        create_button = ttk.Button(btn_frame, text="Create", command=do_create)
+        create_button.pack(side=tk.RIGHT, padx=5)
+        ttk.Button(btn_frame, text="Cancel", command=do_cancel).pack(side=tk.RIGHT)
+        dialog.protocol("WM_DELETE_WINDOW", do_cancel)
+
+    def _created(self, result: CreateResult, seed: bool):
+        logging.info("Created %s in %.1fs", result.output, result.seconds)
+        if not seed:
+            return
+        if self.manager is None:
+            messagebox.showwarning("Not Ready", "The session is still starting; add the torrent later.")
+            return
+        try:
+            self.manager.add_torrent_file(result.output, save_path=result.save_path, seed_mode=True)
+        except Exception as e:  # pragma: no cover - defensive
+            logging.error("Failed to seed created torrent: %s", e)
+            messagebox.showerror("Error", f"Failed to seed created torrent: {e}")
+
+    def toggle_performance_panel(self):
+        """Show or hide the performance panel.
+
+        Instrumentation is only enabled while the panel is open so the timers
+        cost (almost) nothing during normal use.
+        """
+        if self._perf_panel is not None and self._perf_panel.is_open():
+            self._perf_panel.close()
+            self._perf_panel = None
+            return
+        self._perf_panel = PerformancePanel(self.master)
+
+    def open_statistics(self):
+        """Show the transfer statistics window (or raise it if already open)."""
+        if self._stats_window is not None and self._stats_window.is_open():
+            self._stats_window.window.lift()
+            return
+        self._stats_window = StatisticsWindow(self.master, self._traffic_report)
+
+    def _traffic_report(self, span_s: float) -> Optional[TrafficReport]:
+        if self.manager is None:
+            return None
+        return self.manager.traffic_report(span_s)
+
+    def open_postprocess_jobs(self):
+        """Show the post-processing jobs window (or raise it if already open)."""
+        if self._jobs_window is not None and self._jobs_window.is_open():
+            self._jobs_window.window.lift()
+            return
+        self._jobs_window = PostProcessWindow(self.master, self._postprocess_jobs, self._retry_postprocess)
+
+    def _postprocess_jobs(self) -> Optional[List[PostProcessJob]]:
+        if self.manager is None:
+            return None
+        return self.manager.postprocess_jobs()
+
+    def _retry_postprocess(self, info_hash: str) -> None:
+        if self.manager is not None:
+            self.manager.retry_postprocess(info_hash)
+
+    def toggle_details(self):
+        """Show or hide the peers / files of the selected torrent."""
+        if self.details.visible:
+            self.details.hide()
+        else:
+            self.details.show()
+
+    def _selected_peers(self) -> Optional[Tuple[int, List[PeerInfo]]]:
+        """(row index, peers) of the first selected torrent, None without a selection."""
+        if self.manager is None:
+            return None
+        indices = self._selected_indices()
+        if not indices:
+            return None
+        return indices[0], self.manager.get_peers_at(indices[0])
+
+    def _selected_files(self) -> Optional[Tuple[int, Optional[FileView]]]:
+        """(row index, cached file view) of the first selected torrent, None without a selection."""
+        if self.manager is None:
+            return None
+        indices = self._selected_indices()
+        if not indices:
+            return None
+        return indices[0], self.manager.get_files_at(indices[0])
+
     def quit_app(self):
-        self.manager.save_state()
+        if self._startup_job is not None:
+            self.master.after_cancel(self._startup_job)
+            self._startup_job = None
+        self.details.hide()
+        self._stop_api()
+        if self._recorder is not None:
+            self._recorder.close()
+            self._recorder = None
+        self._unsubscribe_config()
+        if self.manager is not None:
+            if self._sharded:  # workers save their state and exit
+                self.manager.close()
+            else:
+                self.manager.save_state()
+                self.manager.close()
         if self._update_job is not None:
             try:
                 self.master.after_cancel(self._update_job)
@@ -320,12 +900,24 @@ class TorrentDownloaderApp:
     def save_download_dir(self, path: str):
         """Saves the download directory to the config file."""
         assert isinstance(path, str) and path, "path must be a non-empty string"
-        from . import config
         config.save_download_directory(path)
 
+    def _load_disk_settings(self) -> Tuple[str, bool]:
+        """Load the disk preset from the config, ignoring unknown preset names."""
+        preset, full_allocation = config.load_disk_settings()
+        if preset not in DISK_PRESETS:
+            logging.warning("Unknown disk preset %r in config, using default", preset)
+            preset = 'default'
+        return preset, full_allocation
+
+    def apply_disk_settings(self, preset: str, full_allocation: bool):
+        """Persist a disk preset; the config subscriber applies it to the session."""
+        assert preset in DISK_PRESETS, "preset must be a known disk preset"
+        assert isinstance(full_allocation, bool), "full_allocation must be a boolean"
+        config.save_disk_settings(preset, full_allocation)
+
     def _resolve_download_dir(self) -> str:
         """Determine and create downloads directory with fallback strategy."""
-        from . import config
         download_dir = config.load_download_directory()
         if download_dir:
             os.makedirs(download_dir, exist_ok=True)
@@ -345,7 +937,7 @@ class TorrentDownloaderApp:
 
     # --- Internal helpers -------------------------------------------------
     def _schedule_update(self):
-        self._update_job = self.master.after(POLL_INTERVAL_MS, self.update_status)
+        self._update_job = self.master.after(self.poll_interval_ms, self.update_status)
 
     @staticmethod
     def _format_eta(seconds: Optional[int]) -> str:
@@ -363,6 +955,10 @@ class TorrentDownloaderApp:
         return name if len(name) <= max_len else name[: max_len - 3] + "..."
 
     def _build_rows(self, statuses: Sequence[TorrentStatus]) -> List[Tuple[str, str, str, str, str, str]]:
+        with PERF.timer("_build_rows"):
+            return self._build_rows_impl(statuses)
+
+    def _build_rows_impl(self, statuses: Sequence[TorrentStatus]) -> List[Tuple[str, str, str, str, str, str]]:
         assert isinstance(statuses, Sequence), "statuses must be a sequence"
         if not statuses:
             return [("No active torrents", "", "", "", "", "")]
@@ -376,29 +972,72 @@ class TorrentDownloaderApp:
             u_rate = util.format_size(st.upload_rate)
             speed = f"↓{d_rate}/s ↑{u_rate}/s"
             eta_str = self._format_eta(st.eta_seconds)
-            rows.append((self._shorten(st.name), progress, speed, eta_str, str(st.num_peers), st.state))
+            rows.append((self._shorten(st.name, self.max_name_len), progress, speed, eta_str, str(st.num_peers), self._state_label(st)))
         return rows
 
+    @staticmethod
+    def _state_label(st: TorrentStatus) -> str:
+        """State column text; shows relocation / recheck / disk-space queue positions."""
+        if st.move_position is not None:
+            return "moving" if st.move_position == 0 else f"queued move #{st.move_position}"
+        if st.check_position is not None:
+            return "checking" if st.check_position == 0 else f"queued check #{st.check_position}"
+        if st.space_position is not None:
+            return f"waiting for disk space #{st.space_position}"
+        return st.state
+
+    @staticmethod
+    def _format_move_progress(progress) -> str:
+        """Aggregate relocation progress for the status bar (empty when idle)."""
+        if progress.total == 0:
+            return ""
+        text = (f"Moving data: {progress.done}/{progress.total} torrents"
+                f" ({util.format_size(progress.bytes_done)} of {util.format_size(progress.bytes_total)})")
+        if progress.failed:
+            text += f", {progress.failed} failed"
+        return text
+
     def _refresh_tree(self, rows: Sequence[Tuple[str, str, str, str, str, str]]):
         assert isinstance(rows, Sequence), "rows must be a sequence"
         # Only update if rows changed to reduce flicker / overhead
         if list(rows) == self._last_rows:
             return
-        # Full rebuild (simpler and still cheap for small list)
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        for r in rows:
-            self.tree.insert("", "end", values=r)
+        with PERF.timer("_refresh_tree"):
+            # Full rebuild (simpler and still cheap for small list)
+            for item in self.tree.get_children():
+                self.tree.delete(item)
+            for r in rows:
+                self.tree.insert("", "end", values=r)
         self._last_rows = list(rows)
 
     def update_status(self):
+        tick_start = time.perf_counter_ns() if PERF.enabled else 0
         try:
+            self.manager.process_alerts()
+            self.manager.tick()
+            if self._api is not None:  # API commands run here, on the thread owning the manager
+                self._api.commands.run_pending(self.manager)
             statuses: List[TorrentStatus] = self.manager.get_status_list()
             rows = self._build_rows(statuses)
             self._refresh_tree(rows)
+            if self._api is not None:
+                self._serve_api(statuses)
+            if self._recorder is not None:
+                self._record(statuses)
+            self.disk_status_var.set(format_disk_stats(self.manager.get_disk_stats()))
+            self.move_status_var.set(self._format_move_progress(self.manager.get_relocation_progress()))
+            # Stats arrive as an alert and are picked up on the next tick
+            self.manager.request_session_stats()
         except Exception as e:  # pragma: no cover - UI defensive
             logging.error("Error updating status: %s", e)
         finally:
+            if tick_start:
+                elapsed = time.perf_counter_ns() - tick_start
+                PERF.record("tick", elapsed)
+                if elapsed > TICK_BUDGET_MS * 1_000_000:
+                    PERF.count_overrun("tick")
+            if self._perf_panel is not None and self._perf_panel.is_open():
+                self._perf_panel.refresh()
             # Reschedule only if window still exists
             if self.master.winfo_exists():
                 self._schedule_update()
@@ -431,6 +1070,98 @@ class TorrentDownloaderApp:
         for idx in indices:
             self.manager.resume_at(idx)
 
+    def _selected_indices(self) -> List[int]:
+        """Return tree row indices of the current selection (row order)."""
+        selection = self.tree.selection()
+        if not selection:
+            return []
+        return [i for i, item in enumerate(self.tree.get_children()) if item in selection]
+
+    def recheck_selected(self):
+        """Queue a throttled hash check for the selected torrents."""
+        for idx in self._selected_indices():
+            self.manager.force_recheck_at(idx)
+
+    def relocate_selected(self):
+        """Move the data of the selected torrents to a chosen folder."""
+        indices = self._selected_indices()
+        if not indices:
+            return
+        dest = filedialog.askdirectory(mustexist=False, title="Move Data To")
+        if not dest:
+            return
+        for idx in indices:
+            self.manager.relocate_at(idx, dest)
+
+    @staticmethod
+    def _policy_from_fields(ratio: str, seed_min: str, idle_min: str, action: str) -> SeedingPolicy:
+        """Build a per-torrent policy from dialog fields (empty = no limit)."""
+        values = []
+        for text, scale in ((ratio, 1.0), (seed_min, 60.0), (idle_min, 60.0)):
+            text = text.strip()
+            value = float(text) if text else None
+            if value is not None and value < 0:
+                raise ValueError("Limits must not be negative")
+            values.append(None if value is None else value * scale)
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown action: {action}")
+        return SeedingPolicy(ratio_limit=values[0], seed_time_limit_s=values[1], idle_time_limit_s=values[2],
+                             action=action)
+
+    def open_seeding_dialog(self):
+        """Set seeding limits for the selected torrents (or make them use the global ones)."""
+        indices = self._selected_indices()
+        if not indices:
+            return
+        current = self.manager.get_seeding_policy_at(indices[0])
+        dialog = tk.Toplevel(self.master)
+        dialog.title("Seeding Limits")
+        dialog.transient(self.master)
+        dialog.grab_set()
+        dialog.resizable(False, False)
+        frame = ttk.Frame(dialog, padding=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        use_global_var = tk.BooleanVar(value=current is None)
+        ttk.Checkbutton(frame, text="Use the global limits from Settings",
+                        variable=use_global_var).grid(row=0, column=0, columnspan=2, sticky=tk.W)
+
+        def fmt(value: Optional[float], scale: float) -> str:
+            return "" if value is None else f"{value / scale:g}"
+
+        policy = current or SeedingPolicy()
+        ratio_var = tk.StringVar(value=fmt(policy.ratio_limit, 1.0))
+        seed_var = tk.StringVar(value=fmt(policy.seed_time_limit_s, 60.0))
+        idle_var = tk.StringVar(value=fmt(policy.idle_time_limit_s, 60.0))
+        for row, (label, var) in enumerate((("Share ratio (empty = none):", ratio_var),
+                                            ("Seeding time (min):", seed_var),
+                                            ("Idle time (min):", idle_var)), start=1):
+            ttk.Label(frame, text=label).grid(row=row, column=0, sticky=tk.W)
+            ttk.Entry(frame, textvariable=var, width=10).grid(row=row, column=1, sticky=tk.W, padx=(5, 0))
+        action_var = tk.StringVar(value=policy.action if current else ACTION_PAUSE)
+        ttk.Label(frame, text="At the limit:").grid(row=4, column=0, sticky=tk.W)
+        ttk.Combobox(frame, textvariable=action_var, values=list(ACTIONS), state="readonly",
+                     width=10).grid(row=4, column=1, sticky=tk.W, padx=(5, 0))
+
+        def do_save():
+            new_policy: Optional[SeedingPolicy] = None
+            if not use_global_var.get():
+                try:
+                    new_policy = self._policy_from_fields(ratio_var.get(), seed_var.get(), idle_var.get(),
+                                                          action_var.get())
+                except ValueError as e:
+                    messagebox.showerror("Invalid Limit", str(e), parent=dialog)
+                    return
+            for idx in indices:
+                self.manager.set_seeding_policy_at(idx, new_policy)
+            dialog.destroy()
+
+        btn_frame = ttk.Frame(dialog, padding=(0, 5, 0, 10))
+        btn_frame.pack(fill=tk.X)
+        ttk.Button(btn_frame, text="Save", command=do_save).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(btn_frame, text="Cancel", command=dialog.destroy).pack(side=tk.RIGHT)
+        dialog.bind('<Return>', lambda _e: do_save())
+
     # --- Removal logic ----------------------------------------------------
     def remove_selected(self, delete_files: bool = False):
         """Remove currently selected torrents.
@@ -480,3 +1211,492 @@ class TorrentDownloaderApp:
                 self._refresh_tree(rows)
             except Exception as e:  # pragma: no cover
                 logging.error("Failed immediate refresh after removal: %s", e)
+
+
+class KeyedTable:
+    """Treeview whose rows are keyed (peer endpoint, file index) and updated in place.
+
+    Only added, changed and removed rows touch the widget, so churn in large
+    tables does not rebuild them. The table is cleared when ``owner`` (the
+    torrent it shows) changes.
+    """
+
+    def __init__(self, parent: tk.Misc, columns: Sequence[str], headings: Sequence[str],
+                 widths: Dict[str, int], height: int = 8):
+        self.frame = ttk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=tuple(columns), show="headings", height=height)
+        for col, heading in zip(columns, headings):
+            self.tree.heading(col, text=heading)
+            self.tree.column(col, width=widths.get(col, 90), anchor=tk.W)
+        vsb = ttk.Scrollbar(self.frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=vsb.set)
+        self.tree.grid(column=0, row=0, sticky="nsew")
+        vsb.grid(column=1, row=0, sticky="ns")
+        self.frame.grid_columnconfigure(0, weight=1)
+        self.frame.grid_rowconfigure(0, weight=1)
+        self._owner: Any = None
+        self._rows: Dict[str, Tuple[str, ...]] = {}
+
+    @staticmethod
+    def diff_rows(old: Dict[str, Tuple[str, ...]], new: Dict[str, Tuple[str, ...]]
+                  ) -> Tuple[List[str], List[str], List[str]]:
+        """Return (added, changed, removed) row keys."""
+        added = [key for key in new if key not in old]
+        changed = [key for key, row in new.items() if key in old and old[key] != row]
+        removed = [key for key in old if key not in new]
+        return added, changed, removed
+
+    def apply(self, owner: Any, rows: Dict[str, Tuple[str, ...]]):
+        if owner != self._owner:  # another torrent: start from an empty table
+            if self._rows:
+                self.tree.delete(*self._rows)
+            self._rows = {}
+            self._owner = owner
+        added, changed, removed = self.diff_rows(self._rows, rows)
+        if removed:
+            self.tree.delete(*removed)
+        for key in changed:
+            self.tree.item(key, values=rows[key])
+        for key in added:
+            self.tree.insert("", "end", iid=key, values=rows[key])
+        self._rows = rows
+
+    def clear(self):
+        self.apply(None, {})
+
+
+class PeerPanel:
+    """Peers tab: connected peers of the selected torrent, keyed by endpoint."""
+
+    title = "Peers"
+    COLUMNS = ("endpoint", "client", "flags", "down", "up", "progress", "connection")
+    HEADINGS = ("IP", "Client", "Flags", "Down", "Up", "Progress", "Connection")
+
+    def __init__(self, parent: tk.Misc, fetch: Callable[[], Optional[Tuple[int, List[PeerInfo]]]]):
+        self._fetch = fetch
+        self.table = KeyedTable(parent, self.COLUMNS, self.HEADINGS, {'endpoint': 200, 'client': 200})
+        self.frame = self.table.frame
+
+    @staticmethod
+    def format_row(peer: PeerInfo) -> Tuple[str, ...]:
+        return (peer.endpoint, peer.client, peer.flags, f"{util.format_size(peer.download_rate)}/s",
+                f"{util.format_size(peer.upload_rate)}/s", f"{peer.progress * 100:.1f}%", peer.connection)
+
+    def refresh(self):
+        selected = self._fetch()
+        if selected is None:
+            self.table.clear()
+            return
+        torrent, peers = selected
+        self.table.apply(torrent, {peer.endpoint: self.format_row(peer) for peer in peers})
+
+    def clear(self):
+        self.table.clear()
+
+
+class FilesPanel:
+    """Files tab: piece bar (have / availability) and per-file progress of the selected torrent.
+
+    The manager caches the ``FileView``; the tab only rebuilds its rows when
+    the view version changes and only redraws the bar for a new version or
+    canvas width.
+    """
+
+    title = "Files"
+    COLUMNS = ("path", "size", "progress", "priority")
+    HEADINGS = ("Path", "Size", "Progress", "Priority")
+    PRIORITY_LABELS = {0: "skip", 1: "low", 4: "normal", 7: "high"}
+    BAR_HEIGHT = 14  # have row; the availability row below is half as high
+    LEVELS = 4  # shades for partly downloaded buckets (fewer shades, fewer canvas items)
+    HAVE_COLORS = ("#e0e0e0", "#b3c9e6", "#86a9d9", "#5a8acc", "#2e6bbf")
+    AVAILABILITY_COLORS = {-1: "#e0e0e0", 0: "#d04040", 1: "#e0a030"}  # >= 2 copies: green
+    WELL_AVAILABLE_COLOR = "#40a040"
+
+    def __init__(self, parent: tk.Misc, fetch: Callable[[], Optional[Tuple[int, Optional[FileView]]]]):
+        self._fetch = fetch
+        self.frame = ttk.Frame(parent)
+        self.canvas = tk.Canvas(self.frame, height=self.BAR_HEIGHT * 3 // 2, highlightthickness=0)
+        self.canvas.pack(fill=tk.X, pady=(2, 4))
+        self.table = KeyedTable(self.frame, self.COLUMNS, self.HEADINGS, {'path': 450}, height=7)
+        self.table.frame.pack(fill=tk.BOTH, expand=True)
+        self._shown: Any = None  # (torrent, view version) of the rows
+        self._drawn: Any = None  # (torrent, view version, width) of the bar
+
+    @classmethod
+    def format_row(cls, entry: FileEntry) -> Tuple[str, ...]:
+        return (entry.path, util.format_size(entry.size), f"{entry.progress * 100:.1f}%",
+                cls.PRIORITY_LABELS.get(entry.priority, str(entry.priority)))
+
+    @classmethod
+    def bar_segments(cls, buckets: Sequence[Tuple[float, int]], width: int) -> List[Tuple[int, int, str, str]]:
+        """Merge piece buckets into (x0, x1, have color, availability color) runs."""
+        if not buckets:
+            return []
+        segments: List[Tuple[int, int, str, str]] = []
+        for i, (have, avail) in enumerate(buckets):
+            colors = (cls.HAVE_COLORS[round(have * cls.LEVELS)],
+                      cls.AVAILABILITY_COLORS.get(avail, cls.WELL_AVAILABLE_COLOR))
+            x0, x1 = i * width // len(buckets), (i + 1) * width // len(buckets)
+            if segments and segments[-1][2:] == colors:
+                segments[-1] = (segments[-1][0], x1, *colors)
+            else:
+                segments.append((x0, x1, *colors))
+        return segments
+
+    def _draw_bar(self, view: FileView, width: int):
+        self.canvas.delete("all")
+        bar = self.BAR_HEIGHT
+        for x0, x1, have, avail in self.bar_segments(bin_pieces(view.pieces, view.availability, width), width):
+            self.canvas.create_rectangle(x0, 0, x1, bar, fill=have, width=0)
+            self.canvas.create_rectangle(x0, bar, x1, bar * 3 // 2, fill=avail, width=0)
+
+    def refresh(self):
+        selected = self._fetch()
+        if selected is None or selected[1] is None:  # nothing selected or no metadata yet
+            self.clear()
+            return
+        torrent, view = selected
+        if self._shown != (torrent, view.version):
+            self.table.apply(torrent, {str(f.index): self.format_row(f) for f in view.files})
+            self._shown = (torrent, view.version)
+        width = self.canvas.winfo_width()
+        if width > 1 and self._drawn != (torrent, view.version, width):  # 1 = not mapped yet
+            self._draw_bar(view, width)
+            self._drawn = (torrent, view.version, width)
+
+    def clear(self):
+        self.table.clear()
+        self.canvas.delete("all")
+        self._shown = self._drawn = None
+
+
+class DetailsPane:
+    """Notebook under the torrent list with details of the selected torrent.
+
+    Only the visible tab is refreshed, only while the pane is shown, every
+    ``DETAILS_POLL_MS`` or right after the selection or tab changed.
+    """
+
+    def __init__(self, parent: tk.Misc, master: tk.Misc):
+        self.master = master
+        self.tabs: List[Any] = []  # objects with frame, title, refresh() and clear()
+        self.visible = False
+        self._job: Optional[str] = None
+        self.notebook = ttk.Notebook(parent, height=220)
+        self.notebook.bind('<<NotebookTabChanged>>', lambda _e: self.refresh_now())
+
+    def add_tab(self, tab: Any):
+        """Add a tab whose frame was created with ``self.notebook`` as parent."""
+        self.tabs.append(tab)
+        self.notebook.add(tab.frame, text=tab.title)
+
+    def show(self):
+        self.notebook.grid(column=0, row=1, columnspan=2, sticky="ew", pady=(5, 0))
+        self.visible = True
+        self.refresh_now()
+
+    def hide(self):
+        self.notebook.grid_remove()
+        self.visible = False
+        self._cancel()
+        for tab in self.tabs:  # don't keep stale details around while hidden
+            tab.clear()
+
+    def _cancel(self):
+        if self._job is not None:
+            self.master.after_cancel(self._job)
+            self._job = None
+
+    def current_tab(self) -> Any:
+        return self.tabs[self.notebook.index("current")]
+
+    def refresh_now(self):
+        """Refresh immediately (e.g. on selection change) and restart the interval."""
+        if self.visible:
+            self._cancel()
+            self.refresh()
+
+    def refresh(self):
+        self._job = None
+        if not self.visible:
+            return
+        try:
+            self.current_tab().refresh()
+        except Exception as e:  # pragma: no cover - UI defensive
+            logging.error("Failed to refresh torrent details: %s", e)
+        self._job = self.master.after(DETAILS_POLL_MS, self.refresh)
+
+
+class PerformancePanel:
+    """Toplevel window showing per-stage latency percentiles and memory use.
+
+    Opening the panel enables the process wide ``PERF`` recorder, closing it
+    disables instrumentation again unless it was already on (``perf.ENV_VAR``).
+    Allocation tracing (``tracemalloc``) started with the "Trace allocations"
+    box stops when it is unchecked or the panel closes.
+    """
+
+    COLUMNS = ("stage", "calls", "p50", "p95", "p99", "max", "overruns")
+    MEMORY_COLUMNS = ("location", "size", "blocks")
+
+    def __init__(self, master: tk.Misc):
+        self.window = tk.Toplevel(master)
+        self.window.title("Performance")
+        self.window.geometry("640x460")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self._open = True
+        self._memory_refreshed = 0.0
+
+        frame = ttk.Frame(self.window, padding=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(frame, columns=self.COLUMNS, show="headings", height=8)
+        for col in self.COLUMNS:
+            self.tree.heading(col, text=col.capitalize() if col == "stage" else col)
+            self.tree.column(col, width=180 if col == "stage" else 70, anchor=tk.W if col == "stage" else tk.E)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        btn_frame = ttk.Frame(frame)
+        btn_frame.pack(fill=tk.X, pady=(5, 0))
+        ttk.Button(btn_frame, text="Reset", command=self.reset).pack(side=tk.LEFT)
+        ttk.Label(btn_frame, text=f"Times in ms; tick budget {TICK_BUDGET_MS} ms").pack(side=tk.RIGHT)
+
+        memory_row = ttk.Frame(frame)
+        memory_row.pack(fill=tk.X, pady=(8, 0))
+        self.memory_var = tk.StringVar()
+        ttk.Label(memory_row, textvariable=self.memory_var).pack(side=tk.LEFT)
+        self.trace_var = tk.BooleanVar(value=is_tracing())
+        ttk.Checkbutton(memory_row, text="Trace allocations", variable=self.trace_var,
+                        command=self.toggle_tracing).pack(side=tk.RIGHT)
+        self.memory_tree = ttk.Treeview(frame, columns=self.MEMORY_COLUMNS, show="headings", height=6)
+        for col in self.MEMORY_COLUMNS:
+            self.memory_tree.heading(col, text=col.capitalize())
+            first = col == self.MEMORY_COLUMNS[0]
+            self.memory_tree.column(col, width=420 if first else 90, anchor=tk.W if first else tk.E)
+        self.memory_tree.pack(fill=tk.BOTH, expand=True)
+
+        self._owns_perf = not PERF.enabled  # left on at close if something else enabled it
+        self._started_tracing = False
+        PERF.enable()
+        self.refresh()
+
+    def is_open(self) -> bool:
+        return self._open
+
+    @staticmethod
+    def format_rows(stats) -> List[Tuple[str, ...]]:
+        """Format ``perf.StageStats`` entries into tree rows."""
+        return [
+            (s.stage, str(s.count), f"{s.p50_ms:.2f}", f"{s.p95_ms:.2f}", f"{s.p99_ms:.2f}",
+             f"{s.max_ms:.2f}", str(s.overruns))
+            for s in stats
+        ]
+
+    @staticmethod
+    def format_memory(report: MemoryReport) -> Tuple[str, List[Tuple[str, ...]]]:
+        """(summary text, top allocator rows) of a ``memory.MemoryReport``."""
+        summary = "RSS: " + ("n/a" if report.rss_bytes is None else util.format_size(report.rss_bytes))
+        if report.traced_bytes is not None:
+            summary += (f"  Python: {util.format_size(report.traced_bytes)}"
+                        f" (peak {util.format_size(report.traced_peak_bytes or 0)})")
+        rows = [(a.location, util.format_size(a.size_bytes), str(a.count)) for a in report.top]
+        return summary, rows
+
+    def refresh(self):
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+        for row in self.format_rows(PERF.snapshot()):
+            self.tree.insert("", "end", values=row)
+        now = time.monotonic()
+        if now - self._memory_refreshed >= MEMORY_REFRESH_S:
+            self.refresh_memory()
+
+    def refresh_memory(self):
+        self._memory_refreshed = time.monotonic()
+        summary, rows = self.format_memory(memory_report())
+        self.memory_var.set(summary)
+        self.memory_tree.delete(*self.memory_tree.get_children())
+        for row in rows:
+            self.memory_tree.insert("", "end", values=row)
+
+    def toggle_tracing(self):
+        if self.trace_var.get():
+            self._started_tracing = self._started_tracing or not is_tracing()
+            start_tracing()
+        elif self._started_tracing:  # leave tracing started elsewhere (PYTHONTRACEMALLOC) on
+            self._started_tracing = False
+            stop_tracing()
+        self.refresh_memory()
+
+    def reset(self):
+        PERF.reset()
+        self.refresh()
+
+    def close(self):
+        if self._owns_perf:
+            PERF.disable()
+        if self._started_tracing:
+            stop_tracing()
+        self._open = False
+        try:
+            self.window.destroy()
+        except Exception:  # pragma: no cover - window already gone
+            pass
+
+
+class StatisticsWindow:
+    """Toplevel window with the payload traffic of a period and its busiest torrents."""
+
+    PERIODS = (("Last hour", HOUR), ("Last 24 hours", DAY), ("Last 7 days", 7 * DAY), ("Last 30 days", 30 * DAY))
+    TOP_COLUMNS = ("name", "downloaded", "uploaded")
+    BUCKET_COLUMNS = ("time", "downloaded", "uploaded")
+
+    def __init__(self, master: tk.Misc, fetch: Callable[[float], Optional[TrafficReport]]):
+        self._fetch = fetch
+        self.window = tk.Toplevel(master)
+        self.window.title("Statistics")
+        self.window.geometry("640x480")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self._open = True
+
+        frame = ttk.Frame(self.window, padding=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+        top_row = ttk.Frame(frame)
+        top_row.pack(fill=tk.X)
+        self.period_var = tk.StringVar(value=self.PERIODS[1][0])
+        period = ttk.Combobox(top_row, textvariable=self.period_var, values=[p[0] for p in self.PERIODS],
+                              state="readonly", width=15)
+        period.pack(side=tk.LEFT)
+        period.bind("<<ComboboxSelected>>", lambda _e: self.refresh())
+        ttk.Button(top_row, text="Refresh", command=self.refresh).pack(side=tk.LEFT, padx=5)
+        self.totals_label = ttk.Label(top_row, text="")
+        self.totals_label.pack(side=tk.RIGHT)
+
+        ttk.Label(frame, text="Top torrents").pack(anchor=tk.W, pady=(8, 0))
+        self.top_tree = self._table(frame, self.TOP_COLUMNS, height=6)
+        ttk.Label(frame, text="History").pack(anchor=tk.W, pady=(8, 0))
+        self.bucket_tree = self._table(frame, self.BUCKET_COLUMNS, height=10)
+        self.refresh()
+
+    @staticmethod
+    def _table(parent: tk.Misc, columns: Sequence[str], height: int) -> ttk.Treeview:
+        tree = ttk.Treeview(parent, columns=columns, show="headings", height=height)
+        for col in columns:
+            tree.heading(col, text=col.capitalize())
+            first = col == columns[0]
+            tree.column(col, width=300 if first else 120, anchor=tk.W if first else tk.E)
+        tree.pack(fill=tk.BOTH, expand=True)
+        return tree
+
+    def is_open(self) -> bool:
+        return self._open
+
+    @staticmethod
+    def format_report(report: TrafficReport) -> Tuple[str, List[Tuple[str, ...]], List[Tuple[str, ...]]]:
+        """(totals text, top torrent rows, bucket rows newest first) of a report."""
+        totals = f"Down: {util.format_size(report.downloaded)}  Up: {util.format_size(report.uploaded)}"
+        top = [(t.name or t.info_hash, util.format_size(t.downloaded), util.format_size(t.uploaded))
+               for t in report.top]
+        time_format = "%Y-%m-%d" if report.resolution >= DAY else "%Y-%m-%d %H:%M"
+        buckets = [(time.strftime(time_format, time.localtime(b.start)), util.format_size(b.downloaded),
+                    util.format_size(b.uploaded)) for b in reversed(report.buckets)]
+        return totals, top, buckets
+
+    def refresh(self):
+        span = dict(self.PERIODS).get(self.period_var.get(), DAY)
+        report = self._fetch(span)
+        for tree in (self.top_tree, self.bucket_tree):
+            tree.delete(*tree.get_children())
+        if report is None:
+            self.totals_label.config(text=STARTING_TEXT)
+            return
+        totals, top, buckets = self.format_report(report)
+        self.totals_label.config(text=totals)
+        for row in top:
+            self.top_tree.insert("", "end", values=row)
+        for row in buckets:
+            self.bucket_tree.insert("", "end", values=row)
+
+    def close(self):
+        self._open = False
+        try:
+            self.window.destroy()
+        except Exception:  # pragma: no cover - window already gone
+            pass
+
+
+class PostProcessWindow:
+    """Toplevel window listing post-processing jobs, refreshed while open."""
+
+    COLUMNS = ("name", "state", "stage", "message", "finished")
+
+    def __init__(self, master: tk.Misc, fetch: Callable[[], Optional[List[PostProcessJob]]],
+                 retry: Callable[[str], None]):
+        self.master = master
+        self._fetch = fetch
+        self._retry = retry
+        self._job: Optional[str] = None
+        self.window = tk.Toplevel(master)
+        self.window.title("Post-processing")
+        self.window.geometry("760x320")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self._open = True
+
+        frame = ttk.Frame(self.window, padding=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(frame, columns=self.COLUMNS, show="headings", height=10)
+        widths = {"name": 220, "state": 70, "stage": 70, "message": 260, "finished": 120}
+        for col in self.COLUMNS:
+            self.tree.heading(col, text=col.capitalize())
+            self.tree.column(col, width=widths[col], anchor=tk.W)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+        btn_frame = ttk.Frame(frame)
+        btn_frame.pack(fill=tk.X, pady=(5, 0))
+        ttk.Button(btn_frame, text="Retry Failed", command=self.retry_selected).pack(side=tk.LEFT)
+        self.status_label = ttk.Label(btn_frame, text="")
+        self.status_label.pack(side=tk.RIGHT)
+        self.refresh()
+
+    def is_open(self) -> bool:
+        return self._open
+
+    @staticmethod
+    def format_jobs(jobs: Sequence[PostProcessJob]) -> List[Tuple[str, Tuple[str, ...]]]:
+        """(info-hash, row) per job; the info-hash is the tree item id."""
+        rows = []
+        for job in jobs:
+            finished = "" if job.finished_at is None else time.strftime("%Y-%m-%d %H:%M",
+                                                                        time.localtime(job.finished_at))
+            rows.append((job.info_hash, (job.name, job.state, job.stage, job.message, finished)))
+        return rows
+
+    def refresh(self):
+        self._job = None
+        jobs = self._fetch()
+        selection = self.tree.selection()
+        self.tree.delete(*self.tree.get_children())
+        if jobs is None:
+            self.status_label.config(text=STARTING_TEXT)
+        else:
+            for key, row in self.format_jobs(jobs):
+                self.tree.insert("", "end", iid=key, values=row)
+            self.tree.selection_set([key for key in selection if self.tree.exists(key)])
+            self.status_label.config(text=f"{len(jobs)} jobs")
+        self._job = self.master.after(DETAILS_POLL_MS, self.refresh)
+
+    def retry_selected(self):
+        for key in self.tree.selection():
+            if self.tree.set(key, "state") == FAILED:
+                self._retry(key)
+        if self._job is not None:
+            self.master.after_cancel(self._job)
+        self.refresh()
+
+    def close(self):
+        self._open = False
+        if self._job is not None:
+            self.master.after_cancel(self._job)
+            self._job = None
+        try:
+            self.window.destroy()
+        except Exception:  # pragma: no cover - window already gone
+            pass
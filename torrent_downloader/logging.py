@@ -1,51 +1,171 @@
+import atexit
+import gzip
 import logging
-import sys
+import logging.handlers
 import os
-from typing import Optional
+import queue
+import shutil
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple, Union
 
 from . import util
 
 _CONFIGURED = False
 _LOG_FILE: Optional[str] = None
+_QUEUE: Optional[queue.Queue] = None
+_LISTENER: Optional[logging.handlers.QueueListener] = None  # only set while its thread runs
+_UNSUBSCRIBE_CONFIG: Optional[Callable[[], None]] = None
 
 DEFAULT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+DEFAULT_LEVEL = logging.INFO
+LEVEL_ENV_VAR = 'TORRENT_DOWNLOADER_LOG_LEVEL'
+
+# Rotate at 5 MiB and keep 5 gzip-compressed generations.
+MAX_LOG_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 5
+
+# At most RATE_LIMIT_BURST identical messages per RATE_LIMIT_INTERVAL seconds.
+RATE_LIMIT_INTERVAL = 60.0
+RATE_LIMIT_BURST = 5
+
+
+def _gzip_namer(name: str) -> str:
+    return name + '.gz'
+
+
+def _gzip_rotator(source: str, dest: str) -> None:
+    """Compress the rotated log file (runs on the listener thread)."""
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
 
+class RateLimitFilter(logging.Filter):
+    """Drop repeats of the same message template within a time window.
+
+    Records are keyed by logger, level and the *unformatted* message, so e.g.
+    ``"Failed to retrieve status for handle: %s"`` is limited as a whole no
+    matter which handle failed. Once a window expires the next record that
+    passes carries a note with the number of suppressed repeats. Records
+    above ``max_level`` (by default ERROR and CRITICAL) are never dropped:
+    errors sharing a template are usually about different things.
+    """
+
+    def __init__(self, interval: float = RATE_LIMIT_INTERVAL, burst: int = RATE_LIMIT_BURST,
+                 clock=time.monotonic, max_level: int = logging.WARNING):
+        super().__init__()
+        assert interval > 0, "interval must be positive"
+        assert isinstance(burst, int) and burst > 0, "burst must be a positive integer"
+        self.interval = interval
+        self.burst = burst
+        self.max_level = max_level
+        self._clock = clock
+        # key -> [window_start, passed_in_window, suppressed_in_window]
+        self._windows: Dict[Tuple[str, int, str], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level:
+            return True
+        key = (record.name, record.levelno, str(record.msg))
+        now = self._clock()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.msg = f"{record.msg} (suppressed {suppressed} similar messages)"
+                if len(self._windows) > 10_000:  # bound memory for unique messages
+                    self._windows = {k: w for k, w in self._windows.items() if now - w[0] < self.interval}
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+def resolve_level(level: Union[int, str, None] = None) -> int:
+    """Resolve the log level: explicit value, environment, config, default.
+
+    Accepts level numbers or names ("debug", "WARNING", ...). Unknown names
+    fall through to the next source.
+    """
+    candidates = [level, os.getenv(LEVEL_ENV_VAR)]
+    try:
+        from . import config
+        candidates.append(config.load_log_level())
+    except Exception:  # pragma: no cover - unreadable config must not break logging
+        pass
+    for candidate in candidates:
+        if isinstance(candidate, int):
+            return candidate
+        if isinstance(candidate, str) and candidate.strip():
+            value = logging.getLevelName(candidate.strip().upper())
+            if isinstance(value, int):
+                return value
+    return DEFAULT_LEVEL
 
-def setup_logging(level: int = logging.DEBUG) -> str:
-    """Configure root logging handlers (file + stderr) if not already done.
+
+def setup_logging(level: Union[int, str, None] = None) -> str:
+    """Configure asynchronous root logging (rotating file + stderr) once.
+
+    Records are put on a queue by a ``QueueHandler`` on the calling thread and
+    written by a ``QueueListener`` thread, so neither the Tk thread nor the
+    engine threads ever block on log I/O.
 
     Parameters
     ----------
-    level: int
-        Root logger level (defaults to DEBUG for maximum diagnostics).
+    level: int | str | None
+        Root logger level. ``None`` resolves it from the
+        ``TORRENT_DOWNLOADER_LOG_LEVEL`` environment variable, then the config
+        file, falling back to INFO.
 
     Returns
     -------
     str
         Path to the log file used.
     """
-    assert isinstance(level, int), "level must be an integer"
-    global _CONFIGURED, _LOG_FILE
+    assert level is None or isinstance(level, (int, str)), "level must be an int, str or None"
+    global _CONFIGURED, _LOG_FILE, _QUEUE, _LISTENER
     if _CONFIGURED and _LOG_FILE is not None:
         return _LOG_FILE
 
     log_dir = util.get_log_dir()
-    # Ensure directory exists before creating FileHandler
+    # Ensure directory exists before creating the file handler
     os.makedirs(log_dir, exist_ok=True)
     log_path = os.path.join(log_dir, 'torrentdownloader.log')
 
-    # ``force=True`` ensures a clean slate (Py3.8+) without accumulating handlers
-    logging.basicConfig(
-        level=level,
-        format=DEFAULT_FORMAT,
-        handlers=[
-            logging.FileHandler(log_path),
-            logging.StreamHandler(sys.stderr),
-        ],
-        force=True,
-    )
-
-    logging.info("Logging initialised")
+    formatter = logging.Formatter(DEFAULT_FORMAT)
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_path, maxBytes=MAX_LOG_BYTES, backupCount=BACKUP_COUNT, encoding='utf-8')
+    file_handler.namer = _gzip_namer
+    file_handler.rotator = _gzip_rotator
+    file_handler.setFormatter(formatter)
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(formatter)
+
+    _QUEUE = queue.Queue(-1)
+    queue_handler = logging.handlers.QueueHandler(_QUEUE)
+    queue_handler.addFilter(RateLimitFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):  # clean slate, like basicConfig(force=True)
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(queue_handler)
+    root.setLevel(resolve_level(level))
+
+    listener = logging.handlers.QueueListener(_QUEUE, file_handler, stream_handler)
+    listener.start()
+    _LISTENER = listener
+    atexit.register(shutdown_logging)
+    _subscribe_to_config()
+
+    logging.info("Logging initialised (level %s)", logging.getLevelName(root.level))
     logging.debug(f"Platform: {sys.platform}")
     logging.debug(f"Python executable: {sys.executable}")
     logging.debug(f"Python version: {sys.version}")
@@ -58,3 +178,47 @@ def setup_logging(level: int = logging.DEBUG) -> str:
     _CONFIGURED = True
     _LOG_FILE = log_path
     return log_path
+
+
+def set_log_level(level: Union[int, str]) -> int:
+    """Change the root logger level at runtime and return the numeric level."""
+    assert isinstance(level, (int, str)), "level must be an int or str"
+    value = resolve_level(level)
+    logging.getLogger().setLevel(value)
+    return value
+
+
+def _on_log_level_changed(changed: Dict[str, Any]) -> None:
+    """Config subscriber: apply a new ``log_level`` (None falls back to env/default)."""
+    value = resolve_level(changed.get('log_level'))
+    logging.getLogger().setLevel(value)
+    logging.info("Log level changed to %s", logging.getLevelName(value))
+
+
+def _subscribe_to_config() -> None:
+    global _UNSUBSCRIBE_CONFIG
+    from . import config
+    if _UNSUBSCRIBE_CONFIG is None:
+        _UNSUBSCRIBE_CONFIG = config.STORE.subscribe(_on_log_level_changed, keys=('log_level',))
+
+
+def flush_logging() -> None:
+    """Block until all queued records have been written by the listener."""
+    if _QUEUE is not None and _LISTENER is not None:
+        _QUEUE.join()
+
+
+def shutdown_logging() -> None:
+    """Stop the listener thread after draining the queue (idempotent)."""
+    global _LISTENER, _UNSUBSCRIBE_CONFIG
+    if _UNSUBSCRIBE_CONFIG is not None:
+        _UNSUBSCRIBE_CONFIG()
+        _UNSUBSCRIBE_CONFIG = None
+    if _LISTENER is not None:
+        listener, _LISTENER = _LISTENER, None  # flush_logging must not wait on a stopped listener
+        try:
+            listener.stop()
+        except Exception:  # pragma: no cover - already stopped
+            pass
+        for handler in listener.handlers:
+            handler.close()
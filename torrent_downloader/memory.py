@@ -0,0 +1,130 @@
+"""Low-memory operating mode and process memory reporting.
+
+``LOW_MEMORY_SETTINGS`` caps the libtorrent settings whose memory grows
+with the number of torrents and peers (peer lists, send / receive
+buffers, the disk queue, connections, the alert queue). They are applied
+on top of the disk preset and can be switched at runtime with
+``TorrentManager.apply_memory_mode``; switching off restores
+``LIBTORRENT_DEFAULTS`` for the same keys.
+
+The rest of the module measures the process: ``rss_bytes`` reads the
+resident set size and ``memory_report`` adds the top Python allocators
+while ``tracemalloc`` tracing is on (off by default, it slows every
+allocation down).
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import os
+import tracemalloc
+
+KIB = 1024
+MIB = 1024 * KIB
+DEFAULT_TOP_N = 10
+
+LOW_MEMORY_SETTINGS: Dict[str, Any] = {
+    'connections_limit': 50,
+    'max_peerlist_size': 200,  # peers remembered per torrent
+    'max_paused_peerlist_size': 50,
+    'send_buffer_watermark': 64 * KIB,
+    'send_buffer_low_watermark': 4 * KIB,
+    'send_buffer_watermark_factor': 20,
+    'max_peer_recv_buffer_size': 512 * KIB,
+    'max_out_request_queue': 100,
+    'max_allowed_in_request_queue': 250,
+    'max_queued_disk_bytes': 4 * MIB,
+    'checking_mem_usage': 32,  # 16 KiB blocks
+    'file_pool_size': 10,
+    'aio_threads': 2,
+    'alert_queue_size': 500,
+    'dht_max_torrents': 500,
+    'dht_max_peers': 100,
+}
+
+# libtorrent 2.x defaults of the keys above (what switching the mode off restores).
+LIBTORRENT_DEFAULTS: Dict[str, Any] = {
+    'connections_limit': 200,
+    'max_peerlist_size': 3000,
+    'max_paused_peerlist_size': 1000,
+    'send_buffer_watermark': 500 * KIB,
+    'send_buffer_low_watermark': 10 * KIB,
+    'send_buffer_watermark_factor': 50,
+    'max_peer_recv_buffer_size': 2 * MIB,
+    'max_out_request_queue': 500,
+    'max_allowed_in_request_queue': 2000,
+    'max_queued_disk_bytes': 100 * MIB,
+    'checking_mem_usage': 256,
+    'file_pool_size': 40,
+    'aio_threads': 10,
+    'alert_queue_size': 2000,
+    'dht_max_torrents': 2000,
+    'dht_max_peers': 500,
+}
+
+
+def memory_settings(low_memory: bool) -> Dict[str, Any]:
+    """Return a copy of the libtorrent settings for the memory mode."""
+    assert isinstance(low_memory, bool), "low_memory must be a boolean"
+    return dict(LOW_MEMORY_SETTINGS if low_memory else LIBTORRENT_DEFAULTS)
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size of this process (None where it can't be read)."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+@dataclass
+class Allocation:
+    location: str  # "file:line" of the allocating code
+    size_bytes: int  # still allocated
+    count: int  # live blocks
+
+
+@dataclass
+class MemoryReport:
+    rss_bytes: Optional[int]
+    traced_bytes: Optional[int] = None  # None while tracing is off
+    traced_peak_bytes: Optional[int] = None
+    top: List[Allocation] = field(default_factory=list)  # largest first
+
+
+def start_tracing(frames: int = 1) -> None:
+    """Start recording Python allocations (no-op if already tracing)."""
+    assert isinstance(frames, int) and frames > 0, "frames must be a positive integer"
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop_tracing() -> None:
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def is_tracing() -> bool:
+    return tracemalloc.is_tracing()
+
+
+def top_allocations(top_n: int = DEFAULT_TOP_N) -> List[Allocation]:
+    """Source lines holding the most memory (empty while tracing is off)."""
+    assert isinstance(top_n, int) and top_n > 0, "top_n must be a positive integer"
+    if not tracemalloc.is_tracing():
+        return []
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ))
+    return [Allocation(f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}", stat.size, stat.count)
+            for stat in snapshot.statistics("lineno")[:top_n]]
+
+
+def memory_report(top_n: int = DEFAULT_TOP_N) -> MemoryReport:
+    """RSS plus, while tracing, the traced totals and top allocators."""
+    report = MemoryReport(rss_bytes())
+    if tracemalloc.is_tracing():
+        report.traced_bytes, report.traced_peak_bytes = tracemalloc.get_traced_memory()
+        report.top = top_allocations(top_n)
+    return report
@@ -0,0 +1,119 @@
+"""Peer classes: an unthrottled local network class and rate limited IP ranges.
+
+libtorrent puts every peer into one or more peer classes; the session rate
+limits are the limits of the built-in global class. The class of a peer is
+looked up in the peer class filter, an IP filter whose flags are a bitmask
+of class ids. ``filter_ranges`` paints that filter:
+
+* every address is in the global class,
+* with ``local_unthrottled`` the ``LOCAL_NETWORKS`` are in the local class
+  *instead*, so they skip the session limits; the local class also ignores
+  unchoke slots and gets a higher bandwidth priority,
+* each ``PeerClassRule`` adds its own class to its networks, with its own
+  upload and download limit (a peer limited by several classes gets the
+  lowest limit).
+
+The filter flags are a signed 32-bit integer in the Python bindings, so
+class ids must stay below 31; with the three built-in classes that leaves
+room for ``MAX_RULES`` user classes.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+import ipaddress
+
+MAX_CLASS_ID = 30  # 1 << 31 overflows the filter flags
+BUILTIN_CLASSES = 3  # global, tcp and local
+MAX_RULES = MAX_CLASS_ID + 1 - BUILTIN_CLASSES
+LOCAL_PRIORITY = 2  # bandwidth priority of the local class (libtorrent default: 1)
+
+LOCAL_NETWORKS: Tuple[str, ...] = (
+    '10.0.0.0/8', '172.16.0.0/12', '192.168.0.0/16',  # RFC 1918
+    '169.254.0.0/16', '127.0.0.0/8',  # link-local, loopback
+    'fc00::/7', 'fe80::/10', '::1/128',  # unique local, link-local, loopback
+)
+
+Network = ipaddress.IPv4Network | ipaddress.IPv6Network
+
+
+@dataclass(frozen=True)
+class PeerClassRule:
+    """A user defined class: peers in ``networks`` share its rate limits."""
+    name: str
+    networks: Tuple[str, ...]  # CIDR notation, IPv4 or IPv6
+    upload_limit: int = 0  # bytes/s, 0 = unlimited
+    download_limit: int = 0
+
+    def __post_init__(self) -> None:
+        if not isinstance(self.name, str) or not self.name:
+            raise ValueError("peer class name must be a non-empty string")
+        if isinstance(self.networks, str) or not self.networks:
+            raise ValueError(f"peer class {self.name}: networks must be a non-empty list")
+        object.__setattr__(self, 'networks', tuple(self.networks))
+        for network in self.networks:
+            ipaddress.ip_network(network, strict=False)  # raises ValueError
+        for name in ('upload_limit', 'download_limit'):
+            value = getattr(self, name)
+            if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+                raise ValueError(f"peer class {self.name}: {name} must be an integer >= 0")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'networks': list(self.networks), 'upload_limit': self.upload_limit,
+                'download_limit': self.download_limit}
+
+    @classmethod
+    def from_dict(cls, name: str, data: Mapping[str, Any]) -> "PeerClassRule":
+        if not isinstance(data, Mapping):
+            raise ValueError(f"peer class {name} must be an object")
+        return cls(name, **{k: v for k, v in data.items() if k in cls.__dataclass_fields__ and k != 'name'})
+
+
+@dataclass(frozen=True)
+class PeerClasses:
+    """Peer class configuration of a session."""
+    local_unthrottled: bool = True
+    rules: Tuple[PeerClassRule, ...] = field(default_factory=tuple)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, 'rules', tuple(self.rules))
+        names = [rule.name for rule in self.rules]
+        assert len(set(names)) == len(names), "peer class names must be unique"
+        if len(self.rules) > MAX_RULES:
+            raise ValueError(f"at most {MAX_RULES} peer classes are supported")
+
+
+def _networks(cidrs: Iterable[str]) -> List[Network]:
+    return [ipaddress.ip_network(cidr, strict=False) for cidr in cidrs]
+
+
+def filter_ranges(config: PeerClasses, global_class: int, local_class: int,
+                  rule_classes: Mapping[str, int]) -> List[Tuple[str, str, int]]:
+    """(first, last, class mask) ranges covering the IPv4 and IPv6 space.
+
+    ``rule_classes`` maps rule names to their class ids. Adjacent ranges
+    with the same mask are joined.
+    """
+    local = _networks(LOCAL_NETWORKS) if config.local_unthrottled else []
+    rules = [(_networks(rule.networks), 1 << rule_classes[rule.name]) for rule in config.rules]
+    ranges: List[Tuple[str, str, int]] = []
+    for version, address, bits in ((4, ipaddress.IPv4Address, 32), (6, ipaddress.IPv6Address, 128)):
+        family_local = [n for n in local if n.version == version]
+        family_rules = [([n for n in networks if n.version == version], bit) for networks, bit in rules]
+        # Masks only change at network boundaries; evaluate each segment between them once.
+        boundaries = {0, 1 << bits}
+        for network in family_local + [n for networks, _bit in family_rules for n in networks]:
+            boundaries.update((int(network.network_address), int(network.broadcast_address) + 1))
+        points = sorted(boundaries)
+        segments: List[List[int]] = []  # [first, last, mask]
+        for start, end in zip(points, points[1:]):
+            ip = address(start)
+            mask = 1 << (local_class if any(ip in n for n in family_local) else global_class)
+            for networks, bit in family_rules:
+                if any(ip in n for n in networks):
+                    mask |= bit
+            if segments and segments[-1][2] == mask:
+                segments[-1][1] = end - 1
+            else:
+                segments.append([start, end - 1, mask])
+        ranges.extend((str(address(first)), str(address(last)), mask) for first, last, mask in segments)
+    return ranges
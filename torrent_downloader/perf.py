@@ -0,0 +1,226 @@
+"""Lightweight hot-path timing instrumentation.
+
+Stages such as ``get_status_list`` or ``_refresh_tree`` are wrapped in timers
+that record ``perf_counter_ns`` durations into fixed-bucket histograms. The
+histograms never grow, so recording is O(log buckets) and memory is constant
+no matter how long the app runs.
+
+When the recorder is disabled (the default) ``PERF.timer()`` hands out a
+shared no-op context manager, so the cost on the hot path is a single
+attribute check and method call.
+"""
+
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+import os
+import threading
+import time
+
+# Bucket upper bounds in nanoseconds: 1µs .. ~67s in quarter-octave steps
+# (each bucket is ~19% wider than the previous one).
+BUCKET_BOUNDS_NS: tuple = tuple(int(1000 * 2 ** (i / 4)) for i in range(4 * 26 + 1))
+
+ENV_VAR = "TORRENT_DOWNLOADER_PERF"
+STARTUP_ENV_VAR = "TORRENT_DOWNLOADER_STARTUP_REPORT"
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (values in nanoseconds)."""
+
+    __slots__ = ("counts", "count", "total_ns", "max_ns")
+
+    def __init__(self) -> None:
+        # One extra overflow bucket for values above the last bound.
+        self.counts: List[int] = [0] * (len(BUCKET_BOUNDS_NS) + 1)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, ns: int) -> None:
+        assert isinstance(ns, int), "ns must be an integer"
+        if ns < 0:
+            ns = 0
+        self.counts[bisect_left(BUCKET_BOUNDS_NS, ns)] += 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentile(self, q: float) -> int:
+        """Return the upper bucket bound containing the ``q`` quantile (0..1).
+
+        The result is clamped to the observed maximum so a single sample does
+        not report the (coarser) bucket bound instead of its real value.
+        """
+        assert 0.0 <= q <= 1.0, "q must be within [0, 1]"
+        if self.count == 0:
+            return 0
+        rank = max(1, int(q * self.count + 0.5))
+        seen = 0
+        for idx, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                bound = BUCKET_BOUNDS_NS[idx] if idx < len(BUCKET_BOUNDS_NS) else self.max_ns
+                return min(bound, self.max_ns)
+        return self.max_ns  # pragma: no cover - unreachable
+
+
+@dataclass
+class StageStats:
+    stage: str
+    count: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    overruns: int
+
+
+class _NullTimer:
+    """Context manager used while instrumentation is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *_exc) -> bool:
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("_recorder", "_stage", "_t0")
+
+    def __init__(self, recorder: "PerfRecorder", stage: str) -> None:
+        self._recorder = recorder
+        self._stage = stage
+        self._t0 = 0
+
+    def __enter__(self) -> "_Timer":
+        self._t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *_exc) -> bool:
+        self._recorder.record(self._stage, time.perf_counter_ns() - self._t0)
+        return False
+
+
+class PerfRecorder:
+    """Collects per-stage histograms and overrun counters."""
+
+    def __init__(self, enabled: bool = False) -> None:
+        assert isinstance(enabled, bool), "enabled must be a boolean"
+        self.enabled = enabled
+        self._hists: Dict[str, Histogram] = {}
+        self._overruns: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hists.clear()
+            self._overruns.clear()
+
+    def timer(self, stage: str):
+        """Return a context manager timing ``stage`` (no-op when disabled)."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage)
+
+    def record(self, stage: str, ns: int) -> None:
+        """Record a duration for ``stage`` (ignored when disabled)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self._hists.get(stage)
+            if hist is None:
+                hist = self._hists[stage] = Histogram()
+            hist.record(ns)
+
+    def count_overrun(self, stage: str) -> None:
+        """Count one overrun (e.g. a GUI tick exceeding its time budget)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._overruns[stage] = self._overruns.get(stage, 0) + 1
+
+    def histogram(self, stage: str) -> Optional[Histogram]:
+        return self._hists.get(stage)
+
+    def snapshot(self) -> List[StageStats]:
+        """Return per-stage statistics sorted by stage name."""
+        with self._lock:
+            stages = sorted(set(self._hists) | set(self._overruns))
+            result: List[StageStats] = []
+            for stage in stages:
+                hist = self._hists.get(stage) or Histogram()
+                result.append(StageStats(
+                    stage=stage,
+                    count=hist.count,
+                    p50_ms=hist.percentile(0.50) / 1e6,
+                    p95_ms=hist.percentile(0.95) / 1e6,
+                    p99_ms=hist.percentile(0.99) / 1e6,
+                    max_ms=hist.max_ns / 1e6,
+                    overruns=self._overruns.get(stage, 0),
+                ))
+            return result
+
+
+# Process wide recorder used by the torrent manager and the GUI.
+PERF = PerfRecorder(enabled=os.getenv(ENV_VAR, "") not in ("", "0"))
+
+
+class StartupTimeline:
+    """Start-up milestones in milliseconds since ``start()``.
+
+    ``main()`` starts the timeline, the GUI marks when its first frame is
+    drawn and when the session is ready. ``report()`` renders a short
+    summary that is logged and, with ``TORRENT_DOWNLOADER_STARTUP_REPORT=1``,
+    printed to stderr.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        self._clock = clock
+        self._t0 = clock()
+        self._marks: List[Tuple[str, float]] = []
+
+    def start(self) -> None:
+        self._t0 = self._clock()
+        self._marks.clear()
+
+    def mark(self, name: str) -> float:
+        """Record milestone ``name``; returns its offset in ms."""
+        assert isinstance(name, str) and name, "name must be a non-empty string"
+        offset_ms = (self._clock() - self._t0) * 1000
+        self._marks.append((name, offset_ms))
+        return offset_ms
+
+    def get(self, name: str) -> Optional[float]:
+        for mark, offset_ms in self._marks:
+            if mark == name:
+                return offset_ms
+        return None
+
+    def milestones(self) -> List[Tuple[str, float]]:
+        return list(self._marks)
+
+    def report(self) -> str:
+        lines = ["Startup timeline (ms since start):"]
+        previous = 0.0
+        for name, offset_ms in self._marks:
+            lines.append(f"  {name:<20} {offset_ms:9.1f}  (+{offset_ms - previous:.1f})")
+            previous = offset_ms
+        return "\n".join(lines)
+
+
+# Process wide start-up timeline (reset by ``main()``).
+STARTUP = StartupTimeline()
@@ -0,0 +1,506 @@
+"""Post-processing of finished torrents in a process pool.
+
+When a torrent finishes, the ``TorrentManager`` hands it to the
+``PostProcessor``, which records a job in a ``JobStore`` (an SQLite table
+next to the catalog) and runs it in a bounded ``ProcessPoolExecutor`` so
+hashing, copying and unpacking never touch the Tk thread. At most
+``workers`` jobs are handed to the pool at a time; the rest wait in the
+table, so the queue survives restarts, and jobs interrupted by a restart
+run again from the first stage (every stage can be repeated safely).
+
+The stages run in this order, each only when enabled:
+
+* ``verify``: check the files listed in checksum manifests of the payload
+  (``SHA256SUMS``, ``*.sha256``, ``*.md5``, ... in coreutils format).
+* ``library``: hard link (or copy) the payload into a library folder. The
+  torrent keeps seeding from its own save path.
+* ``extract``: unpack zip and tar archives (stdlib ``zipfile`` /
+  ``tarfile``) into a folder next to each archive.
+* ``script``: run a user command with the payload path as its last
+  argument and ``TD_*`` environment variables.
+
+A torrent is post-processed once; failed jobs can be retried.
+"""
+
+from concurrent.futures import BrokenExecutor, Executor, Future, ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import shlex
+import shutil
+import sqlite3
+import subprocess
+import tarfile
+import threading
+import time
+import zipfile
+
+STAGE_VERIFY = 'verify'
+STAGE_LIBRARY = 'library'
+STAGE_EXTRACT = 'extract'
+STAGE_SCRIPT = 'script'
+STAGES = (STAGE_VERIFY, STAGE_LIBRARY, STAGE_EXTRACT, STAGE_SCRIPT)  # run order
+
+LINK_HARDLINK = 'hardlink'  # falls back to copying across file systems
+LINK_COPY = 'copy'
+LINK_MODES = (LINK_HARDLINK, LINK_COPY)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+DEFAULT_WORKERS = 2
+SCRIPT_TIMEOUT_S = 3600
+READ_CHUNK = 1024 * 1024
+
+# Manifest file name (or suffix) -> hashlib algorithm
+MANIFEST_NAMES = {'MD5SUMS': 'md5', 'SHA1SUMS': 'sha1', 'SHA256SUMS': 'sha256', 'SHA512SUMS': 'sha512'}
+MANIFEST_SUFFIXES = {'.md5': 'md5', '.sha1': 'sha1', '.sha256': 'sha256', '.sha512': 'sha512'}
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS postprocess_jobs (
+    id INTEGER PRIMARY KEY,
+    info_hash TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    spec TEXT NOT NULL,
+    state TEXT NOT NULL,
+    results TEXT NOT NULL DEFAULT '[]',
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS postprocess_jobs_by_state ON postprocess_jobs(state, id);
+"""
+
+
+class StageError(Exception):
+    """A stage failed in an expected way (bad checksum, script exit code, ...)."""
+
+
+@dataclass(frozen=True)
+class PostProcessSettings:
+    """Which stages run for newly finished torrents (from the ``postprocess_*`` settings)."""
+    verify: bool = False
+    library_dir: Optional[str] = None  # None: no library stage
+    link_mode: str = LINK_HARDLINK
+    extract: bool = False
+    script: Optional[str] = None  # command line; the payload path is appended
+    workers: int = DEFAULT_WORKERS
+
+    def __post_init__(self):
+        assert self.link_mode in LINK_MODES, f"link_mode must be one of {LINK_MODES}"
+        assert isinstance(self.workers, int) and self.workers > 0, "workers must be a positive integer"
+
+    @property
+    def stages(self) -> Tuple[str, ...]:
+        enabled = {STAGE_VERIFY: self.verify, STAGE_LIBRARY: bool(self.library_dir), STAGE_EXTRACT: self.extract,
+                   STAGE_SCRIPT: bool(self.script)}
+        return tuple(stage for stage in STAGES if enabled[stage])
+
+    def spec(self, info_hash: str, name: str, save_path: str) -> "JobSpec":
+        return JobSpec(info_hash=info_hash, name=name, save_path=save_path, stages=list(self.stages),
+                       library_dir=self.library_dir, link_mode=self.link_mode, script=self.script)
+
+
+@dataclass
+class JobSpec:
+    """Everything a worker process needs to run a job (stored as JSON)."""
+    info_hash: str
+    name: str
+    save_path: str
+    stages: List[str]
+    library_dir: Optional[str] = None
+    link_mode: str = LINK_HARDLINK
+    script: Optional[str] = None
+
+    @property
+    def payload(self) -> str:
+        """The torrent's file or top-level folder."""
+        return os.path.join(self.save_path, self.name)
+
+
+@dataclass
+class StageResult:
+    stage: str
+    ok: bool
+    message: str
+    seconds: float = 0.0
+
+
+@dataclass
+class PostProcessJob:
+    id: int
+    info_hash: str
+    name: str
+    state: str  # QUEUED, RUNNING, DONE or FAILED
+    results: List[StageResult] = field(default_factory=list)  # stages run so far
+    created_at: float = 0.0
+    finished_at: Optional[float] = None
+
+    @property
+    def stage(self) -> str:
+        """The last stage that ran ("" before the first)."""
+        return self.results[-1].stage if self.results else ""
+
+    @property
+    def message(self) -> str:
+        return self.results[-1].message if self.results else ""
+
+
+# --- Stages (run in worker processes) ---------------------------------------
+
+def _files(root: str) -> List[str]:
+    """Files under ``root`` (or ``root`` itself), sorted."""
+    if os.path.isfile(root):
+        return [root]
+    found = []
+    for dirpath, _dirnames, filenames in os.walk(root):
+        found.extend(os.path.join(dirpath, name) for name in filenames)
+    return sorted(found)
+
+
+def _manifest_algorithm(path: str) -> Optional[str]:
+    name = os.path.basename(path)
+    if name in MANIFEST_NAMES:
+        return MANIFEST_NAMES[name]
+    return MANIFEST_SUFFIXES.get(os.path.splitext(name)[1].lower())
+
+
+def _file_digest(path: str, algorithm: str) -> str:
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _manifest_entries(manifest: str) -> List[Tuple[str, str]]:
+    """(expected hex digest, file path) pairs of a coreutils style manifest.
+
+    A manifest holding only a digest (``foo.iso.sha256``) covers the file
+    named like the manifest without its suffix.
+    """
+    base = os.path.dirname(manifest)
+    entries = []
+    with open(manifest, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            digest, _, name = line.partition(" ")
+            name = name.strip().lstrip("*")
+            if not name:
+                name = os.path.splitext(os.path.basename(manifest))[0]
+            path = os.path.normpath(os.path.join(base, name))
+            if os.path.isabs(name) or os.path.commonpath([base, path]) != base:
+                raise StageError(f"{os.path.basename(manifest)}: path outside the payload: {name}")
+            entries.append((digest.lower(), path))
+    return entries
+
+
+def verify_manifests(root: str) -> str:
+    manifests = [path for path in _files(root) if _manifest_algorithm(path)]
+    if not manifests:
+        return "no checksum manifest"
+    checked = 0
+    for manifest in manifests:
+        algorithm = _manifest_algorithm(manifest)
+        for expected, path in _manifest_entries(manifest):
+            if not os.path.isfile(path):
+                raise StageError(f"missing file: {os.path.relpath(path, os.path.dirname(root))}")
+            if _file_digest(path, algorithm) != expected:
+                raise StageError(f"checksum mismatch: {os.path.relpath(path, os.path.dirname(root))}")
+            checked += 1
+    return f"{checked} files verified"
+
+
+def link_to_library(root: str, library_dir: str, mode: str) -> Tuple[str, str]:
+    """Link or copy ``root`` into ``library_dir``; returns (new root, message).
+
+    Files already in the library with the same size are left alone.
+    """
+    assert mode in LINK_MODES, f"mode must be one of {LINK_MODES}"
+    dest_root = os.path.join(library_dir, os.path.basename(root))
+    linked = copied = skipped = 0
+    for src in _files(root):
+        dest = dest_root if src == root else os.path.join(dest_root, os.path.relpath(src, root))
+        if os.path.isfile(dest) and os.path.getsize(dest) == os.path.getsize(src):
+            skipped += 1
+            continue
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        if mode == LINK_HARDLINK:
+            try:
+                if os.path.lexists(dest):
+                    os.remove(dest)
+                os.link(src, dest)
+                linked += 1
+                continue
+            except OSError:  # other file system, or no hard links there
+                pass
+        shutil.copy2(src, dest)
+        copied += 1
+    return dest_root, f"{linked} linked, {copied} copied, {skipped} already there"
+
+
+def _archive_stem(path: str) -> Optional[str]:
+    lower = path.lower()
+    for suffix in ARCHIVE_SUFFIXES:
+        if lower.endswith(suffix):
+            return path[:-len(suffix)]
+    return None
+
+
+def extract_archives(root: str) -> str:
+    """Unpack every archive under ``root`` into a folder named after it.
+
+    Archives are unpacked into a temporary folder that is renamed when
+    complete, so an interrupted extraction starts over on the next run.
+    """
+    extracted = 0
+    for path in _files(root):
+        stem = _archive_stem(path)
+        if stem is None or os.path.exists(stem):
+            continue
+        partial = stem + ".partial"
+        shutil.rmtree(partial, ignore_errors=True)
+        try:
+            if path.lower().endswith(".zip"):
+                with zipfile.ZipFile(path) as archive:
+                    archive.extractall(partial)  # zipfile strips absolute and ".." paths
+            else:
+                with tarfile.open(path) as archive:
+                    archive.extractall(partial, filter="data")
+        except (zipfile.BadZipFile, tarfile.TarError) as e:
+            shutil.rmtree(partial, ignore_errors=True)
+            raise StageError(f"cannot extract {os.path.basename(path)}: {e}") from None
+        os.replace(partial, stem)
+        extracted += 1
+    return f"{extracted} archives extracted" if extracted else "no archives"
+
+
+def run_script(spec: JobSpec, root: str, timeout_s: float = SCRIPT_TIMEOUT_S) -> str:
+    env = dict(os.environ, TD_INFO_HASH=spec.info_hash, TD_NAME=spec.name, TD_SAVE_PATH=spec.save_path,
+               TD_PAYLOAD=root)
+    try:
+        done = subprocess.run(shlex.split(spec.script or "") + [root], env=env, capture_output=True, text=True,
+                              timeout=timeout_s)
+    except subprocess.TimeoutExpired:
+        raise StageError(f"script timed out after {timeout_s:.0f}s") from None
+    except OSError as e:
+        raise StageError(f"cannot run script: {e}") from None
+    if done.returncode != 0:
+        tail = (done.stderr or done.stdout).strip().splitlines()[-1:]
+        raise StageError(f"script exited with {done.returncode}" + (f": {tail[0]}" if tail else ""))
+    return "script finished"
+
+
+def run_job(spec: JobSpec) -> List[StageResult]:
+    """Run the stages of ``spec`` in order, stopping at the first failure (worker entry point)."""
+    results: List[StageResult] = []
+    root = spec.payload
+    for stage in spec.stages:
+        start = time.monotonic()
+        try:
+            if not os.path.exists(root):
+                raise StageError(f"payload not found: {root}")
+            if stage == STAGE_VERIFY:
+                message = verify_manifests(root)
+            elif stage == STAGE_LIBRARY:
+                root, message = link_to_library(root, spec.library_dir or "", spec.link_mode)
+            elif stage == STAGE_EXTRACT:
+                message = extract_archives(root)
+            elif stage == STAGE_SCRIPT:
+                message = run_script(spec, root)
+            else:
+                raise StageError(f"unknown stage {stage}")
+        except (StageError, OSError) as e:
+            results.append(StageResult(stage, False, str(e), time.monotonic() - start))
+            break
+        results.append(StageResult(stage, True, message, time.monotonic() - start))
+    return results
+
+
+# --- Persistent queue -------------------------------------------------------
+
+def _job(row: Tuple) -> PostProcessJob:
+    results = [StageResult(**r) for r in json.loads(row[4])]
+    return PostProcessJob(id=row[0], info_hash=row[1], name=row[2], state=row[3], results=results,
+                          created_at=row[5], finished_at=row[6])
+
+
+class JobStore:
+    """Post-processing jobs in an SQLite database (its own connection, WAL mode)."""
+
+    _COLUMNS = "id, info_hash, name, state, results, created_at, finished_at"
+
+    def __init__(self, path: str):
+        assert isinstance(path, str) and path, "path must be a non-empty string"
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self._conn:
+            for statement in _SCHEMA.split(";"):
+                if statement.strip():
+                    self._conn.execute(statement)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def add(self, spec: JobSpec, now: float) -> Optional[int]:
+        """Queue a job; returns its id, None if the torrent already has one."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO postprocess_jobs(info_hash, name, spec, state, created_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(info_hash) DO NOTHING",
+                (spec.info_hash, spec.name, json.dumps(asdict(spec)), QUEUED, now))
+            return cursor.lastrowid if cursor.rowcount else None
+
+    def claim(self, limit: int) -> List[Tuple[int, JobSpec]]:
+        """Mark up to ``limit`` queued jobs (oldest first) running and return them."""
+        if limit <= 0:
+            return []
+        with self._lock, self._conn:
+            rows = self._conn.execute("SELECT id, spec FROM postprocess_jobs WHERE state = ? ORDER BY id LIMIT ?",
+                                      (QUEUED, limit)).fetchall()
+            self._conn.executemany("UPDATE postprocess_jobs SET state = ? WHERE id = ?",
+                                   [(RUNNING, job_id) for job_id, _spec in rows])
+        return [(job_id, JobSpec(**json.loads(spec))) for job_id, spec in rows]
+
+    def finish(self, job_id: int, results: List[StageResult], now: float) -> str:
+        """Store a job's results; returns its final state."""
+        state = DONE if all(r.ok for r in results) else FAILED
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE postprocess_jobs SET state = ?, results = ?, finished_at = ? WHERE id = ?",
+                               (state, json.dumps([asdict(r) for r in results]), now, job_id))
+        return state
+
+    def requeue(self, job_ids: List[int]) -> None:
+        """Queue claimed jobs again (they could not be handed to a worker)."""
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE postprocess_jobs SET state = ? WHERE id = ? AND state = ?",
+                                   [(QUEUED, job_id, RUNNING) for job_id in job_ids])
+
+    def requeue_interrupted(self) -> int:
+        """Queue jobs that were running when the app stopped; returns their count."""
+        with self._lock, self._conn:
+            return self._conn.execute("UPDATE postprocess_jobs SET state = ? WHERE state = ?",
+                                      (QUEUED, RUNNING)).rowcount
+
+    def retry(self, spec: JobSpec) -> bool:
+        """Queue the failed job of ``spec.info_hash`` again with a new spec."""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE postprocess_jobs SET state = ?, spec = ?, results = '[]', finished_at = NULL "
+                "WHERE info_hash = ? AND state = ?",
+                (QUEUED, json.dumps(asdict(spec)), spec.info_hash, FAILED)).rowcount > 0
+
+    def spec_of(self, info_hash: str) -> Optional[JobSpec]:
+        with self._lock:
+            row = self._conn.execute("SELECT spec FROM postprocess_jobs WHERE info_hash = ?",
+                                     (info_hash,)).fetchone()
+        return None if row is None else JobSpec(**json.loads(row[0]))
+
+    def jobs(self, limit: int = 100) -> List[PostProcessJob]:
+        """The most recent jobs, newest first."""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {self._COLUMNS} FROM postprocess_jobs ORDER BY id DESC LIMIT ?",
+                                      (limit,)).fetchall()
+        return [_job(row) for row in rows]
+
+
+def _process_pool(workers: int) -> Executor:
+    # spawn: libtorrent threads do not survive fork
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+class PostProcessor:
+    """Feeds queued jobs to the executor and records their results.
+
+    ``poll`` is called from the manager's ``tick`` (the thread owning the
+    manager); the executor is only created once there is a job to run.
+    """
+
+    def __init__(self, store: JobStore, settings: Optional[PostProcessSettings] = None,
+                 executor_factory: Callable[[int], Executor] = _process_pool, clock=time.time):
+        self.store = store
+        self.settings = settings or PostProcessSettings()
+        self._executor_factory = executor_factory
+        self._clock = clock
+        self._executor: Optional[Executor] = None
+        self._running: Dict[Future, int] = {}  # future -> job id
+        requeued = store.requeue_interrupted()
+        if requeued:
+            logging.info("Post-processing: %d interrupted jobs queued again", requeued)
+
+    def configure(self, settings: PostProcessSettings) -> None:
+        """Use ``settings`` for jobs queued from now on (a new pool size applies to new jobs)."""
+        if self._executor is not None and settings.workers != self.settings.workers:
+            self._executor.shutdown(wait=False)  # running jobs finish in the old pool
+            self._executor = None
+        self.settings = settings
+
+    def enqueue(self, info_hash: str, name: str, save_path: str) -> Optional[int]:
+        """Queue a finished torrent; None if no stage is enabled or it was queued before."""
+        if not self.settings.stages:
+            return None
+        job_id = self.store.add(self.settings.spec(info_hash, name, save_path), self._clock())
+        if job_id is not None:
+            logging.info("Post-processing %s (%s)", name, ", ".join(self.settings.stages))
+        return job_id
+
+    def retry(self, info_hash: str) -> bool:
+        """Queue a failed job again, with the current stages."""
+        spec = self.store.spec_of(info_hash)
+        if spec is None:
+            return False
+        return self.store.retry(self.settings.spec(info_hash, spec.name, spec.save_path))
+
+    def running(self) -> int:
+        return len(self._running)
+
+    def poll(self) -> int:
+        """Record finished jobs and start queued ones; returns the number finished."""
+        finished = 0
+        for future in [f for f in self._running if f.done()]:
+            job_id = self._running.pop(future)
+            try:
+                results = future.result()
+            except Exception as e:  # worker crashed (BrokenProcessPool, pickling, ...)
+                results = [StageResult("worker", False, str(e) or type(e).__name__)]
+                if isinstance(e, BrokenExecutor):
+                    self._drop_executor()
+            state = self.store.finish(job_id, results, self._clock())
+            if state == FAILED:
+                logging.warning("Post-processing job %d failed: %s", job_id, results[-1].message)
+            finished += 1
+        claimed = self.store.claim(self.settings.workers - len(self._running))
+        for i, (job_id, spec) in enumerate(claimed):
+            try:
+                if self._executor is None:
+                    self._executor = self._executor_factory(self.settings.workers)
+                future = self._executor.submit(run_job, spec)
+            except (BrokenExecutor, RuntimeError, OSError) as e:  # a broken or shut down pool
+                logging.error("Post-processing: could not start job %d: %s", job_id, e)
+                self._drop_executor()
+                self.store.requeue([job_id for job_id, _spec in claimed[i:]])  # a new pool on the next poll
+                break
+            self._running[future] = job_id
+        return finished
+
+    def _drop_executor(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        """Stop the workers without waiting; running jobs are repeated on the next start."""
+        self._running.clear()  # still ``running`` in the store: requeue_interrupted picks them up
+        self._drop_executor()
@@ -0,0 +1,182 @@
+"""Throttled hash-check (recheck) scheduling.
+
+Force-rechecking many torrents at once makes them all read their data
+concurrently, saturating the disk and starving active downloads. The
+``RecheckScheduler`` keeps explicitly requested rechecks in a queue and only
+lets ``max_active`` of them run at a time, smallest torrents first (or in
+request order). Queued torrents are paused until their turn so they do not
+download on top of data that is about to be verified.
+
+Checks libtorrent starts on its own (e.g. resume data mismatches after an
+unclean shutdown) are throttled through the ``active_checking`` session
+setting, which the manager sets to the same limit.
+
+The scheduler is driven by ``tick()`` from the GUI poll loop and only looks
+at the status of the (few) active checks. The queue is a sorted list of
+``(order key, info-hash)`` kept with ``bisect``, so queueing and looking up a
+position cost O(log n) comparisons rather than a re-sort or a scan.
+
+Queued torrents are paused and not auto-managed, which also ends up in
+their resume data; ``on_hold``/``on_release`` let the manager keep the queue
+in the catalog and ``restore`` queues the checks again after a restart.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import bisect
+import logging
+import time
+
+ORDER_SIZE = 'size'  # smallest first: quickest to return torrents to service
+ORDER_FIFO = 'fifo'
+
+# If libtorrent never reports the checking state after force_recheck (e.g. the
+# torrent has no files on disk yet) the job is considered done after this.
+START_TIMEOUT_S = 10.0
+
+
+@dataclass
+class CheckJob:
+    key: str  # info-hash string
+    handle: Any
+    size: int  # bytes to hash
+    priority: int = 0  # higher runs earlier
+    was_paused: bool = False
+    was_auto_managed: bool = False
+    seq: int = 0
+    started_at: Optional[float] = None
+    seen_checking: bool = False
+    checked: bool = False  # set from torrent_checked_alert
+
+
+@dataclass
+class CheckResult:
+    key: str
+    size: int
+    seconds: float
+
+    @property
+    def mb_per_s(self) -> float:
+        return self.size / (1024 * 1024) / self.seconds if self.seconds > 0 else 0.0
+
+
+@dataclass
+class RecheckScheduler:
+    is_checking: Callable[[Any], bool]  # status -> bool
+    auto_managed_flag: Any = None  # lt.torrent_flags.auto_managed
+    max_active: int = 1
+    order: str = ORDER_SIZE
+    clock: Callable[[], float] = time.monotonic
+    on_hold: Optional[Callable[[CheckJob], None]] = None  # a torrent was queued (and paused)
+    on_release: Optional[Callable[[str], None]] = None  # its check finished or it was discarded
+    _queue: List[Tuple[tuple, str]] = field(default_factory=list)  # sorted (order key, key)
+    _queued: Dict[str, CheckJob] = field(default_factory=dict)
+    _active: Dict[str, CheckJob] = field(default_factory=dict)
+    results: Dict[str, CheckResult] = field(default_factory=dict)
+    _seq: int = 0
+
+    def __post_init__(self) -> None:
+        assert isinstance(self.max_active, int) and self.max_active > 0, "max_active must be a positive integer"
+        assert self.order in (ORDER_SIZE, ORDER_FIFO), "order must be 'size' or 'fifo'"
+
+    def enqueue(self, key: str, handle: Any, size: int, priority: int = 0) -> bool:
+        """Queue a recheck; returns False if the torrent is already queued/active."""
+        assert isinstance(key, str) and key, "key must be a non-empty string"
+        if key in self._active or key in self._queued:
+            return False
+        status = handle.status()
+        self._queue_job(key, handle, size, priority, bool(status.paused), bool(getattr(status, 'auto_managed', False)))
+        logging.info("Queued recheck for %s (%d bytes, position %d)", key, size, self.queue_position(key))
+        return True
+
+    def restore(self, key: str, handle: Any, size: int, priority: int, was_paused: bool,
+                was_auto_managed: bool) -> None:
+        """Queue a recheck that was queued when the session was saved, with the flags to give back."""
+        assert isinstance(key, str) and key, "key must be a non-empty string"
+        if key not in self._active and key not in self._queued:
+            self._queue_job(key, handle, size, priority, was_paused, was_auto_managed)
+
+    def _queue_job(self, key: str, handle: Any, size: int, priority: int, was_paused: bool,
+                   was_auto_managed: bool) -> None:
+        self._seq += 1
+        job = CheckJob(key=key, handle=handle, size=max(0, int(size)), priority=priority, was_paused=was_paused,
+                       was_auto_managed=was_auto_managed, seq=self._seq)
+        # Hold the torrent until it is its turn (auto-management would resume it).
+        if self.auto_managed_flag is not None:
+            handle.unset_flags(self.auto_managed_flag)
+        handle.pause()
+        self._queued[key] = job
+        bisect.insort(self._queue, (self._order_key(job), key))
+        if self.on_hold is not None:
+            self.on_hold(job)
+
+    def _order_key(self, job: CheckJob) -> tuple:
+        if self.order == ORDER_SIZE:
+            return (-job.priority, job.size, job.seq)
+        return (-job.priority, job.seq)
+
+    def queue_position(self, key: str) -> Optional[int]:
+        """1-based position in the waiting queue, 0 if checking, None if unknown."""
+        if key in self._active:
+            return 0
+        job = self._queued.get(key)
+        if job is None:
+            return None
+        return bisect.bisect_left(self._queue, (self._order_key(job), key)) + 1
+
+    def pending(self) -> bool:
+        return bool(self._queue or self._active)
+
+    def mark_checked(self, key: str) -> None:
+        """Record that libtorrent finished checking ``key`` (torrent_checked_alert)."""
+        job = self._active.get(key)
+        if job is not None:
+            job.checked = True
+
+    def discard(self, key: str) -> None:
+        """Forget a torrent (e.g. after it was removed from the session)."""
+        job = self._queued.pop(key, None)
+        if job is not None:
+            del self._queue[bisect.bisect_left(self._queue, (self._order_key(job), key))]
+        elif self._active.pop(key, None) is None:
+            return
+        if self.on_release is not None:
+            self.on_release(key)
+
+    def tick(self) -> None:
+        """Finish completed checks and start queued ones up to ``max_active``."""
+        now = self.clock()
+        for key, job in list(self._active.items()):
+            try:
+                status = job.handle.status()
+            except Exception as e:  # pragma: no cover - handle became invalid
+                logging.warning("Dropping recheck of %s: %s", key, e)
+                del self._active[key]
+                continue
+            if not job.checked:
+                if self.is_checking(status):
+                    job.seen_checking = True
+                    continue
+                assert job.started_at is not None
+                if not job.seen_checking and now - job.started_at < START_TIMEOUT_S:
+                    continue  # libtorrent has not picked up the check yet
+            self._finish(job, now)
+        while self._queue and len(self._active) < self.max_active:
+            job = self._queued.pop(self._queue.pop(0)[1])
+            job.started_at = now
+            job.handle.force_recheck()
+            job.handle.resume()
+            self._active[job.key] = job
+
+    def _finish(self, job: CheckJob, now: float) -> None:
+        del self._active[job.key]
+        assert job.started_at is not None
+        result = CheckResult(key=job.key, size=job.size, seconds=now - job.started_at)
+        self.results[job.key] = result
+        if job.was_paused:
+            job.handle.pause()
+        if job.was_auto_managed and self.auto_managed_flag is not None:
+            job.handle.set_flags(self.auto_managed_flag)
+        if self.on_release is not None:
+            self.on_release(job.key)
+        logging.info("Recheck of %s finished in %.1fs (%.1f MB/s)", job.key, result.seconds, result.mb_per_s)
@@ -0,0 +1,210 @@
+"""Bounded-concurrency storage relocation (``move_storage``) queue.
+
+Moving a library to a new disk used to mean removing and re-adding torrents
+followed by full rechecks. The ``RelocationQueue`` instead calls libtorrent's
+``move_storage`` on each torrent, at most ``max_active`` at a time, and
+tracks completion through ``storage_moved_alert`` /
+``storage_moved_failed_alert``.
+
+libtorrent moves each file with a rename first and only falls back to
+copy + delete when the rename fails with a cross-device error, so moves
+within one filesystem are always cheap renames. Each job records whether
+source and destination share a filesystem so the UI can say which kind of
+move is happening.
+
+A batch's jobs are kept for ``progress()`` until ``FINISHED_LINGER_S``
+after the last one finished, or until a new batch is queued.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+import logging
+import os
+import time
+
+QUEUED = 'queued'
+MOVING = 'moving'
+DONE = 'done'
+FAILED = 'failed'
+
+# How long the result of a finished batch stays in progress() (the status bar).
+FINISHED_LINGER_S = 10.0
+
+
+def _existing_parent(path: str) -> str:
+    """Return ``path`` or its closest existing ancestor."""
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def same_filesystem(src: str, dst: str) -> bool:
+    """True if ``src`` and ``dst`` (or their closest existing parents) share a device."""
+    try:
+        return os.stat(_existing_parent(src)).st_dev == os.stat(_existing_parent(dst)).st_dev
+    except OSError:
+        return False
+
+
+@dataclass
+class RelocationJob:
+    key: str  # info-hash string
+    handle: Any
+    source: str
+    dest: str
+    size: int
+    same_filesystem: bool
+    state: str = QUEUED
+    error: Optional[str] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+@dataclass
+class RelocationProgress:
+    total: int
+    done: int
+    failed: int
+    moving: int
+    bytes_total: int
+    bytes_done: int
+
+    @property
+    def finished(self) -> bool:
+        return self.done + self.failed == self.total
+
+
+@dataclass
+class RelocationQueue:
+    move_flags: Any = None  # e.g. lt.move_flags_t.dont_replace
+    max_active: int = 2
+    on_moved: Optional[Callable[[str, str], None]] = None  # (key, new path)
+    clock: Callable[[], float] = time.monotonic
+    jobs: Dict[str, RelocationJob] = field(default_factory=dict)
+    _order: List[str] = field(default_factory=list)
+    _unfinished: int = 0  # queued or moving jobs
+    _positions: Optional[Dict[str, int]] = None  # key -> queue position, rebuilt after changes
+    _last_finished_at: float = 0.0
+
+    def __post_init__(self) -> None:
+        assert isinstance(self.max_active, int) and self.max_active > 0, "max_active must be a positive integer"
+
+    def enqueue(self, key: str, handle: Any, source: str, dest: str, size: int) -> bool:
+        """Queue a move of ``handle``'s data to ``dest``; False if already moving."""
+        assert isinstance(key, str) and key, "key must be a non-empty string"
+        assert isinstance(dest, str) and dest, "dest must be a non-empty string"
+        existing = self.jobs.get(key)
+        if existing is not None and existing.state in (QUEUED, MOVING):
+            return False
+        if os.path.abspath(source) == os.path.abspath(dest):
+            return False
+        if self._unfinished == 0:
+            self.clear_finished()  # a new batch: don't count the last one's jobs
+            existing = None
+        self._unfinished += 1
+        self._positions = None
+        self.jobs[key] = RelocationJob(key=key, handle=handle, source=source, dest=dest, size=max(0, int(size)),
+                                       same_filesystem=same_filesystem(source, dest))
+        if existing is not None:  # moved before in this batch
+            self._order.remove(key)
+        self._order.append(key)
+        return True
+
+    def pending(self) -> bool:
+        return self._unfinished > 0
+
+    def queue_position(self, key: str) -> Optional[int]:
+        """1-based position among queued jobs, 0 while moving, None otherwise."""
+        job = self.jobs.get(key)
+        if job is None or job.state not in (QUEUED, MOVING):
+            return None
+        if job.state == MOVING:
+            return 0
+        if self._positions is None:  # once per refresh, not per torrent
+            queued = (k for k in self._order if self.jobs[k].state == QUEUED)
+            self._positions = {k: i for i, k in enumerate(queued, 1)}
+        return self._positions[key]
+
+    def tick(self) -> None:
+        """Start queued moves while fewer than ``max_active`` are running; drop a drained batch."""
+        if self._unfinished == 0:
+            if self.jobs and self.clock() - self._last_finished_at >= FINISHED_LINGER_S:
+                self.clear_finished()
+            return
+        active = sum(1 for job in self.jobs.values() if job.state == MOVING)
+        for key in self._order:
+            if active >= self.max_active:
+                break
+            job = self.jobs[key]
+            if job.state != QUEUED:
+                continue
+            try:
+                os.makedirs(job.dest, exist_ok=True)
+                if self.move_flags is None:
+                    job.handle.move_storage(job.dest)
+                else:
+                    job.handle.move_storage(job.dest, self.move_flags)
+            except Exception as e:
+                self._fail(job, str(e))
+                continue
+            job.state = MOVING
+            job.started_at = self.clock()
+            self._positions = None
+            active += 1
+            logging.info("Moving %s to %s (%s)", key, job.dest, "rename" if job.same_filesystem else "copy")
+
+    def storage_moved(self, key: str, new_path: str) -> None:
+        """Handle ``storage_moved_alert`` for ``key``."""
+        job = self.jobs.get(key)
+        if job is None or job.state != MOVING:
+            return
+        job.state = DONE
+        job.finished_at = self._last_finished_at = self.clock()
+        self._unfinished -= 1
+        job.dest = new_path or job.dest
+        logging.info("Moved %s to %s", key, job.dest)
+        if self.on_moved is not None:
+            self.on_moved(key, job.dest)
+
+    def storage_move_failed(self, key: str, error: str) -> None:
+        """Handle ``storage_moved_failed_alert`` for ``key``."""
+        job = self.jobs.get(key)
+        if job is not None and job.state == MOVING:
+            self._fail(job, error)
+
+    def _fail(self, job: RelocationJob, error: str) -> None:
+        job.state = FAILED
+        job.error = error
+        job.finished_at = self._last_finished_at = self.clock()
+        self._unfinished -= 1
+        self._positions = None
+        logging.error("Failed to move %s to %s: %s", job.key, job.dest, error)
+
+    def discard(self, key: str) -> None:
+        job = self.jobs.pop(key, None)
+        if job is None:
+            return
+        if job.state in (QUEUED, MOVING):
+            self._unfinished -= 1
+            self._positions = None
+        self._order.remove(key)
+
+    def progress(self) -> RelocationProgress:
+        jobs = list(self.jobs.values())
+        return RelocationProgress(
+            total=len(jobs),
+            done=sum(1 for j in jobs if j.state == DONE),
+            failed=sum(1 for j in jobs if j.state == FAILED),
+            moving=sum(1 for j in jobs if j.state == MOVING),
+            bytes_total=sum(j.size for j in jobs),
+            bytes_done=sum(j.size for j in jobs if j.state == DONE),
+        )
+
+    def clear_finished(self) -> None:
+        """Drop finished jobs (keeps the aggregate scoped to the current batch)."""
+        self.jobs = {k: j for k, j in self.jobs.items() if j.state in (QUEUED, MOVING)}
+        self._order = [k for k in self._order if k in self.jobs]
@@ -0,0 +1,305 @@
+"""Recording a live session's alerts and statuses, and playing them back.
+
+Slow paths in the status and GUI refresh often only show up with real
+swarms of thousands of torrents. A ``Recorder`` attached to a running
+``TorrentManager`` writes
+
+* every alert (class name, info-hash, message, and for
+  ``session_stats_alert`` the disk and peer counters), and
+* each status refresh the GUI makes: only the torrents whose
+  ``TorrentStatus`` changed, plus the list order when it changed,
+
+as gzip compressed JSON lines with timestamps relative to the start. The
+GUI records while ``ENV_VAR`` names the output file.
+
+A ``ReplayManager`` plays a recording back through the read side of the
+manager API the GUI and the HTTP API use (statuses, keys, alerts to
+listeners, disk statistics), in real time, faster (``speed``) or one
+status refresh per ``get_status_list`` call (``speed=None``). No
+libtorrent session is involved; commands such as pausing are ignored.
+See ``benchmarks/replay.py`` for a driver.
+"""
+
+from dataclasses import fields
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import gzip
+import json
+import logging
+import time
+import zlib
+
+from .disk import DiskStats, DiskStatsTracker
+from .relocate import RelocationProgress
+from .stats import DEFAULT_TOP_N, TrafficReport, bucket_start, resolution_for
+from .torrent import TorrentStatus, _handle_key
+
+FORMAT = "td-replay"
+VERSION = 1
+ENV_VAR = "TORRENT_DOWNLOADER_RECORD"
+STATUS_FIELDS: Tuple[str, ...] = tuple(f.name for f in fields(TorrentStatus))
+# session_stats_alert counters kept in recordings (the ones DiskStatsTracker reads).
+STATS_PREFIXES = ('disk.', 'peer.num_peers_')
+# Manager commands the GUI and the HTTP API send; a replay accepts and ignores them.
+IGNORED_COMMANDS = frozenset({
+    'add_magnet', 'add_torrent_file', 'apply_disk_profile', 'apply_memory_mode', 'apply_settings',
+    'force_recheck_at', 'load_blocklist', 'pause_at', 'relocate_all', 'relocate_at', 'remove_at', 'resume_at',
+    'retry_postprocess', 'set_disk_reserve', 'set_download_directory', 'set_global_seeding_policy',
+    'set_peer_classes', 'set_postprocess_settings', 'set_seeding_policy_at',
+})
+
+
+class Recorder:
+    """Writes alerts and status snapshots of a live manager to a recording."""
+
+    def __init__(self, path: str, clock: Callable[[], float] = time.monotonic):
+        assert isinstance(path, str) and path, "path must be a non-empty string"
+        self.path = path
+        self._clock = clock
+        self._start = clock()
+        self._file: Optional[IO[str]] = gzip.open(path, "wt", encoding="utf-8")
+        self._last: Dict[str, Tuple[Any, ...]] = {}  # key -> status values of the previous snapshot
+        self._order: List[str] = []
+        self.records = 0
+        self._write({"format": FORMAT, "version": VERSION, "fields": list(STATUS_FIELDS), "started": time.time()})
+
+    def attach(self, manager: Any) -> None:
+        """Record every alert ``manager`` dispatches."""
+        manager.add_alert_listener("*", self.record_alert)
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        if self._file is None:
+            return
+        self._file.write(json.dumps(record, separators=(",", ":")))
+        self._file.write("\n")
+        self.records += 1
+
+    def _now(self) -> float:
+        return round(self._clock() - self._start, 3)
+
+    def record_alert(self, alert: Any) -> None:
+        kind = type(alert).__name__
+        record: Dict[str, Any] = {"t": self._now(), "a": kind}
+        handle = getattr(alert, 'handle', None)
+        if handle is not None:
+            try:
+                if handle.is_valid():
+                    record["h"] = _handle_key(handle)
+            except Exception:  # pragma: no cover - handle went away
+                pass
+        try:
+            record["m"] = alert.message()
+        except Exception:  # pragma: no cover - alert without a message
+            pass
+        if kind == "session_stats_alert":
+            record["v"] = {k: v for k, v in dict(alert.values).items() if k.startswith(STATS_PREFIXES)}
+        self._write(record)
+
+    def snapshot(self, statuses: Sequence[TorrentStatus], keys: Sequence[str]) -> None:
+        """Record a status refresh; ``keys`` are the info-hashes of ``statuses`` (same order)."""
+        assert len(statuses) == len(keys), "statuses and keys must have the same length"
+        current = {key: tuple(getattr(st, name) for name in STATUS_FIELDS) for st, key in zip(statuses, keys)}
+        record: Dict[str, Any] = {"t": self._now()}
+        if list(keys) != self._order:
+            self._order = list(keys)
+            record["k"] = self._order
+        changed = {key: values for key, values in current.items() if self._last.get(key) != values}
+        if changed:
+            record["s"] = changed
+        removed = [key for key in self._last if key not in current]
+        if removed:
+            record["r"] = removed
+        self._last = current
+        self._write(record)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            logging.info("Recorded %d records to %s", self.records, self.path)
+
+
+def read_recording(path: str) -> Iterator[Dict[str, Any]]:
+    """Records of a recording after its header; a truncated end (the app was killed) is skipped."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            header = json.loads(f.readline() or "{}")
+            if header.get("format") != FORMAT or header.get("version") != VERSION:
+                raise ValueError(f"not a {FORMAT} v{VERSION} recording: {path}")
+            if header.get("fields") != list(STATUS_FIELDS):
+                raise ValueError(f"recording {path} has different status fields: {header.get('fields')}")
+            for line in f:
+                yield json.loads(line)
+        except (EOFError, zlib.error, json.JSONDecodeError) as e:
+            logging.warning("Recording %s ends early: %s", path, e)
+
+
+class _ReplayHandle:
+    """Stands in for ``alert.handle``: enough for ``_handle_key``."""
+
+    def __init__(self, key: str):
+        self._key = key
+
+    def info_hashes(self) -> "_ReplayHandle":
+        return self
+
+    def get_best(self) -> str:
+        return self._key
+
+    def is_valid(self) -> bool:
+        return True
+
+
+class _ReplayAlert:
+    handle: Optional[_ReplayHandle] = None
+    values: Dict[str, int] = {}
+
+    def __init__(self, record: Dict[str, Any]):
+        if "h" in record:
+            self.handle = _ReplayHandle(record["h"])
+        if "v" in record:
+            self.values = record["v"]
+        self._message = record.get("m", "")
+
+    def message(self) -> str:
+        return self._message
+
+
+class ReplayManager:
+    """Plays a recording back through the read-only part of the ``TorrentManager`` API."""
+
+    def __init__(self, path: str, speed: Optional[float] = 1.0, clock: Callable[[], float] = time.monotonic):
+        assert speed is None or speed > 0, "speed must be None or positive"
+        self.speed = speed
+        self._clock = clock
+        self._start = clock()
+        self._records = read_recording(path)
+        self._next = next(self._records, None)
+        self.position = 0.0  # recording time reached
+        self._statuses: Dict[str, Tuple[Any, ...]] = {}
+        self._order: List[str] = []
+        self._alerts: List[_ReplayAlert] = []
+        self._alert_types: Dict[str, type] = {}  # alert class per name, so listeners can dispatch on it
+        self._listeners: Dict[str, List[Callable[[Any], None]]] = {}
+        self._disk_stats = DiskStatsTracker()
+        self.add_alert_listener("session_stats_alert", lambda a: self._disk_stats.update(a.values))
+
+    @property
+    def finished(self) -> bool:
+        return self._next is None
+
+    def _apply(self, record: Dict[str, Any]) -> bool:
+        """Apply one record; True for a status snapshot."""
+        self.position = record["t"]
+        kind = record.get("a")
+        if kind is not None:
+            alert_type = self._alert_types.get(kind)
+            if alert_type is None:
+                alert_type = self._alert_types[kind] = type(kind, (_ReplayAlert,), {})
+            self._alerts.append(alert_type(record))
+            return False
+        if "k" in record:
+            self._order = record["k"]
+        for key, values in record.get("s", {}).items():
+            self._statuses[key] = tuple(values)
+        for key in record.get("r", ()):
+            self._statuses.pop(key, None)
+        return True
+
+    def _advance(self) -> None:
+        """Apply the records due at the current (scaled) time."""
+        if self.speed is None:
+            return
+        until = (self._clock() - self._start) * self.speed
+        while self._next is not None and self._next["t"] <= until:
+            self._apply(self._next)
+            self._next = next(self._records, None)
+
+    def step(self) -> bool:
+        """Apply records up to and including the next status snapshot; False at the end."""
+        while self._next is not None:
+            record, self._next = self._next, next(self._records, None)
+            if self._apply(record):
+                return True
+        return False
+
+    # --- Manager API --------------------------------------------------------
+    def add_alert_listener(self, alert_type: str, callback: Callable[[Any], None]) -> None:
+        assert isinstance(alert_type, str) and alert_type, "alert_type must be a non-empty string"
+        assert callable(callback), "callback must be callable"
+        self._listeners.setdefault(alert_type, []).append(callback)
+
+    def process_alerts(self) -> int:
+        self._advance()
+        alerts, self._alerts = self._alerts, []
+        for alert in alerts:
+            for key in (type(alert).__name__, "*"):
+                for callback in self._listeners.get(key, ()):
+                    try:
+                        callback(alert)
+                    except Exception as e:  # pragma: no cover - listener bug must not stop the replay
+                        logging.error("Alert listener for %s failed: %s", key, e)
+        return len(alerts)
+
+    def get_status_list(self) -> List[TorrentStatus]:
+        """Fresh status objects, like a live refresh (``speed=None``: advances one snapshot)."""
+        if self.speed is None:
+            self.step()
+        else:
+            self._advance()
+        return [TorrentStatus(*self._statuses[key]) for key in self._order if key in self._statuses]
+
+    def torrent_keys(self) -> List[str]:
+        return [key for key in self._order if key in self._statuses]
+
+    def get_torrents(self) -> List[str]:
+        return self.torrent_keys()
+
+    def get_loaded_torrents_info(self) -> list:
+        return []
+
+    def get_disk_stats(self) -> Optional[DiskStats]:
+        return self._disk_stats.latest
+
+    def get_relocation_progress(self) -> RelocationProgress:
+        return RelocationProgress(total=0, done=0, failed=0, moving=0, bytes_total=0, bytes_done=0)
+
+    def tick(self) -> None:
+        pass
+
+    def request_session_stats(self) -> None:
+        pass  # recorded with the alerts
+
+    def save_state(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self._records.close()
+
+    def get_peers_at(self, index: int) -> list:
+        return []  # not recorded
+
+    def get_files_at(self, index: int) -> None:
+        return None
+
+    def get_seeding_policy_at(self, index: int) -> None:
+        return None
+
+    def postprocess_jobs(self, limit: int = 100) -> list:
+        return []
+
+    def traffic_report(self, span_s: float, top_n: int = DEFAULT_TOP_N) -> TrafficReport:
+        """An empty report: traffic is not recorded."""
+        resolution = resolution_for(span_s)
+        now = time.time()
+        return TrafficReport(resolution, bucket_start(now - span_s, resolution),
+                             bucket_start(now, resolution) + resolution)
+
+    def __getattr__(self, name: str) -> Callable[..., bool]:
+        """The ``IGNORED_COMMANDS`` (pause_at, remove_at, apply_settings, ...) do nothing during a replay."""
+        if name not in IGNORED_COMMANDS:
+            raise AttributeError(f"{type(self).__name__} has no attribute {name!r}")
+
+        def ignored(*_args: Any, **_kwargs: Any) -> bool:
+            logging.info("Replay: ignoring %s", name)
+            return False
+        return ignored
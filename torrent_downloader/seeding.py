@@ -0,0 +1,211 @@
+"""Seeding policies: share ratio / seed time / idle limits and swarm priority.
+
+Finished torrents otherwise seed forever and compete for upload slots and
+connections with torrents that still need seeders. A ``SeedingPolicy`` stops
+a torrent once it reached a share ratio, seeded for a given time or has not
+uploaded anything for a while. Policies can be set per torrent; torrents
+without their own policy use the global one.
+
+The ``SeedingEngine`` never polls handles. It works on ``SeedSnapshot``
+objects the manager builds from libtorrent's ``state_update_alert`` (only
+torrents that changed are reported, the engine caches the rest) and
+evaluates them every ``interval_s`` from ``tick()``. Seed time keeps running
+between updates; idle time is measured from the last snapshot in which the
+uploaded byte count grew.
+
+With ``prioritize_underseeded`` the engine also caps the unchoke slots of
+seeding torrents in well seeded swarms so the upload capacity goes to swarms
+with few seeds (based on the tracker scrape counts).
+"""
+
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import logging
+import time
+
+ACTION_PAUSE = 'pause'  # pause and take out of auto-management
+ACTION_REMOVE = 'remove'  # remove from the session, keeping the data
+ACTIONS = (ACTION_PAUSE, ACTION_REMOVE)
+
+DEFAULT_INTERVAL_S = 5.0
+
+# A swarm is under-seeded with at most this many seeds or more leechers than seeds.
+UNDERSEEDED_MAX_SEEDS = 3
+# Unchoke slots for torrents in well seeded swarms (-1 = no per-torrent limit).
+WELL_SEEDED_UPLOAD_SLOTS = 1
+UNLIMITED_SLOTS = -1
+
+
+@dataclass(frozen=True)
+class SeedingPolicy:
+    ratio_limit: Optional[float] = None  # uploaded / downloaded
+    seed_time_limit_s: Optional[float] = None
+    idle_time_limit_s: Optional[float] = None  # time without any upload
+    action: str = ACTION_PAUSE
+
+    def __post_init__(self) -> None:
+        assert self.action in ACTIONS, f"action must be one of {ACTIONS}"
+        for name in ('ratio_limit', 'seed_time_limit_s', 'idle_time_limit_s'):
+            value = getattr(self, name)
+            assert value is None or value >= 0, f"{name} must be None or >= 0"
+
+    @property
+    def has_limits(self) -> bool:
+        return (self.ratio_limit, self.seed_time_limit_s, self.idle_time_limit_s) != (None, None, None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SeedingPolicy":
+        return cls(**{k: v for k, v in data.items() if k in cls.__dataclass_fields__})
+
+
+NO_LIMITS = SeedingPolicy()
+
+
+@dataclass
+class SeedSnapshot:
+    """What the engine needs to know about one torrent (from ``torrent_status``)."""
+    key: str
+    handle: Any
+    seeding: bool
+    paused: bool
+    uploaded: int  # all-time bytes
+    downloaded: int  # all-time bytes, at least the size of the data we have
+    seeding_s: float  # seed time as of this snapshot
+    num_complete: int = -1  # swarm seeds from the tracker, -1 if unknown
+    num_incomplete: int = -1
+    observed_at: float = 0.0  # engine clock
+    last_upload_at: float = 0.0  # engine clock
+
+
+@dataclass
+class LimitReached:
+    key: str
+    handle: Any
+    action: str
+    reason: str
+
+
+def share_ratio(uploaded: int, downloaded: int) -> float:
+    """Share ratio; data we never downloaded counts as downloaded once."""
+    return uploaded / downloaded if downloaded > 0 else 0.0
+
+
+def is_underseeded(num_complete: int, num_incomplete: int) -> Optional[bool]:
+    """True/False from scrape counts, None while the tracker has not reported them."""
+    if num_complete < 0 or num_incomplete < 0:
+        return None
+    return num_complete <= UNDERSEEDED_MAX_SEEDS or num_incomplete > num_complete
+
+
+def limit_reason(policy: SeedingPolicy, ratio: float, seeding_s: float, idle_s: float) -> Optional[str]:
+    """Return why ``policy`` says to stop seeding, or None to keep going."""
+    if policy.ratio_limit is not None and ratio >= policy.ratio_limit:
+        return f"ratio {ratio:.2f} >= {policy.ratio_limit:.2f}"
+    if policy.seed_time_limit_s is not None and seeding_s >= policy.seed_time_limit_s:
+        return f"seeded {seeding_s / 60:.0f} min"
+    if policy.idle_time_limit_s is not None and idle_s >= policy.idle_time_limit_s:
+        return f"idle {idle_s / 60:.0f} min"
+    return None
+
+
+@dataclass
+class SeedingEngine:
+    global_policy: SeedingPolicy = NO_LIMITS
+    interval_s: float = DEFAULT_INTERVAL_S
+    prioritize_underseeded: bool = False
+    request_updates: Optional[Callable[[], None]] = None  # e.g. session.post_torrent_updates
+    clock: Callable[[], float] = time.monotonic
+    policies: Dict[str, SeedingPolicy] = field(default_factory=dict)  # per-torrent overrides
+    _snapshots: Dict[str, SeedSnapshot] = field(default_factory=dict)
+    _slots: Dict[str, int] = field(default_factory=dict)  # upload slots we set per torrent
+    _next_run: float = 0.0
+
+    def __post_init__(self) -> None:
+        assert self.interval_s > 0, "interval_s must be positive"
+
+    def policy_for(self, key: str) -> SeedingPolicy:
+        return self.policies.get(key, self.global_policy)
+
+    def set_policy(self, key: str, policy: Optional[SeedingPolicy]) -> None:
+        """Use ``policy`` for ``key``; None falls back to the global policy."""
+        assert isinstance(key, str) and key, "key must be a non-empty string"
+        if policy is None:
+            self.policies.pop(key, None)
+        else:
+            self.policies[key] = policy
+
+    def set_global(self, policy: SeedingPolicy, prioritize_underseeded: bool) -> None:
+        self.global_policy = policy
+        if self.prioritize_underseeded and not prioritize_underseeded:
+            self._reset_slots()
+        self.prioritize_underseeded = prioritize_underseeded
+        self._next_run = 0.0  # evaluate on the next tick
+
+    def update(self, snapshots: Iterable[SeedSnapshot]) -> None:
+        """Cache fresh snapshots (torrents missing from an update keep their last one)."""
+        now = self.clock()
+        for snap in snapshots:
+            previous = self._snapshots.get(snap.key)
+            snap.observed_at = now
+            if previous is None or snap.uploaded > previous.uploaded:
+                snap.last_upload_at = now
+            else:
+                snap.last_upload_at = previous.last_upload_at
+            self._snapshots[snap.key] = snap
+
+    def discard(self, key: str) -> None:
+        """Forget a torrent (e.g. after it was removed from the session)."""
+        self._snapshots.pop(key, None)
+        self._slots.pop(key, None)
+        self.policies.pop(key, None)
+
+    def tick(self) -> List[LimitReached]:
+        """Every ``interval_s``: ask for new snapshots and evaluate the cached ones."""
+        now = self.clock()
+        if now < self._next_run:
+            return []
+        self._next_run = now + self.interval_s
+        if self.request_updates is not None:
+            self.request_updates()  # arrives as an alert, used on the next run
+        return self.evaluate(now)
+
+    def evaluate(self, now: Optional[float] = None) -> List[LimitReached]:
+        """Return torrents over their limit and rebalance upload slots."""
+        now = self.clock() if now is None else now
+        reached: List[LimitReached] = []
+        for key, snap in self._snapshots.items():
+            if not snap.seeding or snap.paused:
+                continue
+            policy = self.policy_for(key)
+            if policy.has_limits:
+                seeding_s = snap.seeding_s + (now - snap.observed_at)
+                reason = limit_reason(policy, share_ratio(snap.uploaded, snap.downloaded), seeding_s,
+                                      now - snap.last_upload_at)
+                if reason is not None:
+                    snap.paused = True  # don't report it again before the next update
+                    reached.append(LimitReached(key, snap.handle, policy.action, reason))
+                    continue
+            if self.prioritize_underseeded:
+                self._balance_slots(snap)
+        for hit in reached:
+            logging.info("Seeding limit reached for %s (%s): %s", hit.key, hit.reason, hit.action)
+        return reached
+
+    def _balance_slots(self, snap: SeedSnapshot) -> None:
+        underseeded = is_underseeded(snap.num_complete, snap.num_incomplete)
+        if underseeded is None:
+            return
+        slots = UNLIMITED_SLOTS if underseeded else WELL_SEEDED_UPLOAD_SLOTS
+        if self._slots.get(snap.key, UNLIMITED_SLOTS) != slots:
+            snap.handle.set_max_uploads(slots)
+            self._slots[snap.key] = slots
+
+    def _reset_slots(self) -> None:
+        for key, slots in self._slots.items():
+            snap = self._snapshots.get(key)
+            if snap is not None and slots != UNLIMITED_SLOTS:
+                snap.handle.set_max_uploads(UNLIMITED_SLOTS)
+        self._slots.clear()
@@ -0,0 +1,546 @@
+"""Optional multi-process sharded session for very large libraries.
+
+With tens of thousands of torrents a single libtorrent session, plus one
+Python process translating every status on the GIL, becomes the bottleneck.
+``ShardedTorrentManager`` hash-partitions torrents across N worker
+processes. Each worker runs its own ``TorrentManager`` with its own session
+file and listen port range. The coordinator exposes the ``TorrentManager``
+API the GUI uses, so it can be swapped in without GUI changes.
+
+Protocol: one ``multiprocessing`` pipe per worker carrying batches of
+``(method, args, kwargs)`` calls. Every batch gets a list of
+``(ok, value)`` replies. Status refreshes are broadcast to all shards
+before any reply is read, so the shards translate statuses in parallel.
+Each reply is one ``ShardSnapshot`` holding the statuses, disk stats and
+relocation progress of that shard.
+
+Torrents are assigned by info-hash (``shard_for``) when they are added and
+stay in that shard's session file afterwards. Shard 0 uses the unsharded
+session file, so torrents from a single-session setup keep loading. The
+shard count should only be changed with the app stopped.
+
+Global indices (``pause_at`` etc.) address the concatenation of the shards'
+status lists in shard order, as returned by ``get_status_list``.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import base64
+import hashlib
+import logging
+import multiprocessing
+import os
+import pickle
+import time
+import urllib.parse
+
+from .disk import DiskStats
+from .files import FileView
+from .peerclass import PeerClasses
+from .postprocess import PostProcessJob, PostProcessSettings
+from .relocate import RelocationProgress
+from .seeding import SeedingPolicy
+from .stats import DEFAULT_TOP_N, TrafficReport, merge_reports
+from .torrent import LoadedTorrentInfo, PeerInfo, TorrentManager, TorrentStatus, _handle_key, lt
+
+# Workers process alerts and run schedulers this often while idle.
+WORKER_TICK_S = 0.5
+# Seconds to wait for a shard's reply before treating it as dead.
+REPLY_TIMEOUT_S = 60.0
+
+DEFAULT_BASE_PORT = 6881
+DEFAULT_PORTS_PER_SHARD = 10
+
+Call = Tuple[str, tuple, dict]
+
+
+@dataclass
+class ShardSnapshot:
+    shard: int
+    statuses: List[TorrentStatus]
+    disk_stats: Optional[DiskStats]
+    relocation: RelocationProgress
+    elapsed_ns: int  # time the worker spent building the snapshot
+
+
+def shard_for(key: str, shards: int) -> int:
+    """Stable shard index for an info-hash key (independent of PYTHONHASHSEED)."""
+    assert isinstance(key, str) and key, "key must be a non-empty string"
+    assert isinstance(shards, int) and shards > 0, "shards must be a positive integer"
+    return int.from_bytes(hashlib.sha1(key.lower().encode()).digest()[:8], "big") % shards
+
+
+def magnet_key(magnet_uri: str) -> str:
+    """Info-hash hex of a magnet link (v1 preferred), or a digest of the URI."""
+    assert isinstance(magnet_uri, str) and magnet_uri.startswith("magnet:?"), "magnet_uri must be a magnet link"
+    params = urllib.parse.parse_qs(magnet_uri[len("magnet:?"):])
+    v2 = None
+    for xt in params.get("xt", []):
+        if xt.startswith("urn:btih:"):
+            digest = xt[len("urn:btih:"):]
+            if len(digest) == 32:  # base32 encoded
+                try:
+                    digest = base64.b32decode(digest.upper()).hex()
+                except ValueError:
+                    continue
+            return digest.lower()
+        if xt.startswith("urn:btmh:1220"):  # multihash sha2-256
+            v2 = xt[len("urn:btmh:1220"):].lower()
+    return v2 or hashlib.sha1(magnet_uri.encode()).hexdigest()
+
+
+def torrent_file_key(torrent_path: str) -> str:
+    """Info-hash hex of a .torrent file, matching ``magnet_key``."""
+    hashes = lt.torrent_info(torrent_path).info_hashes()
+    return str(hashes.v1) if hashes.has_v1() else str(hashes.v2)
+
+
+def shard_settings(settings: Optional[Dict[str, Any]], index: int, base_port: int,
+                   ports_per_shard: int) -> Dict[str, Any]:
+    """Session settings for shard ``index``: its own listen port range.
+
+    Explicit ``listen_interfaces`` (e.g. loopback port 0 in tests) are kept.
+    """
+    result = dict(settings or {})
+    if 'listen_interfaces' not in result:
+        port = base_port + index * ports_per_shard
+        result['listen_interfaces'] = f"0.0.0.0:{port},[::]:{port}"
+        result['max_retry_port_bind'] = ports_per_shard - 1
+    return result
+
+
+def shard_session_file(session_file: str, index: int) -> str:
+    return session_file if index == 0 else f"{session_file}.shard{index}"
+
+
+def merge_disk_stats(stats: Sequence[Optional[DiskStats]]) -> Optional[DiskStats]:
+    """Sum queue gauges and average latencies over the shards that reported."""
+    present = [s for s in stats if s is not None]
+    if not present:
+        return None
+
+    def mean(values: List[Optional[float]]) -> Optional[float]:
+        known = [v for v in values if v is not None]
+        return sum(known) / len(known) if known else None
+
+    return DiskStats(
+        queued_jobs=sum(s.queued_jobs for s in present),
+        queued_write_bytes=sum(s.queued_write_bytes for s in present),
+        peers_blocked_on_disk=sum(s.peers_blocked_on_disk for s in present),
+        request_latency_us=int(sum(s.request_latency_us for s in present) / len(present)),
+        read_latency_us=mean([s.read_latency_us for s in present]),
+        write_latency_us=mean([s.write_latency_us for s in present]),
+    )
+
+
+def merge_relocation(progress: Sequence[RelocationProgress]) -> RelocationProgress:
+    return RelocationProgress(
+        total=sum(p.total for p in progress),
+        done=sum(p.done for p in progress),
+        failed=sum(p.failed for p in progress),
+        moving=sum(p.moving for p in progress),
+        bytes_total=sum(p.bytes_total for p in progress),
+        bytes_done=sum(p.bytes_done for p in progress),
+    )
+
+
+# --- Worker process -------------------------------------------------------
+
+# Methods a worker executes; anything else is rejected.
+_WORKER_METHODS = frozenset({
+    'add_magnet', 'add_torrent_file', 'pause_at', 'resume_at', 'remove_at', 'force_recheck_at',
+    'relocate_at', 'relocate_all', 'set_download_directory', 'apply_settings', 'apply_disk_profile',
+    'get_loaded_torrents_info', 'save_state', 'set_global_seeding_policy', 'set_seeding_policy_at',
+    'get_seeding_policy_at', 'get_peers_at', 'get_files_at', 'set_labels_at', 'get_labels_at',
+    'traffic_report', 'apply_memory_mode', 'set_postprocess_settings', 'postprocess_jobs', 'retry_postprocess',
+    'load_blocklist', 'set_peer_classes', 'set_disk_reserve',
+})
+# Methods returning libtorrent handles, which cannot cross the pipe: their key is sent instead.
+_HANDLE_RESULTS = frozenset({'add_magnet', 'add_torrent_file'})
+
+
+def _snapshot(manager: TorrentManager, index: int) -> ShardSnapshot:
+    t0 = time.perf_counter_ns()
+    statuses = manager.get_status_list()
+    return ShardSnapshot(shard=index, statuses=statuses, disk_stats=manager.get_disk_stats(),
+                         relocation=manager.get_relocation_progress(),
+                         elapsed_ns=time.perf_counter_ns() - t0)
+
+
+def _run_call(manager: TorrentManager, index: int, method: str, args: tuple, kwargs: dict) -> Any:
+    if method == 'snapshot':
+        return _snapshot(manager, index)
+    if method == 'torrent_keys':
+        return manager.torrent_keys()
+    if method not in _WORKER_METHODS:
+        raise ValueError(f"Unsupported shard method: {method}")
+    result = getattr(manager, method)(*args, **kwargs)
+    return _handle_key(result) if method in _HANDLE_RESULTS else result
+
+
+def _picklable_error(error: BaseException) -> BaseException:
+    try:
+        pickle.dumps(error)
+        return error
+    except Exception:
+        return RuntimeError(repr(error))
+
+
+def _worker_main(conn, index: int, download_dir: str, session_file: str, settings: Dict[str, Any],
+                 manager_kwargs: Dict[str, Any]) -> None:
+    """Entry point of a shard process: serve call batches until told to stop."""
+    try:
+        manager = TorrentManager(download_dir, session_file, settings, **manager_kwargs)
+    except BaseException as e:
+        conn.send((False, _picklable_error(e)))
+        return
+    conn.send((True, len(manager.get_torrents())))
+    last_tick = 0.0
+    while True:
+        if conn.poll(WORKER_TICK_S):
+            try:
+                batch = conn.recv()
+            except EOFError:  # coordinator went away
+                break
+            if batch is None:  # orderly shutdown
+                break
+            replies = []
+            for method, args, kwargs in batch:
+                try:
+                    replies.append((True, _run_call(manager, index, method, args, kwargs)))
+                except Exception as e:
+                    replies.append((False, _picklable_error(e)))
+            conn.send(replies)
+        now = time.monotonic()
+        if now - last_tick >= WORKER_TICK_S:
+            last_tick = now
+            manager.process_alerts()
+            manager.tick()
+            manager.request_session_stats()
+    manager.save_state()
+    manager.close()
+    conn.close()
+
+
+# --- Coordinator ----------------------------------------------------------
+
+@dataclass
+class _Shard:
+    index: int
+    process: Any
+    conn: Any
+    count: int = 0  # torrents in this shard as of the last snapshot/command
+
+
+class ShardedTorrentManager:
+    """Coordinator fronting ``shards`` worker processes with the TorrentManager API.
+
+    Extra keyword arguments (``disk_preset``, ``full_allocation``, ...) are
+    passed to every worker's ``TorrentManager``.
+    """
+
+    def __init__(self, download_dir: str, session_file: str, settings: Optional[Dict[str, Any]] = None, *,
+                 shards: int = 2, base_port: int = DEFAULT_BASE_PORT,
+                 ports_per_shard: int = DEFAULT_PORTS_PER_SHARD, **manager_kwargs: Any):
+        assert isinstance(download_dir, str) and download_dir, "download_dir must be a non-empty string"
+        assert isinstance(session_file, str) and session_file, "session_file must be a non-empty string"
+        assert isinstance(shards, int) and shards > 0, "shards must be a positive integer"
+        assert isinstance(ports_per_shard, int) and ports_per_shard > 0, "ports_per_shard must be positive"
+        self.shards = shards
+        self._download_dir = download_dir
+        self._shards: List[_Shard] = []
+        self._disk_stats: Optional[DiskStats] = None
+        self._relocation = RelocationProgress(0, 0, 0, 0, 0, 0)
+        os.makedirs(download_dir, exist_ok=True)
+        ctx = multiprocessing.get_context("spawn")  # libtorrent threads do not survive fork
+        for index in range(shards):
+            parent, child = ctx.Pipe()
+            process = ctx.Process(target=_worker_main, name=f"torrent-shard-{index}", daemon=True,
+                                  args=(child, index, download_dir, shard_session_file(session_file, index),
+                                        shard_settings(settings, index, base_port, ports_per_shard),
+                                        manager_kwargs))
+            process.start()
+            child.close()
+            self._shards.append(_Shard(index=index, process=process, conn=parent))
+        try:
+            for shard in self._shards:  # workers start in parallel; wait for all
+                shard.count = self._receive(shard)
+        except BaseException:
+            self.close()
+            raise
+        logging.info("Started %d torrent shards (%d torrents)", shards, self.torrent_count())
+
+    @property
+    def download_dir(self) -> str:
+        return self._download_dir
+
+    # --- Transport ----------------------------------------------------------
+    @staticmethod
+    def _recv(shard: "_Shard") -> Any:
+        try:
+            if not shard.conn.poll(REPLY_TIMEOUT_S):
+                raise RuntimeError(f"Shard {shard.index} did not reply within {REPLY_TIMEOUT_S:.0f}s")
+            return shard.conn.recv()
+        except EOFError:
+            raise RuntimeError(f"Shard {shard.index} exited (code {shard.process.exitcode})") from None
+
+    def _receive(self, shard: _Shard) -> Any:
+        ok, value = self._recv(shard)
+        if not ok:
+            raise value
+        return value
+
+    def _call_batch(self, batches: Dict[int, List[Call]]) -> Dict[int, List[Any]]:
+        """Send one batch per shard, then collect all replies (shards run in parallel).
+
+        Exceptions raised by individual calls are returned in place of their result.
+        """
+        for index, calls in batches.items():
+            self._shards[index].conn.send(calls)
+        results: Dict[int, List[Any]] = {}
+        for index in batches:
+            results[index] = [value for _ok, value in self._recv(self._shards[index])]
+        return results
+
+    def _call(self, index: int, method: str, *args: Any, **kwargs: Any) -> Any:
+        result = self._call_batch({index: [(method, args, kwargs)]})[index][0]
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    def _broadcast(self, method: str, *args: Any, **kwargs: Any) -> List[Any]:
+        results = self._call_batch({s.index: [(method, args, kwargs)] for s in self._shards})
+        values = [results[s.index][0] for s in self._shards]
+        for value in values:
+            if isinstance(value, BaseException):
+                raise value
+        return values
+
+    def _locate(self, index: int) -> Optional[Tuple[int, int]]:
+        """Map a global index to (shard, local index) using the last known counts."""
+        if index < 0:
+            return None
+        for shard in self._shards:
+            if index < shard.count:
+                return shard.index, index
+            index -= shard.count
+        return None
+
+    # --- Adding torrents ----------------------------------------------------
+    def add_magnet(self, magnet_uri: str) -> str:
+        """Add a magnet link to its shard; returns its key in ``torrent_keys``."""
+        index = shard_for(magnet_key(magnet_uri), self.shards)
+        key = self._call(index, 'add_magnet', magnet_uri)
+        self._shards[index].count += 1
+        return key
+
+    def add_torrent_file(self, torrent_path: str, save_path: Optional[str] = None, seed_mode: bool = False) -> str:
+        """Add a .torrent file to its shard; returns its key in ``torrent_keys``."""
+        assert isinstance(torrent_path, str) and torrent_path, "torrent_path must be a non-empty string"
+        if not os.path.isfile(torrent_path):
+            raise FileNotFoundError(f"Torrent file not found: {torrent_path}")
+        index = shard_for(torrent_file_key(torrent_path), self.shards)
+        key = self._call(index, 'add_torrent_file', os.path.abspath(torrent_path), save_path, seed_mode)
+        self._shards[index].count += 1
+        return key
+
+    # --- Status -------------------------------------------------------------
+    def get_snapshots(self) -> List[ShardSnapshot]:
+        """One status snapshot per shard, fetched in parallel."""
+        snapshots: List[ShardSnapshot] = self._broadcast('snapshot')
+        for shard, snapshot in zip(self._shards, snapshots):
+            shard.count = len(snapshot.statuses)
+        self._disk_stats = merge_disk_stats([s.disk_stats for s in snapshots])
+        self._relocation = merge_relocation([s.relocation for s in snapshots])
+        return snapshots
+
+    def get_status_list(self) -> List[TorrentStatus]:
+        """Merged statuses of all shards (shard order defines global indices)."""
+        statuses: List[TorrentStatus] = []
+        for snapshot in self.get_snapshots():
+            statuses.extend(snapshot.statuses)
+        return statuses
+
+    def get_disk_stats(self) -> Optional[DiskStats]:
+        """Disk stats merged from the last snapshot."""
+        return self._disk_stats
+
+    def get_relocation_progress(self) -> RelocationProgress:
+        """Relocation progress merged from the last snapshot."""
+        return self._relocation
+
+    def torrent_count(self) -> int:
+        return sum(s.count for s in self._shards)
+
+    def torrent_keys(self) -> List[str]:
+        """Info-hash of every torrent in global index order."""
+        keys: List[str] = []
+        for shard, shard_keys in zip(self._shards, self._broadcast('torrent_keys')):
+            shard.count = len(shard_keys)
+            keys.extend(shard_keys)
+        return keys
+
+    def get_torrents(self) -> List[str]:
+        """Info-hash keys of all torrents (the handles live in the workers)."""
+        return self.torrent_keys()
+
+    def get_loaded_torrents_info(self) -> List[LoadedTorrentInfo]:
+        infos: List[LoadedTorrentInfo] = []
+        for shard_infos in self._broadcast('get_loaded_torrents_info'):
+            infos.extend(shard_infos)
+        return infos
+
+    # --- Per-torrent commands -----------------------------------------------
+    def _at(self, method: str, index: int, *args: Any, **kwargs: Any) -> bool:
+        assert isinstance(index, int), "index must be an integer"
+        location = self._locate(index)
+        if location is None:
+            return False
+        shard, local = location
+        return bool(self._call(shard, method, local, *args, **kwargs))
+
+    def pause_at(self, index: int) -> bool:
+        return self._at('pause_at', index)
+
+    def resume_at(self, index: int) -> bool:
+        return self._at('resume_at', index)
+
+    def force_recheck_at(self, index: int, priority: int = 0) -> bool:
+        return self._at('force_recheck_at', index, priority)
+
+    def relocate_at(self, index: int, dest: str) -> bool:
+        return self._at('relocate_at', index, dest)
+
+    def set_seeding_policy_at(self, index: int, policy: Optional[SeedingPolicy]) -> bool:
+        return self._at('set_seeding_policy_at', index, policy)
+
+    def get_seeding_policy_at(self, index: int) -> Optional[SeedingPolicy]:
+        location = self._locate(index)
+        if location is None:
+            return None
+        return self._call(location[0], 'get_seeding_policy_at', location[1])
+
+    def get_peers_at(self, index: int) -> List[PeerInfo]:
+        location = self._locate(index)
+        if location is None:
+            return []
+        return self._call(location[0], 'get_peers_at', location[1])
+
+    def get_files_at(self, index: int) -> Optional[FileView]:
+        location = self._locate(index)
+        if location is None:
+            return None
+        return self._call(location[0], 'get_files_at', location[1])
+
+    def set_labels_at(self, index: int, labels: List[str]) -> bool:
+        return self._at('set_labels_at', index, labels)
+
+    def get_labels_at(self, index: int) -> List[str]:
+        location = self._locate(index)
+        if location is None:
+            return []
+        return self._call(location[0], 'get_labels_at', location[1])
+
+    def remove_at(self, index: int, *, delete_files: bool = False) -> bool:
+        location = self._locate(index)
+        removed = self._at('remove_at', index, delete_files=delete_files)
+        if removed and location is not None:
+            # keeps later indices valid when removing several rows back to front
+            self._shards[location[0]].count -= 1
+        return removed
+
+    def run_batch(self, method: str, indices: Sequence[int], *args: Any) -> int:
+        """Run ``method`` (e.g. 'pause_at') for many global indices, one message per shard.
+
+        Returns how many calls succeeded.
+        """
+        assert method in ('pause_at', 'resume_at', 'force_recheck_at'), "unsupported batch method"
+        batches: Dict[int, List[Call]] = {}
+        for index in indices:
+            location = self._locate(index)
+            if location is not None:
+                batches.setdefault(location[0], []).append((method, (location[1], *args), {}))
+        if not batches:
+            return 0
+        return sum(1 for results in self._call_batch(batches).values()
+                   for value in results if value is True)
+
+    # --- Session-wide -------------------------------------------------------
+    def relocate_all(self, dest: str) -> int:
+        return sum(self._broadcast('relocate_all', dest))
+
+    def set_download_directory(self, path: str) -> None:
+        assert isinstance(path, str) and path, "path must be a non-empty string"
+        self._broadcast('set_download_directory', path)
+        self._download_dir = path
+
+    def apply_settings(self, settings: Dict[str, Any]) -> None:
+        self._broadcast('apply_settings', settings)
+
+    def apply_disk_profile(self, preset: str, full_allocation: bool) -> None:
+        self._broadcast('apply_disk_profile', preset, full_allocation)
+
+    def apply_memory_mode(self, low_memory: bool) -> None:
+        self._broadcast('apply_memory_mode', low_memory)
+
+    def load_blocklist(self, path: Optional[str]) -> None:
+        self._broadcast('load_blocklist', path)
+
+    def set_peer_classes(self, peer_classes: PeerClasses) -> None:
+        self._broadcast('set_peer_classes', peer_classes)
+
+    def set_disk_reserve(self, disk_reserve: Optional[int]) -> None:
+        self._broadcast('set_disk_reserve', disk_reserve)
+
+    def set_postprocess_settings(self, settings: PostProcessSettings) -> None:
+        self._broadcast('set_postprocess_settings', settings)
+
+    def postprocess_jobs(self, limit: int = 100) -> List[PostProcessJob]:
+        """Jobs of all shards (each runs its own pool), newest first."""
+        jobs = [job for shard_jobs in self._broadcast('postprocess_jobs', limit) for job in shard_jobs]
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)[:limit]
+
+    def retry_postprocess(self, info_hash: str) -> bool:
+        return any(self._broadcast('retry_postprocess', info_hash))
+
+    def set_global_seeding_policy(self, policy: SeedingPolicy, prioritize_underseeded: bool = False) -> None:
+        self._broadcast('set_global_seeding_policy', policy, prioritize_underseeded)
+
+    def traffic_report(self, span_s: float, top_n: int = DEFAULT_TOP_N) -> TrafficReport:
+        """Traffic of all shards (each keeps its own history)."""
+        return merge_reports(self._broadcast('traffic_report', span_s, top_n), top_n)
+
+    def save_state(self) -> None:
+        self._broadcast('save_state')
+
+    def process_alerts(self) -> int:
+        """Alerts are processed inside the workers; nothing to do here."""
+        return 0
+
+    def tick(self) -> None:
+        """Schedulers run inside the workers; nothing to do here."""
+
+    def request_session_stats(self) -> None:
+        """Workers request session stats on their own tick."""
+
+    def close(self) -> None:
+        """Stop all workers; each saves its session state before exiting."""
+        for shard in self._shards:
+            try:
+                shard.conn.send(None)
+            except (OSError, ValueError):  # pipe already closed
+                pass
+        for shard in self._shards:
+            shard.process.join(REPLY_TIMEOUT_S)
+            if shard.process.is_alive():  # pragma: no cover - hung worker
+                logging.warning("Terminating unresponsive shard %d", shard.index)
+                shard.process.terminate()
+            shard.conn.close()
+        self._shards.clear()
+
+    def __enter__(self) -> "ShardedTorrentManager":
+        return self
+
+    def __exit__(self, *_exc) -> bool:
+        self.close()
+        return False
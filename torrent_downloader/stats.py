@@ -0,0 +1,243 @@
+"""Transfer statistics history: payload traffic per torrent in time buckets.
+
+The ``TrafficRecorder`` is fed the ``total_payload_download`` /
+``total_payload_upload`` counters of status snapshots (from the
+``state_update_alert`` the seeding engine already requests). It keeps the
+deltas of the current minute in memory and, once a minute is over, adds
+them to the minute, hour and day buckets of a ``TrafficStore`` in one
+transaction. Only torrents that transferred something get a row, and each
+resolution has its own retention, so the history stays small. Buckets
+are aligned to UTC.
+
+The whole node is recorded under the key ``NODE`` alongside the torrents.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+RESOLUTIONS = (MINUTE, HOUR, DAY)
+# How long each resolution is kept.
+RETENTION_S = {MINUTE: 2 * DAY, HOUR: 90 * DAY, DAY: 5 * 365 * DAY}
+PRUNE_INTERVAL_S = HOUR
+NODE = ""  # key of the whole-node rows
+DEFAULT_TOP_N = 10
+
+# (info-hash, name, total payload downloaded, total payload uploaded) of one status snapshot
+Counters = Tuple[str, str, int, int]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS traffic (
+    resolution INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    info_hash TEXT NOT NULL,
+    downloaded INTEGER NOT NULL,
+    uploaded INTEGER NOT NULL,
+    PRIMARY KEY (resolution, start, info_hash)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS traffic_names (
+    info_hash TEXT PRIMARY KEY,
+    name TEXT NOT NULL
+);
+"""
+
+
+@dataclass
+class TrafficBucket:
+    start: int  # unix time, aligned to the resolution
+    downloaded: int  # payload bytes
+    uploaded: int
+
+
+@dataclass
+class TorrentTraffic:
+    info_hash: str
+    name: str
+    downloaded: int
+    uploaded: int
+
+    @property
+    def total(self) -> int:
+        return self.downloaded + self.uploaded
+
+
+@dataclass
+class TrafficReport:
+    resolution: int  # seconds per bucket
+    since: int
+    until: int
+    buckets: List[TrafficBucket] = field(default_factory=list)  # node traffic, oldest first, empty ones left out
+    top: List[TorrentTraffic] = field(default_factory=list)  # most traffic first
+
+    @property
+    def downloaded(self) -> int:
+        return sum(b.downloaded for b in self.buckets)
+
+    @property
+    def uploaded(self) -> int:
+        return sum(b.uploaded for b in self.buckets)
+
+
+def bucket_start(t: float, resolution: int) -> int:
+    assert resolution in RESOLUTIONS, "unknown resolution"
+    return int(t // resolution) * resolution
+
+
+def resolution_for(span_s: float) -> int:
+    """Bucket size for showing ``span_s`` seconds (at most a few hundred buckets)."""
+    if span_s <= 6 * HOUR:
+        return MINUTE
+    if span_s <= 14 * DAY:
+        return HOUR
+    return DAY
+
+
+def merge_reports(reports: Sequence[TrafficReport], top_n: int = DEFAULT_TOP_N) -> TrafficReport:
+    """Combine reports over the same window (e.g. one per shard)."""
+    assert reports, "need at least one report"
+    buckets: Dict[int, TrafficBucket] = {}
+    for report in reports:
+        for b in report.buckets:
+            merged = buckets.setdefault(b.start, TrafficBucket(b.start, 0, 0))
+            merged.downloaded += b.downloaded
+            merged.uploaded += b.uploaded
+    top = sorted((t for r in reports for t in r.top), key=lambda t: t.total, reverse=True)[:top_n]
+    first = reports[0]
+    return TrafficReport(first.resolution, first.since, first.until, [buckets[k] for k in sorted(buckets)], top)
+
+
+class TrafficStore:
+    """Bucketed traffic in an SQLite database (its own connection, WAL mode)."""
+
+    def __init__(self, path: str):
+        assert isinstance(path, str) and path, "path must be a non-empty string"
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock, self._conn:
+            for statement in _SCHEMA.split(";"):
+                if statement.strip():
+                    self._conn.execute(statement)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def add(self, minutes: Dict[Tuple[int, str], List[int]], names: Dict[str, str]) -> None:
+        """Add per-minute deltas ((minute start, key) -> [down, up]) to every resolution."""
+        rows = [(resolution, bucket_start(start, resolution), key, down, up)
+                for (start, key), (down, up) in minutes.items() for resolution in RESOLUTIONS]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO traffic(resolution, start, info_hash, downloaded, uploaded) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(resolution, start, info_hash) DO UPDATE SET "
+                "downloaded = downloaded + excluded.downloaded, uploaded = uploaded + excluded.uploaded", rows)
+            self._conn.executemany("INSERT INTO traffic_names(info_hash, name) VALUES (?, ?) "
+                                   "ON CONFLICT(info_hash) DO UPDATE SET name = excluded.name",
+                                   [(k, n) for k, n in names.items() if n])
+
+    def prune(self, now: float, retention_s: Optional[Dict[int, float]] = None) -> int:
+        """Drop buckets older than their resolution's retention; returns the row count."""
+        retention_s = retention_s or RETENTION_S
+        with self._lock, self._conn:
+            removed = sum(self._conn.execute("DELETE FROM traffic WHERE resolution = ? AND start < ?",
+                                             (resolution, now - keep)).rowcount
+                          for resolution, keep in retention_s.items())
+            self._conn.execute("DELETE FROM traffic_names WHERE info_hash NOT IN "
+                               "(SELECT DISTINCT info_hash FROM traffic WHERE resolution = ?)", (DAY,))
+        return removed
+
+    def buckets(self, resolution: int, since: int, until: int, info_hash: str = NODE) -> List[TrafficBucket]:
+        with self._lock:
+            rows = self._conn.execute("SELECT start, downloaded, uploaded FROM traffic WHERE resolution = ? "
+                                      "AND start >= ? AND start < ? AND info_hash = ? ORDER BY start",
+                                      (resolution, since, until, info_hash)).fetchall()
+        return [TrafficBucket(*row) for row in rows]
+
+    def top(self, resolution: int, since: int, until: int, n: int = DEFAULT_TOP_N) -> List[TorrentTraffic]:
+        """Torrents with the most traffic (down + up) in the window."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT t.info_hash, COALESCE(n.name, ''), SUM(t.downloaded), SUM(t.uploaded) FROM traffic t "
+                "LEFT JOIN traffic_names n ON n.info_hash = t.info_hash "
+                "WHERE t.resolution = ? AND t.start >= ? AND t.start < ? AND t.info_hash != ? "
+                "GROUP BY t.info_hash ORDER BY SUM(t.downloaded) + SUM(t.uploaded) DESC LIMIT ?",
+                (resolution, since, until, NODE, n)).fetchall()
+        return [TorrentTraffic(*row) for row in rows]
+
+
+class TrafficRecorder:
+    """Turns payload counters into per-minute deltas and flushes closed minutes."""
+
+    def __init__(self, store: TrafficStore, clock=time.time, retention_s: Optional[Dict[int, float]] = None):
+        self.store = store
+        self._clock = clock
+        self._retention_s = retention_s or RETENTION_S
+        self._last: Dict[str, Tuple[int, int]] = {}  # key -> counters of the previous sample
+        self._names: Dict[str, str] = {}  # names not written yet
+        self._pending: Dict[Tuple[int, str], List[int]] = {}  # (minute start, key) -> [down, up]
+        self._last_prune = 0.0
+
+    def sample(self, counters: Iterable[Counters]) -> None:
+        """Record the traffic since the previous sample of each torrent.
+
+        Counters restart at zero when a torrent is (re)added, so the first
+        sample of a torrent and a counter that went backwards count in full.
+        """
+        minute = bucket_start(self._clock(), MINUTE)
+        node = self._pending.setdefault((minute, NODE), [0, 0])
+        for key, name, down, up in counters:
+            last_down, last_up = self._last.get(key, (0, 0))
+            if down < last_down or up < last_up:  # restarted
+                last_down = last_up = 0
+            delta_down, delta_up = down - last_down, up - last_up
+            if key not in self._last and name:
+                self._names[key] = name
+            self._last[key] = (down, up)
+            if delta_down or delta_up:
+                bucket = self._pending.setdefault((minute, key), [0, 0])
+                bucket[0] += delta_down
+                bucket[1] += delta_up
+                node[0] += delta_down
+                node[1] += delta_up
+
+    def discard(self, key: str) -> None:
+        """Forget a removed torrent's counters (its history stays)."""
+        self._last.pop(key, None)
+
+    def flush(self, force: bool = False) -> int:
+        """Write finished minutes (all minutes with ``force``); returns the bucket count written."""
+        now = self._clock()
+        current = bucket_start(now, MINUTE)
+        ready = {k: v for k, v in self._pending.items() if (force or k[0] < current) and (v[0] or v[1])}
+        self._pending = {k: v for k, v in self._pending.items() if not force and k[0] >= current}
+        try:
+            if ready or self._names:
+                self.store.add(ready, self._names)
+                self._names = {}
+            if now - self._last_prune >= PRUNE_INTERVAL_S:
+                self._last_prune = now
+                self.store.prune(now, self._retention_s)
+        except sqlite3.Error as e:
+            logging.error("Failed to write traffic statistics: %s", e)
+        return len(ready)
+
+    def report(self, span_s: float, top_n: int = DEFAULT_TOP_N, resolution: Optional[int] = None) -> TrafficReport:
+        """Node traffic and top torrents of the last ``span_s`` seconds (including the current minute)."""
+        self.flush(force=True)
+        resolution = resolution or resolution_for(span_s)
+        now = self._clock()
+        until = bucket_start(now, resolution) + resolution
+        since = bucket_start(now - span_s, resolution)
+        return TrafficReport(resolution, since, until, self.store.buckets(resolution, since, until),
+                             self.store.top(resolution, since, until, top_n))
@@ -12,11 +12,50 @@ Key concepts:
 """
 
 from dataclasses import dataclass
-from typing import List, Optional, Protocol, runtime_checkable
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple, runtime_checkable
+import importlib
+import json
 import logging
 import os
+import threading
 
-import libtorrent as lt
+from .admission import AdmissionController
+from .blocklist import Blocklist, load_blocklist
+from .catalog import Hold, ResumeRow, TorrentCatalog
+from .disk import DiskStats, DiskStatsTracker, disk_settings
+from .files import FileEntry, FileView, FileViewCache
+from .memory import memory_settings
+from .peerclass import LOCAL_PRIORITY, MAX_CLASS_ID, PeerClasses, filter_ranges
+from .perf import PERF
+from .postprocess import JobStore, PostProcessJob, PostProcessor, PostProcessSettings
+from .recheck import CheckResult, RecheckScheduler
+from .relocate import RelocationProgress, RelocationQueue
+from .seeding import ACTION_REMOVE, NO_LIMITS, LimitReached, SeedingEngine, SeedingPolicy, SeedSnapshot
+from .stats import DEFAULT_TOP_N, TrafficRecorder, TrafficReport, TrafficStore
+
+AlertListener = Callable[[Any], None]
+
+
+class _LazyModule:
+    """Module proxy that imports ``name`` on first attribute access.
+
+    Importing libtorrent is a large part of start-up time; deferring it lets
+    the GUI map its window first and create the session in the background.
+    """
+
+    def __init__(self, name: str) -> None:
+        assert isinstance(name, str) and name, "name must be a non-empty string"
+        self._name = name
+        self._module: Any = None
+
+    def __getattr__(self, attr: str) -> Any:
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+lt: Any = _LazyModule("libtorrent")
 
 @dataclass
 class LoadedTorrentInfo:
@@ -24,7 +63,7 @@ class LoadedTorrentInfo:
     magnet_link: Optional[str]
 
 
-@dataclass
+@dataclass(slots=True)  # one per torrent per refresh
 class TorrentStatus:
     name: str
     progress: float  # 0..1
@@ -34,6 +73,29 @@ class TorrentStatus:
     eta_seconds: Optional[int]  # None if not available
     has_metadata: bool
     state: str  # E.g., "downloading", "seeding", "paused"
+    check_position: Optional[int] = None  # 0 = being rechecked, n = n-th in recheck queue
+    move_position: Optional[int] = None  # 0 = data being moved, n = n-th in relocation queue
+    space_position: Optional[int] = None  # n = n-th torrent waiting for disk space
+
+
+@dataclass
+class PeerInfo:
+    endpoint: str  # "ip:port", unique per torrent
+    client: str
+    flags: str  # see _peer_flags
+    download_rate: int  # bytes/sec
+    upload_rate: int  # bytes/sec
+    progress: float  # 0..1, the peer's share of the torrent
+    connection: str  # "BT", "uTP", "Web" or "HTTP"
+
+
+# peer_info::utp_socket (bit 17) is not exported by the Python bindings.
+_UTP_SOCKET_FLAG = 1 << 17
+# ip_filter::blocked access flag
+BLOCKED = 1
+# Catalog hold kinds: torrents paused by disk-space admission control / waiting for a recheck.
+_HOLD_SPACE = "space"
+_HOLD_RECHECK = "recheck"
 
 
 @runtime_checkable
@@ -90,6 +152,19 @@ def _compute_eta(total_done: int, total_wanted: int, download_rate: int) -> Opti
     return int(remaining / download_rate)
 
 
+def _magnet_summary(magnet_uri: str) -> str:
+    """Return a short loggable identifier for a magnet URI.
+
+    Whole magnet links (with trackers) can be kilobytes long; logging just
+    the ``xt`` info-hash part keeps the hot add path cheap.
+    """
+    assert isinstance(magnet_uri, str), "magnet_uri must be a string"
+    for part in magnet_uri[len("magnet:?"):].split("&"):
+        if part.startswith("xt="):
+            return part[3:]
+    return magnet_uri[:60]
+
+
 def _get_state_str(s) -> str:
     """Return a human-readable string for the torrent's state."""
     if not lt:
@@ -109,6 +184,115 @@ def _get_state_str(s) -> str:
     return state_map.get(state, str(state))
 
 
+def _is_checking(s) -> bool:
+    """Return True while libtorrent is hashing the torrent's data."""
+    return s.state in (lt.torrent_status.states.checking_files,
+                       lt.torrent_status.states.checking_resume_data)
+
+
+def _handle_key(handle) -> str:
+    """Stable string key (best info-hash, v2 for hybrid torrents) for a torrent handle."""
+    try:
+        return str(handle.info_hashes().get_best())
+    except AttributeError:  # pragma: no cover - libtorrent 1.x
+        return str(handle.info_hash())
+
+
+def _alert_storage_path(alert) -> str:
+    """New save path from a ``storage_moved_alert`` (a method in the bindings)."""
+    path = alert.storage_path
+    return str(path() if callable(path) else path)
+
+
+def _status_key(s) -> str:
+    """Info-hash key of a ``torrent_status`` (matches ``_handle_key``)."""
+    try:
+        return str(s.info_hashes.get_best())
+    except AttributeError:  # pragma: no cover - libtorrent 1.x
+        return str(s.info_hash)
+
+
+def _seed_snapshot(s) -> SeedSnapshot:
+    """Translate a ``torrent_status`` from a ``state_update_alert`` for the seeding engine."""
+    duration = getattr(s, 'seeding_duration', None)  # timedelta in libtorrent 2.x
+    seeding_s = duration.total_seconds() if duration is not None else getattr(s, 'seeding_time', 0)
+    return SeedSnapshot(key=_status_key(s), handle=s.handle, seeding=bool(s.is_finished), paused=bool(s.paused),
+                        uploaded=s.all_time_upload, downloaded=max(s.all_time_download, s.total_done),
+                        seeding_s=seeding_s, num_complete=s.num_complete, num_incomplete=s.num_incomplete)
+
+
+def _peer_flags(p) -> str:
+    """Compact flag letters for a ``peer_info``, in the style of other clients.
+
+    D/d: downloading from / interested in the peer, U/u: uploading to / peer is
+    interested, O: optimistic unchoke, S: snubbed, I: incoming connection,
+    E/e: RC4 / plaintext encrypted, H/X/L: found via DHT / PEX / LSD.
+    """
+    info = lt.peer_info
+    flags, source = p.flags, p.source
+    letters = []
+    if flags & info.interesting:
+        letters.append('d' if flags & info.remote_choked else 'D')
+    if flags & info.remote_interested:
+        letters.append('u' if flags & info.choked else 'U')
+    for bit, letter in ((info.optimistic_unchoke, 'O'), (info.snubbed, 'S'), (info.rc4_encrypted, 'E'),
+                        (info.plaintext_encrypted, 'e')):
+        if flags & bit:
+            letters.append(letter)
+    if not flags & info.outgoing_connection:
+        letters.append('I')
+    for bit, letter in ((info.dht, 'H'), (info.pex, 'X'), (info.lsd, 'L')):
+        if source & bit:
+            letters.append(letter)
+    return " ".join(letters)
+
+
+def _peer_from_info(p) -> PeerInfo:
+    """Translate a libtorrent ``peer_info`` into a ``PeerInfo``."""
+    ip, port = p.ip
+    client = p.client
+    if isinstance(client, bytes):
+        client = client.decode('utf-8', errors='replace')
+    if p.connection_type == lt.peer_info.web_seed:
+        connection = "Web"
+    elif p.connection_type == lt.peer_info.http_seed:
+        connection = "HTTP"
+    else:
+        connection = "uTP" if p.flags & _UTP_SOCKET_FLAG else "BT"
+    endpoint = f"[{ip}]:{port}" if ":" in ip else f"{ip}:{port}"
+    return PeerInfo(endpoint=endpoint, client=client or "(unknown)", flags=_peer_flags(p),
+                    download_rate=p.down_speed, upload_rate=p.up_speed,
+                    progress=min(max(float(p.progress), 0.0), 1.0), connection=connection)
+
+
+def _file_view(handle) -> FileView:
+    """Per-file progress (whole pieces), priorities and the piece map of a torrent with metadata."""
+    ti = handle.torrent_file()
+    fs = ti.layout() if hasattr(ti, 'layout') else ti.files()  # files() is deprecated in 2.x
+    progress = handle.file_progress(lt.file_progress_flags_t.piece_granularity)
+    priorities = handle.get_file_priorities()
+    pad_flag = lt.file_storage.flag_pad_file
+    files: List[FileEntry] = []
+    for i in range(fs.num_files()):
+        if fs.file_flags(i) & pad_flag:  # alignment padding of v2/hybrid torrents
+            continue
+        size = fs.file_size(i)
+        files.append(FileEntry(index=i, path=fs.file_path(i), size=size,
+                               progress=progress[i] / size if size else 1.0, priority=int(priorities[i])))
+    status = handle.status(lt.status_flags_t.query_pieces)
+    return FileView(files=files, pieces=list(status.pieces), availability=list(handle.piece_availability()))
+
+
+def _atp_key(atp) -> str:
+    """Info-hash key of ``add_torrent_params`` (matches ``_handle_key``)."""
+    if atp.ti is not None:  # resume data need not carry the info-hash when it has the metadata
+        return _handle_key(atp.ti)
+    try:
+        return str(atp.info_hashes.get_best())
+    except AttributeError:  # pragma: no cover - libtorrent 1.x
+        return str(atp.info_hash)
+
+
 def _status_from_handle(handle: _HandleLike) -> TorrentStatus:
     """Translate a libtorrent ``torrent_handle`` into a ``TorrentStatus``.
 
@@ -118,7 +302,11 @@ def _status_from_handle(handle: _HandleLike) -> TorrentStatus:
     """
     assert isinstance(handle, _HandleLike), "handle must be a _HandleLike object"
     try:
-        s = handle.status()
+        if PERF.enabled:  # inline check keeps the disabled path branch-only
+            with PERF.timer("lt.handle_status"):
+                s = handle.status()
+        else:
+            s = handle.status()
     except Exception as e:  # pragma: no cover - defensive
         logging.warning("Failed to retrieve status for handle: %s", e)
         raise
@@ -176,22 +364,78 @@ def _status_from_handle(handle: _HandleLike) -> TorrentStatus:
 class TorrentManager:
     """Encapsulates libtorrent session operations."""
 
-    def __init__(self, download_dir: str, session_file: str):
-        """Initialise the torrent session, optionally loading from a saved state."""
+    def __init__(self, download_dir: str, session_file: str, settings: Optional[Dict[str, Any]] = None,
+                 *, disk_preset: str = 'default', full_allocation: bool = False, max_active_checks: int = 1,
+                 seeding_policy: Optional[SeedingPolicy] = None, prioritize_underseeded: bool = False,
+                 low_memory: bool = False, postprocess: Optional[PostProcessSettings] = None,
+                 blocklist_path: Optional[str] = None, peer_classes: Optional[PeerClasses] = None,
+                 disk_reserve: Optional[int] = None):
+        """Initialise the torrent session, optionally loading from a saved state.
+
+        ``settings`` entries override the default libtorrent session settings
+        (e.g. to bind to loopback only with DHT/LSD/UPnP disabled). The disk
+        preset (see ``disk.DISK_PRESETS``) is applied before ``settings``.
+        ``full_allocation`` pre-allocates files of newly added torrents
+        instead of creating them sparse. ``max_active_checks`` limits how many
+        torrents hash their data at the same time. ``seeding_policy`` is the
+        global seeding limit (see ``seeding.SeedingEngine``). ``low_memory``
+        caps libtorrent's memory settings on top of the disk preset (see
+        ``memory.LOW_MEMORY_SETTINGS``) and keeps fewer views cached.
+        ``postprocess`` selects the stages run for finished torrents (see
+        ``postprocess.PostProcessor``). ``blocklist_path`` is an IP blocklist
+        file, loaded from its compiled cache (see ``blocklist.load_blocklist``).
+        ``peer_classes`` sets up the local network class and rate limited IP
+        ranges (see ``peerclass``); None keeps libtorrent's default classes.
+        ``disk_reserve`` turns on disk-space admission control, keeping that
+        many bytes free on every volume (see ``admission.AdmissionController``).
+        """
         assert isinstance(download_dir, str) and download_dir, "download_dir must be a non-empty string"
         assert isinstance(session_file, str) and session_file, "session_file must be a non-empty string"
+        assert settings is None or isinstance(settings, dict), "settings must be a dict or None"
+        assert isinstance(full_allocation, bool), "full_allocation must be a boolean"
+        assert isinstance(low_memory, bool), "low_memory must be a boolean"
+        assert disk_reserve is None or (isinstance(disk_reserve, int) and disk_reserve >= 0), \
+            "disk_reserve must be None or an integer >= 0"
         if lt is None:
             raise RuntimeError("libtorrent library not available")
         self._download_dir = download_dir
         self._session_file = session_file
-        self._resume_file = session_file + ".resume"
+        # One row per torrent; replaced the session file plus .resume/.paths/.seeding files.
+        self._catalog = TorrentCatalog(session_file + ".db")
+        if self._catalog.get_meta("legacy_imported") is None:
+            self._import_legacy_files()
+        self._save_paths = self._catalog.save_paths()  # info-hash -> save path of relocated torrents
+        self._alert_listeners: Dict[str, List[AlertListener]] = {}
+        self._disk_stats = DiskStatsTracker()
+        self._disk_preset = disk_preset
+        self._low_memory = low_memory
+        self.add_alert_listener("session_stats_alert", lambda a: self._disk_stats.update(a.values))
+        self._rechecks = RecheckScheduler(
+            is_checking=_is_checking, auto_managed_flag=lt.torrent_flags.auto_managed, max_active=max_active_checks,
+            on_hold=lambda j: self._catalog.set_hold(_HOLD_RECHECK, Hold(j.key, j.was_paused, j.was_auto_managed,
+                                                                         j.seq, j.priority)),
+            on_release=lambda key: self._catalog.clear_hold(_HOLD_RECHECK, key))
+        self.add_alert_listener("torrent_checked_alert", lambda a: self._rechecks.mark_checked(_handle_key(a.handle)))
+        self._relocations = RelocationQueue(move_flags=lt.move_flags_t.dont_replace, on_moved=self._on_storage_moved)
+        self.add_alert_listener("storage_moved_alert",
+                                lambda a: self._relocations.storage_moved(_handle_key(a.handle), _alert_storage_path(a)))
+        self.add_alert_listener("storage_moved_failed_alert",
+                                lambda a: self._relocations.storage_move_failed(_handle_key(a.handle), a.message()))
+        self._seeding = SeedingEngine(global_policy=seeding_policy or NO_LIMITS,
+                                      prioritize_underseeded=prioritize_underseeded,
+                                      request_updates=lambda: self._session.post_torrent_updates())
+        self._seeding.policies.update(self._catalog.seeding_policies())
+        self._traffic = TrafficRecorder(TrafficStore(self._catalog.path))
+        self.add_alert_listener("state_update_alert", self._on_state_update)
+        self._postprocess = PostProcessor(JobStore(self._catalog.path), postprocess)
+        self.add_alert_listener("torrent_finished_alert", self._on_torrent_finished)
+        self._file_views = FileViewCache(max_entries=1 if low_memory else None)
+        self._admission: Optional[AdmissionController] = None
+        for alert_type in ("piece_finished_alert", "torrent_checked_alert", "metadata_received_alert"):
+            self.add_alert_listener(alert_type, self._on_pieces_changed)
 
-        # Initialise the libtorrent session object.
-        self._session = lt.session()
-        self._load_session_state()
-
-        # Apply settings for listening ports, DHT, etc.
-        settings = {
+        # Settings for listening ports, DHT, etc.
+        session_settings = {
             'listen_interfaces': '0.0.0.0:6881,[::]:6881',
             'enable_dht': True,
             'enable_lsd': True,
@@ -201,55 +445,527 @@ class TorrentManager:
             'alert_mask': lt.alert.category_t.all_categories,
             'download_rate_limit': 0,  # Unlimited
             'upload_rate_limit': 0,  # Unlimited
+            'active_checking': max_active_checks,  # throttles checks libtorrent starts itself
         }
-        self._session.apply_settings(settings)
-        logging.info("Configured libtorrent session with settings: %s", settings)
+        session_settings.update(disk_settings(disk_preset))
+        if low_memory:
+            session_settings.update(memory_settings(True))
+        session_settings.update(settings or {})
+        # Created with them, so nothing listens on the default interfaces or starts DHT/LSD/UPnP first.
+        self._session = lt.session(session_settings)
+        logging.info("Configured libtorrent session with settings: %s", session_settings)
+        self._load_session_state(session_settings)
+
+        # Blocked before the first peer connects; start-up already runs off the GUI thread.
+        self._pending_blocklist: Optional[Future] = None
+        self.blocked_ranges = 0
+        if blocklist_path:
+            try:
+                self.set_blocklist(load_blocklist(blocklist_path))
+            except OSError as e:
+                logging.error("Failed to load the IP blocklist %s: %s", blocklist_path, e)
+        self._peer_class_ids: Dict[str, int] = {}  # user class name -> libtorrent class id
+        if peer_classes is not None:
+            self.set_peer_classes(peer_classes)
 
         # Default parameters for adding new torrents.
         self._params = {
             'save_path': self._download_dir,
-            'storage_mode': lt.storage_mode_t(2),  # Use sparse allocation
+            'storage_mode': self._storage_mode(full_allocation),
         }
+        self.set_disk_reserve(disk_reserve)  # None: gives torrents held in an earlier session their flags back
+        self._restore_rechecks()
+
+    @staticmethod
+    def _storage_mode(full_allocation: bool):
+        if full_allocation:
+            return lt.storage_mode_t.storage_mode_allocate
+        return lt.storage_mode_t.storage_mode_sparse
+
+    def apply_settings(self, settings: Dict[str, Any]) -> None:
+        """Apply libtorrent settings to the running session (no restart needed).
+
+        Values are merged into the current settings; keys that are not given
+        keep their current value.
+        """
+        assert isinstance(settings, dict), "settings must be a dictionary"
+        if not settings:
+            return
+        self._session.apply_settings(settings)
+        logging.info("Applied session settings: %s", settings)
+
+    def apply_disk_profile(self, preset: str, full_allocation: bool) -> None:
+        """Apply a disk preset to the running session.
+
+        Settings take effect immediately (keys the previous preset changed
+        are reset to libtorrent's defaults); the allocation mode only applies
+        to torrents added afterwards.
+        """
+        assert isinstance(full_allocation, bool), "full_allocation must be a boolean"
+        settings = disk_settings(preset)
+        if self._low_memory:  # the memory caps win over the preset
+            settings.update(memory_settings(True))
+        self._session.apply_settings(settings)
+        self._disk_preset = preset
+        self._params['storage_mode'] = self._storage_mode(full_allocation)
+        logging.info("Applied disk preset %s (full_allocation=%s)", preset, full_allocation)
+
+    def apply_memory_mode(self, low_memory: bool) -> None:
+        """Switch the low-memory mode of the running session.
+
+        Switching off restores libtorrent's defaults for the capped keys and
+        then re-applies the disk preset. Overrides passed as ``settings`` at
+        start-up are not restored; callers re-apply them.
+        """
+        assert isinstance(low_memory, bool), "low_memory must be a boolean"
+        settings = memory_settings(low_memory)
+        if not low_memory:
+            settings.update(disk_settings(self._disk_preset))
+        self._session.apply_settings(settings)
+        self._low_memory = low_memory
+        self._file_views.max_entries = 1 if low_memory else None
+        if low_memory:
+            self._file_views.clear()
+        logging.info("Low-memory mode %s", "on" if low_memory else "off")
+
+    # --- IP blocklist -------------------------------------------------------
+    @staticmethod
+    def _build_ip_filter(blocklist: Optional[Blocklist]) -> Tuple[Any, int]:
+        """(``lt.ip_filter`` blocking the ranges of ``blocklist``, range count); one add_rule per range."""
+        ip_filter = lt.ip_filter()
+        if blocklist is None:
+            return ip_filter, 0
+        for first, last in blocklist.address_ranges():
+            ip_filter.add_rule(first, last, BLOCKED)
+        return ip_filter, len(blocklist)
+
+    def set_blocklist(self, blocklist: Optional[Blocklist]) -> None:
+        """Block the ranges of ``blocklist`` (None: allow everyone again)."""
+        self._set_ip_filter(*self._build_ip_filter(blocklist))
+
+    def _set_ip_filter(self, ip_filter: Any, blocked_ranges: int) -> None:
+        self._session.set_ip_filter(ip_filter)
+        self.blocked_ranges = blocked_ranges
+        logging.info("IP filter blocks %d ranges", self.blocked_ranges)
+
+    def load_blocklist(self, path: Optional[str]) -> None:
+        """Load a blocklist file and build its filter on a background thread; ``tick`` installs it."""
+        assert path is None or (isinstance(path, str) and path), "path must be None or a non-empty string"
+        future: Future = Future()
+
+        def load():
+            try:
+                future.set_result(self._build_ip_filter(load_blocklist(path) if path else None))
+            except BaseException as e:  # reported by tick
+                future.set_exception(e)
+
+        threading.Thread(target=load, name="blocklist-load", daemon=True).start()
+        self._pending_blocklist = future
+
+    # --- Peer classes -------------------------------------------------------
+    def set_peer_classes(self, peer_classes: PeerClasses) -> None:
+        """Create, update and delete the user peer classes and install the peer class filter."""
+        assert isinstance(peer_classes, PeerClasses), "peer_classes must be a PeerClasses"
+        wanted = {rule.name for rule in peer_classes.rules}
+        for name in [name for name in self._peer_class_ids if name not in wanted]:
+            self._session.delete_peer_class(self._peer_class_ids.pop(name))
+        for rule in peer_classes.rules:
+            if rule.name not in self._peer_class_ids:
+                self._peer_class_ids[rule.name] = self._session.create_peer_class(rule.name)
+            class_id = self._peer_class_ids[rule.name]
+            assert class_id <= MAX_CLASS_ID, f"peer class id {class_id} does not fit the filter"
+            self._session.set_peer_class(class_id, {
+                'label': rule.name, 'upload_limit': rule.upload_limit, 'download_limit': rule.download_limit,
+                'connection_limit_factor': 100, 'ignore_unchoke_slots': False,
+                'upload_priority': 1, 'download_priority': 1})
+        if peer_classes.local_unthrottled:
+            self._session.set_peer_class(self._session.local_peer_class_id, {
+                'label': 'local', 'upload_limit': 0, 'download_limit': 0, 'connection_limit_factor': 150,
+                'ignore_unchoke_slots': True, 'upload_priority': LOCAL_PRIORITY,
+                'download_priority': LOCAL_PRIORITY})
+        peer_class_filter = lt.ip_filter()
+        for first, last, mask in filter_ranges(peer_classes, self._session.global_peer_class_id,
+                                               self._session.local_peer_class_id, self._peer_class_ids):
+            peer_class_filter.add_rule(first, last, mask)
+        self._session.set_peer_class_filter(peer_class_filter)
+        logging.info("Peer classes: local network %s, %d user classes",
+                     "unthrottled" if peer_classes.local_unthrottled else "throttled", len(peer_classes.rules))
+
+    # --- Disk-space admission ----------------------------------------------
+    def set_disk_reserve(self, disk_reserve: Optional[int]) -> None:
+        """Bytes to keep free per volume; None turns admission control off and starts held torrents."""
+        assert disk_reserve is None or (isinstance(disk_reserve, int) and disk_reserve >= 0), \
+            "disk_reserve must be None or an integer >= 0"
+        if disk_reserve is None:
+            if self._admission is not None:
+                self._admission.release_all()
+                self._admission = None
+            else:
+                self._release_holds(_HOLD_SPACE)
+            return
+        if self._admission is not None:
+            self._admission.reserve_bytes = disk_reserve
+            return
+        self._admission = AdmissionController(
+            disk_reserve, auto_managed_flag=lt.torrent_flags.auto_managed,
+            on_hold=lambda e: self._catalog.set_hold(_HOLD_SPACE, Hold(e.key, e.was_paused, e.was_auto_managed, e.seq)),
+            on_release=lambda key: self._catalog.clear_hold(_HOLD_SPACE, key))
+        # Sizes arrive with the next status updates; over-committed volumes are sorted out by tick().
+        handles = {_handle_key(h): h for h in self._handles if h.is_valid()}
+        held = self._catalog.holds(_HOLD_SPACE)  # still paused from the last session
+        held_keys = {hold.info_hash for hold in held}
+        for key, handle in handles.items():
+            if key not in held_keys:
+                self._admission.admit(key, handle, self._save_paths.get(key, self._download_dir), 0)
+        for hold in held:
+            handle = handles.get(hold.info_hash)
+            if handle is None:
+                self._catalog.clear_hold(_HOLD_SPACE, hold.info_hash)
+                continue
+            self._admission.restore(hold.info_hash, handle, self._save_paths.get(hold.info_hash, self._download_dir),
+                                    hold.was_paused, hold.was_auto_managed)
+        self._session.post_torrent_updates()
+
+    def _release_holds(self, kind: str) -> None:
+        """Give torrents the catalog still lists as held by ``kind`` their paused/auto-managed state back."""
+        held = self._catalog.holds(kind)
+        if not held:
+            return
+        handles = {_handle_key(h): h for h in self._handles if h.is_valid()}
+        for hold in held:
+            handle = handles.get(hold.info_hash)
+            if handle is not None:
+                if hold.was_auto_managed:
+                    handle.set_flags(lt.torrent_flags.auto_managed)
+                if not hold.was_paused:
+                    handle.resume()
+            self._catalog.clear_hold(kind, hold.info_hash)
 
-    def _load_session_state(self):
-        """Load session state from file if it exists."""
+    def _admit(self, handle, save_path: str, remaining: int) -> None:
+        if self._admission is not None:
+            self._admission.admit(_handle_key(handle), handle, save_path, remaining)
+
+    # --- Alerts -------------------------------------------------------------
+    def add_alert_listener(self, alert_type: str, callback: AlertListener) -> None:
+        """Call ``callback(alert)`` for alerts whose class is named ``alert_type``.
+
+        Use ``"*"`` to receive every alert. Listeners run on the thread that
+        calls ``process_alerts`` (the Tk thread in the GUI).
+        """
+        assert isinstance(alert_type, str) and alert_type, "alert_type must be a non-empty string"
+        assert callable(callback), "callback must be callable"
+        self._alert_listeners.setdefault(alert_type, []).append(callback)
+
+    def _dispatch_alert(self, alert) -> None:
+        for key in (type(alert).__name__, "*"):
+            for callback in self._alert_listeners.get(key, ()):
+                try:
+                    callback(alert)
+                except Exception as e:  # pragma: no cover - listener bug must not stop the pump
+                    logging.error("Alert listener for %s failed: %s", key, e)
+
+    def process_alerts(self) -> int:
+        """Pop pending libtorrent alerts and dispatch them to listeners."""
+        alerts = self._session.pop_alerts()
+        for alert in alerts:
+            self._dispatch_alert(alert)
+        return len(alerts)
+
+    def request_session_stats(self) -> None:
+        """Ask libtorrent for a ``session_stats_alert`` (delivered asynchronously)."""
+        self._session.post_session_stats()
+
+    def get_disk_stats(self) -> Optional[DiskStats]:
+        """Return the disk statistics derived from the latest stats alert."""
+        return self._disk_stats.latest
+
+    def tick(self) -> None:
+        """Periodic housekeeping, called from the GUI poll loop."""
+        self._rechecks.tick()
+        self._relocations.tick()
+        for hit in self._seeding.tick():
+            self._apply_seeding_limit(hit)
+        self._traffic.flush()
+        self._postprocess.poll()
+        if self._admission is not None:
+            self._admission.tick()
+        if self._pending_blocklist is not None and self._pending_blocklist.done():
+            future, self._pending_blocklist = self._pending_blocklist, None
+            try:
+                self._set_ip_filter(*future.result())  # only the swap runs on this thread
+            except Exception as e:
+                logging.error("Failed to load the IP blocklist: %s", e)
+
+    def close(self) -> None:
+        """Stop the post-processing workers and close the databases; call after ``save_state`` on exit."""
+        self._postprocess.shutdown()
+        self._postprocess.store.close()
+        self._traffic.store.close()
+        self._catalog.close()
+
+    def _on_state_update(self, alert) -> None:
+        statuses = list(alert.status)
+        self._seeding.update(_seed_snapshot(s) for s in statuses)
+        self._traffic.sample((_status_key(s), s.name, s.total_payload_download, s.total_payload_upload)
+                             for s in statuses)
+        if self._admission is not None:
+            self._admission.update((_status_key(s), s.total_wanted - s.total_wanted_done) for s in statuses)
+
+    def traffic_report(self, span_s: float, top_n: int = DEFAULT_TOP_N) -> TrafficReport:
+        """Payload traffic of the last ``span_s`` seconds and the busiest torrents."""
+        assert span_s > 0, "span_s must be positive"
+        return self._traffic.report(span_s, top_n)
+
+    # --- Post-processing ----------------------------------------------------
+    def _on_torrent_finished(self, alert) -> None:
+        # libtorrent also reports torrents that were complete when loaded; only
+        # those that downloaded something in this session are new.
+        st = alert.handle.status()
+        if st.total_payload_download > 0:
+            self._postprocess.enqueue(_handle_key(alert.handle), st.name, st.save_path)
+
+    def set_postprocess_settings(self, settings: PostProcessSettings) -> None:
+        """Stages for torrents finishing from now on (queued jobs keep theirs)."""
+        assert isinstance(settings, PostProcessSettings), "settings must be PostProcessSettings"
+        self._postprocess.configure(settings)
+
+    def postprocess_jobs(self, limit: int = 100) -> List[PostProcessJob]:
+        """The most recent post-processing jobs, newest first."""
+        return self._postprocess.store.jobs(limit)
+
+    def retry_postprocess(self, info_hash: str) -> bool:
+        """Queue the failed post-processing job of a torrent again."""
+        return self._postprocess.retry(info_hash)
+
+    # --- Seeding policies ---------------------------------------------------
+    def set_global_seeding_policy(self, policy: SeedingPolicy, prioritize_underseeded: bool = False) -> None:
+        """Seeding limits for torrents without their own policy (applied live)."""
+        assert isinstance(policy, SeedingPolicy), "policy must be a SeedingPolicy"
+        self._seeding.set_global(policy, prioritize_underseeded)
+
+    def set_seeding_policy_at(self, index: int, policy: Optional[SeedingPolicy]) -> bool:
+        """Give the torrent at ``index`` its own policy (None: use the global one)."""
+        assert isinstance(index, int), "index must be an integer"
+        assert policy is None or isinstance(policy, SeedingPolicy), "policy must be a SeedingPolicy or None"
+        if index < 0 or index >= len(self._handles) or not self._handles[index].is_valid():
+            return False
+        key = _handle_key(self._handles[index])
+        self._seeding.set_policy(key, policy)
+        self._catalog.set_seeding_policy(key, policy)
+        return True
+
+    def get_seeding_policy_at(self, index: int) -> Optional[SeedingPolicy]:
+        """The torrent's own policy, None if it uses the global one (or is unknown)."""
+        assert isinstance(index, int), "index must be an integer"
+        if index < 0 or index >= len(self._handles) or not self._handles[index].is_valid():
+            return None
+        return self._seeding.policies.get(_handle_key(self._handles[index]))
+
+    # --- Labels -----------------------------------------------------------------
+    def set_labels_at(self, index: int, labels: List[str]) -> bool:
+        """Replace the labels of the torrent at ``index`` (kept in the catalog)."""
+        assert isinstance(index, int), "index must be an integer"
+        assert all(isinstance(label, str) and label for label in labels), "labels must be non-empty strings"
+        if index < 0 or index >= len(self._handles) or not self._handles[index].is_valid():
+            return False
+        self._catalog.set_labels(_handle_key(self._handles[index]), labels)
+        return True
+
+    def get_labels_at(self, index: int) -> List[str]:
+        assert isinstance(index, int), "index must be an integer"
+        if index < 0 or index >= len(self._handles) or not self._handles[index].is_valid():
+            return []
+        return self._catalog.labels_of(_handle_key(self._handles[index]))
+
+    def _apply_seeding_limit(self, hit: LimitReached) -> None:
+        if hit.action == ACTION_REMOVE:
+            for index, handle in enumerate(self._handles):
+                if handle == hit.handle:
+                    self.remove_at(index)
+                    return
+            return
+        # Out of auto-management, otherwise the queue would resume it right away.
+        hit.handle.unset_flags(lt.torrent_flags.auto_managed)
+        hit.handle.pause()
+
+    # --- Storage relocation -------------------------------------------------
+    def _on_storage_moved(self, key: str, new_path: str) -> None:
+        self._save_paths[key] = new_path
+        self._catalog.set_save_path(key, new_path)
+
+    def relocate_at(self, index: int, dest: str) -> bool:
+        """Queue moving the data of the torrent at ``index`` to ``dest``."""
+        assert isinstance(index, int), "index must be an integer"
+        assert isinstance(dest, str) and dest, "dest must be a non-empty string"
+        if index < 0 or index >= len(self._handles):
+            return False
+        handle = self._handles[index]
+        if not handle.is_valid():
+            return False
+        status = handle.status()
+        source = getattr(status, 'save_path', '') or self._download_dir
+        size = getattr(status, 'total_wanted', 0) or 0
+        return self._relocations.enqueue(_handle_key(handle), handle, source, dest, size)
+
+    def relocate_all(self, dest: str) -> int:
+        """Queue moving every torrent to ``dest``; returns the number queued."""
+        self._relocations.clear_finished()
+        return sum(1 for i in range(len(self._handles)) if self.relocate_at(i, dest))
+
+    def get_relocation_progress(self) -> RelocationProgress:
+        return self._relocations.progress()
+
+    # --- Rechecks -----------------------------------------------------------
+    def force_recheck_at(self, index: int, priority: int = 0) -> bool:
+        """Queue a throttled hash check of the torrent at ``index``."""
+        assert isinstance(index, int), "index must be an integer"
+        if index < 0 or index >= len(self._handles):
+            return False
+        handle = self._handles[index]
+        if not handle.is_valid() or not handle.has_metadata():
+            return False
+        size = getattr(handle.status(), 'total_wanted', 0) or 0
+        return self._rechecks.enqueue(_handle_key(handle), handle, size, priority)
+
+    def _restore_rechecks(self) -> None:
+        """Queue the rechecks that were still waiting when the session was saved."""
+        held = self._catalog.holds(_HOLD_RECHECK)
+        if not held:
+            return
+        handles = {_handle_key(h): h for h in self._handles if h.is_valid()}
+        for hold in held:
+            handle = handles.get(hold.info_hash)
+            if handle is None:
+                self._catalog.clear_hold(_HOLD_RECHECK, hold.info_hash)
+                continue
+            size = getattr(handle.status(), 'total_wanted', 0) or 0
+            self._rechecks.restore(hold.info_hash, handle, size, hold.priority, hold.was_paused,
+                                   hold.was_auto_managed)
+
+    def get_check_results(self) -> Dict[str, CheckResult]:
+        """Hash throughput of finished rechecks keyed by info-hash."""
+        return dict(self._rechecks.results)
+
+    # --- Persistence ----------------------------------------------------------
+    def _import_legacy_files(self) -> None:
+        """Move state from the pre-catalog files into the catalog.
+
+        Entries that can't be read are skipped one by one. The import is
+        marked done (and the old files renamed to ``*.imported``) only when
+        it went through, so a failed one is tried again on the next start;
+        torrents the catalog already has are not overwritten.
+        """
+        resume_file, paths_file = self._session_file + ".resume", self._session_file + ".paths"
+        seeding_file = self._session_file + ".seeding"
+        legacy = [p for p in (self._session_file, resume_file, paths_file, seeding_file) if os.path.exists(p)]
+        if not legacy:
+            self._catalog.set_meta("legacy_imported", b"1")
+            return
+        known = self._catalog.resume_keys()
+        rows: List[ResumeRow] = []
+        paths: Dict[str, Any] = {}
+        policies: Dict[str, Any] = {}
+        try:
+            if os.path.exists(resume_file):
+                with open(resume_file, 'rb') as f:
+                    entries = lt.bdecode(f.read())
+                if not isinstance(entries, list):
+                    raise ValueError(f"{resume_file} is not a list of resume data")
+                for i, entry in enumerate(entries):
+                    try:
+                        data = lt.bencode(entry)
+                        key = _atp_key(lt.read_resume_data(data))
+                    except Exception as e:
+                        logging.error("Skipping unreadable entry %d of %s: %s", i, resume_file, e)
+                        continue
+                    if key not in known:
+                        rows.append(ResumeRow(info_hash=key, resume=data))
+            for path, target in ((paths_file, paths), (seeding_file, policies)):
+                if os.path.exists(path):
+                    with open(path, 'r', encoding='utf-8') as f:
+                        target.update(json.load(f))
+            imported = {row.info_hash for row in rows}
+            with self._catalog.transaction():
+                if os.path.exists(self._session_file) and self._catalog.get_meta("session_state") is None:
+                    with open(self._session_file, 'rb') as f:
+                        self._catalog.set_meta("session_state", f.read())
+                self._catalog.put_resume(rows)
+                for key, path in paths.items():
+                    if str(key) in imported:
+                        self._catalog.set_save_path(str(key), str(path))
+                for key, policy in policies.items():
+                    if str(key) not in imported:
+                        continue
+                    try:
+                        self._catalog.set_seeding_policy(str(key), SeedingPolicy.from_dict(policy))
+                    except Exception as e:
+                        logging.error("Skipping the bad seeding policy of %s: %s", key, e)
+                self._catalog.set_meta("legacy_imported", b"1")
+        except Exception as e:  # nothing was written; tried again on the next start
+            logging.error(f"Failed to import the old session files: {e}")
+            return
+        logging.info("Imported %d torrents from %s into %s", len(rows), resume_file, self._catalog.path)
+        for path in legacy:
+            try:
+                os.replace(path, path + ".imported")
+            except OSError as e:
+                logging.warning("Could not rename %s after importing it: %s", path, e)
+
+    def _load_session_state(self, settings: Dict[str, Any]):
+        """Load the session state and re-add the torrents of the catalog.
+
+        ``settings`` are applied again after the saved state (which carries
+        settings of its own) and before the first torrent is added.
+        """
         self._handles = [] # Clear existing handles before loading
-        if os.path.exists(self._session_file):
+        state = self._catalog.get_meta("session_state")
+        if state is not None:
             try:
-                with open(self._session_file, 'rb') as f:
-                    data = lt.bdecode(f.read())
-                    self._session.load_state(data)
-                    logging.info(f"Session state loaded from {self._session_file}")
+                self._session.load_state(lt.bdecode(state))
+                logging.info(f"Session state loaded from {self._catalog.path}")
             except Exception as e:
                 logging.error(f"Failed to load session state: {e}")
+            self._session.apply_settings(settings)
 
-        if os.path.exists(self._resume_file):
+        loaded = 0
+        for key, resume in self._catalog.iter_resume():
             try:
-                with open(self._resume_file, 'rb') as f:
-                    resume_data_list = lt.bdecode(f.read())
-                
-                for resume_data_dict in resume_data_list:
-                    resume_data_bytes = lt.bencode(resume_data_dict)
-                    atp = lt.read_resume_data(resume_data_bytes)
-                    atp.save_path = self._download_dir  # Ensure correct save path
-                    handle = self._session.add_torrent(atp)
-                    self._handles.append(handle)
-                logging.info(f"Loaded resume data for {len(resume_data_list)} torrents from {self._resume_file}")
+                atp = lt.read_resume_data(resume)
+                # Relocated torrents keep their own path, others follow the download dir
+                atp.save_path = self._save_paths.get(key, self._download_dir)
+                self._handles.append(self._session.add_torrent(atp))
+                loaded += 1
             except Exception as e:
-                logging.error(f"Failed to load resume data: {e}")
+                logging.error(f"Failed to load resume data of {key}: {e}")
+        if loaded:
+            logging.info(f"Loaded resume data for {loaded} torrents from {self._catalog.path}")
 
     def save_state(self):
-        """Save the current session state to a file."""
+        """Save the session state and the resume data of changed torrents."""
+        with PERF.timer("save_state"):
+            self._save_state()
+
+    @staticmethod
+    def _resume_row(alert) -> ResumeRow:
+        params = alert.params
+        return ResumeRow(info_hash=_handle_key(alert.handle), resume=lt.bencode(alert.resume_data),
+                         name=str(params.name), added_at=float(params.added_time) or None,
+                         completed_at=float(params.completed_time) or None,
+                         download_limit=int(params.download_limit), upload_limit=int(params.upload_limit),
+                         file_priorities=[int(p) for p in params.file_priorities])
+
+    def _save_state(self):
         try:
+            self._traffic.flush(force=True)
             # Save session state
-            with open(self._session_file, 'wb') as f:
-                f.write(lt.bencode(self._session.save_state()))
-            logging.info(f"Session state saved to {self._session_file}")
-
-            # Save resume data for all torrents
-            resume_data = []
-            valid_handles = [h for h in self._handles if h.is_valid()]
+            self._catalog.set_meta("session_state", lt.bencode(self._session.save_state()))
+            logging.info(f"Session state saved to {self._catalog.path}")
 
+            # Torrents already in the catalog are only saved again if they changed.
+            order = {_handle_key(h): i for i, h in enumerate(self._handles) if h.is_valid()}
+            stored = self._catalog.resume_keys()
+            valid_handles = [h for h in self._handles if h.is_valid()
+                             and (_handle_key(h) not in stored or h.need_save_resume_data())]
             if not valid_handles:
                 return
 
@@ -259,6 +975,7 @@ class TorrentManager:
                 h.save_resume_data()
 
             # Wait for all resume data alerts (or failures)
+            rows: List[ResumeRow] = []
             while outstanding_resume_data > 0:
                 if not self._session.wait_for_alert(5000):  # 5 second timeout per alert
                     logging.warning("Timeout waiting for resume data alerts")
@@ -267,19 +984,18 @@ class TorrentManager:
                 alerts = self._session.pop_alerts()
                 for alert in alerts:
                     if isinstance(alert, lt.save_resume_data_alert):
-                        resume_data.append(alert.resume_data)
+                        rows.append(self._resume_row(alert))
                         outstanding_resume_data -= 1
                     elif isinstance(alert, lt.save_resume_data_failed_alert):
                         logging.warning(f"Failed to get resume data: {alert.message()}")
                         outstanding_resume_data -= 1
+                    else:  # don't swallow unrelated alerts
+                        self._dispatch_alert(alert)
 
-            # Save collected resume data
-            if resume_data:
-                with open(self._resume_file, 'wb') as f:
-                    f.write(lt.bencode(resume_data))
-                logging.info(f"Resume data for {len(resume_data)} torrents saved to {self._resume_file}")
-            else:
-                logging.warning("No resume data collected")
+            # New torrents are appended to the catalog in list order
+            rows.sort(key=lambda row: order.get(row.info_hash, len(order)))
+            saved = self._catalog.put_resume(rows)
+            logging.info(f"Resume data for {saved} torrents saved to {self._catalog.path}")
 
         except Exception as e:
             logging.error(f"Failed to save session or resume data: {e}")
@@ -287,15 +1003,30 @@ class TorrentManager:
     def add_magnet(self, magnet_uri: str):
         """Add a magnet URI to the session and track its handle."""
         assert isinstance(magnet_uri, str) and magnet_uri.startswith("magnet:?"), "magnet_uri must be a valid magnet link"
-        # lt.add_magnet_uri() is asynchronous, it returns a handle immediately.
-        handle = self._session.add_magnet_uri(magnet_uri, self._params)
+        # Adding is asynchronous, a handle is returned immediately.
+        with PERF.timer("add_magnet"):
+            if hasattr(self._session, 'add_magnet_uri'):  # libtorrent 1.x
+                handle = self._session.add_magnet_uri(magnet_uri, self._params)
+            else:  # removed in libtorrent 2.x
+                atp = lt.parse_magnet_uri(magnet_uri)
+                atp.save_path = self._params['save_path']
+                atp.storage_mode = self._params['storage_mode']
+                handle = self._session.add_torrent(atp)
         self._handles.append(handle)
-        logging.debug("Added magnet URI: %s", magnet_uri)
+        self._admit(handle, self._params['save_path'], 0)  # size unknown until the metadata arrives
+        logging.debug("Added magnet URI: %s", _magnet_summary(magnet_uri))
         return handle
 
-    def add_torrent_file(self, torrent_path: str):
-        """Add a .torrent file to the session."""
+    def add_torrent_file(self, torrent_path: str, save_path: Optional[str] = None, seed_mode: bool = False):
+        """Add a .torrent file to the session.
+
+        ``save_path`` overrides the download directory for this torrent (kept
+        across restarts). With ``seed_mode`` the data is trusted to be
+        complete and not checked - for torrents just created from it.
+        """
         assert isinstance(torrent_path, str) and torrent_path, "torrent_path must be a non-empty string"
+        assert save_path is None or (isinstance(save_path, str) and save_path), "save_path must be a non-empty string"
+        assert isinstance(seed_mode, bool), "seed_mode must be a boolean"
         if not os.path.isfile(torrent_path):
             raise FileNotFoundError(f"Torrent file not found: {torrent_path}")
         # Load the .torrent file to get its metadata.
@@ -306,13 +1037,23 @@ class TorrentManager:
 
         params = dict(self._params)  # shallow copy
         params['ti'] = info
+        if save_path is not None:
+            params['save_path'] = save_path
+        if seed_mode:
+            params['flags'] = lt.torrent_flags.default_flags | lt.torrent_flags.seed_mode
         # Add the torrent to the session.
         try:
-            handle = self._session.add_torrent(params)
+            with PERF.timer("add_torrent_file"):
+                handle = self._session.add_torrent(params)
         except Exception as e:  # pragma: no cover
             raise RuntimeError(f"Failed to add torrent: {e}") from e
 
         self._handles.append(handle)
+        self._admit(handle, params['save_path'], 0 if seed_mode else info.total_size())
+        if save_path is not None and save_path != self._download_dir:
+            key = _handle_key(handle)
+            self._save_paths[key] = save_path
+            self._catalog.set_save_path(key, save_path)
         logging.debug("Added torrent file: %s", torrent_path)
         return handle
 
@@ -326,6 +1067,10 @@ class TorrentManager:
         """Return the list of torrent handles."""
         return self._handles
 
+    def torrent_keys(self) -> List[str]:
+        """Info-hash of every torrent in list order ("" for invalid handles)."""
+        return [_handle_key(h) if h.is_valid() else "" for h in self._handles]
+
     def get_loaded_torrents_info(self) -> List[LoadedTorrentInfo]:
         """Return info about torrents loaded from the session state."""
         info_list = []
@@ -349,7 +1094,10 @@ class TorrentManager:
             return False
         handle = self._handles[index]
         # Check if the torrent is valid and can be paused.
-        if handle.is_valid() and handle.status().pausable:
+        if not handle.is_valid():
+            return False
+        status = handle.status()
+        if getattr(status, 'pausable', not status.paused):  # no 'pausable' in libtorrent 2.x
             handle.pause()
             return True
         return False
@@ -362,18 +1110,67 @@ class TorrentManager:
         handle = self._handles[index]
         # Check if the torrent is valid and is currently paused.
         if handle.is_valid() and handle.status().paused:
+            if self._admission is not None:
+                self._admission.force(_handle_key(handle))  # the user overrides a disk-space hold
             handle.resume()
             return True
         return False
 
+    def get_peers_at(self, index: int) -> List[PeerInfo]:
+        """Connected peers of the torrent at ``index`` (empty if the index is invalid).
+
+        ``get_peer_info`` is comparatively expensive; call it for one torrent
+        at a time and not on every status refresh.
+        """
+        assert isinstance(index, int), "index must be an integer"
+        if index < 0 or index >= len(self._handles) or not self._handles[index].is_valid():
+            return []
+        with PERF.timer("get_peers"):
+            return [_peer_from_info(p) for p in self._handles[index].get_peer_info()]
+
+    # --- Files ----------------------------------------------------------------
+    def _on_pieces_changed(self, alert) -> None:
+        if len(self._file_views):  # nothing cached unless the files view is open
+            self._file_views.invalidate(_handle_key(alert.handle))
+
+    def get_files_at(self, index: int) -> Optional[FileView]:
+        """Files and piece map of the torrent at ``index`` (None without metadata).
+
+        The view is cached per torrent and only recomputed after pieces
+        finished or the availability got old (see ``files.FileViewCache``).
+        """
+        assert isinstance(index, int), "index must be an integer"
+        if index < 0 or index >= len(self._handles):
+            return None
+        handle = self._handles[index]
+        if not handle.is_valid() or not handle.has_metadata():
+            return None
+        pieces_done = handle.status(0).num_pieces  # no optional fields: cheap
+        with PERF.timer("get_files"):
+            return self._file_views.get(_handle_key(handle), pieces_done, lambda: _file_view(handle))
+
     def get_status_list(self) -> List[TorrentStatus]:
         """Return a list of status objects for all torrents."""
         statuses: List[TorrentStatus] = []
-        for handle in list(self._handles):
-            try:
-                statuses.append(_status_from_handle(handle))
-            except Exception:  # pragma: no cover - already logged in helper
-                continue
+        with PERF.timer("get_status_list"):
+            # Only pay for info-hash lookups while rechecks, moves or disk-space holds are queued.
+            rechecks = self._rechecks if self._rechecks.pending() else None
+            relocations = self._relocations if self._relocations.pending() else None
+            admission = self._admission if self._admission is not None and self._admission.pending() else None
+            for handle in list(self._handles):
+                try:
+                    st = _status_from_handle(handle)
+                except Exception:  # pragma: no cover - already logged in helper
+                    continue
+                if rechecks is not None or relocations is not None or admission is not None:
+                    key = _handle_key(handle)
+                    if rechecks is not None:
+                        st.check_position = rechecks.queue_position(key)
+                    if relocations is not None:
+                        st.move_position = relocations.queue_position(key)
+                    if admission is not None:
+                        st.space_position = admission.queue_position(key)
+                statuses.append(st)
         return statuses
 
     def remove_at(self, index: int, *, delete_files: bool = False) -> bool:
@@ -385,12 +1182,23 @@ class TorrentManager:
         try:
             # Remove the handle from our internal list.
             handle = self._handles.pop(index)
+            key = _handle_key(handle)
+            self._rechecks.discard(key)
+            self._relocations.discard(key)
+            self._save_paths.pop(key, None)
+            self._file_views.discard(key)
+            self._seeding.discard(key)
+            self._traffic.discard(key)
+            if self._admission is not None:
+                self._admission.discard(key)
+            self._catalog.delete(key)
             # Remove the torrent from the libtorrent session.
-            if delete_files:
-                # Use the delete_files flag to remove data from disk.
-                self._session.remove_torrent(handle, lt.options_t.delete_files)
-            else:
-                self._session.remove_torrent(handle)
+            with PERF.timer("remove_torrent"):
+                if delete_files:
+                    # Use the delete_files flag to remove data from disk.
+                    self._session.remove_torrent(handle, lt.options_t.delete_files)
+                else:
+                    self._session.remove_torrent(handle)
             logging.info("Removed torrent at index %s (delete_files=%s)", index, delete_files)
             return True
         except Exception as e:  # pragma: no cover - defensive
@@ -6,20 +6,14 @@ import tkinter as tk
 
 from . import util
 from .logging import setup_logging
-from .gui import TorrentDownloaderApp
-
-
-# Create necessary directories
-app_data_dir = util.get_app_data_dir()
-log_dir = util.get_log_dir()
-cache_dir = util.get_cache_dir()
-
-for directory in [app_data_dir, log_dir, cache_dir]:
-    os.makedirs(directory, exist_ok=True)
+from .perf import STARTUP
 
 
 def main() -> None:
+    STARTUP.start()
     try:
+        # Create necessary directories (downloads dir is resolved by the GUI)
+        util.ensure_app_dirs(create_downloads=False)
         # Ensure logging configured (idempotent if already done by caller/tests)
         log_file = setup_logging()
         logging.info("Starting TorrentDownloader application")
@@ -30,6 +24,7 @@ def main() -> None:
 
         root = tk.Tk()
         assert isinstance(root, tk.Tk), "root must be a tk.Tk instance"
+        STARTUP.mark("tk_ready")
         # Disable system menu bar on macOS
         if sys.platform == 'darwin':
             logging.info("Configuring macOS-specific settings")
@@ -38,7 +33,11 @@ def main() -> None:
             root.createcommand('::tk::mac::ShowHelp', lambda: None)
             root.createcommand('::tk::mac::Quit', lambda: None)
 
+        # Imported here so importing this module stays cheap; the GUI defers
+        # libtorrent itself until the session is created in the background.
+        from .gui import TorrentDownloaderApp
         app = TorrentDownloaderApp(root)
+        STARTUP.mark("window_built")
         root.mainloop()
     except Exception as e:
         logging.error(f"Error starting application: {e}")